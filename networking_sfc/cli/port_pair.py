@@ -66,10 +66,15 @@ class PortPairCreate(extension.ClientExtensionCreate, PortPair):
             help=_('ID or name of the egress neutron port.'))
         parser.add_argument(
             '--service-function-parameters',
-            metavar='type=TYPE[,correlation=CORRELATION_TYPE]',
+            metavar='type=TYPE[,correlation=CORRELATION_TYPE]'
+                    '[,weight=WEIGHT]',
             type=utils.str2dict,
             help=_('Dictionary of Service function parameters. '
-                   'Currently, only correlation=None is supported.'))
+                   'Currently, only correlation=None, correlation=mpls '
+                   'for a service function keeping the MPLS label of '
+                   'the chain, and weight, the share of the traffic of '
+                   'the port pair group going to this port pair, are '
+                   'supported.'))
 
     def args2body(self, parsed_args):
         body = {}
@@ -97,10 +102,18 @@ class PortPairUpdate(extension.ClientExtensionUpdate, PortPair):
         parser.add_argument(
             '--description',
             help=_('Description for the Port Pair.'))
+        parser.add_argument(
+            '--service-function-parameters',
+            metavar='weight=WEIGHT',
+            type=utils.str2dict,
+            help=_('Dictionary of Service function parameters. '
+                   'Currently, only weight can be updated.'))
 
     def args2body(self, parsed_args):
         body = {}
-        neutronv20.update_dict(parsed_args, body, ['name', 'description'])
+        neutronv20.update_dict(parsed_args, body,
+                               ['name', 'description',
+                                'service_function_parameters'])
         return {self.resource: body}
 
 
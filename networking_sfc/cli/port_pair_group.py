@@ -14,6 +14,7 @@
 #    under the License.
 
 from neutronclient.common import extension
+from neutronclient.common import utils
 from neutronclient.neutron import v2_0 as neutronv20
 
 from networking_sfc._i18n import _
@@ -68,10 +69,23 @@ class PortPairGroupCreate(extension.ClientExtensionCreate, PortPairGroup):
             metavar='NAME',
             help=_('Name of the Port Pair Group.'))
         add_common_arguments(parser)
+        parser.add_argument(
+            '--port-pair-group-parameters',
+            metavar=('[lb_fields=LB_FIELDS][,symmetric=BOOL]'
+                     '[,locality=LOCALITY]'),
+            type=utils.str2dict,
+            help=_('Dictionary of port pair group parameters. lb_fields '
+                   'is a list of eth_src, eth_dst, ip_src, ip_dst, '
+                   'tcp_src, tcp_dst, udp_src and udp_dst separated by '
+                   '&, symmetric=true hashes the 5-tuple symmetrically, '
+                   'locality=local sends the traffic of a host to its '
+                   'local port pairs when it has some.'))
 
     def args2body(self, parsed_args):
         body = {}
         body = update_common_args2body(self.get_client(), body, parsed_args)
+        neutronv20.update_dict(parsed_args, body,
+                               ['port_pair_group_parameters'])
         return {self.resource: body}
 
 
@@ -0,0 +1,72 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Move path node next hops out of the JSON column
+
+Revision ID: f22de9af7d7d
+Revises: 48072cb59133
+Create Date: 2016-08-09 14:20:13.508196
+
+"""
+
+from alembic import op
+from oslo_serialization import jsonutils
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f22de9af7d7d'
+down_revision = '48072cb59133'
+depends_on = ('c85461ee53b8',)
+
+
+path_nodes = sa.Table(
+    'sfc_path_nodes', sa.MetaData(),
+    sa.Column('id', sa.String(length=36)),
+    sa.Column('next_hop', sa.String(length=512)))
+
+port_details = sa.Table(
+    'sfc_portpair_details', sa.MetaData(),
+    sa.Column('id', sa.String(length=36)))
+
+next_hops = sa.Table(
+    'sfc_path_node_next_hops', sa.MetaData(),
+    sa.Column('pathnode_id', sa.String(length=36)),
+    sa.Column('portpair_id', sa.String(length=36)),
+    sa.Column('weight', sa.Integer()))
+
+
+def upgrade():
+    bind = op.get_bind()
+    port_detail_ids = set(
+        row.id for row in bind.execute(sa.select([port_details.c.id])))
+
+    rows = {}
+    for node in bind.execute(
+        sa.select([path_nodes.c.id, path_nodes.c.next_hop]).where(
+            path_nodes.c.next_hop.isnot(None))
+    ):
+        for member in jsonutils.loads(node.next_hop) or []:
+            # skip members whose port detail has been deleted already
+            if member['portpair_id'] not in port_detail_ids:
+                continue
+            rows[(node.id, member['portpair_id'])] = {
+                'pathnode_id': node.id,
+                'portpair_id': member['portpair_id'],
+                'weight': member.get('weight', 1)
+            }
+    if rows:
+        op.bulk_insert(next_hops, list(rows.values()))
+
+    op.drop_column('sfc_path_nodes', 'next_hop')
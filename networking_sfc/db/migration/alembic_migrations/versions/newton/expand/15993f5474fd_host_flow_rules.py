@@ -0,0 +1,42 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add host flow rules table
+
+Revision ID: 15993f5474fd
+Revises: c85461ee53b8
+Create Date: 2016-08-16 09:47:05.218334
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '15993f5474fd'
+down_revision = 'c85461ee53b8'
+
+
+def upgrade():
+    op.create_table('sfc_host_flow_rules',
+        sa.Column('host_id', sa.String(length=255), nullable=False),
+        sa.Column('port_id', sa.String(length=36), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('flowrules',
+                  sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                  nullable=False),
+        sa.PrimaryKeyConstraint('host_id', 'port_id')
+    )
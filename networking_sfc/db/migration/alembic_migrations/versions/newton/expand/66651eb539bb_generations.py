@@ -0,0 +1,37 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add generation table
+
+Revision ID: 66651eb539bb
+Revises: b25e255e2194
+Create Date: 2016-08-25 11:32:54.902716
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '66651eb539bb'
+down_revision = 'b25e255e2194'
+
+
+def upgrade():
+    op.create_table('sfc_generations',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
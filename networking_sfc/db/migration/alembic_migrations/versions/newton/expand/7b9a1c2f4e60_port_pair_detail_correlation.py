@@ -0,0 +1,35 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add correlation to port pair details
+
+Revision ID: 7b9a1c2f4e60
+Revises: a3e5cd4e5b32
+Create Date: 2016-09-19 11:42:08.604127
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b9a1c2f4e60'
+down_revision = 'a3e5cd4e5b32'
+
+
+def upgrade():
+    op.add_column('sfc_portpair_details',
+                  sa.Column('correlation', sa.String(length=255),
+                            nullable=True))
@@ -0,0 +1,47 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add port chain hop stats table
+
+Revision ID: a3e5cd4e5b32
+Revises: d6fb381b65f2
+Create Date: 2016-09-12 15:04:21.318407
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e5cd4e5b32'
+down_revision = 'd6fb381b65f2'
+
+
+def upgrade():
+    op.create_table('sfc_port_chain_hop_stats',
+        sa.Column('portchain_id', sa.String(length=36), nullable=False),
+        sa.Column('host', sa.String(length=255), nullable=False),
+        sa.Column('hop', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('packets_in', sa.BigInteger(), nullable=False),
+        sa.Column('bytes_in', sa.BigInteger(), nullable=False),
+        sa.Column('packets_out', sa.BigInteger(), nullable=False),
+        sa.Column('bytes_out', sa.BigInteger(), nullable=False),
+        sa.Column('packet_rate', sa.Float(), nullable=True),
+        sa.Column('byte_rate', sa.Float(), nullable=True),
+        sa.Column('timestamp', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['portchain_id'], ['sfc_port_chains.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('portchain_id', 'host', 'hop')
+    )
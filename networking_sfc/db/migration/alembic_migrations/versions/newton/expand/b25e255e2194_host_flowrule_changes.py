@@ -0,0 +1,49 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add host revision and flow rule change tables
+
+Revision ID: b25e255e2194
+Revises: 15993f5474fd
+Create Date: 2016-08-22 16:11:38.640127
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b25e255e2194'
+down_revision = '15993f5474fd'
+
+
+def upgrade():
+    op.create_table('sfc_host_revisions',
+        sa.Column('host_id', sa.String(length=255), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('host_id')
+    )
+
+    op.create_table('sfc_host_flowrule_changes',
+        sa.Column('host_id', sa.String(length=255), nullable=False),
+        sa.Column('revision', sa.Integer(), autoincrement=False,
+                  nullable=False),
+        sa.Column('method', sa.String(length=64), nullable=False),
+        sa.Column('flowrule',
+                  sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                  nullable=False),
+        sa.PrimaryKeyConstraint('host_id', 'revision')
+    )
@@ -0,0 +1,42 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add path node next hop table
+
+Revision ID: c85461ee53b8
+Revises: e68d78d233ff
+Create Date: 2016-08-09 14:02:51.772431
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c85461ee53b8'
+down_revision = 'e68d78d233ff'
+
+
+def upgrade():
+    op.create_table('sfc_path_node_next_hops',
+        sa.Column('pathnode_id', sa.String(length=36), nullable=False),
+        sa.Column('portpair_id', sa.String(length=36), nullable=False),
+        sa.Column('weight', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['pathnode_id'], ['sfc_path_nodes.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['portpair_id'], ['sfc_portpair_details.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('pathnode_id', 'portpair_id')
+    )
@@ -0,0 +1,41 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add port pair group parameter table
+
+Revision ID: d6fb381b65f2
+Revises: 66651eb539bb
+Create Date: 2016-09-06 10:21:37.512964
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6fb381b65f2'
+down_revision = '66651eb539bb'
+
+
+def upgrade():
+    op.create_table('sfc_port_pair_group_params',
+        sa.Column('keyword', sa.String(length=255), nullable=False),
+        sa.Column('value', sa.String(length=255), nullable=True),
+        sa.Column('pair_group_id', sa.String(length=36), nullable=False),
+        sa.ForeignKeyConstraint(['pair_group_id'],
+                                ['sfc_port_pair_groups.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('keyword', 'pair_group_id')
+    )
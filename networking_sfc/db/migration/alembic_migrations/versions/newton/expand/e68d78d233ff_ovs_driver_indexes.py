@@ -0,0 +1,55 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Add indexes for OVS driver lookup columns
+
+Revision ID: e68d78d233ff
+Revises: 5a475fc853e6
+Create Date: 2016-08-03 10:21:37.183513
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e68d78d233ff'
+down_revision = '5a475fc853e6'
+
+
+def upgrade():
+    op.create_index(
+        op.f('ix_sfc_portpair_details_host_id'),
+        'sfc_portpair_details', ['host_id'], unique=False
+    )
+    op.create_index(
+        'ix_sfc_portpair_details_ingress_tenant_id',
+        'sfc_portpair_details', ['ingress', 'tenant_id'], unique=False
+    )
+    op.create_index(
+        'ix_sfc_portpair_details_egress_tenant_id',
+        'sfc_portpair_details', ['egress', 'tenant_id'], unique=False
+    )
+    op.create_index(
+        'ix_sfc_path_nodes_portchain_id_nsi',
+        'sfc_path_nodes', ['portchain_id', 'nsi'], unique=False
+    )
+    op.create_index(
+        'ix_sfc_path_nodes_nsp_nsi',
+        'sfc_path_nodes', ['nsp', 'nsi'], unique=False
+    )
+    op.create_index(
+        'ix_sfc_path_nodes_next_group_id_nsi',
+        'sfc_path_nodes', ['next_group_id', 'nsi'], unique=False
+    )
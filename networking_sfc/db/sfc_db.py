@@ -41,6 +41,11 @@ LOG = logging.getLogger(__name__)
 
 UUID_LEN = 36
 PARAM_LEN = 255
+HOST_LEN = 255
+
+# The counters of the port chain hops, summed over the hosts
+HOP_STATS_COUNTERS = ('packets_in', 'bytes_in', 'packets_out', 'bytes_out',
+                      'packet_rate', 'byte_rate')
 
 
 class ChainParameter(model_base.BASEV2):
@@ -65,6 +70,17 @@ class ServiceFunctionParam(model_base.BASEV2):
         primary_key=True)
 
 
+class PortPairGroupParam(model_base.BASEV2):
+    """Represents a port pair group parameter."""
+    __tablename__ = 'sfc_port_pair_group_params'
+    keyword = sa.Column(sa.String(PARAM_LEN), primary_key=True)
+    value = sa.Column(sa.String(PARAM_LEN))
+    pair_group_id = sa.Column(
+        sa.String(UUID_LEN),
+        sa.ForeignKey('sfc_port_pair_groups.id', ondelete='CASCADE'),
+        primary_key=True)
+
+
 class ChainClassifierAssoc(model_base.BASEV2):
     """Relation table between sfc_port_chains and flow_classifiers."""
     __tablename__ = 'sfc_chain_classifier_associations'
@@ -144,6 +160,34 @@ class PortPairGroup(model_base.BASEV2, models_v2.HasId,
     chain_group_associations = orm.relationship(
         ChainGroupAssoc,
         backref='port_pair_groups')
+    port_pair_group_parameters = orm.relationship(
+        PortPairGroupParam,
+        collection_class=attribute_mapped_collection('keyword'),
+        cascade='all, delete-orphan')
+
+
+class ChainHopStats(model_base.BASEV2):
+    """Represents the data plane counters of a port chain hop on a host.
+
+    Hop 0 classifies the traffic into the chain, hop n is the n-th port
+    pair group. The packets and bytes in are delivered to the service
+    functions of the hop, the ones out leave the hop, at the given rates.
+    """
+    __tablename__ = 'sfc_port_chain_hop_stats'
+    portchain_id = sa.Column(
+        sa.String(UUID_LEN),
+        sa.ForeignKey('sfc_port_chains.id', ondelete='CASCADE'),
+        primary_key=True)
+    host = sa.Column(sa.String(HOST_LEN), primary_key=True)
+    hop = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    packets_in = sa.Column(sa.BigInteger, nullable=False, default=0)
+    bytes_in = sa.Column(sa.BigInteger, nullable=False, default=0)
+    packets_out = sa.Column(sa.BigInteger, nullable=False, default=0)
+    bytes_out = sa.Column(sa.BigInteger, nullable=False, default=0)
+    packet_rate = sa.Column(sa.Float)
+    byte_rate = sa.Column(sa.Float)
+    # time of the counters on the host, in seconds
+    timestamp = sa.Column(sa.Float)
 
 
 class PortChain(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
@@ -166,6 +210,17 @@ class PortChain(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
         ChainParameter,
         collection_class=attribute_mapped_collection('keyword'),
         cascade='all, delete-orphan')
+    hop_stats = orm.relationship(
+        ChainHopStats,
+        cascade='all, delete-orphan')
+
+
+def _get_rate(last_counter, counter, elapsed):
+    delta = counter - last_counter
+    if delta < 0:
+        # The counters restart from zero when the flows are reinstalled
+        delta = counter
+    return float(delta) / elapsed
 
 
 class SfcDbPlugin(
@@ -191,10 +246,27 @@ class SfcDbPlugin(
             'chain_parameters': {
                 param['keyword']: param['value']
                 for k, param in six.iteritems(port_chain['chain_parameters'])
-            }
+            },
+            'chain_statistics': self._make_chain_statistics(
+                port_chain['hop_stats'])
         }
         return self._fields(res, fields)
 
+    def _make_chain_statistics(self, hop_stats):
+        """Sum the counters of the hops of a port chain over the hosts."""
+        hops = {}
+        for stats in hop_stats:
+            hop = hops.setdefault(stats['hop'], dict(
+                [('hop', stats['hop'])] +
+                [(key, 0) for key in HOP_STATS_COUNTERS]))
+            for key in HOP_STATS_COUNTERS:
+                hop[key] += stats[key] or 0
+        for hop in six.itervalues(hops):
+            # Delivered to the service functions and not coming out
+            hop['packets_dropped'] = max(
+                0, hop['packets_in'] - hop['packets_out'])
+        return sorted(six.itervalues(hops), key=lambda hop: hop['hop'])
+
     def _validate_port_pair_groups(self, context, pg_ids, pc_id=None):
         with context.session.begin(subtransactions=True):
             for pg_id in pg_ids:
@@ -363,10 +435,42 @@ class SfcDbPlugin(
                         context, v, pc_id=id)
                     self._setup_chain_group_associations(
                         context, pc_db, v)
+                    # The hops are renumbered
+                    pc_db.hop_stats = []
                 else:
                     pc_db[k] = v
             return self._make_port_chain_dict(pc_db)
 
+    @log_helpers.log_method_call
+    def update_port_chain_hop_stats(self, context, id, host, hop_stats,
+                                    timestamp):
+        """Store the data plane counters of the hops of a chain on a host.
+
+        @param: hop_stats: list of the counters of each hop, by the keys
+                of ChainHopStats
+        @param: timestamp: time of the counters on the host, in seconds
+        """
+        with context.session.begin(subtransactions=True):
+            pc_db = self._get_port_chain(context, id)
+            hops_db = dict((hop_db.hop, hop_db) for hop_db in pc_db.hop_stats
+                           if hop_db.host == host)
+            for stats in hop_stats:
+                hop_db = hops_db.get(stats['hop'])
+                if hop_db is None:
+                    hop_db = ChainHopStats(host=host, hop=stats['hop'])
+                    pc_db.hop_stats.append(hop_db)
+                elif (hop_db.timestamp is not None and
+                      timestamp > hop_db.timestamp):
+                    elapsed = timestamp - hop_db.timestamp
+                    hop_db.packet_rate = _get_rate(
+                        hop_db.packets_out, stats['packets_out'], elapsed)
+                    hop_db.byte_rate = _get_rate(
+                        hop_db.bytes_out, stats['bytes_out'], elapsed)
+                for key in ('packets_in', 'bytes_in',
+                            'packets_out', 'bytes_out'):
+                    setattr(hop_db, key, stats[key])
+                hop_db.timestamp = timestamp
+
     def _make_port_pair_dict(self, port_pair, fields=None):
         res = {
             'id': port_pair['id'],
@@ -376,7 +480,7 @@ class SfcDbPlugin(
             'ingress': port_pair['ingress'],
             'egress': port_pair['egress'],
             'service_function_parameters': {
-                param['keyword']: param['value']
+                param['keyword']: self._make_sf_parameter_value(param)
                 for k, param in six.iteritems(
                     port_pair['service_function_parameters'])
             }
@@ -384,6 +488,15 @@ class SfcDbPlugin(
 
         return self._fields(res, fields)
 
+    def _make_sf_parameter_value(self, param):
+        # the integer parameters are stored as strings
+        if (
+            param['keyword'] in ext_sfc.SUPPORTED_SF_INT_PARAMETERS and
+            param['value'] is not None
+        ):
+            return int(param['value'])
+        return param['value']
+
     def _validate_port_pair_ingress_egress(self, ingress, egress):
         if 'device_id' not in ingress or not ingress['device_id']:
             raise ext_sfc.PortPairIngressNoHost(
@@ -417,9 +530,10 @@ class SfcDbPlugin(
 
             service_function_parameters = {
                 key: ServiceFunctionParam(keyword=key, value=val)
-                for key, val in six.iteritems(
-                    pp['service_function_parameters']
-                )
+                for key, val in six.iteritems(dict(
+                    ext_sfc.DEFAULT_SF_PARAMETER,
+                    **pp['service_function_parameters']
+                ))
             }
             ingress = self._get_port(context, pp['ingress'])
             egress = self._get_port(context, pp['egress'])
@@ -473,10 +587,26 @@ class SfcDbPlugin(
 
     @log_helpers.log_method_call
     def update_port_pair(self, context, id, port_pair):
-        new_pp = port_pair['port_pair']
+        new_pp = dict(port_pair['port_pair'])
+        sf_params = new_pp.pop('service_function_parameters', None)
         with context.session.begin(subtransactions=True):
             old_pp = self._get_port_pair(context, id)
             old_pp.update(new_pp)
+            for key, val in six.iteritems(sf_params or {}):
+                param = old_pp.service_function_parameters.get(key)
+                if key not in ext_sfc.SUPPORTED_SF_INT_PARAMETERS:
+                    # only the integer parameters can be updated
+                    old_val = (
+                        self._make_sf_parameter_value(param) if param
+                        else ext_sfc.DEFAULT_SF_PARAMETER.get(key))
+                    if val != old_val:
+                        raise ext_sfc.ServiceFunctionParameterNotUpdatable(
+                            key=key)
+                elif param:
+                    param.value = val
+                else:
+                    old_pp.service_function_parameters[key] = (
+                        ServiceFunctionParam(keyword=key, value=val))
             return self._make_port_pair_dict(old_pp)
 
     @log_helpers.log_method_call
@@ -497,10 +627,22 @@ class SfcDbPlugin(
             'description': port_pair_group['description'],
             'tenant_id': port_pair_group['tenant_id'],
             'port_pairs': [pp['id'] for pp in port_pair_group['port_pairs']],
+            'port_pair_group_parameters': dict(
+                ext_sfc.DEFAULT_PPG_PARAMETERS, **{
+                    param['keyword']: self._make_ppg_parameter_value(param)
+                    for k, param in six.iteritems(
+                        port_pair_group['port_pair_group_parameters'])
+                })
         }
 
         return self._fields(res, fields)
 
+    def _make_ppg_parameter_value(self, param):
+        # the boolean parameters are stored as strings
+        if param['keyword'] == 'symmetric':
+            return param['value'] == str(True)
+        return param['value']
+
     @log_helpers.log_method_call
     def create_port_pair_group(self, context, port_pair_group):
         """Create a port pair group."""
@@ -513,12 +655,18 @@ class SfcDbPlugin(
             for portpair in portpairs_list:
                 if portpair.portpairgroup_id:
                     raise ext_sfc.PortPairInUse(id=portpair.id)
+            port_pair_group_parameters = {
+                key: PortPairGroupParam(keyword=key, value=str(val))
+                for key, val in six.iteritems(
+                    pg['port_pair_group_parameters'])
+            }
             port_pair_group_db = PortPairGroup(
                 id=uuidutils.generate_uuid(),
                 name=pg['name'],
                 description=pg['description'],
                 tenant_id=tenant_id,
-                port_pairs=portpairs_list)
+                port_pairs=portpairs_list,
+                port_pair_group_parameters=port_pair_group_parameters)
             context.session.add(port_pair_group_db)
             return self._make_port_pair_group_dict(port_pair_group_db)
 
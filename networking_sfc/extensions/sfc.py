@@ -37,8 +37,25 @@ SFC_PREFIX = "/sfc"
 
 SUPPORTED_CHAIN_PARAMETERS = [('correlation', 'mpls')]
 DEFAULT_CHAIN_PARAMETER = {'correlation': 'mpls'}
-SUPPORTED_SF_PARAMETERS = [('correlation', None)]
+SUPPORTED_SF_PARAMETERS = [('correlation', None), ('correlation', 'mpls')]
 DEFAULT_SF_PARAMETER = {'correlation': None}
+# The integer service function parameters with their (min, max) values,
+# the weight of a port pair is its share of the traffic of its group,
+# it defaults to 1.
+SUPPORTED_SF_INT_PARAMETERS = {'weight': (1, 65535)}
+# The packet fields a port pair group may hash on to select the port pair
+# of a flow, lb_fields is a '&' separated list of them. A symmetric group
+# hashes the 5-tuple so that both directions of a connection select the
+# same port pair, it can not be combined with lb_fields.
+SUPPORTED_LB_FIELDS = ('eth_src', 'eth_dst', 'ip_src', 'ip_dst',
+                       'tcp_src', 'tcp_dst', 'udp_src', 'udp_dst')
+# The locality of a port pair group, a host sends the traffic of a local
+# group to its port pairs on this host, or to all of them when it has no
+# usable local port pair.
+SUPPORTED_PPG_LOCALITIES = ('any', 'local')
+SUPPORTED_PPG_PARAMETERS = ('lb_fields', 'symmetric', 'locality')
+DEFAULT_PPG_PARAMETERS = {'lb_fields': '', 'symmetric': False,
+                          'locality': 'any'}
 
 
 # Port Chain Exceptions
@@ -61,8 +78,26 @@ class InvalidChainParameter(neutron_exc.InvalidInput):
 class InvalidServiceFunctionParameter(neutron_exc.InvalidInput):
     message = _(
         "Service function parameter does not support (%%(key)s, %%(value)s). "
-        "Supported service function parameters are %(supported_paramters)s."
-    ) % {'supported_paramters': SUPPORTED_SF_PARAMETERS}
+        "Supported service function parameters are %(supported_paramters)s "
+        "and the integer parameters %(supported_int_paramters)s."
+    ) % {'supported_paramters': SUPPORTED_SF_PARAMETERS,
+         'supported_int_paramters': SUPPORTED_SF_INT_PARAMETERS}
+
+
+class ServiceFunctionParameterNotUpdatable(neutron_exc.InvalidInput):
+    message = _("Service function parameter %(key)s can not be updated.")
+
+
+class InvalidPortPairGroupParameter(neutron_exc.InvalidInput):
+    message = _(
+        "Port pair group parameter does not support (%%(key)s, %%(value)s). "
+        "Supported port pair group parameters are %(supported_paramters)s, "
+        "lb_fields is a list of %(supported_lb_fields)s separated by '&' "
+        "and can not be set on a symmetric port pair group, locality is one "
+        "of %(supported_localities)s."
+    ) % {'supported_paramters': SUPPORTED_PPG_PARAMETERS,
+         'supported_lb_fields': SUPPORTED_LB_FIELDS,
+         'supported_localities': SUPPORTED_PPG_LOCALITIES}
 
 
 class PortPairGroupNotSpecified(neutron_exc.InvalidInput):
@@ -138,16 +173,63 @@ def normalize_chain_parameters(parameters):
     return parameters
 
 
+def normalize_sf_int_parameter(key, value):
+    min_value, max_value = SUPPORTED_SF_INT_PARAMETERS[key]
+    try:
+        int_value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidServiceFunctionParameter(key=key, value=value)
+    if not min_value <= int_value <= max_value:
+        raise InvalidServiceFunctionParameter(key=key, value=value)
+    return int_value
+
+
 def normalize_sf_parameters(parameters):
     parameters = converters.convert_none_to_empty_dict(parameters)
     if not parameters:
         return DEFAULT_SF_PARAMETER
     for key, value in six.iteritems(parameters):
-        if (key, value) not in SUPPORTED_SF_PARAMETERS:
+        if key in SUPPORTED_SF_INT_PARAMETERS:
+            parameters[key] = normalize_sf_int_parameter(key, value)
+        elif (key, value) not in SUPPORTED_SF_PARAMETERS:
             raise InvalidServiceFunctionParameter(key=key, value=value)
     return parameters
 
 
+def normalize_lb_fields(lb_fields):
+    if not lb_fields:
+        return ''
+    fields = lb_fields.split('&')
+    if (
+        len(set(fields)) != len(fields) or
+        not set(fields).issubset(SUPPORTED_LB_FIELDS)
+    ):
+        raise InvalidPortPairGroupParameter(key='lb_fields', value=lb_fields)
+    return lb_fields
+
+
+def normalize_ppg_parameters(parameters):
+    parameters = converters.convert_none_to_empty_dict(parameters)
+    for key, value in six.iteritems(parameters):
+        if key not in SUPPORTED_PPG_PARAMETERS:
+            raise InvalidPortPairGroupParameter(key=key, value=value)
+        try:
+            if key == 'lb_fields':
+                parameters[key] = normalize_lb_fields(value)
+            elif key == 'locality':
+                if value not in SUPPORTED_PPG_LOCALITIES:
+                    raise InvalidPortPairGroupParameter(key=key, value=value)
+            else:
+                parameters[key] = converters.convert_to_boolean(value)
+        except (AttributeError, neutron_exc.InvalidInput):
+            raise InvalidPortPairGroupParameter(key=key, value=value)
+    params = dict(DEFAULT_PPG_PARAMETERS, **parameters)
+    if params['symmetric'] and params['lb_fields']:
+        raise InvalidPortPairGroupParameter(
+            key='lb_fields', value=params['lb_fields'])
+    return params
+
+
 RESOURCE_ATTRIBUTE_MAP = {
     'port_pairs': {
         'id': {
@@ -179,7 +261,7 @@ RESOURCE_ATTRIBUTE_MAP = {
             'is_visible': True,
             'validate': {'type:uuid': None}},
         'service_function_parameters': {
-            'allow_post': True, 'allow_put': False,
+            'allow_post': True, 'allow_put': True,
             'is_visible': True, 'default': None,
             'validate': {'type:dict': None},
             'convert_to': normalize_sf_parameters},
@@ -220,6 +302,9 @@ RESOURCE_ATTRIBUTE_MAP = {
             'is_visible': True, 'default': None,
             'validate': {'type:dict': None},
             'convert_to': normalize_chain_parameters},
+        'chain_statistics': {
+            'allow_post': False, 'allow_put': False,
+            'is_visible': True},
     },
     'port_pair_groups': {
         'id': {
@@ -247,6 +332,11 @@ RESOURCE_ATTRIBUTE_MAP = {
             'is_visible': True, 'default': None,
             'validate': {'type:uuid_list': None},
             'convert_to': converters.convert_none_to_empty_list},
+        'port_pair_group_parameters': {
+            'allow_post': True, 'allow_put': False,
+            'is_visible': True, 'default': None,
+            'validate': {'type:dict': None},
+            'convert_to': normalize_ppg_parameters},
     },
 }
 
@@ -0,0 +1,172 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import copy
+import threading
+import time
+
+import eventlet
+from oslo_log import log
+from oslo_service import loopingcall
+
+from networking_sfc._i18n import _LE, _LI
+
+
+LOG = log.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class DriverStats(object):
+    """Latency histograms and error counters of the driver calls."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._dump_loop = None
+
+    def _make_method_stats(self):
+        histogram = dict(('le_%dms' % bound, 0) for bound in LATENCY_BUCKETS)
+        histogram['inf'] = 0
+        return {'calls': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'histogram': histogram}
+
+    def record(self, driver_name, method_name, elapsed, failed=False):
+        elapsed_ms = elapsed * 1000
+        bucket = 'inf'
+        for bound in LATENCY_BUCKETS:
+            if elapsed_ms <= bound:
+                bucket = 'le_%dms' % bound
+                break
+        with self._lock:
+            stats = self._stats.setdefault(driver_name, {}).setdefault(
+                method_name, self._make_method_stats())
+            stats['calls'] += 1
+            stats['errors'] += int(failed)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['histogram'][bucket] += 1
+
+    @contextlib.contextmanager
+    def measure(self, driver_name, method_name):
+        start = time.time()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.record(driver_name, method_name, time.time() - start, failed)
+
+    def get_stats(self):
+        """Get the stats of the driver calls.
+
+        @return: dict of the call stats by driver name and method name
+        """
+        with self._lock:
+            return copy.deepcopy(self._stats)
+
+    def log_stats(self):
+        for driver_name, methods in sorted(self.get_stats().items()):
+            for method_name, stats in sorted(methods.items()):
+                LOG.info(_LI("%(kind)s driver '%(name)s' %(method)s: "
+                             "%(calls)d calls, %(errors)d errors, "
+                             "avg %(avg).2f ms, max %(max).2f ms, "
+                             "histogram %(histogram)s"),
+                         {'kind': self.kind,
+                          'name': driver_name,
+                          'method': method_name,
+                          'calls': stats['calls'],
+                          'errors': stats['errors'],
+                          'avg': stats['total_ms'] / stats['calls'],
+                          'max': stats['max_ms'],
+                          'histogram': stats['histogram']})
+
+    def start_periodic_dump(self, interval):
+        """Log the stats every interval seconds, 0 disables it."""
+        if interval <= 0 or self._dump_loop is not None:
+            return
+        self._dump_loop = loopingcall.FixedIntervalLoopingCall(
+            self.log_stats)
+        self._dump_loop.start(interval=interval, initial_delay=interval)
+
+
+class DriverDispatcher(object):
+    """Call a driver method across the drivers of a driver manager.
+
+    The drivers are called in order and every call is recorded in the
+    stats. With parallel dispatch, the drivers declaring themselves
+    independent, by setting their ``independent`` attribute, are called
+    concurrently in green threads while the other drivers are called in
+    order. An independent driver must not share state with the other
+    drivers, such as the DB session of the request context.
+    """
+
+    def __init__(self, kind, drivers, parallel=False):
+        self.kind = kind
+        self.drivers = drivers
+        self.parallel = parallel
+        self.stats = DriverStats(kind)
+
+    def _get_independent_drivers(self):
+        if not self.parallel:
+            return []
+        return [driver for driver in self.drivers
+                if getattr(driver.obj, 'independent', False)]
+
+    def _call_driver(self, driver, method_name, context):
+        try:
+            with self.stats.measure(driver.name, method_name):
+                getattr(driver.obj, method_name)(context)
+        except Exception as e:
+            # This is an internal failure.
+            LOG.exception(e)
+            LOG.error(
+                _LE("%(kind)s driver '%(name)s' failed in %(method)s"),
+                {'kind': self.kind, 'name': driver.name,
+                 'method': method_name}
+            )
+            raise
+
+    def call(self, method_name, context):
+        """Call a method across all the drivers.
+
+        The original exception of the first failed driver is raised once
+        all the drivers called concurrently are done.
+
+        :param method_name: name of the method to call
+        :param context: context parameter to pass to each method call
+        """
+        independent_drivers = self._get_independent_drivers()
+        pool = eventlet.GreenPool()
+        threads = [pool.spawn(self._call_driver, driver, method_name, context)
+                   for driver in independent_drivers]
+        errors = []
+        try:
+            for driver in self.drivers:
+                if driver not in independent_drivers:
+                    self._call_driver(driver, method_name, context)
+        finally:
+            for thread in threads:
+                try:
+                    thread.wait()
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise errors[0]
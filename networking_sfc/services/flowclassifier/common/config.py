@@ -22,6 +22,15 @@ FLOWCLASSIFIER_DRIVER_OPTS = [
                 help=_("An ordered list of flow classifier drivers "
                        "entrypoints to be loaded from the "
                        "networking_sfc.flowclassifier.drivers namespace.")),
+    cfg.BoolOpt('parallel_dispatch',
+                default=False,
+                help=_("Call the flow classifier drivers declaring "
+                       "themselves independent concurrently with the "
+                       "other drivers.")),
+    cfg.IntOpt('driver_stats_interval',
+               default=0,
+               help=_("Seconds between two logs of the flow classifier "
+                      "driver call stats, 0 disables them.")),
 ]
 
 
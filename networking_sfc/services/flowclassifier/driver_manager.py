@@ -16,7 +16,8 @@ from oslo_config import cfg
 from oslo_log import log
 import stevedore
 
-from networking_sfc._i18n import _LE, _LI
+from networking_sfc._i18n import _LI
+from networking_sfc.services import driver_dispatch
 from networking_sfc.services.flowclassifier.common import exceptions as fc_exc
 
 
@@ -45,6 +46,9 @@ class FlowClassifierDriverManager(stevedore.named.NamedExtensionManager):
         LOG.info(_LI("Loaded Flow Classifier drivers: %s"),
                  self.names())
         self._register_drivers()
+        self.dispatcher = driver_dispatch.DriverDispatcher(
+            'Flow Classifier', self.ordered_drivers,
+            parallel=cfg.CONF.flowclassifier.parallel_dispatch)
 
     def _register_drivers(self):
         """Register all Flow Classifier drivers.
@@ -67,6 +71,12 @@ class FlowClassifierDriverManager(stevedore.named.NamedExtensionManager):
             driver.obj.initialize()
             self.native_bulk_support &= getattr(driver.obj,
                                                 'native_bulk_support', True)
+        self.dispatcher.stats.start_periodic_dump(
+            cfg.CONF.flowclassifier.driver_stats_interval)
+
+    def get_driver_stats(self):
+        """Get the latency histograms and error counters of the drivers."""
+        return self.dispatcher.stats.get_stats()
 
     def _call_drivers(self, method_name, context, raise_orig_exc=False):
         """Helper method for calling a method across all drivers.
@@ -76,23 +86,15 @@ class FlowClassifierDriverManager(stevedore.named.NamedExtensionManager):
         :param raise_orig_exc: whether or not to raise the original
         driver exception, or use a general one
         """
-        for driver in self.ordered_drivers:
-            try:
-                getattr(driver.obj, method_name)(context)
-            except Exception as e:
-                # This is an internal failure.
-                LOG.exception(e)
-                LOG.error(
-                    _LE("Flow Classifier driver '%(name)s' "
-                        "failed in %(method)s"),
-                    {'name': driver.name, 'method': method_name}
+        try:
+            self.dispatcher.call(method_name, context)
+        except Exception:
+            if raise_orig_exc:
+                raise
+            else:
+                raise fc_exc.FlowClassifierDriverError(
+                    method=method_name
                 )
-                if raise_orig_exc:
-                    raise e
-                else:
-                    raise fc_exc.FlowClassifierDriverError(
-                        method=method_name
-                    )
 
     def create_flow_classifier(self, context):
         self._call_drivers("create_flow_classifier", context)
@@ -20,6 +20,11 @@ import six
 class FlowClassifierDriverBase(object):
     """Flow Classifier Driver Base Class."""
 
+    # Whether the driver may be called concurrently with the other
+    # drivers, see the parallel_dispatch option. Such a driver must not
+    # use the DB session of the request context.
+    independent = False
+
     @abc.abstractmethod
     def create_flow_classifier(self, context):
         pass
@@ -14,15 +14,19 @@
 
 import six
 import sys
+import time
 
 from neutron_lib import exceptions
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging
+from oslo_service import loopingcall
 
 from networking_sfc.services.sfc.agent import br_int
 from networking_sfc.services.sfc.agent import br_phys
 from networking_sfc.services.sfc.agent import br_tun
+from networking_sfc.services.sfc.agent import encap
+from networking_sfc.services.sfc.common import flowrule_codec
 from networking_sfc.services.sfc.common import ovs_ext_lib
 from networking_sfc.services.sfc.drivers.ovs import constants
 from networking_sfc.services.sfc.drivers.ovs import rpc_topics as sfc_topics
@@ -43,7 +47,18 @@ LOG = logging.getLogger(__name__)
 
 agent_opts = [
     cfg.StrOpt('sfc_encap_mode', default='mpls',
-               help=_("The encapsulation mode of sfc.")),
+               help=_("The encapsulation mode of sfc: mpls, or eth_nsh "
+                      "for NSH over Ethernet, which needs an Open vSwitch "
+                      "supporting NSH.")),
+    cfg.IntOpt('sfc_group_stats_interval', default=0,
+               help=_("Interval in seconds between the reports of the "
+                      "bucket counters of the sfc groups to the plugin, "
+                      "which adjusts the bucket weights to them. 0 "
+                      "disables the reports.")),
+    cfg.IntOpt('sfc_flow_stats_interval', default=0,
+               help=_("Interval in seconds between the reports of the "
+                      "packet and byte counters of the port chain hops "
+                      "to the plugin. 0 disables the reports.")),
 ]
 
 cfg.CONF.register_opts(agent_opts, "AGENT")
@@ -57,13 +72,48 @@ cfg.CONF.import_group('OVS', 'neutron.plugins.ml2.drivers.openvswitch.agent.'
 # Flow 2: pri=0, ip,dl_dst=nexthop_mac,, action=push_mpls:0x8847,
 # set_mpls_label,set_mpls_ttl,push_vlan,output:(patch port or resubmit to
 # table(INGRESS_TABLE)
+# With the eth_nsh encapsulation mode, the NSH and Ethernet headers are
+# pushed instead of the MPLS header.
 ACROSS_SUBNET_TABLE = 5
 
+# This table holds the flow classifiers of the chains. Table 0 only sends
+# it the IPv4 traffic of the ports having flow classifiers, or of any port
+# while the classifiers of source ports on other hosts are installed. The
+# traffic no classifier matches is marked in SFC_CLASSIFIED_REG and sent
+# back to table 0 for the normal processing.
+CLASSIFIER_TABLE = 7
+SFC_CLASSIFIED_REG = 'reg7'
+
+# The classifier flows load the hop of the chain, path id and service
+# index, of the traffic they send to the group of the next hops in
+# SFC_HOP_REG. The group of a port pair group is shared by the chains it
+# is in, the ACROSS_SUBNET_TABLE flows match the register next to the mac
+# address of the next hop to push the header of the right chain.
+SFC_HOP_REG = 'reg4'
+
 # The table has multiple flows that steer traffic for the different chains
 # to the ingress port of different service functions hosted on this Compute
 # node.
 INGRESS_TABLE = 10
 
+# The selection method parameter of a dp_hash group holds the datapath
+# hash algorithm in its upper 32 bits, 1 is the symmetric L4 hash.
+DP_HASH_SYMMETRIC_L4 = 1 << 32
+
+# The flows of a port chain hop are tagged with a cookie made of the SFC
+# cookie prefix, the path id, the service index and the direction of the
+# flow, so their counters can be told apart in the flow stats.
+SFC_COOKIE_PREFIX = 0x5fc0 << 48
+SFC_COOKIE_MASK = 0xffff << 48
+# The flow delivers the traffic to the service functions of the hop
+SFC_COOKIE_INGRESS = 1
+# The flow classifies the traffic leaving the hop
+SFC_COOKIE_EGRESS = 2
+# The flow of path id 0 steers the traffic of a port, or of any port, to
+# the classifier table
+SFC_COOKIE_GOTO_PORT = 3
+SFC_COOKIE_GOTO_ANY = 4
+
 # port chain default flow rule priority
 PC_DEF_PRI = 20
 PC_INGRESS_PRI = 30
@@ -97,17 +147,64 @@ class SfcPluginApi(object):
             context, 'get_all_src_node_flowrules',
             host=self.host)
 
+    def get_flowrule_changes(self, context, revision):
+        """Get the flow rule changes of the host after a revision.
+
+        @return: None if the plugin does not support the 1.1 API, the
+                 client is then capped to 1.0
+        """
+        if not self.client.can_send_version('1.1'):
+            return None
+        cctxt = self.client.prepare(version='1.1')
+        try:
+            return cctxt.call(
+                context, 'get_flowrule_changes',
+                host=self.host, revision=revision)
+        except oslo_messaging.UnsupportedVersion:
+            pass
+        except oslo_messaging.RemoteError as e:
+            if e.exc_type != 'UnsupportedVersion':
+                raise
+        LOG.warning(_LW("The sfc plugin does not support the flow rule "
+                        "changes, the flow rule casts are not checked"))
+        self.client = n_rpc.get_client(self.target, version_cap='1.0')
+        return None
+
+    def get_flow_classifiers(self, context, fc_ids):
+        cctxt = self.client.prepare(version='1.2')
+        return cctxt.call(
+            context, 'get_flow_classifiers', fc_ids=fc_ids)
+
+    def update_group_stats(self, context, group_stats, timestamp):
+        cctxt = self.client.prepare(version='1.3')
+        cctxt.cast(
+            context, 'update_group_stats',
+            host=self.host, group_stats=group_stats, timestamp=timestamp)
+
+    def update_flow_stats(self, context, flow_stats, timestamp):
+        cctxt = self.client.prepare(version='1.4')
+        cctxt.cast(
+            context, 'update_flow_stats',
+            host=self.host, flow_stats=flow_stats, timestamp=timestamp)
+
 
 class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
     # history
     # 1.0 Initial version
-    """This class will support MPLS frame
+    """This class will support MPLS and NSH frames
 
     Ethernet + MPLS
     IPv4 Packet:
     +-------------------------------+---------------+--------------------+
     |Outer Ethernet, ET=0x8847      | MPLS head,    | original IP Packet |
     +-------------------------------+---------------+--------------------+
+
+    Ethernet + NSH
+    IPv4 Packet:
+    +-------------------------------+---------------+--------------------+
+    |Outer Ethernet, ET=0x894f      | NSH head,     | original Ethernet  |
+    |                               | MD type 1     | frame              |
+    +-------------------------------+---------------+--------------------+
     """
 
     def __init__(self, bridge_classes, conf=None):
@@ -117,15 +214,37 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
             bridge_classes, conf=conf)
 
         self.overlay_encap_mode = cfg.CONF.AGENT.sfc_encap_mode
-        self._sfc_setup_rpc()
-
-        if self.overlay_encap_mode == 'eth_nsh':
-            raise FeatureSupportError(feature=self.overlay_encap_mode)
-        elif self.overlay_encap_mode == 'vxlan_nsh':
+        if self.overlay_encap_mode not in encap.ENCAPS:
             raise FeatureSupportError(feature=self.overlay_encap_mode)
-        elif self.overlay_encap_mode == 'mpls':
-            self._clear_sfc_flow_on_int_br()
-            self._setup_src_node_flow_rules_with_mpls()
+        self.sfc_encap = encap.ENCAPS[self.overlay_encap_mode]()
+        # flow classifiers by id: (revision, flow classifier)
+        self.sfc_classifiers = {}
+        # ids of the flow rules using the cached flow classifiers by id
+        self.sfc_classifier_users = {}
+        # mac addresses of the next hops of the buckets by group id
+        self.sfc_group_buckets = {}
+        # ACROSS_SUBNET_TABLE flows of the next hops by (mac address, hop),
+        # with the ids of the flow rules sending to them
+        self.sfc_next_hop_flows = {}
+        # matches of the classifier flows by in_port, None for any port
+        self.sfc_classifier_flows = {}
+        # (vif port, network id) of the ports on this host by port id, kept
+        # from the port processing so the flow rules need no OVSDB query
+        self.sfc_ports = {}
+        self._sfc_setup_rpc()
+        # revision of the last flow rule change applied on this host, None
+        # if the plugin does not keep the flow rule changes
+        result = self.sfc_plugin_rpc.get_flowrule_changes(self.context, None)
+        self.sfc_revision = result['revision'] if result else None
+
+        self._clear_sfc_flow_on_int_br()
+        self._setup_src_node_flow_rules_with_mpls()
+        self._sfc_group_stats_loop = self._sfc_start_periodic_report(
+            self._sfc_report_group_stats,
+            cfg.CONF.AGENT.sfc_group_stats_interval)
+        self._sfc_flow_stats_loop = self._sfc_start_periodic_report(
+            self._sfc_report_flow_stats,
+            cfg.CONF.AGENT.sfc_flow_stats_interval)
 
     def _sfc_setup_rpc(self):
         self.sfc_plugin_rpc = SfcPluginApi(
@@ -206,11 +325,22 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
 
     def _clear_sfc_flow_on_int_br(self):
         self.int_br.delete_group(group_id='all')
+        self.sfc_group_buckets.clear()
+        self.sfc_classifier_flows.clear()
+        self.sfc_next_hop_flows.clear()
+        self.int_br.delete_flows(
+            cookie='0x%x/0x%x' % (SFC_COOKIE_PREFIX, SFC_COOKIE_MASK))
         self.int_br.delete_flows(table=ACROSS_SUBNET_TABLE)
+        self.int_br.delete_flows(table=CLASSIFIER_TABLE)
         self.int_br.delete_flows(table=INGRESS_TABLE)
         self.int_br.install_goto(dest_table_id=INGRESS_TABLE,
                                  priority=PC_DEF_PRI,
-                                 dl_type=0x8847)
+                                 dl_type=self.sfc_encap.ethertype)
+        self.int_br.add_flow(
+            table=CLASSIFIER_TABLE,
+            priority=0,
+            actions="load:1->NXM_NX_%s[0],resubmit(,%d)" % (
+                SFC_CLASSIFIED_REG.upper(), ovs_const.LOCAL_SWITCHING))
         self.int_br.install_drop(table_id=INGRESS_TABLE)
 
     def _get_flow_infos_from_flow_classifier(self, flow_classifier):
@@ -274,9 +404,10 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
     ):
         inport_match = {}
         priority = PC_DEF_PRI
+        cookie = self._get_sfc_cookie(flowrule, SFC_COOKIE_EGRESS)
 
         if match_inport is True:
-            egress_port = self.int_br.get_vif_port_by_id(flowrule['egress'])
+            egress_port = self._get_vif_port(flowrule['egress'])
             if egress_port:
                 inport_match = dict(in_port=egress_port.ofport)
                 priority = PC_INGRESS_PRI
@@ -286,23 +417,109 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
         ):
             match_info = dict(inport_match, **flow_info)
             if add_flow:
+                self.int_br.reserve_cookie(cookie)
                 self.int_br.add_flow(
-                    table=ovs_const.LOCAL_SWITCHING,
+                    table=CLASSIFIER_TABLE,
                     priority=priority,
+                    cookie=cookie,
                     actions=actions, **match_info
                 )
+                self._add_classifier_goto(
+                    inport_match.get('in_port'), match_info)
             else:
                 self.int_br.delete_flows(
-                    table=ovs_const.LOCAL_SWITCHING,
+                    table=CLASSIFIER_TABLE,
+                    cookie='0x%x/-1' % cookie,
                     **match_info
                 )
+                self._delete_classifier_goto(
+                    inport_match.get('in_port'), match_info)
+
+    def _is_mpls_correlated(self, flowrule):
+        return (self.overlay_encap_mode == 'mpls' and
+                flowrule['node_type'] == constants.SF_NODE and
+                flowrule.get('correlation') == 'mpls')
+
+    def _setup_mpls_egress_flow_on_int_br(self, flowrule, actions,
+                                          add_flow=True):
+        """Forward the labeled traffic sent back by an MPLS-aware SF.
+
+        The SF keeps the label the traffic was delivered with, the label
+        tells the chain and the hop, so a single flow replaces the flows
+        of the classifiers of the chain.
+        """
+        egress_port = self._get_vif_port(flowrule['egress'])
+        if not egress_port:
+            return
+        cookie = self._get_sfc_cookie(flowrule, SFC_COOKIE_EGRESS)
+        match_info = dict(
+            table=ovs_const.LOCAL_SWITCHING,
+            in_port=egress_port.ofport,
+            **self.sfc_encap.get_match(flowrule['nsp'], flowrule['nsi'] + 1))
+        if add_flow:
+            self.int_br.reserve_cookie(cookie)
+            self.int_br.add_flow(
+                priority=PC_INGRESS_PRI,
+                cookie=cookie,
+                actions="pop_mpls:0x0800,%s" % actions,
+                **match_info)
+        else:
+            self.int_br.delete_flows(
+                cookie='0x%x/-1' % cookie,
+                **match_info)
+
+    def _get_classifier_goto(self, in_port):
+        """Get the table 0 flow steering a port to the classifier table.
+
+        @param: in_port: the ofport of the port, None for any port
+        """
+        if in_port is None:
+            cookie = SFC_COOKIE_PREFIX | SFC_COOKIE_GOTO_ANY
+            flow = dict(priority=PC_DEF_PRI)
+        else:
+            cookie = SFC_COOKIE_PREFIX | SFC_COOKIE_GOTO_PORT
+            flow = dict(priority=PC_INGRESS_PRI, in_port=in_port)
+        flow.update({
+            'table': ovs_const.LOCAL_SWITCHING,
+            'cookie': cookie,
+            'dl_type': 0x0800,
+            SFC_CLASSIFIED_REG: '0/0x1'
+        })
+        return flow
+
+    def _add_classifier_goto(self, in_port, match_info):
+        """Steer a port to the classifier table with its first classifier.
+
+        The goto is shared by the classifier flows of the port, it is
+        installed with the first of them.
+        """
+        matches = self.sfc_classifier_flows.setdefault(in_port, set())
+        if not matches:
+            flow = self._get_classifier_goto(in_port)
+            self.int_br.reserve_cookie(flow['cookie'])
+            self.int_br.add_flow(
+                actions="resubmit(,%d)" % CLASSIFIER_TABLE, **flow)
+        matches.add(tuple(sorted(match_info.items())))
+
+    def _delete_classifier_goto(self, in_port, match_info):
+        """Remove the goto of a port with its last classifier."""
+        matches = self.sfc_classifier_flows.get(in_port)
+        if not matches:
+            return
+        matches.discard(tuple(sorted(match_info.items())))
+        if not matches:
+            del self.sfc_classifier_flows[in_port]
+            flow = self._get_classifier_goto(in_port)
+            flow.pop('priority')
+            flow['cookie'] = '0x%x/-1' % flow['cookie']
+            self.int_br.delete_flows(**flow)
 
     def _update_destination_ingress_flow_rules(self, flowrule):
         for flow_info in self._get_flow_infos_from_flow_classifier_list(
             flowrule['del_fcs']
         ):
             self.int_br.delete_flows(
-                table=ovs_const.LOCAL_SWITCHING,
+                table=CLASSIFIER_TABLE,
                 in_port=self.patch_tun_ofport,
                 **flow_info
             )
@@ -311,7 +528,7 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
         ):
             inport_match = dict(in_port=self.patch_tun_ofport)
             match_info = dict(inport_match, **flow_info)
-            self.int_br.install_normal(table_id=ovs_const.LOCAL_SWITCHING,
+            self.int_br.install_normal(table_id=CLASSIFIER_TABLE,
                                        priority=PC_INGRESS_PRI,
                                        **match_info)
 
@@ -321,13 +538,31 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
         if not flow_rules:
             return
         for fr in flow_rules:
-            self._setup_egress_flow_rules_with_mpls(fr, False)
+            fr = self._sfc_decode_flowrule(fr)
             # if the traffic is from patch port, it means the destination
             # is on the this host. so implement normal forward but not
             # match the traffic from the source.
             # Next step need to do is check if the traffic is from vRouter
             # on the local host, also need to implement same normal process.
-            self._update_destination_ingress_flow_rules(fr)
+            self._update_src_node_flow_rules(fr)
+
+    def _get_group_selection(self, group_params):
+        """Get the bucket selection of a select group from its parameters.
+
+        A symmetric group uses the symmetric L4 hash of the datapath so
+        both directions of a connection select the same bucket, a group
+        with lb_fields hashes these fields. Otherwise the selection is
+        left to OVS.
+        """
+        if not group_params:
+            return {}
+        if group_params.get('symmetric'):
+            return {'selection_method': 'dp_hash',
+                    'selection_method_param': DP_HASH_SYMMETRIC_L4}
+        if group_params.get('lb_fields'):
+            return {'selection_method': 'hash',
+                    'fields': group_params['lb_fields'].split('&')}
+        return {}
 
     def _setup_egress_flow_rules_with_mpls(self, flowrule, match_inport=True):
         group_id = flowrule.get('next_group_id', None)
@@ -342,6 +577,7 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
         ):
             # 1st, install br-int flow rule on table ACROSS_SUBNET_TABLE
             # and group table
+            hop = self._get_sfc_hop(flowrule)
             buckets = []
             for item in next_hops:
                 if item['net_uuid'] not in self.local_vlan_map:
@@ -362,61 +598,83 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
                 no_across_subnet_actions_list = []
                 across_subnet_actions_list = []
 
-                push_mpls = (
-                    "push_mpls:0x8847,"
-                    "set_mpls_label:%d,"
-                    "set_mpls_ttl:%d,"
-                    "mod_vlan_vid:%d," %
-                    ((flowrule['nsp'] << 8) | flowrule['nsi'],
-                     flowrule['nsi'], lvm.vlan))
+                push_actions = self.sfc_encap.get_push_actions(
+                    flowrule['nsp'], flowrule['nsi'], lvm.vlan, item)
+                # the traffic across subnets gets the mac of the gateway
+                # as source, on the frame the service function receives
+                across_subnet_push_actions = self.sfc_encap.get_push_actions(
+                    flowrule['nsp'], flowrule['nsi'], lvm.vlan, item,
+                    src_mac=item['gw_mac'])
 
-                no_across_subnet_actions_list.append(push_mpls)
-                across_subnet_actions_list.append(push_mpls)
+                no_across_subnet_actions_list.append(push_actions)
+                across_subnet_actions_list.append(across_subnet_push_actions)
 
                 if item['local_endpoint'] == self.local_ip:
                     no_across_subnet_actions = (
                         "resubmit(,%d)" % INGRESS_TABLE)
-                    across_subnet_actions = (
-                        "mod_dl_src:%s, resubmit(,%d)" %
-                        (item['gw_mac'], INGRESS_TABLE))
                 else:
                     # same subnet with next hop
                     no_across_subnet_actions = ("output:%s" %
                                                 self.patch_tun_ofport)
-                    across_subnet_actions = ("mod_dl_src:%s, output:%s" %
-                                             (item['gw_mac'],
-                                              self.patch_tun_ofport))
+                across_subnet_actions = no_across_subnet_actions
                 no_across_subnet_actions_list.append(no_across_subnet_actions)
                 across_subnet_actions_list.append(across_subnet_actions)
 
-                self.int_br.add_flow(
-                    table=ACROSS_SUBNET_TABLE,
-                    priority=1,
-                    dl_dst=item['mac_address'],
-                    dl_type=0x0800,
-                    nw_src=item['cidr'],
-                    actions="%s" %
-                            (','.join(no_across_subnet_actions_list)))
-                # different subnet with next hop
-                self.int_br.add_flow(
-                    table=ACROSS_SUBNET_TABLE,
-                    priority=0,
-                    dl_dst=item['mac_address'],
-                    actions="%s" %
-                            (','.join(across_subnet_actions_list)))
+                hop_match = {SFC_HOP_REG: hop}
+                self._add_next_hop_flows(
+                    flowrule['id'], item['mac_address'], hop, [
+                        dict(hop_match,
+                             table=ACROSS_SUBNET_TABLE,
+                             priority=1,
+                             dl_dst=item['mac_address'],
+                             dl_type=0x0800,
+                             nw_src=item['cidr'],
+                             actions=','.join(
+                                 no_across_subnet_actions_list)),
+                        # different subnet with next hop
+                        dict(hop_match,
+                             table=ACROSS_SUBNET_TABLE,
+                             priority=0,
+                             dl_dst=item['mac_address'],
+                             actions=','.join(across_subnet_actions_list))
+                    ])
+
+            # release the next hops the flow rule no longer sends to
+            next_hop_macs = set(item['mac_address'] for item in next_hops)
+            for (mac_address, next_hop_hop), next_hop in list(
+                six.iteritems(self.sfc_next_hop_flows)
+            ):
+                if (
+                    (mac_address not in next_hop_macs or
+                     next_hop_hop != hop) and
+                    flowrule['id'] in next_hop['owners']
+                ):
+                    self._delete_next_hop_flows(
+                        flowrule['id'], mac_address, next_hop_hop)
 
             buckets = ','.join(buckets)
+            group = self._get_group_selection(
+                flowrule.get('next_group_parameters'))
             group_content = self.int_br.dump_group_for_id(group_id)
             if group_content.find('group_id=%d' % group_id) == -1:
                 self.int_br.add_group(group_id=group_id,
-                                      type='select', buckets=buckets)
+                                      type='select', buckets=buckets,
+                                      **group)
             else:
                 self.int_br.mod_group(group_id=group_id,
-                                      type='select', buckets=buckets)
+                                      type='select', buckets=buckets,
+                                      **group)
+            self.sfc_group_buckets[group_id] = [
+                item['mac_address'] for item in next_hops]
 
-            # 2nd, install br-int flow rule on table 0  for egress traffic
+            # 2nd, install br-int flow rule on the classifier table
             # for egress traffic
-            enc_actions = ("group:%d" % group_id)
+            enc_actions = ("load:0x%x->NXM_NX_%s[],group:%d" % (
+                hop, SFC_HOP_REG.upper(), group_id))
+            if self._is_mpls_correlated(flowrule):
+                self._setup_mpls_egress_flow_on_int_br(
+                    flowrule, enc_actions)
+                return
             # to uninstall the removed flow classifiers
             self._setup_local_switch_flows_on_int_br(
                 flowrule,
@@ -432,30 +690,91 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
                 add_flow=True,
                 match_inport=match_inport)
 
+    def _sfc_check_path_id(self, flowrule):
+        """Check that the path id of a flow rule fits in the header."""
+        if flowrule['nsp'] <= self.sfc_encap.max_path_id:
+            return True
+        LOG.error(_LE("The path id %(nsp)d of flow rule %(id)s exceeds "
+                      "%(max)d, the largest of the %(mode)s encapsulation"),
+                  {'nsp': flowrule['nsp'], 'id': flowrule['id'],
+                   'max': self.sfc_encap.max_path_id,
+                   'mode': self.overlay_encap_mode})
+        return False
+
+    def _get_sfc_hop(self, flowrule):
+        return flowrule['nsp'] << 8 | flowrule['nsi']
+
+    def _add_next_hop_flows(self, owner, mac_address, hop, flows):
+        """Install the ACROSS_SUBNET_TABLE flows of a next hop of a hop.
+
+        The flows of a next hop are shared by the flow rules of the same
+        chain hop sending to it, they are only written when they change.
+
+        @param: owner: the id of the flow rule sending to the next hop
+        @param: hop: the chain hop the flows match, see _get_sfc_hop
+        @param: flows: list of the flows of the next hop
+        """
+        next_hop = self.sfc_next_hop_flows.setdefault(
+            (mac_address, hop), {'owners': set(), 'flows': None})
+        next_hop['owners'].add(owner)
+        if next_hop['flows'] != flows:
+            for flow in flows:
+                self.int_br.add_flow(**flow)
+            next_hop['flows'] = flows
+
+    def _delete_next_hop_flows(self, owner, mac_address, hop,
+                               last_user=True):
+        """Release the flows of a next hop, removed with their last owner.
+
+        @param: last_user: whether to remove the flows of a next hop no
+                flow rule was seen installing, such as after a restart
+        """
+        next_hop = self.sfc_next_hop_flows.get((mac_address, hop))
+        if next_hop is not None:
+            next_hop['owners'].discard(owner)
+            if next_hop['owners']:
+                return
+            del self.sfc_next_hop_flows[(mac_address, hop)]
+        elif not last_user:
+            return
+        self.int_br.delete_flows(
+            table=ACROSS_SUBNET_TABLE,
+            dl_dst=mac_address,
+            **{SFC_HOP_REG: hop})
+
+    def _get_vif_port(self, port_id):
+        port = self.sfc_ports.get(port_id)
+        return port[0] if port else None
+
     def _get_vlan_by_port(self, port_id):
-        for key, val in six.iteritems(self.network_ports):
-            if port_id in val:
-                lvm = self.local_vlan_map[key]
-                return lvm.vlan
-        return None
+        port = self.sfc_ports.get(port_id)
+        lvm = self.local_vlan_map.get(port[1]) if port else None
+        return lvm.vlan if lvm else None
 
     def _setup_ingress_flow_rules_with_mpls(self, flowrule):
-        vif_port = self.int_br.get_vif_port_by_id(flowrule['ingress'])
+        vif_port = self._get_vif_port(flowrule['ingress'])
         if vif_port:
             vlan = self._get_vlan_by_port(flowrule['ingress'])
             # install br-int flow rule on table 0 for ingress traffic
             match_field = {}
 
-            actions = ("strip_vlan, pop_mpls:0x0800,"
-                       "output:%s" % vif_port.ofport)
+            if self._is_mpls_correlated(flowrule):
+                # the SF gets the label of the chain
+                actions = "strip_vlan, output:%s" % vif_port.ofport
+            else:
+                actions = ("strip_vlan, %s,output:%s" % (
+                    self.sfc_encap.pop_actions, vif_port.ofport))
+            cookie = self._get_sfc_cookie(flowrule, SFC_COOKIE_INGRESS)
+            self.int_br.reserve_cookie(cookie)
             match_field = dict(
                 table=INGRESS_TABLE,
                 priority=1,
+                cookie=cookie,
                 dl_dst=vif_port.vif_mac,
                 dl_vlan=vlan,
-                dl_type=0x8847,
-                mpls_label=flowrule['nsp'] << 8 | (flowrule['nsi'] + 1),
-                actions=actions)
+                actions=actions,
+                **self.sfc_encap.get_match(
+                    flowrule['nsp'], flowrule['nsi'] + 1))
 
             self.int_br.add_flow(**match_field)
 
@@ -468,6 +787,9 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
             not group_id and
             flowrule['egress'] is not None
         ):
+            if self._is_mpls_correlated(flowrule):
+                self._setup_mpls_egress_flow_on_int_br(flowrule, 'normal')
+                return
             # to uninstall the new removed flow classifiers
             self._setup_local_switch_flows_on_int_br(
                 flowrule,
@@ -497,6 +819,10 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
         return None
 
     def _update_flow_rules_with_mpls_enc(self, flowrule, flowrule_status):
+        if not self._sfc_check_path_id(flowrule):
+            flowrule_status.append(
+                {'id': flowrule['id'], 'status': constants.STATUS_ERROR})
+            return
         try:
             if flowrule.get('egress', None):
                 self._setup_egress_flow_rules_with_mpls(flowrule)
@@ -547,7 +873,11 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
             group_id = flowrule.get('next_group_id', None)
 
             # delete tunnel table flow rule on br-int(egress match)
-            if flowrule['egress'] is not None:
+            if self._is_mpls_correlated(flowrule):
+                if flowrule['egress'] is not None:
+                    self._setup_mpls_egress_flow_on_int_br(
+                        flowrule, None, add_flow=False)
+            elif flowrule['egress'] is not None:
                 self._setup_local_switch_flows_on_int_br(
                     flowrule,
                     flowrule['del_fcs'],
@@ -558,24 +888,29 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
 
             # delete table INGRESS_TABLE ingress match flow rule
             # on br-int(ingress match)
-            vif_port = self.int_br.get_vif_port_by_id(flowrule['ingress'])
+            vif_port = self._get_vif_port(flowrule['ingress'])
             if vif_port:
                 # third, install br-int flow rule on table INGRESS_TABLE
                 # for ingress traffic
                 self.int_br.delete_flows(
                     table=INGRESS_TABLE,
-                    dl_type=0x8847,
+                    cookie='0x%x/-1' % self._get_sfc_cookie(
+                        flowrule, SFC_COOKIE_INGRESS),
                     dl_dst=vif_port.vif_mac,
-                    mpls_label=flowrule['nsp'] << 8 | (flowrule['nsi'] + 1)
+                    **self.sfc_encap.get_match(
+                        flowrule['nsp'], flowrule['nsi'] + 1)
                 )
 
             # delete group table, need to check again
-            if group_id and flowrule.get('group_refcnt', None) <= 1:
-                self.int_br.delete_group(group_id=group_id)
+            if group_id:
+                last_user = flowrule.get('group_refcnt', None) <= 1
+                if last_user:
+                    self.int_br.delete_group(group_id=group_id)
+                    self.sfc_group_buckets.pop(group_id, None)
                 for item in flowrule['next_hops']:
-                    self.int_br.delete_flows(
-                        table=ACROSS_SUBNET_TABLE,
-                        dl_dst=item['mac_address'])
+                    self._delete_next_hop_flows(
+                        flowrule['id'], item['mac_address'],
+                        self._get_sfc_hop(flowrule), last_user=last_user)
             elif (not group_id and
                   flowrule['egress'] is not None):
                 # to delete last hop flow rule
@@ -586,9 +921,9 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
                             flowrule
                         )
                         if ldp:
-                            self.int_br.delete_flows(
-                                table=ACROSS_SUBNET_TABLE,
-                                dl_dst=ldp['mac_address'])
+                            self._delete_next_hop_flows(
+                                flowrule['id'], ldp['mac_address'],
+                                self._get_sfc_hop(flowrule))
 
         except Exception as e:
             flowrule_status_temp = {}
@@ -598,27 +933,225 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
             LOG.exception(e)
             LOG.error(_LE("_delete_flow_rule_with_mpls_enc failed"))
 
+    # The _with_mpls flow rule methods build the chain headers through
+    # self.sfc_encap, whatever the encapsulation mode
     def _treat_update_flow_rules(self, flowrule, flowrule_status):
-        if self.overlay_encap_mode == 'eth_nsh':
-            raise FeatureSupportError(feature=self.overlay_encap_mode)
-        elif self.overlay_encap_mode == 'vxlan_nsh':
-            raise FeatureSupportError(feature=self.overlay_encap_mode)
-        elif self.overlay_encap_mode == 'mpls':
-            self._update_flow_rules_with_mpls_enc(flowrule, flowrule_status)
+        self._update_flow_rules_with_mpls_enc(flowrule, flowrule_status)
 
     def _treat_delete_flow_rules(self, flowrule, flowrule_status):
-        if self.overlay_encap_mode == 'eth_nsh':
-            raise FeatureSupportError(feature=self.overlay_encap_mode)
-        elif self.overlay_encap_mode == 'vxlan_nsh':
-            raise FeatureSupportError(feature=self.overlay_encap_mode)
-        elif self.overlay_encap_mode == 'mpls':
-            self._delete_flow_rule_with_mpls_enc(
-                flowrule, flowrule_status)
+        self._delete_flow_rule_with_mpls_enc(flowrule, flowrule_status)
+
+    def _sfc_start_periodic_report(self, report, interval):
+        """Call report every interval seconds, 0 disables it."""
+        if interval <= 0:
+            return None
+        loop = loopingcall.FixedIntervalLoopingCall(report)
+        loop.start(interval=interval, initial_delay=interval)
+        return loop
+
+    def _sfc_report_group_stats(self):
+        """Report the bucket counters of the sfc groups to the plugin.
+
+        The bucket counters are reported by the mac address of the next
+        hop of the bucket. The groups with buckets not matching the next
+        hops, being replaced, are left for the next report.
+        """
+        try:
+            timestamp = time.time()
+            bridge_stats = self.int_br.dump_group_stats()
+            group_stats = []
+            for group_id, macs in six.iteritems(self.sfc_group_buckets):
+                buckets = bridge_stats.get(group_id)
+                if not buckets or len(buckets) != len(macs):
+                    continue
+                group_stats.append({
+                    'group_id': group_id,
+                    'buckets': [dict(bucket, mac_address=mac)
+                                for mac, bucket in zip(macs, buckets)]
+                })
+            if group_stats:
+                self.sfc_plugin_rpc.update_group_stats(
+                    self.context, group_stats, timestamp)
+        except Exception as e:
+            LOG.exception(e)
+            LOG.error(_LE("report group stats failed"))
+
+    def _sfc_report_flow_stats(self):
+        """Report the counters of the port chain hops to the plugin.
+
+        The counters of the flows of each hop are summed by the cookie
+        the flows are tagged with.
+        """
+        try:
+            timestamp = time.time()
+            cookie_stats = self.int_br.dump_flow_stats(
+                SFC_COOKIE_PREFIX, SFC_COOKIE_MASK)
+            hops = {}
+            for cookie, stats in six.iteritems(cookie_stats):
+                nsp = (cookie >> 16) & 0xffffffff
+                nsi = (cookie >> 8) & 0xff
+                direction = cookie & 0xff
+                if direction not in (SFC_COOKIE_INGRESS, SFC_COOKIE_EGRESS):
+                    # the flows steering to the classifier table
+                    continue
+                hop = hops.setdefault((nsp, nsi), {
+                    'nsp': nsp, 'nsi': nsi,
+                    'packets_in': 0, 'bytes_in': 0,
+                    'packets_out': 0, 'bytes_out': 0
+                })
+                if direction == SFC_COOKIE_INGRESS:
+                    hop['packets_in'] += stats['packet_count']
+                    hop['bytes_in'] += stats['byte_count']
+                else:
+                    hop['packets_out'] += stats['packet_count']
+                    hop['bytes_out'] += stats['byte_count']
+            if hops:
+                self.sfc_plugin_rpc.update_flow_stats(
+                    self.context, sorted(hops.values(),
+                                         key=lambda hop: (hop['nsp'],
+                                                          -hop['nsi'])),
+                    timestamp)
+        except Exception as e:
+            LOG.exception(e)
+            LOG.error(_LE("report flow stats failed"))
+
+    def _get_sfc_cookie(self, flowrule, direction):
+        """Get the cookie of the flows of a hop in a direction."""
+        return (SFC_COOKIE_PREFIX | flowrule['nsp'] << 16 |
+                flowrule['nsi'] << 8 | direction)
+
+    def _sfc_cache_classifiers(self, flow_classifiers):
+        for fc in flow_classifiers:
+            if fc.get('id'):
+                self.sfc_classifiers[fc['id']] = (
+                    flowrule_codec.get_classifier_revision(fc),
+                    flowrule_codec.get_classifier(fc))
+
+    def _sfc_track_classifiers(self, flowrule):
+        """Track the flow rules using the cached flow classifiers.
+
+        A flow classifier is dropped from the cache once no flow rule has
+        flows installed for it anymore.
+        """
+        for fc in flowrule.get('add_fcs') or []:
+            if fc.get('id'):
+                self.sfc_classifier_users.setdefault(
+                    fc['id'], set()).add(flowrule.get('id'))
+        for fc in flowrule.get('del_fcs') or []:
+            if not fc.get('id'):
+                continue
+            users = self.sfc_classifier_users.get(fc['id'], set())
+            users.discard(flowrule.get('id'))
+            if not users:
+                self.sfc_classifier_users.pop(fc['id'], None)
+                self.sfc_classifiers.pop(fc['id'], None)
+
+    def _sfc_decode_flowrule(self, flowrule):
+        """Decode a flow rule cast in the compact format.
+
+        The referenced flow classifiers missing from the classifier cache
+        are fetched from the plugin in one call. The flow classifiers of
+        the legacy flow rules are added to the cache, so the ones flows
+        were installed for can always be resolved when they are deleted.
+        A full resync is scheduled when a flow classifier to delete the
+        flows of can not be resolved.
+        """
+        if not flowrule_codec.is_compact(flowrule):
+            for key in flowrule_codec.CLASSIFIER_KEYS:
+                self._sfc_cache_classifiers((flowrule or {}).get(key) or [])
+            if flowrule:
+                self._sfc_track_classifiers(flowrule)
+            return flowrule
+
+        refs = flowrule_codec.get_classifier_refs(flowrule)
+        missing = set(
+            fc_id for fc_id, revision in refs
+            if self.sfc_classifiers.get(fc_id, (None, ))[0] != revision)
+        if missing:
+            self._sfc_cache_classifiers(
+                self.sfc_plugin_rpc.get_flow_classifiers(
+                    self.context, sorted(missing)) or [])
+        classifiers = dict(
+            (fc_id, self.sfc_classifiers[fc_id][1])
+            for fc_id, revision in refs if fc_id in self.sfc_classifiers)
+        unresolved = missing - set(classifiers)
+        for fc_id in unresolved:
+            LOG.error(_LE("flow classifier %s not found"), fc_id)
+        decoded = flowrule_codec.decode_flowrule(flowrule, classifiers)
+        self._sfc_track_classifiers(decoded)
+        if unresolved.intersection(
+            fc_id for fc_id, revision in flowrule_codec.get_classifier_refs(
+                flowrule, keys=('del_fcs', ))
+        ):
+            # the flows installed for them are left behind
+            LOG.warning(_LW("Flow classifiers to delete are unknown, "
+                            "resyncing"))
+            self._sfc_resync(self.sfc_revision)
+        return decoded
+
+    def _sfc_check_revision(self, flowrule):
+        """Check the revision a flow rule cast is tagged with.
+
+        When casts were missed in between, the missed changes are fetched
+        from the plugin and applied, or a full resync is scheduled if the
+        plugin does not keep them anymore.
+
+        @return: True if the cast should be applied
+        """
+        revision = flowrule.get('revision')
+        if revision is None or self.sfc_revision is None:
+            return True
+        if revision <= self.sfc_revision:
+            LOG.debug("flow rule revision %(revision)s already applied, "
+                      "current revision %(current)s",
+                      {'revision': revision, 'current': self.sfc_revision})
+            return False
+        if revision == self.sfc_revision + 1:
+            self.sfc_revision = revision
+            return True
+
+        LOG.info(_LI("Missed flow rule changes %(start)s to %(end)s"),
+                 {'start': self.sfc_revision + 1, 'end': revision - 1})
+        result = self.sfc_plugin_rpc.get_flowrule_changes(
+            self.context, self.sfc_revision)
+        if not result:
+            self._sfc_resync(None)
+            return False
+        if result['changes'] is None:
+            LOG.warning(_LW("Flow rule changes up to revision %s are not "
+                            "available, resyncing"), result['revision'])
+            self._sfc_resync(result['revision'])
+            return False
+        for change in result['changes']:
+            self.sfc_revision = change['revision']
+            self._sfc_apply_change(change['method'], change['flowrule'])
+        return False
+
+    def _sfc_apply_change(self, method, flowrule):
+        handlers = {
+            'update_flow_rules': self._update_flow_rules,
+            'delete_flow_rules': self._delete_flow_rules,
+            'update_src_node_flow_rules': self._update_src_node_flow_rules,
+            'delete_src_node_flow_rules': self._delete_src_node_flow_rules
+        }
+        handlers[method](self._sfc_decode_flowrule(flowrule))
+
+    def _sfc_resync(self, revision):
+        self.sfc_revision = revision
+        # the flow classifiers are fetched again with the flow rules
+        self.sfc_classifiers.clear()
+        self.sfc_classifier_users.clear()
+        self.fullsync = True
+        self._setup_src_node_flow_rules_with_mpls()
 
     def update_flow_rules(self, context, **kwargs):
+        flowrules = self._sfc_decode_flowrule(kwargs['flowrule_entries'])
+        if self._sfc_check_revision(flowrules):
+            self._update_flow_rules(flowrules)
+
+    def _update_flow_rules(self, flowrules):
         try:
             flowrule_status = []
-            flowrules = kwargs['flowrule_entries']
             LOG.debug("update_flow_rules received,  flowrules = %s",
                       flowrules)
 
@@ -633,9 +1166,13 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
                 self.context, flowrule_status)
 
     def delete_flow_rules(self, context, **kwargs):
+        flowrules = self._sfc_decode_flowrule(kwargs['flowrule_entries'])
+        if self._sfc_check_revision(flowrules):
+            self._delete_flow_rules(flowrules)
+
+    def _delete_flow_rules(self, flowrules):
         try:
             flowrule_status = []
-            flowrules = kwargs['flowrule_entries']
             LOG.debug("delete_flow_rules received,  flowrules= %s", flowrules)
             if flowrules:
                 self._treat_delete_flow_rules(flowrules, flowrule_status)
@@ -648,11 +1185,16 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
                 self.context, flowrule_status)
 
     def update_src_node_flow_rules(self, context, **kwargs):
-        flowrule = kwargs['flowrule_entries']
-        if self.overlay_encap_mode == 'mpls':
-            self._setup_egress_flow_rules_with_mpls(flowrule,
-                                                    match_inport=False)
-            self._update_destination_ingress_flow_rules(flowrule)
+        flowrule = self._sfc_decode_flowrule(kwargs['flowrule_entries'])
+        if self._sfc_check_revision(flowrule):
+            self._update_src_node_flow_rules(flowrule)
+
+    def _update_src_node_flow_rules(self, flowrule):
+        if not self._sfc_check_path_id(flowrule):
+            return
+        self._setup_egress_flow_rules_with_mpls(flowrule,
+                                                match_inport=False)
+        self._update_destination_ingress_flow_rules(flowrule)
 
     def _delete_src_node_flow_rules_with_mpls(self, flowrule,
                                               match_inport=False):
@@ -660,7 +1202,7 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
                   flowrule)
         group_id = flowrule.get('next_group_id', None)
 
-        # delete br-int table 0 full match flow
+        # delete br-int classifier table full match flow
         self._setup_local_switch_flows_on_int_br(
             flowrule,
             flowrule['del_fcs'],
@@ -669,19 +1211,25 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
             match_inport=False)
 
         # delete group table, need to check again
-        if None != group_id and flowrule.get('group_refcnt', None) <= 1:
-            self.int_br.delete_group(group_id=group_id)
+        if None != group_id:
+            last_user = flowrule.get('group_refcnt', None) <= 1
+            if last_user:
+                self.int_br.delete_group(group_id=group_id)
+                self.sfc_group_buckets.pop(group_id, None)
             for item in flowrule['next_hops']:
-                self.int_br.delete_flows(
-                    table=ACROSS_SUBNET_TABLE,
-                    dl_dst=item['mac_address'])
+                self._delete_next_hop_flows(
+                    flowrule['id'], item['mac_address'],
+                    self._get_sfc_hop(flowrule), last_user=last_user)
 
     def delete_src_node_flow_rules(self, context, **kwargs):
-        flowrule = kwargs['flowrule_entries']
-        if self.overlay_encap_mode == 'mpls':
-            self._delete_src_node_flow_rules_with_mpls(flowrule,
-                                                       match_inport=False)
-            self._update_destination_ingress_flow_rules(flowrule)
+        flowrule = self._sfc_decode_flowrule(kwargs['flowrule_entries'])
+        if self._sfc_check_revision(flowrule):
+            self._delete_src_node_flow_rules(flowrule)
+
+    def _delete_src_node_flow_rules(self, flowrule):
+        self._delete_src_node_flow_rules_with_mpls(flowrule,
+                                                   match_inport=False)
+        self._update_destination_ingress_flow_rules(flowrule)
 
     def sfc_treat_devices_added_updated(self, port_id):
         resync = False
@@ -695,6 +1243,7 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
             )
             if flows_list:
                 for flow in flows_list:
+                    flow = self._sfc_decode_flowrule(flow)
                     self._treat_update_flow_rules(flow, flowrule_status)
         except Exception as e:
             LOG.exception(e)
@@ -723,6 +1272,16 @@ class OVSSfcAgent(ovs_neutron_agent.OVSNeutronAgent):
 
         return resync
 
+    def treat_vif_port(self, vif_port, port_id, network_id, *args):
+        need_binding = super(OVSSfcAgent, self).treat_vif_port(
+            vif_port, port_id, network_id, *args)
+        self.sfc_ports[port_id] = (vif_port, network_id)
+        return need_binding
+
+    def port_unbound(self, vif_id, net_uuid=None):
+        self.sfc_ports.pop(vif_id, None)
+        super(OVSSfcAgent, self).port_unbound(vif_id, net_uuid=net_uuid)
+
     def treat_devices_added_or_updated(self, devices, ovs_restarted):
         skipped_devices = []
         need_binding_devices = []
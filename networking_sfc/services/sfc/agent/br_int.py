@@ -43,6 +43,7 @@ class OVSIntegrationBridge(
     def mod_flow(self, **kwargs):
         ovs_ext_lib.OVSBridgeExt.mod_flow(self, **kwargs)
 
-    def run_ofctl(self, cmd, args, process_input=None):
+    def run_ofctl(self, cmd, args, process_input=None,
+                  protocol=ovs_ext_lib.OPENFLOW13):
         return ovs_ext_lib.OVSBridgeExt.run_ofctl(
-            self, cmd, args, process_input=process_input)
+            self, cmd, args, process_input=process_input, protocol=protocol)
@@ -32,9 +32,10 @@ class OVSTunnelBridge(br_tun.OVSTunnelBridge, ovs_ext_lib.OVSBridgeExt):
     def mod_flow(self, **kwargs):
         ovs_ext_lib.OVSBridgeExt.mod_flow(self, **kwargs)
 
-    def run_ofctl(self, cmd, args, process_input=None):
+    def run_ofctl(self, cmd, args, process_input=None,
+                  protocol=ovs_ext_lib.OPENFLOW13):
         return ovs_ext_lib.OVSBridgeExt.run_ofctl(
-            self, cmd, args, process_input=process_input)
+            self, cmd, args, process_input=process_input, protocol=protocol)
 
     def install_flood_to_tun(self, vlan, tun_id, ports, deferred_br=None):
         br = deferred_br if deferred_br else self
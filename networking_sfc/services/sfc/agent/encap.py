@@ -0,0 +1,95 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Encapsulations of the service chain traffic between the hops.
+
+The agent pushes the header of the chain on the traffic it sends to the
+next hop, in ACROSS_SUBNET_TABLE, and removes it when delivering the
+traffic to the service function, in INGRESS_TABLE. The header carries the
+path id and the service index of the hop that sent the traffic. The
+path ids above max_path_id do not fit in the header.
+"""
+
+
+def _mod_dl_src(src_mac):
+    # The source mac is rewritten on the original frame, before the
+    # header is pushed
+    return "mod_dl_src:%s," % src_mac if src_mac else ""
+
+
+class MplsEncap(object):
+    """Carry the path id and the service index in an MPLS label.
+
+    The label is 20 bits, the upper 12 hold the path id and the lower 8
+    the service index, which the TTL carries too.
+    """
+
+    ethertype = 0x8847
+    max_path_id = (1 << 12) - 1
+    pop_actions = 'pop_mpls:0x0800'
+
+    def get_push_actions(self, nsp, nsi, vlan, next_hop, src_mac=None):
+        return ("%s"
+                "push_mpls:0x8847,"
+                "set_mpls_label:%d,"
+                "set_mpls_ttl:%d,"
+                "mod_vlan_vid:%d," %
+                (_mod_dl_src(src_mac), (nsp << 8) | nsi, nsi, vlan))
+
+    def get_match(self, nsp, nsi):
+        return dict(dl_type=self.ethertype, mpls_label=nsp << 8 | nsi)
+
+
+class NshEncap(object):
+    """Carry the path id and the service index in an NSH header.
+
+    The NSH header of MD type 1 goes between the original frame and a new
+    Ethernet header, it has a 24 bits service path id, an 8 bits service
+    index and four fixed context headers, the first of which holds the
+    segmentation id of the network the traffic is sent on.
+    """
+
+    ethertype = 0x894f
+    max_path_id = (1 << 24) - 1
+    # remove the outer Ethernet header, then the NSH header
+    pop_actions = 'decap(),decap()'
+
+    def get_push_actions(self, nsp, nsi, vlan, next_hop, src_mac=None):
+        # The new Ethernet header starts zeroed, the source mac of the
+        # frame is kept in a register to be copied to it
+        return ("%s"
+                "move:NXM_OF_ETH_SRC[]->NXM_NX_XXREG0[0..47],"
+                "encap(nsh(md_type=1)),"
+                "set_field:0x%x->nsh_spi,"
+                "set_field:%d->nsh_si,"
+                "set_field:%d->nsh_c1,"
+                "encap(ethernet),"
+                "move:NXM_NX_XXREG0[0..47]->NXM_OF_ETH_SRC[],"
+                "mod_dl_dst:%s,"
+                "mod_vlan_vid:%d," %
+                (_mod_dl_src(src_mac), nsp, nsi,
+                 next_hop.get('segment_id') or 0,
+                 next_hop['mac_address'], vlan))
+
+    def get_match(self, nsp, nsi):
+        return dict(dl_type=self.ethertype, nsh_mdtype=1,
+                    nsh_spi=nsp, nsh_si=nsi)
+
+
+# The encapsulations by sfc_encap_mode, vxlan_nsh needs the NSH tunnel
+# ports of an Open vSwitch built with the out of tree NSH patches
+ENCAPS = {
+    'mpls': MplsEncap,
+    'eth_nsh': NshEncap,
+}
@@ -22,6 +22,14 @@ SFC_DRIVER_OPTS = [
                 help=_("An ordered list of service chain drivers "
                        "entrypoints to be loaded from the "
                        "networking_sfc.sfc.drivers namespace.")),
+    cfg.BoolOpt('parallel_dispatch',
+                default=False,
+                help=_("Call the service chain drivers declaring themselves "
+                       "independent concurrently with the other drivers.")),
+    cfg.IntOpt('driver_stats_interval',
+               default=0,
+               help=_("Seconds between two logs of the service chain driver "
+                      "call stats, 0 disables them.")),
 ]
 
 
@@ -46,3 +46,13 @@ class SfcNoSuchSubnet(SfcDriverError):
 class FlowClassifierInvalid(SfcDriverError):
     """Invalid flow classifier."""
     message = _("There is no %(type)s assigned.")
+
+
+class SfcIntIdUnavailable(SfcDriverError):
+    """No int id left in the pool."""
+    message = _("There is no %(type)s id available.")
+
+
+class SfcOvnObjectNotFound(SfcDriverError):
+    """OVN NB object not found."""
+    message = _("OVN %(type)s %(name)s does not exist.")
@@ -0,0 +1,160 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compact wire format of the flow rules cast to the sfc agents.
+
+A compact flow rule carries the format version under VERSION_KEY, uses
+the short keys of SHORT_KEYS and refers to the flow classifiers of
+add_fcs/del_fcs by [id, revision]. The agent resolves the references
+from its classifier cache, fetching the missing ones from the plugin.
+A flow rule without VERSION_KEY is in the legacy format.
+"""
+
+import hashlib
+
+from neutron_lib import exceptions
+from oslo_serialization import jsonutils
+import six
+
+from networking_sfc._i18n import _
+
+FORMAT_VERSION = 1
+VERSION_KEY = 'v'
+
+# The flow classifier fields the agent builds flows from
+CLASSIFIER_FIELDS = (
+    'ethertype',
+    'protocol',
+    'source_port_range_min',
+    'source_port_range_max',
+    'destination_port_range_min',
+    'destination_port_range_max',
+    'source_ip_prefix',
+    'destination_ip_prefix',
+    'logical_source_port',
+    'logical_destination_port'
+)
+
+CLASSIFIER_KEYS = ('add_fcs', 'del_fcs')
+
+SHORT_KEYS = {
+    'id': 'i',
+    'nsp': 'p',
+    'nsi': 's',
+    'node_type': 't',
+    'portchain_id': 'c',
+    'status': 'st',
+    'fwd_path': 'f',
+    'next_group_id': 'g',
+    'next_group_parameters': 'gp',
+    'group_refcnt': 'gr',
+    'ingress': 'in',
+    'egress': 'eg',
+    'host': 'h',
+    'host_id': 'hi',
+    'local_endpoint': 'le',
+    'mac_address': 'm',
+    'network_type': 'nt',
+    'segment_id': 'sg',
+    'correlation': 'co',
+    'revision': 'r',
+    'add_fcs': 'a',
+    'del_fcs': 'd',
+    'next_hops': 'nh',
+    'weight': 'w',
+    'gw_mac': 'gm',
+    'cidr': 'ci',
+    'net_uuid': 'nu'
+}
+LONG_KEYS = dict((short, key) for key, short in six.iteritems(SHORT_KEYS))
+
+
+def get_classifier(flow_classifier):
+    """Strip a flow classifier down to the fields the agent uses."""
+    classifier = dict(
+        (field, flow_classifier.get(field)) for field in CLASSIFIER_FIELDS)
+    classifier['id'] = flow_classifier['id']
+    return classifier
+
+
+def get_classifier_revision(flow_classifier):
+    """Get the content revision of a flow classifier."""
+    return hashlib.sha1(jsonutils.dump_as_bytes(
+        [flow_classifier.get(field) for field in CLASSIFIER_FIELDS]
+    )).hexdigest()[:8]
+
+
+def _shorten(entry):
+    return dict(
+        (SHORT_KEYS.get(key, key), value)
+        for key, value in six.iteritems(entry))
+
+
+def _lengthen(entry):
+    return dict(
+        (LONG_KEYS.get(key, key), value)
+        for key, value in six.iteritems(entry))
+
+
+def is_compact(flowrule):
+    return bool(flowrule) and VERSION_KEY in flowrule
+
+
+def encode_flowrule(flowrule):
+    """Encode a legacy flow rule into the compact format."""
+    compact = _shorten(flowrule)
+    for key in CLASSIFIER_KEYS:
+        if flowrule.get(key):
+            compact[SHORT_KEYS[key]] = [
+                [fc['id'], get_classifier_revision(fc)]
+                for fc in flowrule[key]]
+    if flowrule.get('next_hops'):
+        compact[SHORT_KEYS['next_hops']] = [
+            _shorten(next_hop) for next_hop in flowrule['next_hops']]
+    compact[VERSION_KEY] = FORMAT_VERSION
+    return compact
+
+
+def get_classifier_refs(compact, keys=CLASSIFIER_KEYS):
+    """Get the [id, revision] classifier references of a compact flow rule.
+
+    @param: keys: the classifier keys to get the references of
+    """
+    refs = []
+    for key in keys:
+        refs.extend(compact.get(SHORT_KEYS[key]) or [])
+    return refs
+
+
+def decode_flowrule(compact, classifiers):
+    """Decode a compact flow rule into the legacy format.
+
+    @param: classifiers: dict of the referenced flow classifiers by id,
+    references missing from it are dropped.
+    """
+    if compact.get(VERSION_KEY) != FORMAT_VERSION:
+        msg = _("unsupported flow rule format version %s") % (
+            compact.get(VERSION_KEY))
+        raise exceptions.InvalidInput(error_message=msg)
+    flowrule = _lengthen(compact)
+    del flowrule[VERSION_KEY]
+    for key in CLASSIFIER_KEYS:
+        if flowrule.get(key):
+            flowrule[key] = [
+                classifiers[fc_id] for fc_id, revision in flowrule[key]
+                if fc_id in classifiers]
+    if flowrule.get('next_hops'):
+        flowrule['next_hops'] = [
+            _lengthen(next_hop) for next_hop in flowrule['next_hops']]
+    return flowrule
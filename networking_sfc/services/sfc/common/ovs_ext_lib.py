@@ -29,6 +29,10 @@ from networking_sfc._i18n import _, _LE
 # Special return value for an invalid OVS ofport
 INVALID_OFPORT = '-1'
 
+OPENFLOW13 = 'openflow13'
+# The selection method of a group can only be set in OpenFlow 1.5
+OPENFLOW15 = 'openflow15'
+
 LOG = logging.getLogger(__name__)
 
 
@@ -55,6 +59,23 @@ def get_port_mask(min_port, max_port):
 
 
 class OVSBridgeExt(ovs_bridge.OVSAgentBridge):
+    def __init__(self, *args, **kwargs):
+        super(OVSBridgeExt, self).__init__(*args, **kwargs)
+        self._sfc_cookies = set()
+
+    @property
+    def reserved_cookies(self):
+        return (super(OVSBridgeExt, self).reserved_cookies |
+                self._sfc_cookies)
+
+    def reserve_cookie(self, cookie):
+        """Keep the flows of a cookie from the cleanup of stale flows.
+
+        The agent deletes the flows of the cookies not reserved once it
+        has synced after a restart.
+        """
+        self._sfc_cookies.add(cookie)
+
     def setup_controllers(self, conf):
         self.set_protocols("[]")
         self.del_controller()
@@ -116,11 +137,11 @@ class OVSBridgeExt(ovs_bridge.OVSAgentBridge):
             )
         return ofport
 
-    def run_ofctl(self, cmd, args, process_input=None):
+    def run_ofctl(self, cmd, args, process_input=None, protocol=OPENFLOW13):
         # We need to dump-groups according to group Id,
         # which is a feature of OpenFlow1.5
         full_args = [
-            "ovs-ofctl", "-O openflow13", cmd, self.br_name
+            "ovs-ofctl", "-O %s" % protocol, cmd, self.br_name
         ] + args
         try:
             return utils.execute(full_args, run_as_root=True,
@@ -131,11 +152,16 @@ class OVSBridgeExt(ovs_bridge.OVSAgentBridge):
                       {'args': full_args})
 
     def do_action_groups(self, action, kwargs_list):
+        protocol = OPENFLOW13
+        if any('selection_method' in kw for kw in kwargs_list):
+            protocol = OPENFLOW15
         group_strs = [_build_group_expr_str(kw, action) for kw in kwargs_list]
         if action == 'add' or action == 'del':
-            self.run_ofctl('%s-groups' % action, ['-'], '\n'.join(group_strs))
+            self.run_ofctl('%s-groups' % action, ['-'], '\n'.join(group_strs),
+                           protocol=protocol)
         elif action == 'mod':
-            self.run_ofctl('%s-group' % action, ['-'], '\n'.join(group_strs))
+            self.run_ofctl('%s-group' % action, ['-'], '\n'.join(group_strs),
+                           protocol=protocol)
         else:
             msg = _("Action is illegal")
             raise exceptions.InvalidInput(error_message=msg)
@@ -158,11 +184,77 @@ class OVSBridgeExt(ovs_bridge.OVSAgentBridge):
                                if 'NXST' not in item)
         return retval
 
+    def dump_flow_stats(self, cookie, cookie_mask):
+        """Get the counters of the flows of cookies, summed by cookie.
+
+        @return: dict of the packet_count and byte_count by cookie
+        """
+        return _parse_flow_stats(self.run_ofctl(
+            "dump-flows", ["cookie=0x%x/0x%x" % (cookie, cookie_mask)]))
+
+    def dump_group_stats(self):
+        """Get the bucket counters of the groups of the bridge.
+
+        @return: dict of the list of the packet_count and byte_count of
+                 each bucket, in bucket order, by group id
+        """
+        return _parse_group_stats(self.run_ofctl("dump-group-stats", []))
+
+
+def _parse_flow_stats(flow_stats_str):
+    """Parse the output of ovs-ofctl dump-flows into counters by cookie."""
+    flow_stats = {}
+    for line in (flow_stats_str or '').splitlines():
+        line = line.strip()
+        if not line.startswith('cookie='):
+            continue
+        fields = dict(
+            item.strip().partition('=')[::2] for item in line.split(','))
+        stats = flow_stats.setdefault(
+            int(fields['cookie'], 16), {'packet_count': 0, 'byte_count': 0})
+        stats['packet_count'] += int(fields.get('n_packets', 0))
+        stats['byte_count'] += int(fields.get('n_bytes', 0))
+    return flow_stats
+
+
+def _parse_group_stats(group_stats_str):
+    """Parse the output of ovs-ofctl dump-group-stats.
+
+    A group is on one line, its counters come first, then the counters
+    of each bucket prefixed by the bucket:
+    group_id=1,ref_count=1,packet_count=4,byte_count=392,
+    bucket0:packet_count=1,byte_count=98,bucket1:packet_count=3,...
+    """
+    group_stats = {}
+    for line in (group_stats_str or '').splitlines():
+        line = line.strip()
+        if not line.startswith('group_id='):
+            continue
+        group_id = None
+        buckets = []
+        for item in line.split(','):
+            if item.startswith('bucket'):
+                item = item.partition(':')[2]
+                buckets.append({})
+            key, sep, value = item.partition('=')
+            if key == 'group_id':
+                group_id = int(value)
+            elif buckets and key in ('packet_count', 'byte_count'):
+                buckets[-1][key] = int(value)
+        group_stats[group_id] = buckets
+    return group_stats
+
 
 def _build_group_expr_str(group_dict, cmd):
+    """Build the ovs-ofctl string of a group.
+
+    The fields a select group hashes on with selection_method=hash are
+    given as a list under 'fields'.
+    """
     group_expr_arr = []
     buckets = None
     groupId = None
+    fields = None
 
     if cmd != 'del':
         if "group_id" not in group_dict:
@@ -177,12 +269,18 @@ def _build_group_expr_str(group_dict, cmd):
             raise exceptions.InvalidInput(error_message=msg)
         buckets = "%s" % group_dict.pop('buckets')
 
+        if group_dict.get('fields'):
+            fields = "fields(%s)" % ','.join(group_dict.pop('fields'))
+
     if groupId:
         group_expr_arr.append(groupId)
 
     for key, value in six.iteritems(group_dict):
         group_expr_arr.append("%s=%s" % (key, value))
 
+    if fields:
+        group_expr_arr.append(fields)
+
     if buckets:
         group_expr_arr.append(buckets)
 
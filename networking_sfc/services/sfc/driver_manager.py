@@ -16,7 +16,8 @@ from oslo_config import cfg
 from oslo_log import log
 import stevedore
 
-from networking_sfc._i18n import _LE, _LI
+from networking_sfc._i18n import _LI
+from networking_sfc.services import driver_dispatch
 from networking_sfc.services.sfc.common import exceptions as sfc_exc
 
 
@@ -43,6 +44,9 @@ class SfcDriverManager(stevedore.named.NamedExtensionManager):
                                                name_order=True)
         LOG.info(_LI("Loaded SFC drivers: %s"), self.names())
         self._register_drivers()
+        self.dispatcher = driver_dispatch.DriverDispatcher(
+            'SFC', self.ordered_drivers,
+            parallel=cfg.CONF.sfc.parallel_dispatch)
 
     def _register_drivers(self):
         """Register all SFC drivers.
@@ -64,23 +68,44 @@ class SfcDriverManager(stevedore.named.NamedExtensionManager):
             driver.obj.initialize()
             self.native_bulk_support &= getattr(driver.obj,
                                                 'native_bulk_support', True)
+        self.dispatcher.stats.start_periodic_dump(
+            cfg.CONF.sfc.driver_stats_interval)
 
-    def _call_drivers(self, method_name, context):
+    def get_driver_stats(self):
+        """Get the latency histograms and error counters of the drivers."""
+        return self.dispatcher.stats.get_stats()
+
+    def start_rpc_listeners(self):
+        """Start the RPC listeners of the drivers serving agents.
+
+        Neutron calls this in each of its RPC worker processes.
+
+        :return: the list of started RPC servers
+        """
+        servers = []
+        for driver in self.ordered_drivers:
+            start_rpc_listeners = getattr(
+                driver.obj, 'start_rpc_listeners', None)
+            if start_rpc_listeners:
+                LOG.info(_LI("Starting RPC listeners of SFC driver '%s'"),
+                         driver.name)
+                servers.extend(start_rpc_listeners())
+        return servers
+
+    def _call_drivers(self, method_name, context, raise_orig_exc=False):
         """Helper method for calling a method across all SFC drivers.
 
         :param method_name: name of the method to call
         :param context: context parameter to pass to each method call
+        :param raise_orig_exc: whether or not to raise the original
+        driver exception, or use a general one
         """
-        for driver in self.ordered_drivers:
-            try:
-                getattr(driver.obj, method_name)(context)
-            except Exception as e:
-                # This is an internal failure.
-                LOG.exception(e)
-                LOG.error(
-                    _LE("SFC driver '%(name)s' failed in %(method)s"),
-                    {'name': driver.name, 'method': method_name}
-                )
+        try:
+            self.dispatcher.call(method_name, context)
+        except Exception:
+            if raise_orig_exc:
+                raise
+            else:
                 raise sfc_exc.SfcDriverError(
                     method=method_name
                 )
@@ -88,26 +113,56 @@ class SfcDriverManager(stevedore.named.NamedExtensionManager):
     def create_port_chain(self, context):
         self._call_drivers("create_port_chain", context)
 
+    def create_port_chain_precommit(self, context):
+        """Driver precommit before the db transaction committed."""
+        self._call_drivers("create_port_chain_precommit", context,
+                           raise_orig_exc=True)
+
     def update_port_chain(self, context):
         self._call_drivers("update_port_chain", context)
 
+    def update_port_chain_precommit(self, context):
+        """Driver precommit before the db transaction committed."""
+        self._call_drivers("update_port_chain_precommit", context,
+                           raise_orig_exc=True)
+
     def delete_port_chain(self, context):
         self._call_drivers("delete_port_chain", context)
 
     def create_port_pair(self, context):
         self._call_drivers("create_port_pair", context)
 
+    def create_port_pair_precommit(self, context):
+        """Driver precommit before the db transaction committed."""
+        self._call_drivers("create_port_pair_precommit", context,
+                           raise_orig_exc=True)
+
     def update_port_pair(self, context):
         self._call_drivers("update_port_pair", context)
 
+    def update_port_pair_precommit(self, context):
+        """Driver precommit before the db transaction committed."""
+        self._call_drivers("update_port_pair_precommit", context,
+                           raise_orig_exc=True)
+
     def delete_port_pair(self, context):
         self._call_drivers("delete_port_pair", context)
 
     def create_port_pair_group(self, context):
         self._call_drivers("create_port_pair_group", context)
 
+    def create_port_pair_group_precommit(self, context):
+        """Driver precommit before the db transaction committed."""
+        self._call_drivers("create_port_pair_group_precommit", context,
+                           raise_orig_exc=True)
+
     def update_port_pair_group(self, context):
         self._call_drivers("update_port_pair_group", context)
 
+    def update_port_pair_group_precommit(self, context):
+        """Driver precommit before the db transaction committed."""
+        self._call_drivers("update_port_pair_group_precommit", context,
+                           raise_orig_exc=True)
+
     def delete_port_pair_group(self, context):
         self._call_drivers("delete_port_pair_group", context)
@@ -20,6 +20,11 @@ import six
 class SfcDriverBase(object):
     """SFC Driver Base Class."""
 
+    # Whether the driver may be called concurrently with the other
+    # drivers, see the parallel_dispatch option. Such a driver must not
+    # use the DB session of the request context.
+    independent = False
+
     @abc.abstractmethod
     def create_port_chain(self, context):
         pass
@@ -55,3 +60,51 @@ class SfcDriverBase(object):
     @abc.abstractmethod
     def update_port_pair_group(self, context):
         pass
+
+    def create_port_chain_precommit(self, context):
+        """Driver precommit before the db transaction committed.
+
+        Raising an exception rejects the port chain create and rolls back
+        the transaction.
+        """
+        pass
+
+    def update_port_chain_precommit(self, context):
+        """Driver precommit before the db transaction committed.
+
+        Raising an exception rejects the port chain update and rolls back
+        the transaction.
+        """
+        pass
+
+    def create_port_pair_precommit(self, context):
+        """Driver precommit before the db transaction committed.
+
+        Raising an exception rejects the port pair create and rolls back
+        the transaction.
+        """
+        pass
+
+    def update_port_pair_precommit(self, context):
+        """Driver precommit before the db transaction committed.
+
+        Raising an exception rejects the port pair update and rolls back
+        the transaction.
+        """
+        pass
+
+    def create_port_pair_group_precommit(self, context):
+        """Driver precommit before the db transaction committed.
+
+        Raising an exception rejects the port pair group create and rolls back
+        the transaction.
+        """
+        pass
+
+    def update_port_pair_group_precommit(self, context):
+        """Driver precommit before the db transaction committed.
+
+        Raising an exception rejects the port pair group update and rolls back
+        the transaction.
+        """
+        pass
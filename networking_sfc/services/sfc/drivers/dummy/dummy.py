@@ -19,6 +19,8 @@ from networking_sfc.services.sfc.drivers import base as sfc_driver
 
 class DummyDriver(sfc_driver.SfcDriverBase):
     """SFC Driver Dummy Class."""
+    independent = True
+
     def initialize(self):
         pass
 
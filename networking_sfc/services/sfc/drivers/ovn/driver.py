@@ -12,15 +12,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from neutron.callbacks import events
+from neutron.callbacks import registry
+from neutron.callbacks import resources
 from neutron import manager
-
-from neutron.agent.ovsdb.native import idlutils
+from neutron_lib import exceptions as n_exc
 
 from oslo_log import helpers as log_helpers
 from oslo_log import log as logging
 
 from networking_sfc.extensions import flowclassifier
+from networking_sfc.extensions import sfc
+from networking_sfc.services.sfc.common import context as sfc_ctx
+from networking_sfc.services.sfc.common import exceptions as exc
 from networking_sfc.services.sfc.drivers import base as driver_base
+from networking_sfc.services.sfc.drivers.ovn import idl_index
 from networking_sfc.services.sfc.drivers.ovs import(
     db as ovs_sfc_db)
 from networking_sfc._i18n import _LW, _LI
@@ -30,6 +36,31 @@ from networking_ovn.ovsdb import impl_idl_ovn
 
 LOG = logging.getLogger(__name__)
 
+SFC_NAME_PREFIX = 'neutron-sfc-'
+
+# The OVN NB tables looked up by name
+INDEXED_TABLES = (
+    'Logical_Switch',
+    'Logical_Switch_Port',
+    'Logical_Port_Chain',
+    'Logical_Port_Pair_Group',
+    'Logical_Port_Pair',
+    'Logical_Flow_Classifier'
+)
+
+# Flow classifier fields not supported by the OVN flow classifiers
+OVN_UNSUPPORTED_FC_FIELDS = (
+    'id', 'name', 'description', 'tenant_id', 'l7_parameters')
+
+# The NB API commands editing the port pair groups and flow classifiers of
+# an existing port chain. Some networking-ovn SFC branches do not have
+# them, the port chains are then deleted and created again instead.
+OVN_EDIT_COMMANDS = (
+    'delete_lport_pair_group',
+    'set_lport_pair_group',
+    'delete_lflow_classifier'
+)
+
 
 class OVNSfcDriver(driver_base.SfcDriverBase,
                    ovs_sfc_db.OVSSfcDriverDB):
@@ -38,6 +69,11 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
     def initialize(self):
         super(OVNSfcDriver, self).initialize()
         self._ovn_property = None
+        self._ovn_seqno = None
+        self._ovn_index = idl_index.IdlNameIndex(INDEXED_TABLES)
+        self._port_networks = {}
+        registry.subscribe(
+            self._port_deleted, resources.PORT, events.AFTER_DELETE)
         LOG.debug("OVN SFC driver init done")
 
     @log_helpers.log_method_call
@@ -46,6 +82,14 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
                                                  pg_id)
         return pg['port_pairs']
 
+    def _get_portpair_ids_by_pg_ids(self, context, pg_ids):
+        """Get the port pair ids of port pair groups in a single query."""
+        if not pg_ids:
+            return {}
+        pgs = context._plugin.get_port_pair_groups(
+            context._plugin_context, filters={'id': list(pg_ids)})
+        return dict((pg['id'], pg['port_pairs']) for pg in pgs)
+
     def _get_port_pair_detail(self, context, port_pair_id):
         pp = context._plugin.get_port_pair(context._plugin_context,
                                            port_pair_id)
@@ -68,12 +112,16 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
             LOG.warning(_LW("Not found the flow classifier service plugin"))
             return flow_classifiers
 
-        for fc_id in fc_ids:
-            fc = fc_plugin.get_flow_classifier(self.admin_context, fc_id)
-            flow_classifiers.append(fc)
+        fcs = dict(
+            (fc['id'], fc) for fc in fc_plugin.get_flow_classifiers(
+                self.admin_context, filters={'id': list(fc_ids)}))
+        flow_classifiers = [fcs[fc_id] for fc_id in fc_ids if fc_id in fcs]
 
         return flow_classifiers
 
+    def _get_sfc_plugin(self):
+        return manager.NeutronManager.get_service_plugins().get(sfc.SFC_EXT)
+
     def _create_ovn_dict(self, context, port_chain):
         ovn_dict = {}
         ovn_dict = {
@@ -84,19 +132,29 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
             'port_pair_groups': port_chain['port_pair_groups']
         }
         #
-        # Loop over port-pair group gettting individual port-pairs for VNF
+        # Get the port-pair groups and their port-pairs for VNF, each in
+        # a single query
         #
+        port_pair_ids = self._get_portpair_ids_by_pg_ids(
+            context, port_chain['port_pair_groups'])
+        port_pairs = {}
+        all_port_pair_ids = [
+            port_pair_id
+            for pg_port_pair_ids in port_pair_ids.values()
+            for port_pair_id in pg_port_pair_ids]
+        if all_port_pair_ids:
+            port_pairs = dict(
+                (port_pair['id'], port_pair)
+                for port_pair in context._plugin.get_port_pairs(
+                    context._plugin_context,
+                    filters={'id': all_port_pair_ids}))
         port_pair_group_list = []
         for port_group_item in port_chain['port_pair_groups']:
-            port_pair_list = []
             port_pair_group = {}
-            port_pair_id = self._get_portpair_ids(context, port_group_item)
-            for port_pair_item in port_pair_id:
-                LOG.debug("Port Pair Id: %s " % port_pair_id)
-                port_pair_detail = self._get_port_pair_detail(
-                    context, port_pair_item)
-                port_pair_list.append(port_pair_detail)
-            port_pair_group["port_pairs"] = port_pair_list
+            port_pair_group["port_pairs"] = [
+                port_pairs[port_pair_id]
+                for port_pair_id in port_pair_ids.get(port_group_item, [])
+                if port_pair_id in port_pairs]
             port_pair_group["id"] = port_group_item
             port_pair_group_list.append(port_pair_group)
         ovn_dict['port_pair_groups'] = port_pair_group_list
@@ -104,48 +162,91 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
         LOG.debug("Port Chain Definition: %s " % ovn_dict)
         return ovn_dict
 
+    def _get_chain_lswitch(self, context, port_chain, flow_classifiers):
+        """Get the logical switch a port chain is bound to.
+
+        The port chain lives on the logical switch of the logical source
+        ports of its flow classifiers, or of the ingress of its first port
+        pair if it has no flow classifier.
+        """
+        port_ids = set(
+            fc['logical_source_port'] for fc in flow_classifiers)
+        if not port_ids and port_chain['port_pair_groups']:
+            port_pair_ids = self._get_portpair_ids(
+                context, port_chain['port_pair_groups'][0])
+            if port_pair_ids:
+                port_pair = self._get_port_pair_detail(
+                    context, port_pair_ids[0])
+                port_ids.add(port_pair['ingress'])
+        lswitch_names = set()
+        port_lswitches = self._get_port_lswitches(port_ids)
+        for port_id, lswitch_name in port_lswitches.items():
+            if lswitch_name is None:
+                raise exc.SfcOvnObjectNotFound(
+                    type='Logical_Switch', name=port_id)
+            lswitch_names.add(lswitch_name)
+        if len(lswitch_names) != 1:
+            raise exc.SfcBadRequest(
+                resource='port_chain',
+                msg='port chain %s must be on exactly one network '
+                    'in ovn driver' % port_chain['id'])
+        return lswitch_names.pop()
+
+    #
+    # Port chain
+    #
+    @log_helpers.log_method_call
+    def create_port_chain_precommit(self, context):
+        port_chain = context.current
+        self._get_chain_lswitch(
+            context, port_chain, self._get_portchain_fcs(port_chain))
+
+    @log_helpers.log_method_call
+    def update_port_chain_precommit(self, context):
+        self.create_port_chain_precommit(context)
+
     @log_helpers.log_method_call
     def create_port_chain(self, context):
         port_chain = context.current
         ovn_dict = self._create_ovn_dict(context, port_chain)
-        # create ACL entry for flow classifier
-        flow_classifiers = ovn_dict['flow_classifier']
-        with self._ovn.transaction(check_error=True) as txn:
-            for flow_classifier in flow_classifiers:
-                flow_classifier_name = self._sfc_name(flow_classifier['id'])
-                lswitch_name = self._check_lswitch_exists(
-                    context, flow_classifier['logical_source_port'])
-                if lswitch_name is None:
-                    LOG.error("Logical switch does not exist for "
-                              "flow_classifier logical source port: %s" %
-                              flow_classifier['logical_source_port'])
-                    return False
-                lport_uuid_src = self._check_logical_port_exist(
-                    flow_classifier['logical_source_port'])
-                if lport_uuid_src is None:
-                    LOG.error("Logical port %s does not exist",
-                              flow_classifier['logical_source_port'])
-                    return False
-                lport_uuid_dst = self._check_logical_port_exist(
-                    flow_classifier['logical_destination_port'])
-                if lport_uuid_dst is None:
-                    LOG.error("Logical port %s does not exist",
-                              flow_classifier['logical_destination_port'])
-                    return False
-                acl = {'match': 'inport == %s && outport = %s' % (lport_uuid_src, lport_uuid_dst),
-                       'action': 'sfc',
-                       'priority': 2000,
-                       'direction': 'from-lport'}
-                txn.add(self._ovn.add_sfc_flow_classifier(lswitch_name, flow_classifier_name, **acl))
+        lswitch_name = self._get_chain_lswitch(
+            context, port_chain, ovn_dict['flow_classifier'])
+        with self._ovn_transaction() as txn:
+            self._add_ovn_port_chain(txn, lswitch_name, ovn_dict)
 
     @log_helpers.log_method_call
     def delete_port_chain(self, context):
-        pass
+        port_chain = context.current
+        with self._ovn_transaction() as txn:
+            self._delete_ovn_port_chain(txn, self._sfc_name(port_chain['id']))
 
     @log_helpers.log_method_call
     def update_port_chain(self, context):
-        pass
+        original = context.original
+        current = context.current
+        if (
+            original['port_pair_groups'] == current['port_pair_groups'] and
+            set(original['flow_classifiers']) ==
+            set(current['flow_classifiers'])
+        ):
+            return
+        lport_chain_name = self._sfc_name(current['id'])
+        with self._ovn_transaction() as txn:
+            if not self._ovn_can_edit():
+                self._rebuild_ovn_port_chain(
+                    txn, context, lport_chain_name, current)
+                return
+            self._update_ovn_port_pair_groups(
+                txn, context, lport_chain_name,
+                original['port_pair_groups'], current['port_pair_groups'])
+            self._update_ovn_flow_classifiers(
+                txn, lport_chain_name,
+                original['flow_classifiers'], current['flow_classifiers'])
 
+    #
+    # Port pair group: the OVN port pair groups belong to the port chain
+    # using them, they are created and deleted with it.
+    #
     @log_helpers.log_method_call
     def create_port_pair_group(self, context):
         pass
@@ -156,18 +257,50 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
 
     @log_helpers.log_method_call
     def update_port_pair_group(self, context):
-        pass
+        original = context.original
+        current = context.current
+        if set(original['port_pairs']) == set(current['port_pairs']):
+            return
+        lport_pair_group_name = self._sfc_name(current['id'])
+        lppg = self._get_ovn_row(
+            'Logical_Port_Pair_Group', lport_pair_group_name)
+        if lppg is None:
+            # Not used by any port chain yet
+            return
+        with self._ovn_transaction() as txn:
+            if self._ovn_can_edit():
+                self._set_ovn_port_pair_group(
+                    txn, lport_pair_group_name, current['port_pairs'])
+                return
+            for lport_chain in self._ovn.idl.tables[
+                'Logical_Port_Chain'
+            ].rows.values():
+                if lppg in lport_chain.port_pair_groups:
+                    self._rebuild_ovn_port_chain(
+                        txn, context, lport_chain.name,
+                        context._plugin.get_port_chain(
+                            context._plugin_context,
+                            self._sfc_id(lport_chain.name)))
 
+    #
+    # Port pair
+    #
     @log_helpers.log_method_call
     def create_port_pair(self, context):
-        pass
+        port_pair = context.current
+        with self._ovn_transaction() as txn:
+            self._add_ovn_port_pair(txn, context, port_pair)
 
     @log_helpers.log_method_call
     def delete_port_pair(self, context):
-        pass
+        port_pair = context.current
+        with self._ovn_transaction() as txn:
+            self._delete_ovn_port_pair(txn, self._sfc_name(port_pair['id']))
 
     @log_helpers.log_method_call
     def update_port_pair(self, context):
+        # Only the name and description of a port pair can be updated,
+        # OVN does not know about them.
         pass
 
     #
@@ -178,8 +311,29 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
         if self._ovn_property is None:
             LOG.info(_LI("Getting OvsdbOvnIdl"))
             self._ovn_property = impl_idl_ovn.OvsdbNbOvnIdl(self)
+            self._ovn_index.attach(self._ovn_property.idl)
         return self._ovn_property
 
+    def _ovn_can_edit(self):
+        """Whether the NB API can edit the rows of a port chain."""
+        return all(
+            hasattr(self._ovn, command) for command in OVN_EDIT_COMMANDS)
+
+    def _ovn_transaction(self):
+        """Open a NB transaction, resyncing first on a new IDL session.
+
+        The sequence number of the IDL session changes whenever the
+        connection to the NB DB is established again, the SFC rows are
+        then resynced against the IDL cache before the transaction.
+        """
+        seqno = self._ovn.idl._session.get_seqno()
+        if seqno != self._ovn_seqno:
+            if self._ovn_seqno is not None:
+                self._ovn_index.rebuild()
+            self._sync_ovn_sfc()
+            self._ovn_seqno = seqno
+        return self._ovn.transaction(check_error=True)
+
     #
     # Interface into OVN - adds new rules to direct
     # traffic to VNF port-pair
@@ -190,44 +344,80 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
         # is a UUID. If so then there will be no matches.
         # We prefix the UUID to enable us to use the Neutron UUID when
         # updating, deleting etc.
-        return 'neutron-sfc-%s' % id
+        return SFC_NAME_PREFIX + id
+
+    def _sfc_id(self, name):
+        return name[len(SFC_NAME_PREFIX):]
+
+    #
+    # Port to network cache: the network of a port never changes, so the
+    # cache entry of a port is only dropped when the port is deleted.
+    #
+    def _port_deleted(self, resource, event, trigger, **kwargs):
+        self._port_networks.pop(kwargs['port']['id'], None)
+
+    def _get_port_networks(self, port_ids):
+        """Get the network ids of ports, querying the missing ones at once.
+
+        @return: dict of the network ids by port id of the existing ports
+        """
+        missing_port_ids = [
+            port_id for port_id in port_ids
+            if port_id not in self._port_networks]
+        if missing_port_ids:
+            core_plugin = manager.NeutronManager.get_plugin()
+            ports = core_plugin.get_ports(
+                self.admin_context, filters={'id': missing_port_ids},
+                fields=['id', 'network_id'])
+            for port in ports:
+                self._port_networks[port['id']] = port['network_id']
+        return dict(
+            (port_id, self._port_networks[port_id])
+            for port_id in port_ids if port_id in self._port_networks)
+
+    def _get_port_lswitches(self, port_ids):
+        """Get the logical switches of ports.
+
+        @return: dict of the logical switch names by port id, None for the
+        ports without logical switch
+        """
+        port_networks = self._get_port_networks(port_ids)
+        port_lswitches = {}
+        for port_id in port_ids:
+            lswitch_name = None
+            if port_id in port_networks:
+                lswitch_name = utils.ovn_name(port_networks[port_id])
+                if self._get_ovn_row('Logical_Switch', lswitch_name) is None:
+                    LOG.error("Logical Switch %(lswitch)s does not exist "
+                              "got port_id %(port)s",
+                              {'lswitch': lswitch_name, 'port': port_id})
+                    lswitch_name = None
+            port_lswitches[port_id] = lswitch_name
+        return port_lswitches
 
     #
     # Check logical switch exists for network port
     #
     def _check_lswitch_exists(self, context, port_id):
-        lswitch_name = None
-        core_plugin = manager.NeutronManager.get_plugin()
-        #
-        # Get network id belonging to port
-        #
-        port = core_plugin.get_port(self.admin_context, port_id)
-        #
-        # Check network exists
-        #
-        lswitch_name = utils.ovn_name(port['network_id'])
-        try:
-            idlutils.row_by_value(self._ovn.idl, 'Logical_Switch',
-                                  'name', lswitch_name)
-        except idlutils.RowNotFound:
-            msg = ("Logical Switch %s does not exist got port_id %s") % (
-                lswitch_name, port_id)
-            LOG.error(msg)
-            lswitch_name = None
-        return lswitch_name
+        return self._get_port_lswitches([port_id])[port_id]
 
     #
     # Get the logical port uuid
     #
     def _check_logical_port_exist(self, port_name):
         lport_uuid = None
-        try:
-            lport = idlutils.row_by_value(self._ovn.idl, 'Logical_Switch_Port',
-                                          'name', port_name)
-            lport_uuid = lport.uuid
-        except idlutils.RowNotFound:
+        lport = self._get_ovn_row('Logical_Switch_Port', port_name)
+        if lport is None:
             LOG.error("Logical Port %s does not exist", port_name)
-            lport_uuid = None
+        else:
+            lport_uuid = lport.uuid
+        return lport_uuid
+
+    def _get_logical_port_uuid(self, port_name):
+        lport_uuid = self._check_logical_port_exist(port_name)
+        if lport_uuid is None:
+            raise exc.SfcOvnObjectNotFound(
+                type='Logical_Switch_Port', name=port_name)
         return lport_uuid
 
     #
@@ -235,198 +425,302 @@ class OVNSfcDriver(driver_base.SfcDriverBase,
     #
     def _get_port_pair_uuid(self, port_pair_name):
         lpp_uuid = None
-        try:
-            lpp = idlutils.row_by_value(self._ovn.idl, 'Logical_Port_Pair',
-                                        'name', port_pair_name)
-            lpp_uuid = lpp.uuid
-        except idlutils.RowNotFound:
+        lpp = self._get_ovn_row('Logical_Port_Pair', port_pair_name)
+        if lpp is None:
             LOG.error("Logical Port Pair %s does not exist", port_pair_name)
-            lpp_uuid = None
+        else:
+            lpp_uuid = lpp.uuid
         return lpp_uuid
 
     def _get_port_pairs_in_port_pair_group(self, port_pair_group_name):
-        lppg = idlutils.row_by_value(self._ovn.idl, 'Logical_Port_Pair_Group',
-                                     'name', port_pair_group_name)
+        lppg = self._get_ovn_row('Logical_Port_Pair_Group',
+                                 port_pair_group_name)
+        if lppg is None:
+            raise exc.SfcOvnObjectNotFound(
+                type='Logical_Port_Pair_Group', name=port_pair_group_name)
         return lppg.port_pairs
 
     def _get_flow_classifier_uuid(self, fc_name):
         fc_uuid = None
-        try:
-            fc = idlutils.row_by_value(self._ovn.idl,
-                                       'Logical_Flow_Classifier',
-                                       'name', fc_name)
-            fc_uuid = fc.uuid
-        except idlutils.RowNotFound:
+        fc = self._get_ovn_row('Logical_Flow_Classifier', fc_name)
+        if fc is None:
             LOG.error("Logical flow classifier %s does not exist", fc_name)
-            # raise RuntimeError(msg)
+        else:
+            fc_uuid = fc.uuid
         return fc_uuid
 
-    def _set_ovn_port_pair_group(self, port_pair_group):
-        LOG.debug("Update ovn port pair group %s", port_pair_group['id'])
+    def _get_ovn_row(self, table, name):
+        # Make sure the IDL, and so the index, is set up
+        self._ovn
+        return self._ovn_index.get_row(table, name)
+
+    def _get_ovn_sfc_rows(self, table):
+        """Get the rows of an OVN table created by this driver by name."""
+        return dict(
+            (row.name, row)
+            for row in self._ovn.idl.tables[table].rows.values()
+            if row.name.startswith(SFC_NAME_PREFIX))
+
+    def _get_ovn_lswitch_name(self, column, row):
+        """Get the name of the logical switch referring to a row."""
+        for lswitch in self._ovn.idl.tables['Logical_Switch'].rows.values():
+            if row in getattr(lswitch, column):
+                return lswitch.name
+        raise exc.SfcOvnObjectNotFound(type='Logical_Switch', name=row.name)
+
+    #
+    # NB transaction builders, each one adds its commands to the
+    # transaction of the calling API operation.
+    #
+    def _add_ovn_port_pair(self, txn, context, port_pair):
+        lswitch_name = self._check_lswitch_exists(
+            context, port_pair['ingress'])
+        if lswitch_name is None:
+            raise exc.SfcOvnObjectNotFound(
+                type='Logical_Switch', name=port_pair['ingress'])
+        txn.add(self._ovn.create_lport_pair(
+                lport_pair_name=self._sfc_name(port_pair['id']),
+                lswitch_name=lswitch_name,
+                outport=self._get_logical_port_uuid(port_pair['egress']),
+                inport=self._get_logical_port_uuid(port_pair['ingress'])))
+
+    def _delete_ovn_port_pair(self, txn, lport_pair_name):
+        lpp = self._get_ovn_row('Logical_Port_Pair', lport_pair_name)
+        if lpp is None:
+            return
+        txn.add(self._ovn.delete_lport_pair(
+                lport_pair_name=lport_pair_name,
+                lswitch=self._get_ovn_lswitch_name('port_pairs', lpp),
+                lport_pair_group_name=None))
+
+    def _get_port_pair_uuids(self, port_pair_ids):
         port_pair_uuid_list = []
-        port_pairs = port_pair_group['port_pairs']
-        lport_pair_group_name = self._sfc_name(port_pair_group['id'])
-        with self._ovn.transaction(check_error=True) as txn:
-            for port_pair in port_pairs:
-                lport_pair_name = self._sfc_name(port_pair)
-                port_pair_uuid = self._get_port_pair_uuid(lport_pair_name)
-                if port_pair_uuid is None:
-                    LOG.error("Logical port pair %s does not exist",
-                              port_pair)
-                    return False
-                port_pair_uuid_list.append(port_pair_uuid)
-            txn.add(self._ovn.set_lport_pair_group(
-                lport_pair_group_name=lport_pair_group_name,
-                port_pairs=port_pair_uuid_list))
-        return True
-
-    def _create_ovn_port_pair_group(self, context, port_chain,
-                                    port_pair_groups):
-        status = True
+        for port_pair_id in port_pair_ids:
+            lport_pair_name = self._sfc_name(port_pair_id)
+            port_pair_uuid = self._get_port_pair_uuid(lport_pair_name)
+            if port_pair_uuid is None:
+                raise exc.SfcOvnObjectNotFound(
+                    type='Logical_Port_Pair', name=lport_pair_name)
+            port_pair_uuid_list.append(port_pair_uuid)
+        return port_pair_uuid_list
+
+    def _add_ovn_port_pair_group(self, txn, lport_chain_name, pg_id,
+                                 port_pair_ids):
+        txn.add(self._ovn.create_lport_pair_group(
+                lport_pair_group_name=self._sfc_name(pg_id),
+                lport_chain_name=lport_chain_name,
+                port_pairs=self._get_port_pair_uuids(port_pair_ids)))
+
+    def _set_ovn_port_pair_group(self, txn, lport_pair_group_name,
+                                 port_pair_ids):
+        LOG.debug("Update ovn port pair group %s", lport_pair_group_name)
+        txn.add(self._ovn.set_lport_pair_group(
+            lport_pair_group_name=lport_pair_group_name,
+            port_pairs=self._get_port_pair_uuids(port_pair_ids)))
+
+    def _add_ovn_flow_classifier(self, txn, lport_chain_name,
+                                 flow_classifier):
+        flow_classifier_name = self._sfc_name(flow_classifier['id'])
+        # Remove the flow classifier parameters not support in ovn
+        ovn_fc = dict(
+            (key, value) for key, value in flow_classifier.items()
+            if key not in OVN_UNSUPPORTED_FC_FIELDS)
+        ovn_fc['logical_source_port'] = self._get_logical_port_uuid(
+            flow_classifier['logical_source_port'])
+        ovn_fc['logical_destination_port'] = self._get_logical_port_uuid(
+            flow_classifier['logical_destination_port'])
+        txn.add(self._ovn.create_lflow_classifier(
+            lport_chain_name=lport_chain_name,
+            lflow_classifier_name=flow_classifier_name,
+            **ovn_fc))
+
+    def _add_ovn_port_chain(self, txn, lswitch_name, sfc_instance):
+        lport_chain_name = self._sfc_name(sfc_instance['id'])
+        txn.add(self._ovn.create_lport_chain(
+            lswitch_name=lswitch_name,
+            lport_chain_name=lport_chain_name))
+        for group in sfc_instance['port_pair_groups']:
+            self._add_ovn_port_pair_group(
+                txn, lport_chain_name, group['id'],
+                [port_pair['id'] for port_pair in group['port_pairs']])
+        for flow_classifier in sfc_instance['flow_classifier']:
+            self._add_ovn_flow_classifier(
+                txn, lport_chain_name, flow_classifier)
+
+    def _delete_ovn_port_chain(self, txn, lport_chain_name):
+        # The port pair groups and flow classifiers of the port chain are
+        # only referenced by it, OVSDB garbage collects them with it.
+        lport_chain = self._get_ovn_row(
+            'Logical_Port_Chain', lport_chain_name)
+        if lport_chain is None:
+            return
+        txn.add(self._ovn.delete_lport_chain(
+            lswitch_name=self._get_ovn_lswitch_name(
+                'port_chains', lport_chain),
+            lport_chain_name=lport_chain_name))
+
+    def _rebuild_ovn_port_chain(self, txn, context, lport_chain_name,
+                                port_chain):
+        """Delete a port chain and create it again with its current rows.
+
+        This replaces the edits of the port pair groups and flow
+        classifiers of the port chain when the NB API has no command for
+        them, OVSDB garbage collects the old rows.
+        """
+        LOG.debug("Rebuild ovn port chain %s", lport_chain_name)
+        self._delete_ovn_port_chain(txn, lport_chain_name)
+        self._sync_add_ovn_port_chain(txn, context, port_chain)
+
+    def _update_ovn_port_pair_groups(self, txn, context, lport_chain_name,
+                                     original_pg_ids, current_pg_ids):
+        """Apply the port pair group changes of a port chain.
+
+        The groups in the common prefix of both lists are kept, the
+        others are deleted and created again in order, which covers
+        groups being added, removed or reordered.
+
+        @return: the ids of the kept port pair groups
+        """
+        common = 0
+        for original_pg_id, current_pg_id in zip(
+            original_pg_ids, current_pg_ids
+        ):
+            if original_pg_id != current_pg_id:
+                break
+            common += 1
+        for pg_id in original_pg_ids[common:]:
+            txn.add(self._ovn.delete_lport_pair_group(
+                lport_pair_group_name=self._sfc_name(pg_id),
+                lport_chain_name=lport_chain_name))
+        port_pair_ids = self._get_portpair_ids_by_pg_ids(
+            context, current_pg_ids[common:])
+        for pg_id in current_pg_ids[common:]:
+            self._add_ovn_port_pair_group(
+                txn, lport_chain_name, pg_id, port_pair_ids[pg_id])
+        return current_pg_ids[:common]
+
+    def _update_ovn_flow_classifiers(self, txn, lport_chain_name,
+                                     original_fc_ids, current_fc_ids):
+        for fc_id in set(original_fc_ids) - set(current_fc_ids):
+            txn.add(self._ovn.delete_lflow_classifier(
+                lport_chain_name=lport_chain_name,
+                lflow_classifier_name=self._sfc_name(fc_id)))
+        added_fc_ids = [
+            fc_id for fc_id in current_fc_ids
+            if fc_id not in original_fc_ids]
+        for flow_classifier in self._get_fcs_by_ids(added_fc_ids):
+            self._add_ovn_flow_classifier(
+                txn, lport_chain_name, flow_classifier)
 
+    #
+    # Resync of the OVN SFC rows against the IDL cache
+    #
+    def _sync_ovn_sfc(self):
+        """Resync the OVN SFC rows with the neutron SFC resources.
+
+        The IDL cache holds the NB DB content, only the differences with
+        the neutron resources are written to the NB DB. Port pairs are
+        synced in their own transaction first, so that the port pair
+        groups can refer to them.
+        """
+        plugin = self._get_sfc_plugin()
+        if not plugin:
+            return
+        LOG.info(_LI("Resyncing OVN SFC rows"))
+        context = sfc_ctx.SfcPluginContext(plugin, self.admin_context)
+        port_pairs = dict(
+            (port_pair['id'], port_pair)
+            for port_pair in plugin.get_port_pairs(self.admin_context))
+        lport_pairs = self._get_ovn_sfc_rows('Logical_Port_Pair')
+        self._get_port_networks(
+            [port_pair['ingress'] for port_pair in port_pairs.values()])
         with self._ovn.transaction(check_error=True) as txn:
-            lport_chain_name = self._sfc_name(port_chain)
-            for group in port_pair_groups:
-                lport_pair_group_name = self._sfc_name(group['id'])
-                port_pairs = group['port_pairs']
-                # Insert Ports Pair into OVN
-                #
-                port_pair_uuid_list = []
-                for port_pair in port_pairs:
-                    lport_pair_name = self._sfc_name(port_pair['id'])
-                    port_pair_uuid = self._get_port_pair_uuid(lport_pair_name)
-                    if port_pair_uuid is None:
-                        LOG.error("Logical port pair %s does not exist",
-                                  port_pair['id'])
-                        return False
-                    port_pair_uuid_list.append(port_pair_uuid)
-                txn.add(self._ovn.create_lport_pair_group(
-                        lport_pair_group_name=lport_pair_group_name,
-                        lport_chain_name=lport_chain_name,
-                        port_pairs=port_pair_uuid_list))
-
-        return status
-
-    def _create_ovn_flow_classifier(self, context, port_chain,
-                                    flow_classifiers):
-        status = True
-
-        lport_chain_name = self._sfc_name(port_chain)
-        with self._ovn.transaction(check_error=True) as txn:
-            for flow_classifier in flow_classifiers:
-                flow_classifier_name = self._sfc_name(flow_classifier['id'])
-                lport_uuid = self._check_logical_port_exist(
-                    flow_classifier['logical_source_port'])
-                if lport_uuid is None:
-                    LOG.error("Logical port %s does not exist",
-                              flow_classifier['logical_source_port'])
-                    return False
-                flow_classifier['logical_source_port'] = lport_uuid
-                lport_uuid = self._check_logical_port_exist(
-                    flow_classifier['logical_destination_port'])
-                if lport_uuid is None:
-                    LOG.error("Logical port %s does not exist",
-                              flow_classifier['logical_destination_port'])
-                    return False
-                flow_classifier['logical_destination_port'] = lport_uuid
-                # Remove the flow classifier parameters not support in ovn
-                flow_classifier.pop('id')
-                flow_classifier.pop('description')
-                flow_classifier.pop('l7_parameters')
-                flow_classifier.pop('name')
-                flow_classifier.pop('tenant_id')
-                txn.add(self._ovn.create_lflow_classifier(
-                    lport_chain_name=lport_chain_name,
-                    lflow_classifier_name=flow_classifier_name,
-                    **flow_classifier))
-        return status
-
-    def _create_ovn_sfc_about_logical_switch(self, context, sfc_instance):
-        status = True
-
+            for port_pair_id, port_pair in port_pairs.items():
+                if self._sfc_name(port_pair_id) not in lport_pairs:
+                    self._sync_ovn_resource(
+                        'port pair', port_pair_id, self._add_ovn_port_pair,
+                        txn, context, port_pair)
         with self._ovn.transaction(check_error=True) as txn:
-            #
-            # Insert Port Chain into OVN
-            #
-            lport_chain_name = self._sfc_name(sfc_instance['id'])
-            for flow_classifier in sfc_instance['flow_classifier']:
-                lswitch_name = self._check_lswitch_exists(
-                    context, flow_classifier['logical_source_port'])
-                if lswitch_name is None:
-                    LOG.error("Logical switch does not exist for "
-                              "flow_classifier logical source port: %s" %
-                              flow_classifier['logical_source_port'])
-                    return False
-                txn.add(self._ovn.create_lport_chain(
-                    lswitch_name=lswitch_name,
-                    lport_chain_name=lport_chain_name))
-
-            port_pair_groups = sfc_instance['port_pair_groups']
-            for group in port_pair_groups:
-                port_pairs = group['port_pairs']
-                # Insert Ports Pair into OVN
-                #
-                for port_pair in port_pairs:
-                    lport_pair_name = self._sfc_name(port_pair['id'])
-                    lswitch_name = self._check_lswitch_exists(
-                        context, port_pair['ingress'])
-                    if lswitch_name is None:
-                        LOG.error("Logical switch does not exist for "
-                                  "port pair %s ingress port" %
-                                  port_pair['id'])
-                        return False
-                    inport_uuid = self._check_logical_port_exist(
-                        port_pair['ingress'])
-                    outport_uuid = self._check_logical_port_exist(
-                        port_pair['egress'])
-                    if inport_uuid is None or outport_uuid is None:
-                        LOG.error("Logical ingress port or egress port does "
-                                  "not exist for port pair %s",
-                                  port_pair['id'])
-                        return False
-                    txn.add(self._ovn.create_lport_pair(
-                            lport_pair_name=lport_pair_name,
-                            lswitch_name=lswitch_name,
-                            outport=outport_uuid,
-                            inport=inport_uuid))
-        return status
-
-    def _delete_ovn_sfc(self, context, sfc_instance):
-        status = True
-        lport_chain_name = self._sfc_name(sfc_instance['id'])
+            self._sync_ovn_port_chains(txn, context)
+        # The stale port pairs are deleted last, once no port pair group
+        # refers to them anymore.
         with self._ovn.transaction(check_error=True) as txn:
-            #
-            # delete port pair from logcial switch
-            #
-            port_pair_groups = sfc_instance['port_pair_groups']
-            for group in port_pair_groups:
-                port_pairs = group['port_pairs']
-                lport_pair_group_name = self._sfc_name(group['id'])
-                for port_pair in port_pairs:
-                    lport_pair_name = self._sfc_name(port_pair['id'])
-                    lswitch_name = self._check_lswitch_exists(
-                        context, port_pair['ingress'])
-                    if lswitch_name is None:
-                        LOG.error("Logical switch does not exist for "
-                                  "port pair %s ingress port" %
-                                  port_pair['id'])
-                        return False
-                    txn.add(self._ovn.delete_lport_pair(
-                            lport_pair_name=lport_pair_name,
-                            lswitch=lswitch_name,
-                            lport_pair_group_name=lport_pair_group_name))
-            #
-            # delete port chain from OVN
-            #
-            for flow_classifier in sfc_instance['flow_classifier']:
-                lswitch_name = self._check_lswitch_exists(
-                    context, flow_classifier['logical_source_port'])
-                if lswitch_name is None:
-                    LOG.error("Logical switch does not exist for "
-                              "flow_classifier logical source port: %s" %
-                              flow_classifier['logical_source_port'])
-                    return False
-                txn.add(self._ovn.delete_lport_chain(
-                    lswitch_name=lswitch_name,
-                    lport_chain_name=lport_chain_name))
-        return status
+            for lport_pair_name in lport_pairs:
+                if self._sfc_id(lport_pair_name) not in port_pairs:
+                    self._delete_ovn_port_pair(txn, lport_pair_name)
+
+    def _sync_ovn_resource(self, resource, id, sync_method, *args):
+        try:
+            sync_method(*args)
+        except n_exc.NeutronException as e:
+            LOG.warning(_LW("Failed to resync OVN rows of %(resource)s "
+                            "%(id)s: %(error)s"),
+                        {'resource': resource, 'id': id, 'error': e})
+
+    def _sync_ovn_port_chains(self, txn, context):
+        lport_chains = self._get_ovn_sfc_rows('Logical_Port_Chain')
+        for port_chain in context._plugin.get_port_chains(
+            context._plugin_context
+        ):
+            lport_chain = lport_chains.pop(
+                self._sfc_name(port_chain['id']), None)
+            if lport_chain is None:
+                self._sync_ovn_resource(
+                    'port chain', port_chain['id'],
+                    self._sync_add_ovn_port_chain,
+                    txn, context, port_chain)
+            else:
+                self._sync_ovn_resource(
+                    'port chain', port_chain['id'],
+                    self._sync_ovn_port_chain,
+                    txn, context, lport_chain, port_chain)
+        for lport_chain_name in lport_chains:
+            self._delete_ovn_port_chain(txn, lport_chain_name)
+
+    def _sync_add_ovn_port_chain(self, txn, context, port_chain):
+        ovn_dict = self._create_ovn_dict(context, port_chain)
+        lswitch_name = self._get_chain_lswitch(
+            context, port_chain, ovn_dict['flow_classifier'])
+        self._add_ovn_port_chain(txn, lswitch_name, ovn_dict)
+
+    def _sync_ovn_port_chain(self, txn, context, lport_chain, port_chain):
+        if not self._ovn_can_edit():
+            if self._ovn_port_chain_changed(context, lport_chain, port_chain):
+                self._rebuild_ovn_port_chain(
+                    txn, context, lport_chain.name, port_chain)
+            return
+        kept_pg_ids = self._update_ovn_port_pair_groups(
+            txn, context, lport_chain.name,
+            [self._sfc_id(lppg.name)
+             for lppg in lport_chain.port_pair_groups],
+            port_chain['port_pair_groups'])
+        port_pair_ids = self._get_portpair_ids_by_pg_ids(
+            context, kept_pg_ids)
+        for lppg in lport_chain.port_pair_groups:
+            pg_id = self._sfc_id(lppg.name)
+            if pg_id not in kept_pg_ids:
+                continue
+            if set(port_pair_ids[pg_id]) != set(
+                self._sfc_id(lpp.name) for lpp in lppg.port_pairs
+            ):
+                self._set_ovn_port_pair_group(
+                    txn, lppg.name, port_pair_ids[pg_id])
+        self._update_ovn_flow_classifiers(
+            txn, lport_chain.name,
+            [self._sfc_id(lfc.name) for lfc in lport_chain.flow_classifier],
+            port_chain['flow_classifiers'])
+
+    def _ovn_port_chain_changed(self, context, lport_chain, port_chain):
+        """Whether the OVN rows of a port chain differ from the resource."""
+        pg_ids = [
+            self._sfc_id(lppg.name) for lppg in lport_chain.port_pair_groups]
+        if pg_ids != port_chain['port_pair_groups']:
+            return True
+        port_pair_ids = self._get_portpair_ids_by_pg_ids(context, pg_ids)
+        for lppg in lport_chain.port_pair_groups:
+            if set(port_pair_ids.get(self._sfc_id(lppg.name), [])) != set(
+                self._sfc_id(lpp.name) for lpp in lppg.port_pairs
+            ):
+                return True
+        return set(port_chain['flow_classifiers']) != set(
+            self._sfc_id(lfc.name) for lfc in lport_chain.flow_classifier)
@@ -0,0 +1,96 @@
+# Copyright 2016 All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+# The IDL change notification events, see ovs.db.idl
+ROW_CREATE = 'create'
+ROW_UPDATE = 'update'
+ROW_DELETE = 'delete'
+
+
+class IdlNameIndex(object):
+    """Index by name of the rows of some tables of an OVSDB IDL.
+
+    The index is built from the IDL cache when attached to the IDL and is
+    then kept current from the IDL change notifications, so looking a row
+    up by name does not scan its table.
+
+    The IDL clears its cache without notifications when it reconnects,
+    the rows looked up are therefore checked to still be in the cache,
+    and rebuild() may be called once the cache is populated again.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self._idl = None
+        self._lock = threading.Lock()
+        self._rows = dict((table, {}) for table in tables)
+        self._names = dict((table, {}) for table in tables)
+
+    def attach(self, idl):
+        """Build the index from an IDL and follow its change notifications.
+
+        The notifications are received by chaining the notify() method of
+        the IDL, which the IDL calls on every row change.
+        """
+        notify = idl.notify
+
+        def _notify(event, row, updates=None):
+            self.notify(event, row, updates)
+            notify(event, row, updates)
+
+        self._idl = idl
+        idl.notify = _notify
+        self.rebuild()
+
+    def rebuild(self):
+        with self._lock:
+            for table in self.tables:
+                self._rows[table] = {}
+                self._names[table] = {}
+                for row in self._idl.tables[table].rows.values():
+                    self._add_row(table, row)
+
+    def _add_row(self, table, row):
+        name = getattr(row, 'name', None)
+        if name is None:
+            return
+        self._rows[table][name] = row
+        self._names[table][row.uuid] = name
+
+    def _remove_row(self, table, row):
+        name = self._names[table].pop(row.uuid, None)
+        if name is not None and self._rows[table].get(name) is row:
+            del self._rows[table][name]
+
+    def notify(self, event, row, updates=None):
+        table = row._table.name
+        if table not in self._rows:
+            return
+        with self._lock:
+            self._remove_row(table, row)
+            if event != ROW_DELETE:
+                self._add_row(table, row)
+
+    def get_row(self, table, name):
+        """Get the row of a table by name, None if there is none."""
+        row = self._rows[table].get(name)
+        if (
+            row is not None and
+            self._idl.tables[table].rows.get(row.uuid) is not row
+        ):
+            # Left over from an IDL cache cleared by a reconnection
+            return None
+        return row
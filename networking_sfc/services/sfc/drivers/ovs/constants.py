@@ -43,6 +43,12 @@ INSERTION_TYPE_TAP = 'tap'
 
 MAX_HASH = 16
 
+# flow rule changes kept per host for agents catching up on missed casts
+MAX_HOST_FLOWRULE_CHANGES = 1000
+
+# generation bumped on every port chain path change
+GENERATION_PORT_CHAINS = 'port_chains'
+
 INSERTION_TYPE_DICT = {
     n_const.DEVICE_OWNER_ROUTER_HA_INTF: INSERTION_TYPE_L3,
     n_const.DEVICE_OWNER_ROUTER_INTF: INSERTION_TYPE_L3,
@@ -13,15 +13,23 @@
 #    under the License.
 #
 
+import contextlib
+import copy
+import functools
+import threading
+
 import six
 import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
 from sqlalchemy import orm
 from sqlalchemy.orm import exc
 from sqlalchemy import sql
 
 from neutron_lib import exceptions as n_exc
+from oslo_db import exception as db_exc
 from oslo_log import helpers as log_helpers
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import uuidutils
 
 from neutron import context as n_context
@@ -30,6 +38,7 @@ from neutron.db import model_base
 from neutron.db import models_v2
 
 from networking_sfc._i18n import _
+from networking_sfc.services.sfc.drivers.ovs import constants as ovs_const
 
 LOG = logging.getLogger(__name__)
 
@@ -74,8 +83,14 @@ class IDAllocation(object):
         self.session = context.session
 
     @log_helpers.log_method_call
-    def assign_intid(self, type_, uuid):
-        query = self.session.query(UuidIntidAssoc).filter_by(
+    def assign_intid(self, type_, uuid, session=None):
+        """Assign the first free int id of a type to an uuid.
+
+        @param: session: the session to assign it in, such as the one of
+                a driver precommit, the allocator one by default
+        """
+        session = session or self.session
+        query = session.query(UuidIntidAssoc).filter_by(
             type_=type_).order_by(UuidIntidAssoc.intid)
 
         allocated_int_ids = {obj.intid for obj in query.all()}
@@ -85,24 +100,35 @@ class IDAllocation(object):
         start, end = self.conf_obj[type_][0], self.conf_obj[type_][1] + 1
         for init_id in six.moves.range(start, end):
             if init_id not in allocated_int_ids:
-                with self.session.begin(subtransactions=True):
+                with session.begin(subtransactions=True):
                     uuid_intid = UuidIntidAssoc(
                         uuid, init_id, type_)
-                    self.session.add(uuid_intid)
+                    session.add(uuid_intid)
                 return init_id
         else:
             return None
 
     @log_helpers.log_method_call
-    def get_intid_by_uuid(self, type_, uuid):
+    def get_intid_by_uuid(self, type_, uuid, session=None):
 
-        query_obj = self.session.query(UuidIntidAssoc).filter_by(
+        session = session or self.session
+        query_obj = session.query(UuidIntidAssoc).filter_by(
             type_=type_, uuid=uuid).first()
         if query_obj:
             return query_obj.intid
         else:
             return None
 
+    @log_helpers.log_method_call
+    def get_uuid_by_intid(self, type_, intid):
+
+        query_obj = self.session.query(UuidIntidAssoc).filter_by(
+            type_=type_, intid=intid).first()
+        if query_obj:
+            return query_obj.uuid
+        else:
+            return None
+
     @log_helpers.log_method_call
     def release_intid(self, type_, intid):
         """Release int id.
@@ -136,21 +162,48 @@ class PathPortAssoc(model_base.BASEV2):
     weight = sa.Column(sa.Integer, nullable=False, default=1)
 
 
+class PathNodeNextHop(model_base.BASEV2):
+    """path node next hop table.
+
+    It represents the weighted port pair details a path node forwards to,
+    one row per next hop member.
+    """
+    __tablename__ = 'sfc_path_node_next_hops'
+    pathnode_id = sa.Column(sa.String(36),
+                            sa.ForeignKey(
+                                'sfc_path_nodes.id', ondelete='CASCADE'),
+                            primary_key=True)
+    portpair_id = sa.Column(sa.String(36),
+                            sa.ForeignKey('sfc_portpair_details.id',
+                                          ondelete='CASCADE'),
+                            primary_key=True)
+    weight = sa.Column(sa.Integer, nullable=False, default=1)
+
+
 class PortPairDetail(model_base.BASEV2, models_v2.HasId,
                      models_v2.HasTenant):
     __tablename__ = 'sfc_portpair_details'
     ingress = sa.Column(sa.String(36), nullable=True)
     egress = sa.Column(sa.String(36), nullable=True)
-    host_id = sa.Column(sa.String(255), nullable=False)
+    host_id = sa.Column(sa.String(255), nullable=False, index=True)
     mac_address = sa.Column(sa.String(32), nullable=False)
     network_type = sa.Column(sa.String(8))
     segment_id = sa.Column(sa.Integer)
     local_endpoint = sa.Column(sa.String(64), nullable=False)
+    correlation = sa.Column(sa.String(255), nullable=True)
     path_nodes = orm.relationship(PathPortAssoc,
                                   backref='port_pair_detail',
                                   lazy="joined",
                                   cascade='all,delete')
 
+    __table_args__ = (
+        sa.Index('ix_sfc_portpair_details_ingress_tenant_id',
+                 'ingress', 'tenant_id'),
+        sa.Index('ix_sfc_portpair_details_egress_tenant_id',
+                 'egress', 'tenant_id'),
+        model_base.BASEV2.__table_args__
+    )
+
 
 class PathNode(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
     __tablename__ = 'sfc_path_nodes'
@@ -166,12 +219,178 @@ class PathNode(model_base.BASEV2, models_v2.HasId, models_v2.HasTenant):
                                         lazy="joined",
                                         cascade='all,delete')
     next_group_id = sa.Column(sa.Integer)
-    next_hop = sa.Column(sa.String(512))
+    next_hops = orm.relationship(PathNodeNextHop,
+                                 lazy="subquery",
+                                 cascade='all,delete-orphan')
+
+    __table_args__ = (
+        sa.Index('ix_sfc_path_nodes_portchain_id_nsi',
+                 'portchain_id', 'nsi'),
+        sa.Index('ix_sfc_path_nodes_nsp_nsi', 'nsp', 'nsi'),
+        sa.Index('ix_sfc_path_nodes_next_group_id_nsi',
+                 'next_group_id', 'nsi'),
+        model_base.BASEV2.__table_args__
+    )
+
+
+class HostFlowRules(model_base.BASEV2):
+    """host flow rules table.
+
+    It keeps the flow rules an agent fetches for a port on its host, as
+    built from the path nodes, so that agent resyncs only read them.
+    """
+    __tablename__ = 'sfc_host_flow_rules'
+    host_id = sa.Column(sa.String(255), primary_key=True)
+    port_id = sa.Column(sa.String(36), primary_key=True)
+    revision = sa.Column(sa.Integer, nullable=False, default=1)
+    # the flow rules of a port can exceed the 64KB of a MySQL TEXT
+    flowrules = sa.Column(sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                          nullable=False)
+
+
+class HostRevision(model_base.BASEV2):
+    """host revision table.
+
+    It keeps the revision of the last flow rule change sent to a host.
+    """
+    __tablename__ = 'sfc_host_revisions'
+    host_id = sa.Column(sa.String(255), primary_key=True)
+    revision = sa.Column(sa.Integer, nullable=False, default=0)
+
+
+class HostFlowRuleChange(model_base.BASEV2):
+    """host flow rule change table.
+
+    It keeps the latest flow rule changes sent to a host so that an agent
+    which missed some of them can fetch them again.
+    """
+    __tablename__ = 'sfc_host_flowrule_changes'
+    host_id = sa.Column(sa.String(255), primary_key=True)
+    revision = sa.Column(sa.Integer, primary_key=True, autoincrement=False)
+    method = sa.Column(sa.String(64), nullable=False)
+    flowrule = sa.Column(sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                         nullable=False)
+
+
+class Generation(model_base.BASEV2):
+    """generation table.
+
+    It keeps named counters bumped whenever the data they cover changes.
+    """
+    __tablename__ = 'sfc_generations'
+    name = sa.Column(sa.String(64), primary_key=True)
+    generation = sa.Column(sa.Integer, nullable=False, default=0)
+
+
+class DBCacheScope(object):
+    """Read-through cache of path node and port detail lookups.
+
+    Entries are kept per table, keyed by id or by the filter items used
+    for the lookup. Any write touching a table drops every entry of that
+    table, and values are copied in and out since callers modify them.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.hits = 0
+        self.misses = 0
+        self.tables = {}
+
+    def get(self, table, key):
+        entries = self.tables.get(table, {})
+        if key in entries:
+            self.hits += 1
+            return True, copy.deepcopy(entries[key])
+        self.misses += 1
+        return False, None
+
+    def put(self, table, key, value):
+        self.tables.setdefault(table, {})[key] = copy.deepcopy(value)
+
+    def invalidate(self, table):
+        self.tables.pop(table, None)
+
+
+def cached_reads(f):
+    """Run the decorated driver method inside a DB cache scope."""
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        with self.db_cache():
+            return f(self, *args, **kwargs)
+    return wrapper
 
 
 class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
     def initialize(self):
         self.admin_context = n_context.get_admin_context()
+        self._db_cache_local = threading.local()
+        self._db_cache_stats = {'hits': 0, 'misses': 0}
+
+    @contextlib.contextmanager
+    def db_cache(self):
+        """Cache path node and port detail reads for the enclosed block.
+
+        The cache is local to the calling thread and is dropped when the
+        outermost block exits, so other API or RPC workers' writes are seen
+        by the next operation.
+        """
+        scope = getattr(self._db_cache_local, 'scope', None)
+        if scope is None:
+            scope = DBCacheScope()
+            self._db_cache_local.scope = scope
+        scope.depth += 1
+        try:
+            yield scope
+        except Exception:
+            # rows read after a failed write may not have been committed
+            scope.tables.clear()
+            raise
+        finally:
+            scope.depth -= 1
+            if not scope.depth:
+                self._db_cache_local.scope = None
+                self._db_cache_stats['hits'] += scope.hits
+                self._db_cache_stats['misses'] += scope.misses
+                LOG.debug("DB cache scope done with %(hits)d hits and "
+                          "%(misses)d misses",
+                          {'hits': scope.hits, 'misses': scope.misses})
+
+    def get_db_cache_stats(self):
+        hits = self._db_cache_stats['hits']
+        misses = self._db_cache_stats['misses']
+        total = hits + misses
+        return {'hits': hits,
+                'misses': misses,
+                'hit_rate': float(hits) / total if total else 0.0}
+
+    def _get_db_cache_scope(self):
+        local = getattr(self, '_db_cache_local', None)
+        return getattr(local, 'scope', None)
+
+    def _cached_read(self, table, key, read):
+        scope = self._get_db_cache_scope()
+        if scope is None or key is None:
+            return read()
+        found, value = scope.get(table, key)
+        if found:
+            return value
+        value = read()
+        scope.put(table, key, value)
+        return value
+
+    def _invalidate_db_cache(self, table):
+        scope = self._get_db_cache_scope()
+        if scope is not None:
+            scope.invalidate(table)
+
+    def _make_filter_cache_key(self, filters, *args):
+        # only plain filter lookups are cached
+        if any(args):
+            return None
+        try:
+            return ('filter', frozenset(six.iteritems(filters or {})))
+        except TypeError:
+            return None
 
     def _make_pathnode_dict(self, node, fields=None):
         res = {'id': node['id'],
@@ -180,7 +399,9 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
                'nsp': node['nsp'],
                'nsi': node['nsi'],
                'next_group_id': node['next_group_id'],
-               'next_hop': node['next_hop'],
+               'next_hop': [{'portpair_id': next_hop['portpair_id'],
+                             'weight': next_hop['weight']}
+                            for next_hop in node['next_hops']],
                'portchain_id': node['portchain_id'],
                'status': node['status'],
                'portpair_details': [pair_detail['portpair_id']
@@ -200,6 +421,7 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
                'local_endpoint': port['local_endpoint'],
                'mac_address': port['mac_address'],
                'network_type': port['network_type'],
+               'correlation': port['correlation'],
                'path_nodes': [{'pathnode_id': node['pathnode_id'],
                                'weight': node['weight']}
                               for node in port['path_nodes']]
@@ -229,24 +451,283 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
             raise PortPairDetailNotFound(port_id=id)
         return port
 
-    def create_port_detail(self, port):
-        with self.admin_context.session.begin(subtransactions=True):
+    def create_port_detail(self, port, session=None):
+        """Create a port detail.
+
+        @param: session: the session to create it in, such as the one of
+                a driver precommit, the admin context one by default
+        """
+        session = session or self.admin_context.session
+        with session.begin(subtransactions=True):
+            self._invalidate_db_cache(PortPairDetail)
             args = self._filter_non_model_columns(port, PortPairDetail)
             args['id'] = uuidutils.generate_uuid()
             port_obj = PortPairDetail(**args)
-            self.admin_context.session.add(port_obj)
+            session.add(port_obj)
             return self._make_port_detail_dict(port_obj)
 
+    def _set_path_node_next_hops(self, node_obj, next_hops):
+        """Synchronize the next hop rows of a path node.
+
+        @param: node_obj: PathNode
+        @param: next_hops: list of dict with portpair_id and weight
+        """
+        wanted = {next_hop['portpair_id']: next_hop.get('weight', 1)
+                  for next_hop in next_hops or []}
+        current = {next_hop['portpair_id']: next_hop
+                   for next_hop in node_obj.next_hops}
+
+        for portpair_id in set(current) - set(wanted):
+            node_obj.next_hops.remove(current[portpair_id])
+        for portpair_id in set(current) & set(wanted):
+            if current[portpair_id]['weight'] != wanted[portpair_id]:
+                current[portpair_id]['weight'] = wanted[portpair_id]
+        node_obj.next_hops.extend(
+            PathNodeNextHop(portpair_id=portpair_id,
+                            weight=wanted[portpair_id])
+            for portpair_id in set(wanted) - set(current))
+
     def create_path_node(self, node):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
             args = self._filter_non_model_columns(node, PathNode)
             args['id'] = uuidutils.generate_uuid()
             node_obj = PathNode(**args)
+            self._set_path_node_next_hops(node_obj, node.get('next_hop'))
             self.admin_context.session.add(node_obj)
             return self._make_pathnode_dict(node_obj)
 
+    def create_path_nodes(self, nodes, assocs=None, session=None):
+        """Create path nodes and their port associations in one go.
+
+        @param: nodes: list of path node dict, an 'id' is generated for
+                the nodes that do not carry one
+        @param: assocs: list of dict with pathnode_id, portpair_id and
+                weight
+        @param: session: the session to create them in, such as the one
+                of a driver precommit, the admin context one by default
+        @return: list of path node dict in the order of nodes
+        """
+        session = session or self.admin_context.session
+        with session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
+            node_objs = []
+            for node in nodes:
+                args = self._filter_non_model_columns(node, PathNode)
+                args['id'] = node.get('id') or uuidutils.generate_uuid()
+                node_obj = PathNode(**args)
+                self._set_path_node_next_hops(node_obj, node.get('next_hop'))
+                node_objs.append(node_obj)
+
+            nodes_by_id = dict((node_obj.id, node_obj)
+                               for node_obj in node_objs)
+            for assoc in assocs or []:
+                nodes_by_id[assoc['pathnode_id']].portpair_details.append(
+                    PathPortAssoc(portpair_id=assoc['portpair_id'],
+                                  weight=assoc.get('weight', 1)))
+
+            session.add_all(node_objs)
+            return [self._make_pathnode_dict(node_obj)
+                    for node_obj in node_objs]
+
+    def delete_path_nodes_by_portchain(self, portchain_id):
+        """Delete every path node of a port chain with bulk deletes."""
+        session = self.admin_context.session
+        with session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
+            node_ids = session.query(PathNode.id).filter_by(
+                portchain_id=portchain_id).subquery()
+            session.query(PathPortAssoc).filter(
+                PathPortAssoc.pathnode_id.in_(node_ids)
+            ).delete(synchronize_session=False)
+            session.query(PathNodeNextHop).filter(
+                PathNodeNextHop.pathnode_id.in_(node_ids)
+            ).delete(synchronize_session=False)
+            session.query(PathNode).filter_by(
+                portchain_id=portchain_id
+            ).delete(synchronize_session=False)
+            # the rows loaded before are gone, reload them on next access
+            session.expire_all()
+
+    def _make_host_flowrules_dict(self, host_flowrules, fields=None):
+        res = {'host_id': host_flowrules['host_id'],
+               'port_id': host_flowrules['port_id'],
+               'revision': host_flowrules['revision'],
+               'flowrules': jsonutils.loads(host_flowrules['flowrules'])
+               }
+
+        return self._fields(res, fields)
+
+    def get_host_flowrules(self, host_id, port_id):
+        with self.admin_context.session.begin(subtransactions=True):
+            host_flowrules = self.admin_context.session.query(
+                HostFlowRules).filter_by(
+                host_id=host_id, port_id=port_id).first()
+            if host_flowrules:
+                return self._make_host_flowrules_dict(host_flowrules)
+
+        return None
+
+    def get_host_flowrules_by_ports(self, port_ids):
+        """List the materialized (host, port) pairs of the given ports."""
+        if not port_ids:
+            return []
+        with self.admin_context.session.begin(subtransactions=True):
+            query = self.admin_context.session.query(
+                HostFlowRules.host_id, HostFlowRules.port_id).filter(
+                HostFlowRules.port_id.in_(list(port_ids)))
+            return [{'host_id': host_id, 'port_id': port_id}
+                    for host_id, port_id in query]
+
+    def update_host_flowrules(self, host_id, port_id, flowrules):
+        """Store the flow rules of a port and bump their revision."""
+        session = self.admin_context.session
+        try:
+            with session.begin(subtransactions=True):
+                host_flowrules = session.query(HostFlowRules).filter_by(
+                    host_id=host_id, port_id=port_id).first()
+                if host_flowrules:
+                    host_flowrules.revision += 1
+                    host_flowrules.flowrules = jsonutils.dumps(flowrules)
+                else:
+                    host_flowrules = HostFlowRules(
+                        host_id=host_id, port_id=port_id, revision=1,
+                        flowrules=jsonutils.dumps(flowrules))
+                    session.add(host_flowrules)
+                return self._make_host_flowrules_dict(host_flowrules)
+        except db_exc.DBDuplicateEntry:
+            # another worker stored the same port concurrently
+            LOG.debug("Flow rules of port %(port_id)s on host %(host_id)s "
+                      "already stored", {'port_id': port_id,
+                                         'host_id': host_id})
+            return self.get_host_flowrules(host_id, port_id)
+
+    def delete_host_flowrules(self, host_id, port_id):
+        with self.admin_context.session.begin(subtransactions=True):
+            self.admin_context.session.query(HostFlowRules).filter_by(
+                host_id=host_id, port_id=port_id).delete()
+
+    def _get_host_revision(self, host_id):
+        return self.admin_context.session.query(HostRevision).filter_by(
+            host_id=host_id).with_for_update().first()
+
+    def record_host_flowrule_change(self, host_id, method, flowrule):
+        """Record a flow rule change sent to a host.
+
+        @return: the new revision of the host
+        """
+        session = self.admin_context.session
+        with session.begin(subtransactions=True):
+            host_revision = self._get_host_revision(host_id)
+            if not host_revision:
+                try:
+                    with session.begin(nested=True):
+                        host_revision = HostRevision(
+                            host_id=host_id, revision=0)
+                        session.add(host_revision)
+                except db_exc.DBDuplicateEntry:
+                    host_revision = self._get_host_revision(host_id)
+            host_revision.revision += 1
+            revision = host_revision.revision
+            session.add(HostFlowRuleChange(
+                host_id=host_id, revision=revision, method=method,
+                flowrule=jsonutils.dumps(flowrule)))
+            session.query(HostFlowRuleChange).filter(
+                HostFlowRuleChange.host_id == host_id,
+                HostFlowRuleChange.revision <=
+                revision - ovs_const.MAX_HOST_FLOWRULE_CHANGES
+            ).delete(synchronize_session=False)
+        return revision
+
+    def get_host_flowrule_changes(self, host_id, revision=None):
+        """Get the flow rule changes sent to a host after a revision.
+
+        @return: dict with the current revision of the host and the list of
+                 changes, the changes are None if some of them are not kept
+                 anymore
+        """
+        session = self.admin_context.session
+        with session.begin(subtransactions=True):
+            host_revision = session.query(HostRevision).filter_by(
+                host_id=host_id).first()
+            current = host_revision.revision if host_revision else 0
+            if revision is None or revision > current:
+                return {'revision': current, 'changes': None}
+            changes = session.query(HostFlowRuleChange).filter(
+                HostFlowRuleChange.host_id == host_id,
+                HostFlowRuleChange.revision > revision
+            ).order_by(HostFlowRuleChange.revision).all()
+            if len(changes) != current - revision:
+                return {'revision': current, 'changes': None}
+            return {'revision': current,
+                    'changes': [{'revision': change.revision,
+                                 'method': change.method,
+                                 'flowrule': jsonutils.loads(change.flowrule)}
+                                for change in changes]}
+
+    def get_generation(self, name):
+        with self.admin_context.session.begin(subtransactions=True):
+            generation = self.admin_context.session.query(
+                Generation).filter_by(name=name).first()
+            return generation.generation if generation else 0
+
+    def bump_generation(self, name):
+        session = self.admin_context.session
+        with session.begin(subtransactions=True):
+            generation = session.query(Generation).filter_by(
+                name=name).with_for_update().first()
+            if not generation:
+                try:
+                    with session.begin(nested=True):
+                        generation = Generation(name=name, generation=0)
+                        session.add(generation)
+                except db_exc.DBDuplicateEntry:
+                    generation = session.query(Generation).filter_by(
+                        name=name).with_for_update().first()
+            generation.generation += 1
+            return generation.generation
+
+    def get_prev_hop_host_counts(self, port_ids):
+        """Count the previous hop ports of SF ingress ports by host.
+
+        @param: port_ids: ingress port ids of the SF port pairs
+        @return: dict of {(ingress port id, host id): previous hop ports}
+        """
+        if not port_ids:
+            return {}
+        port = orm.aliased(PortPairDetail)
+        assoc = orm.aliased(PathPortAssoc)
+        node = orm.aliased(PathNode)
+        prev_node = orm.aliased(PathNode)
+        prev_assoc = orm.aliased(PathPortAssoc)
+        prev_port = orm.aliased(PortPairDetail)
+        with self.admin_context.session.begin(subtransactions=True):
+            query = self.admin_context.session.query(
+                port.ingress, prev_port.host_id, sa.func.count()
+            ).join(
+                assoc, assoc.portpair_id == port.id
+            ).join(
+                node, node.id == assoc.pathnode_id
+            ).join(
+                prev_node, sa.and_(prev_node.nsp == node.nsp,
+                                   prev_node.nsi == node.nsi + 1)
+            ).join(
+                prev_assoc, prev_assoc.pathnode_id == prev_node.id
+            ).join(
+                prev_port, prev_port.id == prev_assoc.portpair_id
+            ).filter(
+                port.ingress.in_(list(port_ids)),
+                node.node_type != ovs_const.SRC_NODE
+            ).group_by(port.ingress, prev_port.host_id)
+            return dict(((ingress, host_id), count)
+                        for ingress, host_id, count in query)
+
     def create_pathport_assoc(self, assoc):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
             args = self._filter_non_model_columns(assoc, PathPortAssoc)
             assoc_obj = PathPortAssoc(**args)
             self.admin_context.session.add(assoc_obj)
@@ -254,12 +735,41 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
 
     def delete_pathport_assoc(self, pathnode_id, portdetail_id):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
             self.admin_context.session.query(PathPortAssoc).filter_by(
                 pathnode_id=pathnode_id,
                 portpair_id=portdetail_id).delete()
 
+    def get_path_nodes_by_next_hop(self, portpair_id):
+        """List the path nodes forwarding to a port pair detail."""
+        with self.admin_context.session.begin(subtransactions=True):
+            node_objs = self.admin_context.session.query(PathNode).join(
+                PathNodeNextHop, PathNodeNextHop.pathnode_id == PathNode.id
+            ).filter(PathNodeNextHop.portpair_id == portpair_id)
+            return [self._make_pathnode_dict(node_obj)
+                    for node_obj in node_objs]
+
+    def update_port_detail_weight(self, id, weight):
+        """Set the weight of a port pair detail in every path node.
+
+        @return: list of the path node dict forwarding to the port pair
+                 detail
+        """
+        session = self.admin_context.session
+        with session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
+            session.query(PathPortAssoc).filter_by(
+                portpair_id=id).update({'weight': weight})
+            session.query(PathNodeNextHop).filter_by(
+                portpair_id=id).update({'weight': weight})
+            return self.get_path_nodes_by_next_hop(id)
+
     def update_port_detail(self, id, port):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PortPairDetail)
+            self._invalidate_db_cache(PathNode)
             port_obj = self._get_port_detail(id)
             for key, value in six.iteritems(port):
                 if key == 'path_nodes':
@@ -288,6 +798,8 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
 
     def update_path_node(self, id, node):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
             node_obj = self._get_path_node(id)
             for key, value in six.iteritems(node):
                 if key == 'portpair_details':
@@ -307,21 +819,32 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
                             )
                         pds.append(pd_association)
                     node_obj[key] = pds
+                elif key == 'next_hop':
+                    self._set_path_node_next_hops(node_obj, value)
                 else:
                     node_obj[key] = value
             return self._make_pathnode_dict(node_obj)
 
     def delete_port_detail(self, id):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PortPairDetail)
+            self._invalidate_db_cache(PathNode)
             port_obj = self._get_port_detail(id)
             self.admin_context.session.delete(port_obj)
 
     def delete_path_node(self, id):
         with self.admin_context.session.begin(subtransactions=True):
+            self._invalidate_db_cache(PathNode)
+            self._invalidate_db_cache(PortPairDetail)
             node_obj = self._get_path_node(id)
             self.admin_context.session.delete(node_obj)
 
     def get_port_detail(self, id):
+        return self._cached_read(
+            PortPairDetail, ('id', id),
+            lambda: self._get_port_detail_dict(id))
+
+    def _get_port_detail_dict(self, id):
         with self.admin_context.session.begin(subtransactions=True):
             port_obj = self._get_port_detail(id)
             return self._make_port_detail_dict(port_obj)
@@ -336,6 +859,11 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
             return self._make_port_detail_dict(port)
 
     def get_path_node(self, id):
+        return self._cached_read(
+            PathNode, ('id', id),
+            lambda: self._get_path_node_dict(id))
+
+    def _get_path_node_dict(self, id):
         with self.admin_context.session.begin(subtransactions=True):
             node_obj = self._get_path_node(id)
         return self._make_pathnode_dict(node_obj)
@@ -357,6 +885,16 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
     def get_path_node_by_filter(self, filters=None, fields=None,
                                 sorts=None, limit=None, marker=None,
                                 page_reverse=False):
+        key = self._make_filter_cache_key(
+            filters, fields, sorts, limit, marker, page_reverse)
+        return self._cached_read(
+            PathNode, key,
+            lambda: self._get_path_node_by_filter(
+                filters, fields, sorts, limit, marker, page_reverse))
+
+    def _get_path_node_by_filter(self, filters=None, fields=None,
+                                 sorts=None, limit=None, marker=None,
+                                 page_reverse=False):
         with self.admin_context.session.begin(subtransactions=True):
             qry = self._get_path_nodes_by_filter(
                 filters, fields, sorts, limit,
@@ -400,6 +938,16 @@ class OVSSfcDriverDB(common_db_mixin.CommonDbMixin):
     def get_port_detail_by_filter(self, filters=None, fields=None,
                                   sorts=None, limit=None, marker=None,
                                   page_reverse=False):
+        key = self._make_filter_cache_key(
+            filters, fields, sorts, limit, marker, page_reverse)
+        return self._cached_read(
+            PortPairDetail, key,
+            lambda: self._get_port_detail_by_filter(
+                filters, fields, sorts, limit, marker, page_reverse))
+
+    def _get_port_detail_by_filter(self, filters=None, fields=None,
+                                   sorts=None, limit=None, marker=None,
+                                   page_reverse=False):
         with self.admin_context.session.begin(subtransactions=True):
             qry = self._get_port_details_by_filter(
                 filters, fields, sorts, limit,
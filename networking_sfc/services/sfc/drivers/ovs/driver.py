@@ -12,11 +12,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import contextlib
+import functools
+import threading
+
 import netaddr
+import six
 
+from oslo_config import cfg
 from oslo_log import helpers as log_helpers
 from oslo_log import log as logging
-from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
 
 from neutron.common import constants as nc_const
 from neutron.common import rpc as n_rpc
@@ -32,6 +39,7 @@ from networking_sfc._i18n import _LE, _LW
 from networking_sfc.extensions import flowclassifier
 from networking_sfc.extensions import sfc
 from networking_sfc.services.sfc.common import exceptions as exc
+from networking_sfc.services.sfc.common import flowrule_codec
 from networking_sfc.services.sfc.drivers import base as driver_base
 from networking_sfc.services.sfc.drivers.ovs import(
     rpc_topics as sfc_topics)
@@ -41,10 +49,23 @@ from networking_sfc.services.sfc.drivers.ovs import(
     rpc as ovs_sfc_rpc)
 from networking_sfc.services.sfc.drivers.ovs import (
     constants as ovs_const)
+from networking_sfc.services.sfc.drivers.ovs import load_feedback
 
 
 LOG = logging.getLogger(__name__)
 
+# The port pair group parameters the agents select the group buckets by
+GROUP_SELECTION_PARAMETERS = ('lb_fields', 'symmetric')
+
+
+def fdb_batched(f):
+    """Send the l2pop FDB updates of the decorated method in one batch."""
+    @functools.wraps(f)
+    def wrapper(self, *args, **kwargs):
+        with self.fdb_batch():
+            return f(self, *args, **kwargs)
+    return wrapper
+
 
 class OVSSfcDriver(driver_base.SfcDriverBase,
                    ovs_sfc_db.OVSSfcDriverDB):
@@ -58,15 +79,18 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
 
         self.id_pool = ovs_sfc_db.IDAllocation(self.admin_context)
         self.rpc_ctx = n_context.get_admin_context_without_session()
-        self._setup_rpc()
+        self.l2pop_notifier = l2pop_rpc.L2populationAgentNotifyAPI()
+        self._fdb_batch_local = threading.local()
+        self._weight_controller = load_feedback.WeightController(
+            max_age=cfg.CONF.sfc_ovs.load_feedback_max_age)
 
-    def _setup_rpc(self):
-        # Setup a rpc server
+    def start_rpc_listeners(self):
+        # Setup a rpc server, neutron calls this in each RPC worker
         self.topic = sfc_topics.SFC_PLUGIN
         self.endpoints = [ovs_sfc_rpc.SfcRpcCallback(self)]
         self.conn = n_rpc.create_connection()
         self.conn.create_consumer(self.topic, self.endpoints, fanout=False)
-        self.conn.consume_in_threads()
+        return self.conn.consume_in_threads()
 
     def _get_subnet(self, core_plugin, tenant_id, cidr):
         filters = {'tenant_id': [tenant_id]}
@@ -185,64 +209,114 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         if l2pop_driver is None:
             return pop_ports
         session = db_api.get_session()
-        for next_hop in flow_rule['next_hops']:
-            agent_active_ports = \
-                l2pop_db.get_agent_network_active_port_count(
-                    session,
-                    pop_host,
-                    next_hop['net_uuid'])
+        agent_active_ports = dict(
+            (net_uuid, l2pop_db.get_agent_network_active_port_count(
+                session, pop_host, net_uuid))
+            for net_uuid in set(
+                next_hop['net_uuid'] for next_hop in flow_rule['next_hops']))
+        next_hops = [next_hop for next_hop in flow_rule['next_hops']
+                     if agent_active_ports[next_hop['net_uuid']] == 0]
+        if not next_hops:
+            return pop_ports
+
+        filters = dict(
+            network_id=list(set(
+                next_hop['net_uuid'] for next_hop in next_hops)),
+            mac_address=list(set(
+                next_hop['mac_address'] for next_hop in next_hops)))
+        ports = {}
+        for port in core_plugin.get_ports(self.admin_context,
+                                          filters=filters):
+            ports.setdefault(
+                (port['network_id'], port['mac_address']), port)
+        for next_hop in next_hops:
+            port = ports.get((next_hop['net_uuid'], next_hop['mac_address']))
+            if not port:
+                continue
             segment = {}
-            if agent_active_ports == 0:
-                filters = dict(network_id=[next_hop['net_uuid']],
-                               mac_address=[next_hop['mac_address']])
-                ports = core_plugin.get_ports(self.admin_context,
-                                              filters=filters)
-                if not ports:
-                    continue
-                segment['network_type'] = next_hop['network_type']
-                segment['segmentation_id'] = next_hop['segment_id']
-                pop_ports.append((ports[0], segment))
+            segment['network_type'] = next_hop['network_type']
+            segment['segmentation_id'] = next_hop['segment_id']
+            pop_ports.append((port, segment))
 
         return pop_ports
 
-    @log_helpers.log_method_call
-    def _get_network_other_active_entry_count(self, host, remote_port_id):
-        agent_active_ports = 0
-        port_detail = self.get_port_detail_by_filter(
-            dict(ingress=remote_port_id))
-        for assoc in port_detail['path_nodes']:
-            node = self.get_path_node(assoc['pathnode_id'])
-            if node['node_type'] != ovs_const.SRC_NODE:
-                filter = dict(nsp=node['nsp'],
-                              nsi=node['nsi'] + 1)
-                pre_node = self.get_path_node_by_filter(filter)
-                if not pre_node:
-                    continue
-                for each in pre_node['portpair_details']:
-                    pre_port = self.get_port_detail_by_filter(dict(id=each))
-                    if host == pre_port['host_id']:
-                        agent_active_ports += 1
+    @contextlib.contextmanager
+    def fdb_batch(self):
+        """Collect the l2pop FDB updates of the enclosed block.
 
-        return agent_active_ports
+        The updates are sent when the outermost block exits, in one
+        add_fdb_entries and one remove_fdb_entries call per host. An entry
+        both added and removed in the block is only sent with the last
+        method it was given. The updates are dropped when the block
+        raises.
+        """
+        batch = getattr(self._fdb_batch_local, 'batch', None)
+        outermost = batch is None
+        if outermost:
+            batch = self._fdb_batch_local.batch = {}
+        try:
+            yield batch
+        finally:
+            if outermost:
+                self._fdb_batch_local.batch = None
+        if outermost:
+            self._send_fdb_entries(batch)
+
+    def _add_fdb_entries(self, batch, host, method_name, fdb_entries):
+        networks = batch.setdefault(host, {})
+        for network_id, network in six.iteritems(fdb_entries):
+            pending = networks.setdefault(network_id, {
+                'segment_id': network['segment_id'],
+                'network_type': network['network_type'],
+                'ports': {}})
+            for agent_ip, entries in six.iteritems(network['ports']):
+                agent_entries = pending['ports'].setdefault(
+                    agent_ip, collections.OrderedDict())
+                for entry in entries:
+                    agent_entries[entry] = method_name
+
+    def _send_fdb_entries(self, batch):
+        for host, networks in six.iteritems(batch):
+            for method_name in ('remove_fdb_entries', 'add_fdb_entries'):
+                fdb_entries = {}
+                for network_id, network in six.iteritems(networks):
+                    ports = {}
+                    for agent_ip, entries in six.iteritems(network['ports']):
+                        method_entries = [
+                            entry for entry, method in six.iteritems(entries)
+                            if method == method_name]
+                        if method_entries:
+                            ports[agent_ip] = method_entries
+                    if ports:
+                        fdb_entries[network_id] = {
+                            'segment_id': network['segment_id'],
+                            'network_type': network['network_type'],
+                            'ports': ports}
+                if fdb_entries:
+                    getattr(self.l2pop_notifier, method_name)(
+                        self.rpc_ctx, fdb_entries, host)
 
     def _call_on_l2pop_driver(self, flow_rule, method_name):
         pop_host = flow_rule['host_id']
         pop_ports = self._get_remote_pop_ports(flow_rule)
-        for (port, segment) in pop_ports:
-            port_id = port['id']
-            host_id = port['binding:host_id']
-            active_entry_count = self._get_network_other_active_entry_count(
-                pop_host,
-                port_id)
-
-            if active_entry_count == 1:
-                fdb_entry = self._get_agent_fdb(
-                    port,
-                    segment,
-                    host_id)
-
-                getattr(l2pop_rpc.L2populationAgentNotifyAPI(), method_name)(
-                    self.rpc_ctx, fdb_entry, pop_host)
+        if not pop_ports:
+            return
+        # number of the previous hop ports on each host, for each next hop
+        entry_counts = self.get_prev_hop_host_counts(
+            [port['id'] for (port, segment) in pop_ports])
+        with self.fdb_batch() as batch:
+            for (port, segment) in pop_ports:
+                active_entry_count = entry_counts.get(
+                    (port['id'], pop_host), 0)
+
+                if active_entry_count == 1:
+                    fdb_entry = self._get_agent_fdb(
+                        port,
+                        segment,
+                        port['binding:host_id'])
+                    if fdb_entry:
+                        self._add_fdb_entries(
+                            batch, pop_host, method_name, fdb_entry)
 
     def _update_agent_fdb_entries(self, flow_rule):
         self._call_on_l2pop_driver(flow_rule, "add_fdb_entries")
@@ -251,9 +325,10 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         self._call_on_l2pop_driver(flow_rule, "remove_fdb_entries")
 
     @log_helpers.log_method_call
-    def _get_portgroup_members(self, context, pg_id):
+    def _get_portgroup_members(self, context, pg_id, session=None):
         next_group_members = []
-        group_intid = self.id_pool.get_intid_by_uuid('group', pg_id)
+        group_intid = self.id_pool.get_intid_by_uuid(
+            'group', pg_id, session=session)
         LOG.debug('group_intid: %s', group_intid)
         pg = context._plugin.get_port_pair_group(context._plugin_context,
                                                  pg_id)
@@ -267,9 +342,92 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             pd = self.get_port_detail_by_filter(filters)
             if pd:
                 next_group_members.append(
-                    dict(portpair_id=pd['id'], weight=1))
+                    dict(portpair_id=pd['id'],
+                         weight=self._get_port_pair_weight(pp)))
         return group_intid, next_group_members
 
+    def _get_port_pair_weight(self, port_pair):
+        return port_pair['service_function_parameters'].get('weight') or 1
+
+    def _get_portgroup_parameters(self, group_intid):
+        """Get the port pair group parameters of a group.
+
+        The default parameters are returned for a group not found.
+        """
+        def read():
+            sfc_plugin = (
+                manager.NeutronManager.get_service_plugins().get(
+                    sfc.SFC_EXT)
+            )
+            pg_id = self.id_pool.get_uuid_by_intid('group', group_intid)
+            if not sfc_plugin or not pg_id:
+                return sfc.DEFAULT_PPG_PARAMETERS
+            try:
+                pg = sfc_plugin.get_port_pair_group(self.admin_context,
+                                                    pg_id)
+            except sfc.PortPairGroupNotFound:
+                return sfc.DEFAULT_PPG_PARAMETERS
+            return dict(sfc.DEFAULT_PPG_PARAMETERS,
+                        **pg.get('port_pair_group_parameters') or {})
+
+        if group_intid is None:
+            return sfc.DEFAULT_PPG_PARAMETERS
+        return self._cached_read('port_pair_group_params', group_intid,
+                                 read)
+
+    def _get_group_selection_parameters(self, group_intid):
+        """Get the parameters the agents select the buckets of a group by.
+
+        A group selecting its buckets the default way gets None, the
+        agents then leave the selection to OVS.
+        """
+        params = self._get_portgroup_parameters(group_intid)
+        selection = dict((key, params[key])
+                         for key in GROUP_SELECTION_PARAMETERS)
+        if all(selection[key] == sfc.DEFAULT_PPG_PARAMETERS[key]
+               for key in GROUP_SELECTION_PARAMETERS):
+            return None
+        return selection
+
+    def _localize_next_hops(self, flow_rule, local_endpoint):
+        """Keep the next hops of a local group on the flow rule host.
+
+        The next hops on other hosts are only kept when the host has no
+        usable next hop, the next hops without a bound port having already
+        been left out.
+        """
+        next_hops = flow_rule.get('next_hops')
+        if not next_hops or not local_endpoint:
+            return
+        params = self._get_portgroup_parameters(
+            flow_rule.get('next_group_id'))
+        if params['locality'] != 'local':
+            return
+        local_next_hops = [next_hop for next_hop in next_hops
+                           if next_hop['local_endpoint'] == local_endpoint]
+        if local_next_hops:
+            flow_rule['next_hops'] = local_next_hops
+
+    def _get_host_endpoint(self, host):
+        core_plugin = manager.NeutronManager.get_plugin()
+        driver = core_plugin.type_manager.drivers.get(np_const.TYPE_VXLAN)
+        if not driver:
+            return None
+        host_endpoint = driver.obj.get_endpoint_by_host(host)
+        return host_endpoint['ip_address'] if host_endpoint else None
+
+    def get_local_src_node_flowrules(self, context, host, flow_rules):
+        """Localize the next hops of the src node flow rules of a host."""
+        if not flow_rules:
+            return flow_rules
+        local_endpoint = self._get_host_endpoint(host)
+        local_flow_rules = []
+        for flow_rule in flow_rules:
+            flow_rule = dict(flow_rule)
+            self._localize_next_hops(flow_rule, local_endpoint)
+            local_flow_rules.append(flow_rule)
+        return local_flow_rules
+
     def _get_port_pair_detail_by_port_pair(self, context, port_pair_id):
         pp = context._plugin.get_port_pair(context._plugin_context,
                                            port_pair_id)
@@ -285,8 +443,35 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
     @log_helpers.log_method_call
     def _add_flowclassifier_port_assoc(self, fc_ids, tenant_id,
                                        src_node, dst_node,
-                                       last_sf_node=None):
+                                       last_sf_node=None, assocs=None,
+                                       session=None):
+        """Associate the flow classifier ports with the src/dst nodes.
+
+        When assocs is a list, the association args are appended to it
+        for the caller to create them, otherwise they are created here.
+
+        @param: session: the session to create the missing port details
+                in, the admin context one by default
+        """
         dst_ports = []
+        # the port details created in session are not read back from the
+        # db before it commits, several classifiers may share a port
+        created = {}
+
+        def get_or_create_port_detail(pd_filter):
+            key = tuple(sorted(pd_filter.items()))
+            pd = created.get(key) or self.get_port_detail_by_filter(
+                pd_filter)
+            if pd:
+                return pd, False
+            created[key] = self._create_port_detail(
+                pd_filter, session=session)
+            return created[key], True
+
+        # the associations queued in assocs are not in the port details
+        # read from the db yet, several classifiers may share a port
+        pending = set((assoc['pathnode_id'], assoc['portpair_id'])
+                      for assoc in assocs or [])
         for fc in self._get_fcs_by_ids(fc_ids):
             if fc.get('logical_source_port', ''):
                 need_assoc = True
@@ -294,58 +479,68 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
                 src_pd_filter = dict(egress=fc['logical_source_port'],
                                      tenant_id=tenant_id
                                      )
-                src_pd = self.get_port_detail_by_filter(src_pd_filter)
+                src_pd, new_pd = get_or_create_port_detail(src_pd_filter)
 
-                if not src_pd:
-                    # Create source port detail
-                    src_pd = self._create_port_detail(src_pd_filter)
+                if new_pd:
                     LOG.debug('create src port detail: %s', src_pd)
                 else:
                     for path_node in src_pd['path_nodes']:
                         if path_node['pathnode_id'] == src_node['id']:
                             need_assoc = False
+                if (src_node['id'], src_pd['id']) in pending:
+                    need_assoc = False
                 if need_assoc:
                     # Create associate relationship
                     assco_args = {'portpair_id': src_pd['id'],
                                   'pathnode_id': src_node['id'],
                                   'weight': 1,
                                   }
-                    sna = self.create_pathport_assoc(assco_args)
-                    LOG.debug('create assoc src port with node: %s', sna)
-                    src_node['portpair_details'].append(src_pd['id'])
+                    if assocs is not None:
+                        assocs.append(assco_args)
+                        pending.add((src_node['id'], src_pd['id']))
+                    else:
+                        sna = self.create_pathport_assoc(assco_args)
+                        LOG.debug('create assoc src port with node: %s', sna)
+                        src_node['portpair_details'].append(src_pd['id'])
 
             if fc.get('logical_destination_port', ''):
                 need_assoc = True
                 dst_pd_filter = dict(ingress=fc['logical_destination_port'],
                                      tenant_id=tenant_id
                                      )
-                dst_pd = self.get_port_detail_by_filter(dst_pd_filter)
+                dst_pd, new_pd = get_or_create_port_detail(dst_pd_filter)
 
-                if not dst_pd:
-                    # Create dst port detail
-                    dst_pd = self._create_port_detail(dst_pd_filter)
+                if new_pd:
                     LOG.debug('create dst port detail: %s', dst_pd)
                 else:
                     for path_node in dst_pd['path_nodes']:
                         if path_node['pathnode_id'] == dst_node['id']:
                             need_assoc = False
+                if (dst_node['id'], dst_pd['id']) in pending:
+                    need_assoc = False
                 if need_assoc:
                     # Create associate relationship
                     dst_assco_args = {'portpair_id': dst_pd['id'],
                                       'pathnode_id': dst_node['id'],
                                       'weight': 1,
                                       }
-                    dna = self.create_pathport_assoc(dst_assco_args)
-                    LOG.debug('create assoc dst port with node: %s', dna)
-                    dst_node['portpair_details'].append(dst_pd['id'])
+                    if assocs is not None:
+                        assocs.append(dst_assco_args)
+                        pending.add((dst_node['id'], dst_pd['id']))
+                    else:
+                        dna = self.create_pathport_assoc(dst_assco_args)
+                        LOG.debug('create assoc dst port with node: %s', dna)
+                        dst_node['portpair_details'].append(dst_pd['id'])
 
                 dst_ports.append(dict(portpair_id=dst_pd['id'], weight=1))
 
         if last_sf_node and dst_ports is not None:
-            if last_sf_node['next_hop']:
-                next_hops = jsonutils.loads(last_sf_node['next_hop'])
-                next_hops.extend(dst_ports)
-                last_sf_node['next_hop'] = jsonutils.dumps(next_hops)
+            next_hops = last_sf_node['next_hop'] or []
+            next_hop_ids = set(
+                next_hop['portpair_id'] for next_hop in next_hops)
+            last_sf_node['next_hop'] = next_hops + [
+                dst_port for dst_port in dst_ports
+                if dst_port['portpair_id'] not in next_hop_ids]
             # update nexthop info of pre node
             self.update_path_node(last_sf_node['id'],
                                   last_sf_node)
@@ -390,13 +585,10 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
                             dst_node['portpair_details'].remove(pd['id'])
                             # update last hop(SF-group) next hop info
                             if last_sf_node:
-                                next_hop = dict(portpair_id=pd['id'],
-                                                weight=1)
-                                next_hops = jsonutils.loads(
-                                    last_sf_node['next_hop'])
-                                next_hops.remove(next_hop)
-                                last_sf_node['next_hop'] = jsonutils.dumps(
-                                    next_hops)
+                                last_sf_node['next_hop'] = [
+                                    next_hop for next_hop in
+                                    last_sf_node['next_hop'] or []
+                                    if next_hop['portpair_id'] != pd['id']]
                                 update_last_sf = True
                             if len(pd['path_nodes']) == 1:
                                 self.delete_port_detail(pd['id'])
@@ -407,38 +599,45 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
                                   last_sf_node)
 
     @log_helpers.log_method_call
-    def _create_portchain_path(self, context, port_chain):
-        src_node, src_pd, dst_node, dst_pd = (({}, ) * 4)
-        path_nodes, dst_ports = [], []
+    def _create_portchain_path(self, context, port_chain, session=None):
+        session = session or self.admin_context.session
+        with session.begin(subtransactions=True):
+            return self._create_portchain_path_nodes(
+                context, port_chain, session)
+
+    def _create_portchain_path_nodes(self, context, port_chain,
+                                     session=None):
+        path_nodes, assocs = [], []
         # Create an assoc object for chain_id and path_id
         # context = context._plugin_context
-        path_id = self.id_pool.assign_intid('portchain', port_chain['id'])
+        path_id = self.id_pool.assign_intid(
+            'portchain', port_chain['id'], session=session)
 
         if not path_id:
             LOG.error(_LE('No path_id available for creating port chain path'))
-            return
+            raise exc.SfcIntIdUnavailable(type='portchain')
 
         next_group_intid, next_group_members = self._get_portgroup_members(
-            context, port_chain['port_pair_groups'][0])
+            context, port_chain['port_pair_groups'][0], session=session)
 
         port_pair_groups = port_chain['port_pair_groups']
         sf_path_length = len(port_pair_groups)
         # Create a head node object for port chain
-        src_args = {'tenant_id': port_chain['tenant_id'],
+        src_args = {'id': uuidutils.generate_uuid(),
+                    'tenant_id': port_chain['tenant_id'],
                     'node_type': ovs_const.SRC_NODE,
                     'nsp': path_id,
                     'nsi': 0xff,
                     'portchain_id': port_chain['id'],
                     'status': ovs_const.STATUS_BUILDING,
                     'next_group_id': next_group_intid,
-                    'next_hop': jsonutils.dumps(next_group_members),
+                    'next_hop': next_group_members,
                     }
-        src_node = self.create_path_node(src_args)
-        LOG.debug('create src node: %s', src_node)
-        path_nodes.append(src_node)
+        path_nodes.append(src_args)
 
         # Create a destination node object for port chain
         dst_args = {
+            'id': uuidutils.generate_uuid(),
             'tenant_id': port_chain['tenant_id'],
             'node_type': ovs_const.DST_NODE,
             'nsp': path_id,
@@ -446,17 +645,17 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             'portchain_id': port_chain['id'],
             'status': ovs_const.STATUS_BUILDING,
             'next_group_id': None,
-            'next_hop': None
+            'next_hop': []
         }
-        dst_node = self.create_path_node(dst_args)
-        LOG.debug('create dst node: %s', dst_node)
-        path_nodes.append(dst_node)
+        path_nodes.append(dst_args)
 
         dst_ports = self._add_flowclassifier_port_assoc(
             port_chain['flow_classifiers'],
             port_chain['tenant_id'],
-            src_node,
-            dst_node
+            src_args,
+            dst_args,
+            assocs=assocs,
+            session=session
         )
 
         for i in range(sf_path_length):
@@ -465,7 +664,7 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             if i < sf_path_length - 1:
                 next_group_intid, next_group_members = (
                     self._get_portgroup_members(
-                        context, port_pair_groups[i + 1])
+                        context, port_pair_groups[i + 1], session=session)
                 )
             else:
                 next_group_intid = None
@@ -473,6 +672,7 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
 
             # Create a node object
             node_args = {
+                'id': uuidutils.generate_uuid(),
                 'tenant_id': port_chain['tenant_id'],
                 'node_type': ovs_const.SF_NODE,
                 'nsp': path_id,
@@ -480,27 +680,37 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
                 'portchain_id': port_chain['id'],
                 'status': ovs_const.STATUS_BUILDING,
                 'next_group_id': next_group_intid,
-                'next_hop': (
-                    None if not next_group_members else
-                    jsonutils.dumps(next_group_members)
-                )
+                'next_hop': next_group_members or []
             }
-            sf_node = self.create_path_node(node_args)
-            LOG.debug('chain path node: %s', sf_node)
+            path_nodes.append(node_args)
             # Create the assocation objects that combine the pathnode_id with
             # the ingress of the port_pairs in the current group
             # when port_group does not reach tail
             for member in cur_group_members:
-                assco_args = {'portpair_id': member['portpair_id'],
-                              'pathnode_id': sf_node['id'],
-                              'weight': member['weight'], }
-                sfna = self.create_pathport_assoc(assco_args)
-                LOG.debug('create assoc port with node: %s', sfna)
-                sf_node['portpair_details'].append(member['portpair_id'])
-            path_nodes.append(sf_node)
+                assocs.append({'portpair_id': member['portpair_id'],
+                               'pathnode_id': node_args['id'],
+                               'weight': member['weight'], })
 
+        path_nodes = self.create_path_nodes(path_nodes, assocs,
+                                            session=session)
+        LOG.debug('create chain path nodes: %s', path_nodes)
         return path_nodes
 
+    def _get_portchain_path_nodes(self, portchain_id):
+        # the src node first, then the nodes in the order of the chain
+        return sorted(
+            self.get_path_nodes_by_filter(dict(portchain_id=portchain_id)),
+            key=lambda node: node['nsi'], reverse=True)
+
+    def _stamp_host_revision(self, flow_rule, method):
+        """Record a flow rule cast and tag it with the new host revision.
+
+        @param: method: the agent method the flow rule is cast to
+        """
+        flow_rule.pop('revision', None)
+        flow_rule['revision'] = self.record_host_flowrule_change(
+            flow_rule['host'], method, flow_rule)
+
     def _delete_path_node_port_flowrule(self, node, port, fc_ids):
         # if this port is not binding, don't to generate flow rule
         if not port['host_id']:
@@ -511,6 +721,7 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             None,
             fc_ids)
 
+        self._stamp_host_revision(flow_rule, 'delete_flow_rules')
         self.ovs_driver_rpc.ask_agent_to_delete_flow_rules(
             self.admin_context,
             flow_rule)
@@ -551,25 +762,25 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
                     pd,
                     port_chain['flow_classifiers']
                 )
-            for pd in pds:
-                self.delete_path_node(pd['id'])
 
-        # delete the ports on the traffic classifier
-        self._remove_flowclassifier_port_assoc(
-            port_chain['flow_classifiers'],
-            port_chain['tenant_id']
-        )
+        with self.admin_context.session.begin(subtransactions=True):
+            if pds:
+                self.delete_path_nodes_by_portchain(port_chain['id'])
+
+            # delete the ports on the traffic classifier
+            self._remove_flowclassifier_port_assoc(
+                port_chain['flow_classifiers'],
+                port_chain['tenant_id']
+            )
 
-        # Delete the chainpathpair
-        intid = self.id_pool.get_intid_by_uuid(
-            'portchain', port_chain['id'])
-        self.id_pool.release_intid('portchain', intid)
+            # Delete the chainpathpair
+            intid = self.id_pool.get_intid_by_uuid(
+                'portchain', port_chain['id'])
+            self.id_pool.release_intid('portchain', intid)
 
     def _update_path_node_next_hops(self, flow_rule):
         node_next_hops = []
-        if not flow_rule['next_hop']:
-            return None
-        next_hops = jsonutils.loads(flow_rule['next_hop'])
+        next_hops = flow_rule['next_hop']
         if not next_hops:
             return None
         for member in next_hops:
@@ -592,6 +803,10 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             node_next_hops.append(detail)
         flow_rule['next_hops'] = node_next_hops
         flow_rule.pop('next_hop')
+        group_params = self._get_group_selection_parameters(
+            flow_rule.get('next_group_id'))
+        if group_params:
+            flow_rule['next_group_parameters'] = group_params
 
         return node_next_hops
 
@@ -620,6 +835,7 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
 
         # update next hop info
         self._update_path_node_next_hops(flow_rule)
+        self._localize_next_hops(flow_rule, port['local_endpoint'])
 
         return flow_rule
 
@@ -636,7 +852,6 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         fcs = self._get_fcs_by_ids(fc_ids)
         for fc in fcs:
             new_fc = fc.copy()
-            new_fc.pop('id')
             new_fc.pop('name')
             new_fc.pop('tenant_id')
             new_fc.pop('description')
@@ -665,6 +880,7 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             add_fc_ids,
             del_fc_ids)
 
+        self._stamp_host_revision(flow_rule, 'update_flow_rules')
         self.ovs_driver_rpc.ask_agent_to_update_flow_rules(
             self.admin_context,
             flow_rule)
@@ -711,9 +927,20 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         return flow_classifiers
 
     @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    def create_port_chain_precommit(self, context):
+        # The path id and the path nodes are created in the transaction
+        # of the port chain, they are rolled back with it
+        self._create_portchain_path(
+            context, context.current,
+            session=context._plugin_context.session)
+
+    @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def create_port_chain(self, context):
         port_chain = context.current
-        path_nodes = self._create_portchain_path(context, port_chain)
+        path_nodes = self._get_portchain_path_nodes(port_chain['id'])
 
         # notify agent with async thread
         # current we don't use greenthread.spawn
@@ -721,12 +948,18 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             path_nodes,
             port_chain['flow_classifiers'],
             None)
+        self._port_chains_changed(
+            self._get_portchain_ports(port_chain['id']))
 
     @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def delete_port_chain(self, context):
         port_chain = context.current
+        ports = self._get_portchain_ports(port_chain['id'])
         LOG.debug("to delete portchain path")
         self._delete_portchain_path(context, port_chain)
+        self._port_chains_changed(ports)
 
     def _get_diff_set(self, orig, cur):
         orig_set = set(item for item in orig)
@@ -738,20 +971,33 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         return to_del, to_add
 
     @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def update_port_chain(self, context):
         port_chain = context.current
         orig = context.original
+        ports = self._get_portchain_ports(orig['id'])
         self._delete_portchain_path(context, orig)
         path_nodes = self._create_portchain_path(context, port_chain)
         self._thread_update_path_nodes(
             path_nodes,
             port_chain['flow_classifiers'],
             None)
+        ports.update(self._get_portchain_ports(port_chain['id']))
+        self._port_chains_changed(ports)
 
     @log_helpers.log_method_call
-    def create_port_pair_group(self, context):
+    def create_port_pair_group_precommit(self, context):
         group = context.current
-        self.id_pool.assign_intid('group', group['id'])
+        group_intid = self.id_pool.assign_intid(
+            'group', group['id'], session=context._plugin_context.session)
+        if not group_intid:
+            raise exc.SfcIntIdUnavailable(type='group')
+
+    @log_helpers.log_method_call
+    def create_port_pair_group(self, context):
+        # the group id is assigned in create_port_pair_group_precommit
+        pass
 
     @log_helpers.log_method_call
     def delete_port_pair_group(self, context):
@@ -761,6 +1007,8 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             self.id_pool.release_intid('group', group_intid)
 
     @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def update_port_pair_group(self, context):
         current = context.current
         original = context.original
@@ -776,81 +1024,97 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         port_chains = [assoc.portchain_id for assoc in
                        ppg_obj.chain_group_associations]
 
+        ports = set()
         for chain_id in port_chains:
-            port_chain = context._plugin.get_port_chain(
-                context._plugin_context, chain_id)
-            group_intid = self.id_pool.get_intid_by_uuid('group',
-                                                         current['id'])
-            # Get the previous node
-            prev_node = self.get_path_node_by_filter(
-                filters={'portchain_id': chain_id,
-                         'next_group_id': group_intid})
-            if not prev_node:
-                continue
+            ports.update(self._get_portchain_ports(chain_id))
+        for chain_id in port_chains:
+            if not self._update_portchain_group(
+                context, chain_id, current, original
+            ):
+                break
+        for chain_id in port_chains:
+            ports.update(self._get_portchain_ports(chain_id))
+        self._port_chains_changed(ports)
 
-            before_update_prev_node = prev_node.copy()
-            # Update the previous node
-            curr_group_intid, curr_group_members = self._get_portgroup_members(
-                context, current['id'])
-            prev_node['next_hop'] = (
-                jsonutils.dumps(curr_group_members)
-                if curr_group_members else None
-            )
-            # update next hop to database
-            self.update_path_node(prev_node['id'], prev_node)
-            if prev_node['node_type'] == ovs_const.SRC_NODE:
-                self._delete_src_node_flowrules(
-                    before_update_prev_node, port_chain['flow_classifiers'])
-                self._update_src_node_flowrules(
-                    prev_node, port_chain['flow_classifiers'], None)
-            self._delete_path_node_flowrule(
+    def _update_portchain_group(self, context, chain_id, current, original):
+        """Update the path nodes of a port chain for a changed group.
+
+        @return: False if a port pair of the group has no port detail
+        """
+        port_chain = context._plugin.get_port_chain(
+            context._plugin_context, chain_id)
+        group_intid = self.id_pool.get_intid_by_uuid('group',
+                                                     current['id'])
+        # Get the previous node
+        prev_node = self.get_path_node_by_filter(
+            filters={'portchain_id': chain_id,
+                     'next_group_id': group_intid})
+        if not prev_node:
+            return True
+
+        before_update_prev_node = prev_node.copy()
+        # Update the previous node
+        curr_group_intid, curr_group_members = self._get_portgroup_members(
+            context, current['id'])
+        prev_node['next_hop'] = curr_group_members
+        # update next hop to database
+        self.update_path_node(prev_node['id'], prev_node)
+        if prev_node['node_type'] == ovs_const.SRC_NODE:
+            self._delete_src_node_flowrules(
                 before_update_prev_node, port_chain['flow_classifiers'])
-            self._update_path_node_flowrules(
+            self._update_src_node_flowrules(
                 prev_node, port_chain['flow_classifiers'], None)
-
-            # Update the current node
-            # to find the current node by using the node's next_group_id
-            # if this node is the last, next_group_id would be None
-            curr_pos = port_chain['port_pair_groups'].index(current['id'])
-            curr_node = self.get_path_node_by_filter(
-                filters={'portchain_id': chain_id,
-                         'nsi': 0xfe - curr_pos})
-            if not curr_node:
-                continue
-
-            # Add the port-pair-details into the current node
-            for pp_id in (
-                set(current['port_pairs']) - set(original['port_pairs'])
-            ):
-                ppd = self._get_port_pair_detail_by_port_pair(context,
-                                                              pp_id)
-                if not ppd:
-                    LOG.debug('No port_pair_detail for the port_pair: %s',
-                              pp_id)
-                    LOG.debug("Failed to update port-pair-group")
-                    return
-
-                assco_args = {'portpair_id': ppd['id'],
-                              'pathnode_id': curr_node['id'],
-                              'weight': 1, }
-                self.create_pathport_assoc(assco_args)
-                self._update_path_node_port_flowrules(
-                    curr_node, ppd, port_chain['flow_classifiers'])
-
-            # Delete the port-pair-details from the current node
-            for pp_id in (
-                set(original['port_pairs']) - set(current['port_pairs'])
-            ):
-                ppd = self._get_port_pair_detail_by_port_pair(context,
-                                                              pp_id)
-                if not ppd:
-                    LOG.debug('No port_pair_detail for the port_pair: %s',
-                              pp_id)
-                    LOG.debug("Failed to update port-pair-group")
-                    return
-                self._delete_path_node_port_flowrule(
-                    curr_node, ppd, port_chain['flow_classifiers'])
-                self.delete_pathport_assoc(curr_node['id'], ppd['id'])
+        self._delete_path_node_flowrule(
+            before_update_prev_node, port_chain['flow_classifiers'])
+        self._update_path_node_flowrules(
+            prev_node, port_chain['flow_classifiers'], None)
+
+        # Update the current node
+        # to find the current node by using the node's next_group_id
+        # if this node is the last, next_group_id would be None
+        curr_pos = port_chain['port_pair_groups'].index(current['id'])
+        curr_node = self.get_path_node_by_filter(
+            filters={'portchain_id': chain_id,
+                     'nsi': 0xfe - curr_pos})
+        if not curr_node:
+            return True
+
+        # Add the port-pair-details into the current node
+        for pp_id in (
+            set(current['port_pairs']) - set(original['port_pairs'])
+        ):
+            ppd = self._get_port_pair_detail_by_port_pair(context,
+                                                          pp_id)
+            if not ppd:
+                LOG.debug('No port_pair_detail for the port_pair: %s',
+                          pp_id)
+                LOG.debug("Failed to update port-pair-group")
+                return False
+
+            pp = context._plugin.get_port_pair(context._plugin_context,
+                                               pp_id)
+            assco_args = {'portpair_id': ppd['id'],
+                          'pathnode_id': curr_node['id'],
+                          'weight': self._get_port_pair_weight(pp), }
+            self.create_pathport_assoc(assco_args)
+            self._update_path_node_port_flowrules(
+                curr_node, ppd, port_chain['flow_classifiers'])
+
+        # Delete the port-pair-details from the current node
+        for pp_id in (
+            set(original['port_pairs']) - set(current['port_pairs'])
+        ):
+            ppd = self._get_port_pair_detail_by_port_pair(context,
+                                                          pp_id)
+            if not ppd:
+                LOG.debug('No port_pair_detail for the port_pair: %s',
+                          pp_id)
+                LOG.debug("Failed to update port-pair-group")
+                return False
+            self._delete_path_node_port_flowrule(
+                curr_node, ppd, port_chain['flow_classifiers'])
+            self.delete_pathport_assoc(curr_node['id'], ppd['id'])
+        return True
 
     @log_helpers.log_method_call
     def _get_portpair_detail_info(self, portpair_id):
@@ -889,7 +1153,7 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         return host_id, local_ip, network_type, segment_id, mac_address
 
     @log_helpers.log_method_call
-    def _create_port_detail(self, port_pair):
+    def _create_port_detail(self, port_pair, session=None):
         # since first node may not assign the ingress port, and last node may
         # not assign the egress port. we use one of the
         # port as the key to get the SF information.
@@ -909,9 +1173,11 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             'segment_id': segment_id,
             'network_type': network_type,
             'local_endpoint': local_endpoint,
-            'mac_address': mac_address
+            'mac_address': mac_address,
+            'correlation': (port_pair.get('service_function_parameters') or
+                            {}).get('correlation')
         }
-        r = self.create_port_detail(port_detail)
+        r = self.create_port_detail(port_detail, session=session)
         LOG.debug('create port detail: %s', r)
         return r
 
@@ -921,6 +1187,8 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         self._create_port_detail(port_pair)
 
     @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def delete_port_pair(self, context):
         port_pair = context.current
 
@@ -932,12 +1200,253 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         if pds:
             for pd in pds:
                 self.delete_port_detail(pd['id'])
+            self._port_chains_changed(set(
+                port for pd in pds for port in (pd['ingress'], pd['egress'])
+                if port))
 
     @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def update_port_pair(self, context):
-        pass
+        current = context.current
+        weight = self._get_port_pair_weight(current)
+        if weight == self._get_port_pair_weight(context.original):
+            return
+
+        pd = self.get_port_detail_by_filter(
+            dict(ingress=current['ingress'],
+                 egress=current['egress'],
+                 tenant_id=current['tenant_id']))
+        if not pd:
+            return
+
+        self._update_port_detail_weights(
+            context._plugin, context._plugin_context, {pd['id']: weight})
+
+    def _update_port_detail_weights(self, sfc_plugin, context, weights):
+        """Rebalance the port chains in place to new port pair weights.
+
+        The nodes forwarding to the port pairs get their group buckets
+        updated with the new weights.
+
+        @param: weights: dict of the weight by port pair detail id
+        """
+        nodes = {}
+        for pd_id, weight in six.iteritems(weights):
+            for node in self.update_port_detail_weight(pd_id, weight):
+                # The last update returns the nodes with all the weights
+                nodes[node['id']] = node
+        self._update_next_hop_nodes(sfc_plugin, context, nodes.values())
+
+    def _update_next_hop_nodes(self, sfc_plugin, context, nodes):
+        """Send the flow rules of nodes whose next hops changed."""
+        ports = set()
+        for node in nodes:
+            port_chain = sfc_plugin.get_port_chain(
+                context, node['portchain_id'])
+            if node['node_type'] == ovs_const.SRC_NODE:
+                self._update_src_node_flowrules(
+                    node, port_chain['flow_classifiers'], None)
+            self._update_path_node_flowrules(
+                node, port_chain['flow_classifiers'], None)
+            ports.update(self._get_portchain_ports(node['portchain_id']))
+        self._port_chains_changed(ports)
+
+    def _get_group_members(self, sfc_plugin, group_intid):
+        """Get the members of a group by mac address.
+
+        @return: dict of (port pair detail id, configured weight, current
+                 weight) by the mac address of the ingress of the member
+        """
+        nodes = self.get_path_nodes_by_filter(
+            dict(next_group_id=group_intid))
+        if not nodes:
+            return {}
+        members = {}
+        for member in nodes[0]['next_hop']:
+            pd = self.get_port_detail_by_filter(
+                dict(id=member['portpair_id']))
+            if not pd:
+                continue
+            port_pairs = sfc_plugin.get_port_pairs(
+                self.admin_context,
+                filters={'ingress': [pd['ingress']],
+                         'egress': [pd['egress']]})
+            if not port_pairs:
+                continue
+            members[pd['mac_address']] = (
+                pd['id'], self._get_port_pair_weight(port_pairs[0]),
+                member['weight'])
+        return members
 
+    @log_helpers.log_method_call
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
+    def update_group_stats(self, context, host, group_stats, timestamp):
+        """Rebalance the port pair groups to the traffic of their members.
+
+        @param: group_stats: list of the group stats of the host, the
+                group id and the packet and byte counters of the bucket of
+                each member, by mac address
+        @param: timestamp: time of the stats on the host, in seconds
+        """
+        if not cfg.CONF.sfc_ovs.load_feedback:
+            return
+        sfc_plugin = (
+            manager.NeutronManager.get_service_plugins().get(
+                sfc.SFC_EXT)
+        )
+        if not sfc_plugin:
+            return
+        weights = {}
+        for stats in group_stats:
+            group_intid = stats['group_id']
+            members = self._get_group_members(sfc_plugin, group_intid)
+            if not members:
+                self._weight_controller.forget(group_intid)
+                continue
+            self._weight_controller.update_counters(
+                group_intid, host,
+                dict((bucket['mac_address'], bucket['byte_count'])
+                     for bucket in stats['buckets']
+                     if bucket['mac_address'] in members),
+                timestamp)
+            group_weights = self._weight_controller.get_weights(
+                group_intid,
+                dict((mac, member[1])
+                     for mac, member in six.iteritems(members)),
+                dict((mac, member[2])
+                     for mac, member in six.iteritems(members)))
+            if not group_weights:
+                continue
+            LOG.debug('group %(group)s rebalanced to %(weights)s',
+                      {'group': group_intid, 'weights': group_weights})
+            for mac, weight in six.iteritems(group_weights):
+                if weight != members[mac][2]:
+                    weights[members[mac][0]] = weight
+        if weights:
+            self._update_port_detail_weights(
+                sfc_plugin, self.admin_context, weights)
+
+    def update_flow_stats(self, context, host, flow_stats, timestamp):
+        """Store the counters of the port chain hops on a host.
+
+        @param: flow_stats: list of the counters of the flows of each hop
+                on the host, by path id and service index
+        @param: timestamp: time of the counters on the host, in seconds
+        """
+        sfc_plugin = (
+            manager.NeutronManager.get_service_plugins().get(
+                sfc.SFC_EXT)
+        )
+        if not sfc_plugin:
+            return
+        hop_stats = collections.defaultdict(list)
+        for stats in flow_stats:
+            portchain_id = self.id_pool.get_uuid_by_intid(
+                'portchain', stats['nsp'])
+            if not portchain_id:
+                continue
+            hop_stats[portchain_id].append(dict(
+                hop=0xff - stats['nsi'],
+                packets_in=stats['packets_in'],
+                bytes_in=stats['bytes_in'],
+                packets_out=stats['packets_out'],
+                bytes_out=stats['bytes_out']))
+        for portchain_id, stats in six.iteritems(hop_stats):
+            try:
+                sfc_plugin.update_port_chain_hop_stats(
+                    self.admin_context, portchain_id, host, stats,
+                    timestamp)
+            except sfc.PortChainNotFound:
+                LOG.debug('port chain %s deleted', portchain_id)
+
+    @ovs_sfc_db.cached_reads
+    @fdb_batched
     def get_flowrules_by_host_portid(self, context, host, port_id):
+        self._update_port_binding(context, host, port_id)
+        host_flowrules = self.get_host_flowrules(host, port_id)
+        if host_flowrules:
+            return host_flowrules['flowrules']
+
+        flowrules = self._build_flowrules_by_host_portid(
+            context, host, port_id)
+        if flowrules is not None:
+            self.update_host_flowrules(host, port_id, flowrules)
+        return flowrules
+
+    def _update_port_binding(self, context, host, port_id):
+        """Move the port detail of a port to the host it is bound to.
+
+        The nodes forwarding to the port get the endpoint of its new host
+        in their next hops, and the flow rules stored for the port on its
+        old host are dropped.
+        """
+        port_detail = (
+            self.get_port_detail_by_filter(dict(ingress=port_id)) or
+            self.get_port_detail_by_filter(dict(egress=port_id)))
+        if not port_detail or port_detail['host_id'] == host:
+            return
+        host_id, local_endpoint = self._get_portpair_detail_info(
+            port_detail['ingress'] or port_detail['egress'])[:2]
+        if host_id != host:
+            return
+        LOG.debug('port %(port_id)s moved from host %(old)s to %(new)s',
+                  {'port_id': port_id, 'old': port_detail['host_id'],
+                   'new': host})
+        self.update_port_detail(
+            port_detail['id'],
+            dict(host_id=host_id, local_endpoint=local_endpoint))
+        for port in (port_detail['ingress'], port_detail['egress']):
+            if port and port_detail['host_id']:
+                self.delete_host_flowrules(port_detail['host_id'], port)
+        sfc_plugin = (
+            manager.NeutronManager.get_service_plugins().get(
+                sfc.SFC_EXT)
+        )
+        if not sfc_plugin:
+            return
+        self._update_next_hop_nodes(
+            sfc_plugin, context,
+            self.get_path_nodes_by_next_hop(port_detail['id']))
+
+    def _get_portchain_ports(self, portchain_id):
+        ports = set()
+        nodes = self.get_path_nodes_by_filter(
+            dict(portchain_id=portchain_id))
+        for node in nodes or []:
+            for pd_id in node['portpair_details']:
+                port = self.get_port_detail_by_filter(dict(id=pd_id))
+                if not port:
+                    continue
+                for port_id in (port['ingress'], port['egress']):
+                    if port_id:
+                        ports.add(port_id)
+        return ports
+
+    def _port_chains_changed(self, ports):
+        """Refresh what agents fetch once port chain paths changed."""
+        self.bump_generation(ovs_const.GENERATION_PORT_CHAINS)
+        self._refresh_host_flowrules(ports)
+
+    def _refresh_host_flowrules(self, ports):
+        """Rebuild the stored flow rules of the given ports.
+
+        Only the ports an agent has already fetched are rebuilt, the other
+        ones are built on their first fetch.
+        """
+        for host_port in self.get_host_flowrules_by_ports(ports):
+            flowrules = self._build_flowrules_by_host_portid(
+                self.admin_context, host_port['host_id'],
+                host_port['port_id'])
+            if flowrules is None:
+                self.delete_host_flowrules(
+                    host_port['host_id'], host_port['port_id'])
+            else:
+                self.update_host_flowrules(
+                    host_port['host_id'], host_port['port_id'], flowrules)
+
+    def _build_flowrules_by_host_portid(self, context, host, port_id):
         port_chain_flowrules = []
         sfc_plugin = (
             manager.NeutronManager.get_service_plugins().get(
@@ -1002,6 +1511,12 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             LOG.exception(e)
             LOG.error(_LE("get_flowrules_by_host_portid failed"))
 
+    def get_port_chains_generation(self, context):
+        return self.get_generation(ovs_const.GENERATION_PORT_CHAINS)
+
+    def get_flowrule_changes(self, context, host, revision):
+        return self.get_host_flowrule_changes(host, revision)
+
     def get_flow_classifier_by_portchain_id(self, context, portchain_id):
         try:
             flow_classifier_list = []
@@ -1022,6 +1537,19 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
             LOG.exception(e)
             LOG.error(_LE("get_flow_classifier_by_portchain_id failed"))
 
+    def get_flow_classifiers_by_ids(self, context, fc_ids):
+        fc_plugin = (
+            manager.NeutronManager.get_service_plugins().get(
+                flowclassifier.FLOW_CLASSIFIER_EXT)
+        )
+        if not fc_plugin or not fc_ids:
+            return []
+        return [
+            flowrule_codec.get_classifier(fc)
+            for fc in fc_plugin.get_flow_classifiers(
+                self.admin_context, filters={'id': fc_ids})
+        ]
+
     def update_flowrule_status(self, context, id, status):
         try:
             flowrule_status = dict(status=status)
@@ -1048,10 +1576,15 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
         for agent in pc_agents:
             if agent['alive']:
                 # update host info to flow rule
-                flow_rule['host'] = agent['host']
+                host_flow_rule = dict(flow_rule, host=agent['host'])
+                self._localize_next_hops(
+                    host_flow_rule,
+                    agent.get('configurations', {}).get('tunneling_ip'))
+                self._stamp_host_revision(
+                    host_flow_rule, 'update_src_node_flow_rules')
                 self.ovs_driver_rpc.ask_agent_to_update_src_node_flow_rules(
                     self.admin_context,
-                    flow_rule)
+                    host_flow_rule)
 
     def _delete_src_node_flowrules(self, node, del_fc_ids=None):
         flow_rule = self._get_portchain_src_node_flowrule(node,
@@ -1071,10 +1604,13 @@ class OVSSfcDriver(driver_base.SfcDriverBase,
                 # update host info to flow rule
                 self._update_portchain_group_reference_count(flow_rule,
                                                              agent['host'])
+                self._stamp_host_revision(
+                    flow_rule, 'delete_src_node_flow_rules')
                 self.ovs_driver_rpc.ask_agent_to_delete_src_node_flow_rules(
                     self.admin_context,
                     flow_rule)
 
+    @ovs_sfc_db.cached_reads
     def get_all_src_node_flowrules(self, context):
         sfc_plugin = (
             manager.NeutronManager.get_service_plugins().get(
@@ -0,0 +1,205 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Closed loop control of the bucket weights of the port pair groups.
+
+The agents report the byte counters of the buckets of the group of each
+port pair group, the bucket of a member sends the traffic to one port
+pair. The capacity of a member is the weight configured on its port pair.
+The controller computes the traffic rate of every member, summed over
+the hosts, and moves the installed weights so that the traffic of every
+member is proportional to its capacity: a member getting more than its
+share, because the flows hashed to it are heavier, gets a lower weight.
+
+The weights are computed from the installed weights rather than from a
+state of the controller, so a controller restarted, or receiving the
+reports of only some of the hosts, carries on from where the weights are.
+"""
+
+import six
+
+# The bucket weights of an OpenFlow group are 16 bits
+MAX_WEIGHT = 65535
+
+
+class GroupLoad(object):
+    """Traffic rates of the members of a group, by source of counters.
+
+    @param: max_age: seconds after which the rate of a source stops
+            counting, behind the latest counters of the group, so a
+            source no longer reporting does not weigh forever
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        # (timestamp, counter) by (source, member)
+        self.counters = {}
+        # (timestamp, bytes per second) by (source, member)
+        self.rates = {}
+        # timestamp of the latest counters of any source
+        self.latest = None
+
+    def update(self, source, member_counters, timestamp):
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+        for member, counter in six.iteritems(member_counters):
+            key = (source, member)
+            last = self.counters.get(key)
+            self.counters[key] = (timestamp, counter)
+            if last is None or timestamp <= last[0]:
+                continue
+            delta = counter - last[1]
+            if delta < 0:
+                # The counters restart from zero when the group is
+                # replaced or modified, at a time not known, the next
+                # counters give the rate
+                self.rates.pop(key, None)
+                continue
+            self.rates[key] = (
+                timestamp, float(delta) / (timestamp - last[0]))
+        self._expire()
+
+    def _expire(self):
+        if self.max_age is None:
+            return
+        for table in (self.counters, self.rates):
+            for key, value in list(six.iteritems(table)):
+                if self.latest - value[0] > self.max_age:
+                    del table[key]
+
+    def get_rates(self):
+        rates = {}
+        for (source, member), (_ts, rate) in six.iteritems(self.rates):
+            rates[member] = rates.get(member, 0.0) + rate
+        return rates
+
+    def retain(self, members):
+        for table in (self.counters, self.rates):
+            for key in list(table):
+                if key[1] not in members:
+                    del table[key]
+
+    def reset(self):
+        """Drop the counters and rates, measured under old weights."""
+        self.counters.clear()
+        self.rates.clear()
+
+
+class WeightController(object):
+    """Compute the bucket weights of groups from their traffic counters.
+
+    @param: gain: exponent applied to the ratio of the mean utilization to
+            the utilization of a member on each adjustment, 1 corrects the
+            whole imbalance at once, lower values converge more smoothly
+    @param: min_factor, max_factor: bounds of the weight of a member
+            relative to its capacity, 1 being the mean of the members
+    @param: scale: effective weight of a member of capacity 1 getting its
+            share, leaving room to lower and raise it in integer weights
+    @param: threshold: relative deviation of the utilization of a member
+            from the mean utilization tolerated before the weights change,
+            and relative change of a weight worth pushing
+    @param: max_age: seconds after which the counters of a source no
+            longer reporting a group are dropped, None to keep them
+    """
+
+    def __init__(self, gain=0.5, min_factor=0.1, max_factor=10.0,
+                 scale=100, threshold=0.05, max_age=None):
+        self.gain = gain
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.scale = scale
+        self.threshold = threshold
+        self.max_age = max_age
+        self._groups = {}
+
+    def update_counters(self, group, source, member_counters, timestamp):
+        """Record the cumulative byte counters of the members of a group.
+
+        @param: source: the origin of the counters, such as the host of
+                the group
+        @param: member_counters: dict of the counter by member
+        @param: timestamp: time of the counters, in seconds
+        """
+        load = self._groups.get(group)
+        if load is None:
+            load = self._groups[group] = GroupLoad(max_age=self.max_age)
+        load.update(source, member_counters, timestamp)
+
+    def forget(self, group):
+        self._groups.pop(group, None)
+
+    def get_rates(self, group):
+        load = self._groups.get(group)
+        return load.get_rates() if load else {}
+
+    def get_weights(self, group, capacities, current_weights):
+        """Compute the new weights of the members of a group.
+
+        @param: capacities: dict of the configured weight by member
+        @param: current_weights: dict of the installed weight by member
+        @return: dict of the weight by member, None if the weights do not
+                 need to change. The counters of the group are dropped
+                 when the weights change, the traffic they measured was
+                 spread by the previous weights
+        """
+        load = self._groups.get(group)
+        if load is None or not capacities:
+            return None
+        load.retain(capacities)
+        rates = load.get_rates()
+        if not rates or set(rates) != set(capacities):
+            # Not all members measured yet
+            return None
+        total_rate = sum(six.itervalues(rates))
+        if not total_rate:
+            return None
+        mean_utilization = total_rate / sum(six.itervalues(capacities))
+        if all(
+            abs(rates[member] / capacity / mean_utilization - 1) <=
+            self.threshold
+            for member, capacity in six.iteritems(capacities)
+        ):
+            return None
+
+        # The installed weight of the members relative to their capacity
+        factors = dict(
+            (member, float(current_weights.get(member) or capacity) /
+             capacity)
+            for member, capacity in six.iteritems(capacities))
+        mean_factor = sum(six.itervalues(factors)) / len(factors)
+
+        weights = {}
+        for member, capacity in six.iteritems(capacities):
+            factor = factors[member] / mean_factor
+            utilization = rates[member] / capacity
+            if utilization:
+                factor *= (mean_utilization / utilization) ** self.gain
+            else:
+                # No traffic at all, the member has room for more
+                factor *= 2 ** self.gain
+            factor = min(self.max_factor, max(self.min_factor, factor))
+            weights[member] = min(
+                MAX_WEIGHT,
+                max(1, int(round(capacity * factor * self.scale))))
+        if all(
+            current_weights.get(member) and
+            abs(float(weight) / current_weights[member] - 1) <=
+            self.threshold
+            for member, weight in six.iteritems(weights)
+        ):
+            # Too small a step to be worth pushing, the hashing of a few
+            # heavy flows may never balance better
+            return None
+        load.reset()
+        return weights
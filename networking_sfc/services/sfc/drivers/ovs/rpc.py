@@ -11,6 +11,11 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import sys
+import threading
+
+import six
+from oslo_config import cfg
 from oslo_log import log as logging
 
 import oslo_messaging
@@ -18,18 +23,86 @@ import oslo_messaging
 from neutron.common import rpc as n_rpc
 from neutron.common import topics
 
-from networking_sfc._i18n import _LI
+from networking_sfc._i18n import _, _LI
+from networking_sfc.services.sfc.common import flowrule_codec
 from networking_sfc.services.sfc.drivers.ovs import rpc_topics as sfc_topics
 
 LOG = logging.getLogger(__name__)
 
+ovs_driver_opts = [
+    cfg.BoolOpt('compact_flowrules', default=False,
+                help=_("Cast the flow rules to the sfc agents in the "
+                       "compact format, which refers to the flow "
+                       "classifiers by id. Only enable it once all the "
+                       "sfc agents support it.")),
+    cfg.BoolOpt('load_feedback', default=False,
+                help=_("Adjust the bucket weights of the port pair groups "
+                       "to the traffic counters reported by the sfc "
+                       "agents, so the traffic of each port pair is "
+                       "proportional to its weight.")),
+    cfg.IntOpt('load_feedback_max_age', default=180,
+               help=_("Seconds after which the group stats of a host no "
+                      "longer reporting them stop counting in the load "
+                      "feedback, a few times the sfc_group_stats_interval "
+                      "of the sfc agents.")),
+]
+
+cfg.CONF.register_opts(ovs_driver_opts, "sfc_ovs")
+
+
+class SingleFlight(object):
+    """Share one call among the concurrent callers asking for the same key.
+
+    The first caller runs the call, the callers arriving while it is in
+    flight wait for it and get its result, or its exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {
+                    'done': threading.Event(), 'result': None,
+                    'exc_info': None}
+        if not leader:
+            call['done'].wait()
+            if call['exc_info']:
+                six.reraise(*call['exc_info'])
+            return call['result']
+        try:
+            call['result'] = func(*args, **kwargs)
+            return call['result']
+        except Exception:
+            call['exc_info'] = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
 
 class SfcRpcCallback(object):
-    """Sfc RPC server."""
+    """Sfc RPC server.
+
+    API version history:
+        1.0 - Initial version.
+        1.1 - Add get_flowrule_changes.
+        1.2 - Add get_flow_classifiers.
+        1.3 - Add update_group_stats.
+        1.4 - Add update_flow_stats.
+    """
 
     def __init__(self, driver):
-        self.target = oslo_messaging.Target(version='1.0')
+        self.target = oslo_messaging.Target(version='1.4')
         self.driver = driver
+        self._single_flight = SingleFlight()
+        # (port chains generation, src node flow rules)
+        self._src_node_flowrules = (None, None)
 
     def get_flowrules_by_host_portid(self, context, **kwargs):
         host = kwargs.get('host')
@@ -40,6 +113,12 @@ class SfcRpcCallback(object):
         LOG.debug('host: %s, port_id: %s', host, port_id)
         return pcfrs
 
+    def get_flowrule_changes(self, context, **kwargs):
+        host = kwargs.get('host')
+        revision = kwargs.get('revision')
+        LOG.debug('host: %s, changes since revision: %s', host, revision)
+        return self.driver.get_flowrule_changes(context, host, revision)
+
     def get_flow_classifier_by_portchain_id(self, context, **kwargs):
         portchain_id = kwargs.get('portchain_id')
         pcfcs = self.driver.get_flow_classifier_by_portchain_id(
@@ -48,13 +127,45 @@ class SfcRpcCallback(object):
         LOG.debug('portchain id: %s', portchain_id)
         return pcfcs
 
+    def get_flow_classifiers(self, context, **kwargs):
+        fc_ids = kwargs.get('fc_ids')
+        LOG.debug('flow classifiers: %s', fc_ids)
+        return self.driver.get_flow_classifiers_by_ids(context, fc_ids)
+
     def get_all_src_node_flowrules(self, context, **kwargs):
         host = kwargs.get('host')
-        pcfcs = self.driver.get_all_src_node_flowrules(
-            context)
         LOG.debug('portchain get_src_node_flowrules, host: %s', host)
+        generation = self.driver.get_port_chains_generation(context)
+        cached_generation, pcfcs = self._src_node_flowrules
+        if cached_generation != generation or pcfcs is None:
+            pcfcs = self._single_flight.do(
+                ('get_all_src_node_flowrules', generation),
+                self._get_all_src_node_flowrules, context, generation)
+        # The flow rules are shared by the hosts, the next hops of the
+        # local port pair groups are kept per host.
+        return self.driver.get_local_src_node_flowrules(
+            context, host, pcfcs)
+
+    def _get_all_src_node_flowrules(self, context, generation):
+        pcfcs = self.driver.get_all_src_node_flowrules(context)
+        if pcfcs is not None:
+            self._src_node_flowrules = (generation, pcfcs)
         return pcfcs
 
+    def update_group_stats(self, context, **kwargs):
+        host = kwargs.get('host')
+        group_stats = kwargs.get('group_stats')
+        LOG.debug('host: %s, group stats: %s', host, group_stats)
+        self.driver.update_group_stats(
+            context, host, group_stats, kwargs.get('timestamp'))
+
+    def update_flow_stats(self, context, **kwargs):
+        host = kwargs.get('host')
+        flow_stats = kwargs.get('flow_stats')
+        LOG.debug('host: %s, flow stats: %s', host, flow_stats)
+        self.driver.update_flow_stats(
+            context, host, flow_stats, kwargs.get('timestamp'))
+
     def update_flowrules_status(self, context, **kwargs):
         flowrules_status = kwargs.get('flowrules_status')
         LOG.info(_LI('update_flowrules_status: %s'), flowrules_status)
@@ -71,6 +182,11 @@ class SfcAgentRpcClient(object):
         target = oslo_messaging.Target(topic=topic, version='1.0')
         self.client = n_rpc.get_client(target)
 
+    def _encode(self, flows):
+        if cfg.CONF.sfc_ovs.compact_flowrules:
+            return flowrule_codec.encode_flowrule(flows)
+        return flows
+
     def ask_agent_to_update_flow_rules(self, context, flows):
         LOG.debug('Ask agent on the specific host to update flows ')
         LOG.debug('flows: %s', flows)
@@ -79,7 +195,8 @@ class SfcAgentRpcClient(object):
             topic=topics.get_topic_name(
                 self.topic, sfc_topics.PORTFLOW, topics.UPDATE),
             server=host)
-        cctxt.cast(context, 'update_flow_rules', flowrule_entries=flows)
+        cctxt.cast(context, 'update_flow_rules',
+                   flowrule_entries=self._encode(flows))
 
     def ask_agent_to_delete_flow_rules(self, context, flows):
         LOG.debug('Ask agent on the specific host to delete flows ')
@@ -89,7 +206,8 @@ class SfcAgentRpcClient(object):
             topic=topics.get_topic_name(
                 self.topic, sfc_topics.PORTFLOW, topics.DELETE),
             server=host)
-        cctxt.cast(context, 'delete_flow_rules', flowrule_entries=flows)
+        cctxt.cast(context, 'delete_flow_rules',
+                   flowrule_entries=self._encode(flows))
 
     def ask_agent_to_update_src_node_flow_rules(self, context, flows):
         LOG.debug('Ask agent on the specific host to update src node flows ')
@@ -100,7 +218,7 @@ class SfcAgentRpcClient(object):
                 self.topic, sfc_topics.PORTFLOW, topics.UPDATE),
             server=host)
         cctxt.cast(context, 'update_src_node_flow_rules',
-                   flowrule_entries=flows)
+                   flowrule_entries=self._encode(flows))
 
     def ask_agent_to_delete_src_node_flow_rules(self, context, flows):
         LOG.debug('Ask agent on the specific host to delete src node flows')
@@ -111,4 +229,4 @@ class SfcAgentRpcClient(object):
                 self.topic, sfc_topics.PORTFLOW, topics.DELETE),
             server=host)
         cctxt.cast(context, 'delete_src_node_flow_rules',
-                   flowrule_entries=flows)
+                   flowrule_entries=self._encode(flows))
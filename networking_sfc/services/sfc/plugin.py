@@ -38,12 +38,19 @@ class SfcPlugin(sfc_db.SfcDbPlugin):
         super(SfcPlugin, self).__init__()
         self.driver_manager.initialize()
 
+    def start_rpc_listeners(self):
+        return self.driver_manager.start_rpc_listeners()
+
     @log_helpers.log_method_call
     def create_port_chain(self, context, port_chain):
-        port_chain_db = super(SfcPlugin, self).create_port_chain(
-            context, port_chain)
-        portchain_db_context = sfc_ctx.PortChainContext(
-            self, context, port_chain_db)
+        with context.session.begin(subtransactions=True):
+            port_chain_db = super(SfcPlugin, self).create_port_chain(
+                context, port_chain)
+            portchain_db_context = sfc_ctx.PortChainContext(
+                self, context, port_chain_db)
+            self.driver_manager.create_port_chain_precommit(
+                portchain_db_context)
+
         try:
             self.driver_manager.create_port_chain(portchain_db_context)
         except sfc_exc.SfcDriverError as e:
@@ -58,12 +65,15 @@ class SfcPlugin(sfc_db.SfcDbPlugin):
 
     @log_helpers.log_method_call
     def update_port_chain(self, context, portchain_id, port_chain):
-        original_portchain = self.get_port_chain(context, portchain_id)
-        updated_portchain = super(SfcPlugin, self).update_port_chain(
-            context, portchain_id, port_chain)
-        portchain_db_context = sfc_ctx.PortChainContext(
-            self, context, updated_portchain,
-            original_portchain=original_portchain)
+        with context.session.begin(subtransactions=True):
+            original_portchain = self.get_port_chain(context, portchain_id)
+            updated_portchain = super(SfcPlugin, self).update_port_chain(
+                context, portchain_id, port_chain)
+            portchain_db_context = sfc_ctx.PortChainContext(
+                self, context, updated_portchain,
+                original_portchain=original_portchain)
+            self.driver_manager.update_port_chain_precommit(
+                portchain_db_context)
 
         try:
             self.driver_manager.update_port_chain(portchain_db_context)
@@ -92,10 +102,13 @@ class SfcPlugin(sfc_db.SfcDbPlugin):
 
     @log_helpers.log_method_call
     def create_port_pair(self, context, port_pair):
-        portpair_db = super(SfcPlugin, self).create_port_pair(
-            context, port_pair)
-        portpair_context = sfc_ctx.PortPairContext(
-            self, context, portpair_db)
+        with context.session.begin(subtransactions=True):
+            portpair_db = super(SfcPlugin, self).create_port_pair(
+                context, port_pair)
+            portpair_context = sfc_ctx.PortPairContext(
+                self, context, portpair_db)
+            self.driver_manager.create_port_pair_precommit(portpair_context)
+
         try:
             self.driver_manager.create_port_pair(portpair_context)
         except sfc_exc.SfcDriverError as e:
@@ -110,12 +123,14 @@ class SfcPlugin(sfc_db.SfcDbPlugin):
 
     @log_helpers.log_method_call
     def update_port_pair(self, context, portpair_id, port_pair):
-        original_portpair = self.get_port_pair(context, portpair_id)
-        updated_portpair = super(SfcPlugin, self).update_port_pair(
-            context, portpair_id, port_pair)
-        portpair_context = sfc_ctx.PortPairContext(
-            self, context, updated_portpair,
-            original_portpair=original_portpair)
+        with context.session.begin(subtransactions=True):
+            original_portpair = self.get_port_pair(context, portpair_id)
+            updated_portpair = super(SfcPlugin, self).update_port_pair(
+                context, portpair_id, port_pair)
+            portpair_context = sfc_ctx.PortPairContext(
+                self, context, updated_portpair,
+                original_portpair=original_portpair)
+            self.driver_manager.update_port_pair_precommit(portpair_context)
         try:
             self.driver_manager.update_port_pair(portpair_context)
         except sfc_exc.SfcDriverError as e:
@@ -143,10 +158,14 @@ class SfcPlugin(sfc_db.SfcDbPlugin):
 
     @log_helpers.log_method_call
     def create_port_pair_group(self, context, port_pair_group):
-        portpairgroup_db = super(SfcPlugin, self).create_port_pair_group(
-            context, port_pair_group)
-        portpairgroup_context = sfc_ctx.PortPairGroupContext(
-            self, context, portpairgroup_db)
+        with context.session.begin(subtransactions=True):
+            portpairgroup_db = super(SfcPlugin, self).create_port_pair_group(
+                context, port_pair_group)
+            portpairgroup_context = sfc_ctx.PortPairGroupContext(
+                self, context, portpairgroup_db)
+            self.driver_manager.create_port_pair_group_precommit(
+                portpairgroup_context)
+
         try:
             self.driver_manager.create_port_pair_group(portpairgroup_context)
         except sfc_exc.SfcDriverError as e:
@@ -163,13 +182,17 @@ class SfcPlugin(sfc_db.SfcDbPlugin):
     def update_port_pair_group(
         self, context, portpairgroup_id, port_pair_group
     ):
-        original_portpairgroup = self.get_port_pair_group(
-            context, portpairgroup_id)
-        updated_portpairgroup = super(SfcPlugin, self).update_port_pair_group(
-            context, portpairgroup_id, port_pair_group)
-        portpairgroup_context = sfc_ctx.PortPairGroupContext(
-            self, context, updated_portpairgroup,
-            original_portpairgroup=original_portpairgroup)
+        with context.session.begin(subtransactions=True):
+            original_portpairgroup = self.get_port_pair_group(
+                context, portpairgroup_id)
+            updated_portpairgroup = super(
+                SfcPlugin, self).update_port_pair_group(
+                context, portpairgroup_id, port_pair_group)
+            portpairgroup_context = sfc_ctx.PortPairGroupContext(
+                self, context, updated_portpairgroup,
+                original_portpairgroup=original_portpairgroup)
+            self.driver_manager.update_port_pair_group_precommit(
+                portpairgroup_context)
         try:
             self.driver_manager.update_port_pair_group(portpairgroup_context)
         except sfc_exc.SfcDriverError as e:
@@ -0,0 +1,63 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from sqlalchemy import event
+from testtools import content
+
+from neutron.db import api as db_api
+
+
+class QueryCounter(object):
+    """Count the SQL statements executed on the neutron engine."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _after_cursor_execute(self, conn, cursor, statement,
+                              parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        event.listen(db_api.get_engine(), 'after_cursor_execute',
+                     self._after_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(db_api.get_engine(), 'after_cursor_execute',
+                     self._after_cursor_execute)
+
+
+class BenchmarkMixin(object):
+    """Helpers to measure and report statement counts and latencies."""
+
+    def measure(self, name, func, *args, **kwargs):
+        """Run func once and record its statement count and latency.
+
+        @return: (result, statement count)
+        """
+        with QueryCounter() as counter:
+            start = time.time()
+            result = func(*args, **kwargs)
+            elapsed = time.time() - start
+        self.addDetail(
+            name,
+            content.text_content('%d statements, %.2f ms' % (
+                counter.count, elapsed * 1000)))
+        return result, counter.count
@@ -0,0 +1,140 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import mock
+from testtools import content
+
+from neutron.agent.common import ovs_lib
+from neutron.tests import base
+
+from networking_sfc.services.sfc.agent import agent
+from networking_sfc.services.sfc.agent import encap
+from networking_sfc.services.sfc.drivers.ovs import constants
+
+
+class EncapFlowGenerationBenchmarkTestCase(base.BaseTestCase):
+    """Compare the flows of the MPLS and NSH encapsulations.
+
+    CHAIN_COUNT chains of CHAIN_HOP_COUNT hops get, for every hop, the
+    ACROSS_SUBNET_TABLE flows pushing the header of the chain towards the
+    next hop and the INGRESS_TABLE flow removing it, installed by the
+    agent from the same flow rules in both modes on a recording bridge.
+    """
+
+    CHAIN_COUNT = 100
+    CHAIN_HOP_COUNT = 10
+    ROUNDS = 5
+
+    def _get_flowrules(self, first_path_id):
+        flowrules = []
+        for chain in range(self.CHAIN_COUNT):
+            for hop in range(self.CHAIN_HOP_COUNT):
+                flowrules.append({
+                    'id': 'node-%d-%d' % (chain, hop),
+                    'nsp': first_path_id + chain,
+                    'nsi': 254 - hop,
+                    'node_type': 'sf_node',
+                    'ingress': 'port-%d-%d' % (chain, hop),
+                    'egress': None,
+                    'mac_address': '12:34:56:78:%02x:%02x' % (chain, hop),
+                    'segment_id': 33,
+                    'next_group_id': chain * self.CHAIN_HOP_COUNT + hop + 1,
+                    'add_fcs': [],
+                    'del_fcs': [],
+                    'next_hops': [{
+                        'local_endpoint': '10.0.0.2',
+                        'weight': 1,
+                        'mac_address': '12:34:56:78:%02x:%02x' % (
+                            chain, hop + 1),
+                        'segment_id': 33,
+                        'network_type': 'vxlan',
+                        'net_uuid': 'net1',
+                        'gw_mac': '12:34:56:78:ff:ff',
+                        'cidr': '10.0.0.0/24'
+                    }]
+                })
+        return flowrules
+
+    def _get_agent(self, encap_mode, flowrules, flows):
+        sfc_agent = agent.OVSSfcAgent.__new__(agent.OVSSfcAgent)
+        sfc_agent.overlay_encap_mode = encap_mode
+        sfc_agent.sfc_encap = encap.ENCAPS[encap_mode]()
+        sfc_agent.int_br = mock.Mock()
+        sfc_agent.int_br.add_flow.side_effect = (
+            lambda **flow: flows.append(flow))
+        sfc_agent.int_br.dump_group_for_id.return_value = ''
+        sfc_agent.local_ip = '10.0.0.1'
+        sfc_agent.patch_tun_ofport = 2
+        sfc_agent.local_vlan_map = {'net1': mock.Mock(vlan=1)}
+        sfc_agent.sfc_group_buckets = {}
+        sfc_agent.sfc_next_hop_flows = {}
+        sfc_agent.sfc_classifier_flows = {}
+        sfc_agent.sfc_ports = dict(
+            (flowrule['ingress'], (ovs_lib.VifPort(
+                flowrule['ingress'], 6, flowrule['ingress'],
+                flowrule['mac_address'], sfc_agent.int_br), 'net1'))
+            for flowrule in flowrules)
+        return sfc_agent
+
+    def _build_flows(self, encap_mode, flowrules):
+        flows = []
+        sfc_agent = self._get_agent(encap_mode, flowrules, flows)
+        for flowrule in flowrules:
+            sfc_agent._setup_egress_flow_rules_with_mpls(flowrule)
+            sfc_agent._setup_ingress_flow_rules_with_mpls(flowrule)
+        return flows
+
+    def _measure(self, encap_mode, flowrules):
+        start = time.time()
+        for i in range(self.ROUNDS):
+            flow_strs = [ovs_lib._build_flow_expr_str(flow, 'add')
+                         for flow in self._build_flows(encap_mode, flowrules)]
+        elapsed = (time.time() - start) / self.ROUNDS
+        size = sum(len(flow_str) for flow_str in flow_strs)
+        self.addDetail(
+            encap_mode,
+            content.text_content('%d flows, %d bytes, %.2f ms' % (
+                len(flow_strs), size, elapsed * 1000)))
+        return flow_strs
+
+    def test_chain_flows(self):
+        flowrules = self._get_flowrules(256)
+        mpls_flows = self._measure('mpls', flowrules)
+        nsh_flows = self._measure('eth_nsh', flowrules)
+        # The same flows per hop, only the headers differ
+        self.assertEqual(len(mpls_flows), len(nsh_flows))
+        self.assertEqual(
+            self.CHAIN_COUNT * self.CHAIN_HOP_COUNT * 3, len(nsh_flows))
+
+    def test_path_ids_beyond_mpls_label(self):
+        flowrules = self._get_flowrules(encap.MplsEncap.max_path_id + 1)
+        # The labels have no room for the path ids, the flow rules fail
+        mpls_flows = []
+        sfc_agent = self._get_agent('mpls', flowrules, mpls_flows)
+        flowrule_status = []
+        for flowrule in flowrules:
+            sfc_agent._update_flow_rules_with_mpls_enc(
+                flowrule, flowrule_status)
+        self.assertEqual([], mpls_flows)
+        self.assertEqual(
+            set([constants.STATUS_ERROR]),
+            set(status['status'] for status in flowrule_status))
+        # The service path ids fit
+        nsh_flows = self._build_flows('eth_nsh', flowrules)
+        self.assertTrue(all(
+            flow['nsh_spi'] <= encap.NshEncap.max_path_id and
+            flow['nsh_spi'] == flowrule['nsp']
+            for flow, flowrule in zip(nsh_flows[2::3], flowrules)))
@@ -0,0 +1,108 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from oslo_serialization import jsonutils
+from oslo_utils import uuidutils
+from testtools import content
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.common import flowrule_codec
+
+
+class FlowruleCodecBenchmarkTestCase(base.BaseTestCase):
+    """Compare the legacy and compact flow rule casts of one chain.
+
+    The chain has CHAIN_HOP_COUNT hops and CHAIN_FC_COUNT flow
+    classifiers, one flow rule is cast per hop.
+    """
+
+    CHAIN_FC_COUNT = 50
+    CHAIN_HOP_COUNT = 10
+    ROUNDS = 20
+
+    def _get_flow_classifier(self, index):
+        return {
+            'id': uuidutils.generate_uuid(),
+            'ethertype': 'IPv4',
+            'protocol': 'tcp',
+            'source_port_range_min': 1000 + index,
+            'source_port_range_max': 2000 + index,
+            'destination_port_range_min': None,
+            'destination_port_range_max': None,
+            'source_ip_prefix': '10.0.%d.0/24' % index,
+            'destination_ip_prefix': '10.1.%d.0/24' % index,
+            'logical_source_port': uuidutils.generate_uuid(),
+            'logical_destination_port': None,
+            'l7_parameters': {}
+        }
+
+    def _get_flowrules(self):
+        fcs = [self._get_flow_classifier(i)
+               for i in range(self.CHAIN_FC_COUNT)]
+        return [{
+            'id': uuidutils.generate_uuid(),
+            'nsp': 256,
+            'nsi': 255 - hop,
+            'node_type': 'sf_node',
+            'portchain_id': uuidutils.generate_uuid(),
+            'status': 'building',
+            'fwd_path': True,
+            'next_group_id': hop + 1,
+            'group_refcnt': 1,
+            'host': 'host%d' % hop,
+            'host_id': 'host%d' % hop,
+            'ingress': uuidutils.generate_uuid(),
+            'egress': uuidutils.generate_uuid(),
+            'local_endpoint': '10.0.0.%d' % hop,
+            'mac_address': '12:34:56:78:cf:%02x' % hop,
+            'network_type': 'vxlan',
+            'segment_id': 33,
+            'revision': hop + 1,
+            'add_fcs': fcs,
+            'del_fcs': [],
+            'next_hops': [{
+                'local_endpoint': '10.0.0.%d' % (hop + 1),
+                'weight': 1,
+                'mac_address': '12:34:56:78:cf:%02x' % (hop + 1),
+                'segment_id': 33,
+                'network_type': 'vxlan',
+                'gw_mac': '12:34:56:78:ff:ff',
+                'cidr': '10.0.0.0/24',
+                'net_uuid': uuidutils.generate_uuid()
+            }]
+        } for hop in range(self.CHAIN_HOP_COUNT)]
+
+    def _measure(self, name, flowrules, encode):
+        start = time.time()
+        for i in range(self.ROUNDS):
+            messages = [jsonutils.dumps(encode(flowrule))
+                        for flowrule in flowrules]
+        elapsed = (time.time() - start) / self.ROUNDS
+        size = sum(len(message) for message in messages)
+        self.addDetail(
+            name,
+            content.text_content('%d bytes, %.2f ms' % (
+                size, elapsed * 1000)))
+        return size
+
+    def test_chain_flowrules_size(self):
+        flowrules = self._get_flowrules()
+        legacy_size = self._measure(
+            'legacy', flowrules, lambda flowrule: flowrule)
+        compact_size = self._measure(
+            'compact', flowrules, flowrule_codec.encode_flowrule)
+        self.assertLess(compact_size * 3, legacy_size)
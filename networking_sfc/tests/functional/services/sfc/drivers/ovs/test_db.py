@@ -0,0 +1,186 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import uuidutils
+
+from neutron.extensions import portbindings
+
+from networking_sfc.services.sfc.common import context as sfc_ctx
+from networking_sfc.services.sfc.drivers.ovs import db as ovs_db
+from networking_sfc.tests.functional import base
+from networking_sfc.tests.unit.services.sfc.drivers.ovs import test_driver
+
+
+class OVSSfcDriverDBBenchmarkTestCase(
+    base.BenchmarkMixin,
+    test_driver.OVSSfcDriverTestCaseBase
+):
+    """Benchmark the driver lookups an agent resync depends on."""
+
+    PORT_DETAIL_COUNT = 10000
+    FILLER_HOST_COUNT = 100
+    CHAIN_HOP_COUNT = 20
+    CHAIN_HOP_SF_COUNT = 10
+
+    def _create_filler_port_details(self, count):
+        session = self.driver.admin_context.session
+        port_details = [
+            ovs_db.PortPairDetail(
+                id=uuidutils.generate_uuid(),
+                tenant_id=self._tenant_id,
+                ingress=uuidutils.generate_uuid(),
+                egress=uuidutils.generate_uuid(),
+                host_id='filler%d' % (i % self.FILLER_HOST_COUNT),
+                mac_address='fa:16:3e:%02x:%02x:%02x' % (
+                    (i >> 16) & 0xff, (i >> 8) & 0xff, i & 0xff),
+                network_type='vxlan',
+                segment_id=i % 4096,
+                local_endpoint='10.1.%d.%d' % (
+                    (i >> 8) & 0xff, i & 0xff))
+            for i in range(count)
+        ]
+        with session.begin(subtransactions=True):
+            session.add_all(port_details)
+        return port_details
+
+    def test_create_and_delete_portchain_path_nodes(self):
+        port_details = self._create_filler_port_details(
+            self.CHAIN_HOP_COUNT * self.CHAIN_HOP_SF_COUNT)
+        hops = [
+            [dict(portpair_id=pd.id, weight=1) for pd in port_details[
+                i * self.CHAIN_HOP_SF_COUNT:(i + 1) * self.CHAIN_HOP_SF_COUNT]]
+            for i in range(self.CHAIN_HOP_COUNT)
+        ]
+        nodes, assocs = [], []
+        for i, members in enumerate(hops):
+            node_id = uuidutils.generate_uuid()
+            nodes.append({
+                'id': node_id,
+                'tenant_id': self._tenant_id,
+                'node_type': 'sf_node',
+                'nsp': 256,
+                'nsi': 0xfe - i,
+                'portchain_id': 'chain1',
+                'status': 'building',
+                'next_group_id': None,
+                'next_hop': hops[i + 1] if i + 1 < len(hops) else []
+            })
+            assocs.extend(dict(member, pathnode_id=node_id)
+                          for member in members)
+
+        # Statements are issued per table, not per node or association.
+        path_nodes, count = self.measure(
+            'create %d hops of %d SFs' % (
+                self.CHAIN_HOP_COUNT, self.CHAIN_HOP_SF_COUNT),
+            self.driver.create_path_nodes, nodes, assocs)
+        self.assertEqual(self.CHAIN_HOP_COUNT, len(path_nodes))
+        self.assertLess(count, 10)
+
+        _, count = self.measure(
+            'delete %d hops of %d SFs' % (
+                self.CHAIN_HOP_COUNT, self.CHAIN_HOP_SF_COUNT),
+            self.driver.delete_path_nodes_by_portchain, 'chain1')
+        self.assertLess(count, 10)
+        self.assertIsNone(self.driver.get_path_nodes_by_filter(
+            dict(portchain_id='chain1')))
+
+    def test_get_flowrules_by_host_portid(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='ingress',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress, self.port(
+            name='egress',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1',
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id']
+            }) as fc:
+                with self.port_pair(port_pair={
+                    'ingress': ingress['port']['id'],
+                    'egress': egress['port']['id']
+                }) as pp:
+                    pp_context = sfc_ctx.PortPairContext(
+                        self.sfc_plugin, self.ctx,
+                        pp['port_pair']
+                    )
+                    self.driver.create_port_pair(pp_context)
+                    with self.port_pair_group(port_pair_group={
+                        'port_pairs': [pp['port_pair']['id']]
+                    }) as pg:
+                        pg_context = sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']
+                        )
+                        self.driver_create_port_pair_group(pg_context)
+                        with self.port_chain(port_chain={
+                            'name': 'test1',
+                            'port_pair_groups': [pg['port_pair_group']['id']],
+                            'flow_classifiers': [fc['flow_classifier']['id']]
+                        }) as pc:
+                            pc_context = sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']
+                            )
+                            self.driver_create_port_chain(pc_context)
+                            self.wait()
+                            ports = [src_port, ingress, egress]
+                            baseline = {}
+                            for port in ports:
+                                flow_rules, count = self.measure(
+                                    'baseline %s' % port['port']['name'],
+                                    self.driver.get_flowrules_by_host_portid,
+                                    self.ctx,
+                                    host=port['port']['binding:host_id'],
+                                    port_id=port['port']['id'])
+                                self.assertTrue(flow_rules)
+                                baseline[port['port']['id']] = count
+
+                            self._create_filler_port_details(
+                                self.PORT_DETAIL_COUNT)
+
+                            # The number of statements must not depend on
+                            # how many port details exist in the table.
+                            for port in ports:
+                                flow_rules, count = self.measure(
+                                    '%d details %s' % (
+                                        self.PORT_DETAIL_COUNT,
+                                        port['port']['name']),
+                                    self.driver.get_flowrules_by_host_portid,
+                                    self.ctx,
+                                    host=port['port']['binding:host_id'],
+                                    port_id=port['port']['id'])
+                                self.assertTrue(flow_rules)
+                                self.assertEqual(
+                                    baseline[port['port']['id']], count)
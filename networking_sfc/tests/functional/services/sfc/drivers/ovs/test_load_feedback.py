@@ -0,0 +1,127 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import random
+
+from testtools import content
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.drivers.ovs import load_feedback
+
+
+class SelectGroupSimulation(object):
+    """Traffic of a select group spread over its members by flow hash.
+
+    Every host sends FLOW_COUNT flows of Pareto distributed rates, a flow
+    goes to the member its hash falls on when the hash space is divided
+    by the bucket weights. The counters of the buckets are reported
+    every round.
+    """
+
+    FLOW_COUNT = 200
+
+    def __init__(self, capacities, hosts, seed):
+        self.capacities = capacities
+        self.weights = dict(capacities)
+        rand = random.Random(seed)
+        self.flows = dict(
+            (host, [(rand.random(), rand.paretovariate(1.5))
+                    for i in range(self.FLOW_COUNT)])
+            for host in hosts)
+        self.counters = dict(
+            (host, dict((member, 0.0) for member in capacities))
+            for host in hosts)
+
+    def _get_member(self, flow_hash):
+        members = sorted(self.weights)
+        total = float(sum(self.weights.values()))
+        bound = 0.0
+        for member in members:
+            bound += self.weights[member] / total
+            if flow_hash < bound:
+                return member
+        return members[-1]
+
+    def get_rates(self):
+        rates = dict((member, 0.0) for member in self.capacities)
+        for flows in self.flows.values():
+            for flow_hash, rate in flows:
+                rates[self._get_member(flow_hash)] += rate
+        return rates
+
+    def get_imbalance(self):
+        """Get the largest deviation of a utilization from the mean."""
+        rates = self.get_rates()
+        mean_utilization = (
+            sum(rates.values()) / sum(self.capacities.values()))
+        return max(
+            abs(rates[member] / capacity / mean_utilization - 1)
+            for member, capacity in self.capacities.items())
+
+    def run_round(self):
+        for host, flows in self.flows.items():
+            for flow_hash, rate in flows:
+                self.counters[host][self._get_member(flow_hash)] += rate
+
+
+class WeightControllerSimulationTestCase(base.BaseTestCase):
+    """Run the weight controller against simulated select groups."""
+
+    ROUNDS = 30
+
+    def _simulate(self, capacities, hosts, seed):
+        simulation = SelectGroupSimulation(capacities, hosts, seed)
+        controller = load_feedback.WeightController()
+        initial_imbalance = simulation.get_imbalance()
+        updates = []
+        for timestamp in range(self.ROUNDS):
+            simulation.run_round()
+            for host in hosts:
+                controller.update_counters(
+                    1, host, dict(simulation.counters[host]),
+                    float(timestamp))
+            weights = controller.get_weights(
+                1, capacities, simulation.weights)
+            if weights:
+                simulation.weights = weights
+                updates.append(timestamp)
+        imbalance = simulation.get_imbalance()
+        self.addDetail(
+            'seed %d' % seed,
+            content.text_content(
+                'imbalance %.3f -> %.3f, %d weight updates, last in round '
+                '%s, weights %s' % (
+                    initial_imbalance, imbalance, len(updates),
+                    updates[-1] if updates else None,
+                    sorted(simulation.weights.items()))))
+        return initial_imbalance, imbalance, updates
+
+    def test_converge_equal_capacities(self):
+        for seed in range(3):
+            initial, final, updates = self._simulate(
+                {'sf1': 1, 'sf2': 1, 'sf3': 1}, ['host1', 'host2'], seed)
+            self.assertLessEqual(final, initial)
+            self.assertLess(final, 0.15)
+            # The weights settle instead of oscillating
+            self.assertLess(updates[-1] if updates else 0, self.ROUNDS - 5)
+
+    def test_converge_weighted_capacities(self):
+        for seed in range(3):
+            initial, final, updates = self._simulate(
+                {'sf1': 1, 'sf2': 2, 'sf3': 4}, ['host1', 'host2', 'host3'],
+                seed)
+            self.assertLessEqual(final, initial)
+            self.assertLess(final, 0.15)
+            self.assertLess(updates[-1] if updates else 0, self.ROUNDS - 5)
@@ -0,0 +1,101 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import eventlet
+import oslo_messaging
+from testtools import content
+
+from neutron.common import rpc as n_rpc
+from neutron import context as n_context
+from neutron.tests import base as n_base
+
+from networking_sfc.services.sfc.drivers.ovs import driver
+from networking_sfc.services.sfc.drivers.ovs import rpc_topics as sfc_topics
+
+
+class OVSSfcDriverRpcWorkersBenchmarkTestCase(n_base.BaseTestCase):
+    """Load the SFC RPC endpoints through 1, 4 and 8 RPC workers.
+
+    Each worker stands for one neutron RPC worker process: it serves one
+    request at a time, which takes CALL_LATENCY seconds. The timings are
+    only reported, the test checks that the calls spread over the workers.
+    """
+
+    CALL_COUNT = 160
+    CALL_LATENCY = 0.01
+
+    def _start_worker(self, served):
+        sfc_driver = driver.OVSSfcDriver()
+        lock = threading.Lock()
+
+        def get_flowrules_by_host_portid(context, host, port_id):
+            with lock:
+                time.sleep(self.CALL_LATENCY)
+                served.append(port_id)
+            return [{'host': host, 'port_id': port_id}]
+
+        sfc_driver.get_flowrules_by_host_portid = get_flowrules_by_host_portid
+        return sfc_driver.start_rpc_listeners()
+
+    def _run_load(self, worker_count):
+        servers = []
+        served = [[] for i in range(worker_count)]
+        for i in range(worker_count):
+            servers.extend(self._start_worker(served[i]))
+        try:
+            self._call(worker_count)
+        finally:
+            self._stop_servers(servers)
+        self.addDetail(
+            '%d workers calls' % worker_count,
+            content.text_content(
+                ' '.join(str(len(calls)) for calls in served)))
+        return served
+
+    def _call(self, worker_count):
+        client = n_rpc.get_client(oslo_messaging.Target(
+            topic=sfc_topics.SFC_PLUGIN, version='1.0')).prepare()
+        context = n_context.get_admin_context_without_session()
+        pool = eventlet.GreenPool()
+        start = time.time()
+        results = list(pool.imap(
+            lambda i: client.call(
+                context, 'get_flowrules_by_host_portid',
+                host='host%d' % i, port_id='port%d' % i),
+            range(self.CALL_COUNT)))
+        elapsed = time.time() - start
+        self.assertEqual(self.CALL_COUNT, len(results))
+        self.addDetail(
+            '%d workers' % worker_count,
+            content.text_content('%d calls, %.2f s, %.1f calls/s' % (
+                self.CALL_COUNT, elapsed, self.CALL_COUNT / elapsed)))
+
+    def _stop_servers(self, servers):
+        for server in servers:
+            server.stop()
+        for server in servers:
+            server.wait()
+
+    def test_rpc_workers_throughput(self):
+        for worker_count in (1, 4, 8):
+            served = self._run_load(worker_count)
+            self.assertEqual(
+                self.CALL_COUNT, sum(len(calls) for calls in served))
+            # the workers consume the same topic, more than one serves
+            if worker_count > 1:
+                self.assertGreater(
+                    len([calls for calls in served if calls]), 1)
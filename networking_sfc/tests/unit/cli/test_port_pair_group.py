@@ -82,6 +82,19 @@ class CLITestV20PortGroupExtensionJSON(test_cli20.CLITestV20Base):
         self._test_create_resource(resource, cmd, name, myid, args,
                                    position_names, position_values)
 
+    def test_create_port_pair_group_with_parameters(self):
+        """Create port_pair_group: myname with lb_fields."""
+        resource = 'port_pair_group'
+        cmd = pg.PortPairGroupCreate(test_cli20.MyApp(sys.stdout), None)
+        name = 'myname'
+        myid = 'myid'
+        args = [name, '--port-pair', pp1,
+                '--port-pair-group-parameters', 'lb_fields=ip_src&ip_dst']
+        position_names = ['name', 'port_pairs', 'port_pair_group_parameters']
+        position_values = [name, [pp1], {'lb_fields': 'ip_src&ip_dst'}]
+        self._test_create_resource(resource, cmd, name, myid, args,
+                                   position_names, position_values)
+
     def test_delete_port_pair_group(self):
         """Delete port_pair_group: myid."""
         resource = 'port_pair_group'
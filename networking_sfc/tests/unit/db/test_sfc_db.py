@@ -24,6 +24,7 @@ from oslo_utils import uuidutils
 
 from neutron.api import extensions as api_ext
 from neutron.common import config
+from neutron import context
 import neutron.extensions as nextensions
 
 from networking_sfc.db import flowclassifier_db as fdb
@@ -169,7 +170,10 @@ class SfcDbPluginTestCaseBase(
         return {
             'name': port_pair_group.get('name') or '',
             'description': port_pair_group.get('description') or '',
-            'port_pairs': port_pair_group.get('port_pairs') or []
+            'port_pairs': port_pair_group.get('port_pairs') or [],
+            'port_pair_group_parameters': dict(
+                {'lb_fields': '', 'symmetric': False, 'locality': 'any'},
+                **port_pair_group.get('port_pair_group_parameters') or {})
         }
 
     def _test_create_port_pair_group(
@@ -203,7 +207,8 @@ class SfcDbPluginTestCaseBase(
             'port_pair_groups': port_chain['port_pair_groups'],
             'flow_classifiers': port_chain.get('flow_classifiers') or [],
             'chain_parameters': port_chain.get(
-                'chain_parameters') or {'correlation': 'mpls'}
+                'chain_parameters') or {'correlation': 'mpls'},
+            'chain_statistics': []
         }
 
     def _test_create_port_chain(self, port_chain, expected_port_chain=None):
@@ -757,6 +762,79 @@ class SfcDbPluginTestCase(
         res = req.get_response(self.ext_api)
         self.assertEqual(res.status_int, 404)
 
+    def _show_chain_statistics(self, pc_id):
+        req = self.new_show_request('port_chains', pc_id)
+        res = self.deserialize(self.fmt, req.get_response(self.ext_api))
+        return res['port_chain']['chain_statistics']
+
+    def test_show_port_chain_statistics(self):
+        ctx = context.get_admin_context()
+        with self.port_pair_group(
+            port_pair_group={}
+        ) as pg:
+            with self.port_chain(port_chain={
+                'port_pair_groups': [pg['port_pair_group']['id']]
+            }) as pc:
+                pc_id = pc['port_chain']['id']
+                for host, timestamp, counters in (
+                    ('host1', 10.0, (100, 80, 9800, 7840)),
+                    ('host2', 5.0, (0, 0, 0, 0)),
+                    ('host2', 15.0, (50, 50, 4900, 4900)),
+                    ('host1', 20.0, (300, 280, 29400, 27440))
+                ):
+                    self.sfc_plugin.update_port_chain_hop_stats(
+                        ctx, pc_id, host, [{
+                            'hop': 0,
+                            'packets_in': 0, 'bytes_in': 0,
+                            'packets_out': counters[0],
+                            'bytes_out': counters[2]
+                        }, {
+                            'hop': 1,
+                            'packets_in': counters[0],
+                            'bytes_in': counters[2],
+                            'packets_out': counters[1],
+                            'bytes_out': counters[3]
+                        }], timestamp)
+                self.assertEqual([{
+                    'hop': 0,
+                    'packets_in': 0, 'bytes_in': 0,
+                    'packets_out': 350, 'bytes_out': 34300,
+                    'packet_rate': 25.0, 'byte_rate': 2450.0,
+                    'packets_dropped': 0
+                }, {
+                    'hop': 1,
+                    'packets_in': 350, 'bytes_in': 34300,
+                    'packets_out': 330, 'bytes_out': 32340,
+                    'packet_rate': 25.0, 'byte_rate': 2450.0,
+                    'packets_dropped': 20
+                }], self._show_chain_statistics(pc_id))
+
+    def test_update_port_chain_hop_stats_counter_reset(self):
+        ctx = context.get_admin_context()
+        with self.port_pair_group(
+            port_pair_group={}
+        ) as pg:
+            with self.port_chain(port_chain={
+                'port_pair_groups': [pg['port_pair_group']['id']]
+            }) as pc:
+                pc_id = pc['port_chain']['id']
+                for timestamp, counter in ((0.0, 1000), (10.0, 100)):
+                    self.sfc_plugin.update_port_chain_hop_stats(
+                        ctx, pc_id, 'host1', [{
+                            'hop': 0,
+                            'packets_in': 0, 'bytes_in': 0,
+                            'packets_out': counter, 'bytes_out': counter
+                        }], timestamp)
+                statistics = self._show_chain_statistics(pc_id)
+                self.assertEqual(10.0, statistics[0]['packet_rate'])
+
+    def test_update_port_chain_hop_stats_noexist(self):
+        self.assertRaises(
+            sfc.PortChainNotFound,
+            self.sfc_plugin.update_port_chain_hop_stats,
+            context.get_admin_context(), uuidutils.generate_uuid(),
+            'host1', [], 0.0)
+
     def test_update_port_chain_add_flow_classifiers(self):
         with self.port(
             name='test1'
@@ -1029,6 +1107,36 @@ class SfcDbPluginTestCase(
                 for k, v in six.iteritems(expected):
                     self.assertEqual(res['port_chain'][k], v)
 
+    def test_update_port_chain_port_pair_groups_reset_statistics(self):
+        with self.port_pair_group(
+            port_pair_group={}
+        ) as pg1, self.port_pair_group(
+            port_pair_group={}
+        ) as pg2:
+            with self.port_chain(port_chain={
+                'port_pair_groups': [pg1['port_pair_group']['id']],
+            }) as pc:
+                self.sfc_plugin.update_port_chain_hop_stats(
+                    context.get_admin_context(), pc['port_chain']['id'],
+                    'host1', [{
+                        'hop': 1,
+                        'packets_in': 10, 'bytes_in': 980,
+                        'packets_out': 10, 'bytes_out': 980
+                    }], 0.0)
+                self.assertEqual(1, len(self._show_chain_statistics(
+                    pc['port_chain']['id'])))
+                req = self.new_update_request(
+                    'port_chains', {'port_chain': {
+                        'port_pair_groups': [
+                            pg2['port_pair_group']['id']]
+                    }}, pc['port_chain']['id']
+                )
+                res = self.deserialize(
+                    self.fmt,
+                    req.get_response(self.ext_api)
+                )
+                self.assertEqual([], res['port_chain']['chain_statistics'])
+
     def test_update_port_chain_flow_classifiers_port_pair_groups(self):
         with self.port(
             name='test1'
@@ -1167,6 +1275,36 @@ class SfcDbPluginTestCase(
             'port_pairs': []
         })
 
+    def test_create_port_pair_group_lb_fields(self):
+        self._test_create_port_pair_group({
+            'port_pair_group_parameters': {'lb_fields': 'ip_src&ip_dst'}
+        })
+
+    def test_create_port_pair_group_symmetric(self):
+        self._test_create_port_pair_group({
+            'port_pair_group_parameters': {'symmetric': True}
+        })
+
+    def test_create_port_pair_group_locality(self):
+        self._test_create_port_pair_group({
+            'port_pair_group_parameters': {'locality': 'local'}
+        })
+
+    def test_create_port_pair_group_invalid_parameters(self):
+        self._create_port_pair_group(
+            self.fmt, {
+                'port_pair_group_parameters': {'lb_fields': 'ip_proto'}
+            },
+            expected_res_status=400
+        )
+        self._create_port_pair_group(
+            self.fmt, {
+                'port_pair_group_parameters': {
+                    'lb_fields': 'ip_src&ip_dst', 'symmetric': True}
+            },
+            expected_res_status=400
+        )
+
     def test_create_port_pair_group_with_port_pairs(self):
         with self.port(
             name='port1',
@@ -1468,6 +1606,39 @@ class SfcDbPluginTestCase(
                 'service_function_parameters': {}
             })
 
+    def test_create_port_pair_weight_service_function_parameters(self):
+        with self.port(
+            name='port1',
+            device_id='default'
+        ) as src_port, self.port(
+            name='port2',
+            device_id='default'
+        ) as dst_port:
+            self._test_create_port_pair({
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id'],
+                'service_function_parameters': {'weight': '2'}
+            }, {
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id'],
+                'service_function_parameters': {
+                    'correlation': None, 'weight': 2}
+            })
+
+    def test_create_port_pair_mpls_service_function_parameters(self):
+        with self.port(
+            name='port1',
+            device_id='default'
+        ) as src_port, self.port(
+            name='port2',
+            device_id='default'
+        ) as dst_port:
+            self._test_create_port_pair({
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id'],
+                'service_function_parameters': {'correlation': 'mpls'}
+            })
+
     def test_create_port_pair_with_src_dst_same_port(self):
         with self.port(
             name='port1',
@@ -1751,15 +1922,53 @@ class SfcDbPluginTestCase(
             }) as pc:
                 updates = {
                     'service_function_parameters': {
-                        'correlation': None
+                        'weight': 3
                     }
                 }
                 req = self.new_update_request(
                     'port_pairs', {'port_pair': updates},
                     pc['port_pair']['id']
                 )
-                res = req.get_response(self.ext_api)
-                self.assertEqual(res.status_int, 400)
+                res = self.deserialize(
+                    self.fmt,
+                    req.get_response(self.ext_api)
+                )
+                self.assertEqual(
+                    {'correlation': None, 'weight': 3},
+                    res['port_pair']['service_function_parameters'])
+                req = self.new_show_request(
+                    'port_pairs', pc['port_pair']['id']
+                )
+                res = self.deserialize(
+                    self.fmt, req.get_response(self.ext_api)
+                )
+                self.assertEqual(
+                    {'correlation': None, 'weight': 3},
+                    res['port_pair']['service_function_parameters'])
+
+    def test_update_port_pair_invalid_service_function_parameters(self):
+        with self.port(
+            name='port1',
+            device_id='default'
+        ) as src_port, self.port(
+            name='port2',
+            device_id='default'
+        ) as dst_port:
+            with self.port_pair(port_pair={
+                'name': 'test1',
+                'description': 'desc1',
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id']
+            }) as pc:
+                for sf_params in ({'abc': 'def'}, {'weight': 0}):
+                    req = self.new_update_request(
+                        'port_pairs',
+                        {'port_pair': {
+                            'service_function_parameters': sf_params}},
+                        pc['port_pair']['id']
+                    )
+                    res = req.get_response(self.ext_api)
+                    self.assertEqual(res.status_int, 400)
 
     def test_update_port_pair_ingress(self):
         with self.port(
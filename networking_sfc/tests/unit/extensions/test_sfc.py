@@ -265,6 +265,38 @@ class SfcExtensionTestCase(test_api_v2_extension.ExtensionTestCase):
         self.assertIn('port_chain', res)
         self.assertEqual(return_value, res['port_chain'])
 
+    def test_port_chain_get_chain_statistics(self):
+        portchain_id = _uuid()
+        return_value = {
+            'tenant_id': _uuid(),
+            'id': portchain_id,
+            'chain_statistics': [{
+                'hop': 1,
+                'packets_in': 10, 'bytes_in': 980,
+                'packets_out': 9, 'bytes_out': 882,
+                'packets_dropped': 1,
+                'packet_rate': 0.9, 'byte_rate': 88.2
+            }]
+        }
+
+        instance = self.plugin.return_value
+        instance.get_port_chain.return_value = return_value
+
+        res = self.api.get(_get_path(PORT_CHAIN_PATH,
+                                     id=portchain_id, fmt=self.fmt))
+        self.assertEqual(res.status_int, exc.HTTPOk.code)
+        res = self.deserialize(res)
+        self.assertEqual(return_value, res['port_chain'])
+
+    def test_port_chain_update_chain_statistics(self):
+        data = {'port_chain': {'chain_statistics': []}}
+        self.assertRaises(
+            webtest.app.AppError,
+            self.api.put,
+            _get_path(PORT_CHAIN_PATH, id=_uuid(), fmt=self.fmt),
+            self.serialize(data),
+            content_type='application/%s' % self.fmt)
+
     def test_port_chain_update(self):
         portchain_id = _uuid()
         update_data = {'port_chain': {
@@ -340,6 +372,10 @@ class SfcExtensionTestCase(test_api_v2_extension.ExtensionTestCase):
             'description': data['port_pair_group'].get('description') or '',
             'name': data['port_pair_group'].get('name') or '',
             'port_pairs': data['port_pair_group'].get('port_pairs') or [],
+            'port_pair_group_parameters': dict(
+                {'lb_fields': '', 'symmetric': False, 'locality': 'any'},
+                **data['port_pair_group'].get(
+                    'port_pair_group_parameters') or {}),
             'tenant_id': data['port_pair_group']['tenant_id']
         }}
 
@@ -390,6 +426,68 @@ class SfcExtensionTestCase(test_api_v2_extension.ExtensionTestCase):
         self.assertIn('port_pair_group', res)
         self.assertEqual(return_value, res['port_pair_group'])
 
+    def test_create_port_pair_group_parameters(self):
+        portpairgroup_id = _uuid()
+        data = {'port_pair_group': {
+            'port_pair_group_parameters': {'lb_fields': 'ip_src&tcp_src'},
+            'tenant_id': _uuid()
+        }}
+        expected_data = self._get_expected_port_pair_group(data)
+        return_value = copy.copy(expected_data['port_pair_group'])
+        return_value.update({'id': portpairgroup_id})
+        instance = self.plugin.return_value
+        instance.create_port_pair_group.return_value = return_value
+        res = self.api.post(
+            _get_path(PORT_PAIR_GROUP_PATH, fmt=self.fmt),
+            self.serialize(data),
+            content_type='application/%s' % self.fmt)
+        instance.create_port_pair_group.assert_called_with(
+            mock.ANY,
+            port_pair_group=expected_data)
+        self.assertEqual(res.status_int, exc.HTTPCreated.code)
+
+    def test_create_port_pair_group_symmetric(self):
+        portpairgroup_id = _uuid()
+        data = {'port_pair_group': {
+            'port_pair_group_parameters': {'symmetric': 'true'},
+            'tenant_id': _uuid()
+        }}
+        expected_data = self._get_expected_port_pair_group(data)
+        expected_data['port_pair_group']['port_pair_group_parameters'][
+            'symmetric'] = True
+        return_value = copy.copy(expected_data['port_pair_group'])
+        return_value.update({'id': portpairgroup_id})
+        instance = self.plugin.return_value
+        instance.create_port_pair_group.return_value = return_value
+        res = self.api.post(
+            _get_path(PORT_PAIR_GROUP_PATH, fmt=self.fmt),
+            self.serialize(data),
+            content_type='application/%s' % self.fmt)
+        instance.create_port_pair_group.assert_called_with(
+            mock.ANY,
+            port_pair_group=expected_data)
+        self.assertEqual(res.status_int, exc.HTTPCreated.code)
+
+    def test_create_port_pair_group_invalid_parameters(self):
+        for params in (
+            {'abc': 'def'},
+            {'lb_fields': 'ip_src&ip_proto'},
+            {'lb_fields': 'ip_src&ip_src'},
+            {'symmetric': 'abc'},
+            {'locality': 'remote'},
+            {'lb_fields': 'ip_src&ip_dst', 'symmetric': True}
+        ):
+            data = {'port_pair_group': {
+                'port_pair_group_parameters': params,
+                'tenant_id': _uuid()
+            }}
+            self.assertRaises(
+                webtest.app.AppError,
+                self.api.post,
+                _get_path(PORT_PAIR_GROUP_PATH, fmt=self.fmt),
+                self.serialize(data),
+                content_type='application/%s' % self.fmt)
+
     def test_create_port_pair_group_nonuuid_port_pairs(self):
         data = {'port_pair_group': {
             'port_pairs': ['nouuid'],
@@ -711,9 +809,33 @@ class SfcExtensionTestCase(test_api_v2_extension.ExtensionTestCase):
         self.assertEqual(res['port_pair'], return_value)
 
     def test_port_pair_update_service_function_parameters(self):
+        portpair_id = _uuid()
+        update_data = {'port_pair': {
+            'service_function_parameters': {'weight': '3'}
+        }}
+        return_value = {
+            'tenant_id': _uuid(),
+            'id': portpair_id
+        }
+
+        instance = self.plugin.return_value
+        instance.update_port_pair.return_value = return_value
+
+        res = self.api.put(_get_path(PORT_PAIR_PATH, id=portpair_id,
+                                     fmt=self.fmt),
+                           self.serialize(update_data))
+
+        instance.update_port_pair.assert_called_with(
+            mock.ANY, portpair_id,
+            port_pair={'port_pair': {
+                'service_function_parameters': {'weight': 3}
+            }})
+        self.assertEqual(res.status_int, exc.HTTPOk.code)
+
+    def test_port_pair_update_invalid_service_function_parameters(self):
         portpair_id = _uuid()
         data = {'port_pair': {
-            'service_function_parameters': None
+            'service_function_parameters': {'weight': 'abc'}
         }}
         self.assertRaises(
             webtest.app.AppError,
@@ -73,6 +73,25 @@ class DriverManagerTestCase(base.BaseTestCase):
             mock_driver1.initialize.assert_called_once_with()
             mock_driver2.initialize.assert_called_once_with()
 
+    def test_get_driver_stats(self):
+        mock_driver = mock.Mock()
+        mock_driver.create_flow_classifier = mock.Mock(
+            side_effect=[None, fc_exc.FlowClassifierException]
+        )
+        with self.driver_manager_context({
+            'dummy': mock_driver
+        }) as manager:
+            mocked_context = mock.Mock()
+            manager.create_flow_classifier(mocked_context)
+            self.assertRaises(
+                fc_exc.FlowClassifierDriverError,
+                manager.create_flow_classifier, mocked_context
+            )
+            stats = manager.get_driver_stats()['dummy'][
+                'create_flow_classifier']
+            self.assertEqual(2, stats['calls'])
+            self.assertEqual(1, stats['errors'])
+
     def test_create_flow_classifier_called(self):
         mock_driver1 = mock.Mock()
         mock_driver2 = mock.Mock()
@@ -16,11 +16,13 @@ import mock
 import six
 
 from oslo_config import cfg
+import oslo_messaging
 from oslo_utils import uuidutils
 
 from neutron.agent.common import ovs_lib
 from neutron.agent.common import utils
 from neutron.agent import rpc as agent_rpc
+from neutron.common import rpc as n_rpc
 from neutron import context
 from neutron.tests import base
 
@@ -28,7 +30,9 @@ from networking_sfc.services.sfc.agent import agent
 from networking_sfc.services.sfc.agent import br_int
 from networking_sfc.services.sfc.agent import br_phys
 from networking_sfc.services.sfc.agent import br_tun
+from networking_sfc.services.sfc.common import flowrule_codec
 from networking_sfc.services.sfc.common import ovs_ext_lib
+from networking_sfc.services.sfc.drivers.ovs import constants
 
 
 class OVSSfcAgentTestCase(base.BaseTestCase):
@@ -48,6 +52,10 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         self.plugin_rpc.get_all_src_node_flowrules = mock.Mock(
             side_effect=self.mock_get_all_src_node_flowrules
         )
+        self.flowrule_changes = {'revision': 0, 'changes': None}
+        self.plugin_rpc.get_flowrule_changes = mock.Mock(
+            side_effect=self.mock_get_flowrule_changes
+        )
         agent.SfcPluginApi = mock.Mock(
             return_value=self.plugin_rpc
         )
@@ -86,6 +94,11 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
             self.mock_get_vif_port_by_id
         )
         self.get_vif_port_by_id.start()
+        self.get_vif_port = mock.patch.object(
+            agent.OVSSfcAgent, "_get_vif_port",
+            self.mock_get_vif_port_by_id
+        )
+        self.get_vif_port.start()
         self.get_vlan_by_port = mock.patch.object(
             agent.OVSSfcAgent, "_get_vlan_by_port",
             self.mock_get_vlan_by_port
@@ -196,11 +209,18 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         self.default_flow_rules = [{
             'actions': 'resubmit(,10)', 'dl_type': 34887,
             'priority': 20, 'table': 0
+        }, {
+            'actions': 'load:1->NXM_NX_REG7[0],resubmit(,0)',
+            'priority': 0, 'table': 7
         }, {
             'actions': 'drop', 'priority': 0, 'table': 10
         }]
         self.default_delete_flow_rules = [{
+            'cookie': '0x5fc0000000000000/0xffff000000000000'
+        }, {
             'table': 5
+        }, {
+            'table': 7
         }, {
             'table': 10
         }]
@@ -391,6 +411,9 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
             )
         ]
 
+    def mock_get_flowrule_changes(self, context, revision):
+        return self.flowrule_changes
+
     def mock_execute(self, cmd, *args, **kwargs):
         self.executed_cmds.append(' '.join(cmd))
 
@@ -491,6 +514,7 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         self.assertEqual(
             self.added_flows, self.default_flow_rules + [{
                 'actions': 'strip_vlan, pop_mpls:0x0800,output:6',
+                'cookie': 0x5fc000000100fe01,
                 'dl_dst': '00:01:02:03:05:07',
                 'dl_type': 34887,
                 'dl_vlan': 0,
@@ -503,6 +527,36 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
             self.group_mapping, {}
         )
 
+    def test_update_flow_rules_path_id_beyond_encap(self):
+        node_id = uuidutils.generate_uuid()
+        self.agent.update_flow_rules(
+            self.context, flowrule_entries={
+                'nsi': 254,
+                'ingress': u'dd7374b9-a6ac-4a66-a4a6-7d3dee2a1579',
+                'next_hops': None,
+                'del_fcs': [],
+                'group_refcnt': 1,
+                'node_type': 'sf_node',
+                'egress': u'2f1d2140-42ce-4979-9542-7ef25796e536',
+                'next_group_id': None,
+                'nsp': 4096,
+                'add_fcs': [],
+                'id': node_id
+            }
+        )
+        # The MPLS label has no room for the path id
+        self.assertEqual(self.default_flow_rules, self.added_flows)
+        self.plugin_rpc.update_flowrules_status.assert_called_once_with(
+            self.agent.context,
+            [{'id': node_id, 'status': constants.STATUS_ERROR}])
+
+    def test_update_src_node_flow_rules_path_id_beyond_encap(self):
+        self.agent.update_src_node_flow_rules(
+            self.context, flowrule_entries=self._get_src_node_flowrule(
+                'node1', '12:34:56:78:cf:23', 1, nsp=4096))
+        self.assertEqual(self.default_flow_rules, self.added_flows)
+        self.assertEqual({}, self.group_mapping)
+
     def test_update_flow_rules_src_node_empty_next_hops(self):
         self.port_mapping = {
             '2f1d2140-42ce-4979-9542-7ef25796e536': {
@@ -651,17 +705,27 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         self.assertEqual(
             self.added_flows, self.default_flow_rules + [{
                 'actions': 'normal',
+                'cookie': 0x5fc000000100ff02,
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': u'10.100.0.0/16',
                 'priority': 30,
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
+            }, {
+                'actions': 'resubmit(,7)',
+                'cookie': 0x5fc0000000000003,
+                'dl_type': 2048,
+                'in_port': 42,
+                'priority': 30,
+                'reg7': '0/0x1',
+                'table': 0
             }, {
                 'actions': 'strip_vlan, pop_mpls:0x0800,output:42',
+                'cookie': 0x5fc000000100ff01,
                 'dl_dst': '00:01:02:03:06:08',
                 'dl_type': 34887,
                 'dl_vlan': 0,
@@ -672,12 +736,13 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         )
         self.assertEqual(
             self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100ff02/-1',
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': u'10.100.0.0/16',
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
             }]
@@ -752,25 +817,37 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
                 'dl_type': 2048,
                 'nw_src': '10.0.0.0/8',
                 'priority': 1,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
                 'actions': (
-                    'push_mpls:0x8847,set_mpls_label:65791,set_mpls_ttl:255,'
-                    'mod_vlan_vid:1,,mod_dl_src:00:01:02:03:06:09, output:2'),
+                    'mod_dl_src:00:01:02:03:06:09,push_mpls:0x8847,'
+                    'set_mpls_label:65791,set_mpls_ttl:255,'
+                    'mod_vlan_vid:1,,output:2'),
                 'dl_dst': '12:34:56:78:cf:23',
                 'priority': 0,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
-                'actions': 'group:1',
+                'actions': 'load:0x100ff->NXM_NX_REG4[],group:1',
+                'cookie': 0x5fc000000100ff02,
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
                 'priority': 30,
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
+            }, {
+                'actions': 'resubmit(,7)',
+                'cookie': 0x5fc0000000000003,
+                'dl_type': 2048,
+                'in_port': 42,
+                'priority': 30,
+                'reg7': '0/0x1',
+                'table': 0
             }]
         )
         self.assertEqual(
@@ -787,6 +864,244 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
             }
         )
 
+    def _test_update_flow_rules_next_group_parameters(self, group_params):
+        self.port_mapping = {
+            '29e38fb2-a643-43b1-baa8-a86596461cd5': {
+                'port_name': 'port2',
+                'ofport': 42,
+                'vif_mac': '00:01:02:03:06:08',
+            }
+        }
+        self.agent.update_flow_rules(
+            self.context, flowrule_entries={
+                'nsi': 255,
+                'ingress': None,
+                'next_hops': [{
+                    'local_endpoint': '10.0.0.2',
+                    'ingress': '8768d2b3-746d-4868-ae0e-e81861c2b4e6',
+                    'weight': 1,
+                    'net_uuid': '8768d2b3-746d-4868-ae0e-e81861c2b4e7',
+                    'network_type': 'vxlan',
+                    'segment_id': 33,
+                    'gw_mac': '00:01:02:03:06:09',
+                    'cidr': '10.0.0.0/8',
+                    'mac_address': '12:34:56:78:cf:23'
+                }],
+                'del_fcs': [],
+                'group_refcnt': 1,
+                'node_type': 'src_node',
+                'egress': '29e38fb2-a643-43b1-baa8-a86596461cd5',
+                'next_group_id': 1,
+                'next_group_parameters': group_params,
+                'nsp': 256,
+                'add_fcs': [],
+                'id': 'node1'
+            }
+        )
+        return self.group_mapping[1]
+
+    def _get_src_node_flowrule(self, node_id, mac_address, group_refcnt,
+                               nsp=256):
+        return {
+            'nsi': 255,
+            'ingress': None,
+            'next_hops': [{
+                'local_endpoint': '10.0.0.2',
+                'ingress': '8768d2b3-746d-4868-ae0e-e81861c2b4e6',
+                'weight': 1,
+                'net_uuid': '8768d2b3-746d-4868-ae0e-e81861c2b4e7',
+                'network_type': 'vxlan',
+                'segment_id': 33,
+                'gw_mac': '00:01:02:03:06:09',
+                'cidr': '10.0.0.0/8',
+                'mac_address': mac_address
+            }],
+            'del_fcs': [],
+            'group_refcnt': group_refcnt,
+            'node_type': 'src_node',
+            'egress': None,
+            'next_group_id': 1,
+            'nsp': nsp,
+            'add_fcs': [],
+            'id': node_id
+        }
+
+    def test_next_hop_flows_shared(self):
+        with mock.patch.object(ovs_lib.OVSBridge, 'add_flow') as add_flow:
+            for node_id in ('node1', 'node2'):
+                self.agent.update_src_node_flow_rules(
+                    self.context,
+                    flowrule_entries=self._get_src_node_flowrule(
+                        node_id, '12:34:56:78:cf:23', 2))
+        # Written once for both flow rules
+        self.assertEqual(2, len([
+            call for call in add_flow.call_args_list
+            if call[1].get('table') == agent.ACROSS_SUBNET_TABLE]))
+
+        self.agent._delete_src_node_flow_rules_with_mpls(
+            self._get_src_node_flowrule('node1', '12:34:56:78:cf:23', 2))
+        self.assertNotIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x100ff, 'table': 5},
+            self.deleted_flows)
+        self.agent._delete_src_node_flow_rules_with_mpls(
+            self._get_src_node_flowrule('node2', '12:34:56:78:cf:23', 1))
+        self.assertIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x100ff, 'table': 5},
+            self.deleted_flows)
+        self.assertEqual({}, self.agent.sfc_next_hop_flows)
+
+    def test_next_hop_flows_per_chain(self):
+        # Two chains sharing the next hop push their own label to it
+        for node_id, nsp in (('node1', 256), ('node2', 257)):
+            self.agent.update_src_node_flow_rules(
+                self.context,
+                flowrule_entries=self._get_src_node_flowrule(
+                    node_id, '12:34:56:78:cf:23', 2, nsp=nsp))
+        self.assertEqual(
+            set([('12:34:56:78:cf:23', 0x100ff),
+                 ('12:34:56:78:cf:23', 0x101ff)]),
+            set(self.agent.sfc_next_hop_flows))
+        next_hop_flows = [
+            flow for flow in self.added_flows
+            if flow.get('table') == agent.ACROSS_SUBNET_TABLE]
+        self.assertEqual(
+            [(0x100ff, 'set_mpls_label:65791'),
+             (0x100ff, 'set_mpls_label:65791'),
+             (0x101ff, 'set_mpls_label:66047'),
+             (0x101ff, 'set_mpls_label:66047')],
+            [(flow['reg4'], [action for action in flow['actions'].split(',')
+                             if action.startswith('set_mpls_label')][0])
+             for flow in next_hop_flows])
+
+        self.agent._delete_src_node_flow_rules_with_mpls(
+            self._get_src_node_flowrule(
+                'node1', '12:34:56:78:cf:23', 2, nsp=256))
+        self.assertIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x100ff, 'table': 5},
+            self.deleted_flows)
+        self.assertNotIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x101ff, 'table': 5},
+            self.deleted_flows)
+        self.assertEqual(
+            [('12:34:56:78:cf:23', 0x101ff)],
+            list(self.agent.sfc_next_hop_flows))
+
+    def test_next_hop_flows_released_on_update(self):
+        self.agent.update_src_node_flow_rules(
+            self.context, flowrule_entries=self._get_src_node_flowrule(
+                'node1', '12:34:56:78:cf:23', 1))
+        self.agent.update_src_node_flow_rules(
+            self.context, flowrule_entries=self._get_src_node_flowrule(
+                'node1', '12:34:56:78:cf:24', 1))
+        self.assertEqual(
+            [('12:34:56:78:cf:24', 0x100ff)],
+            list(self.agent.sfc_next_hop_flows))
+        self.assertIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x100ff, 'table': 5},
+            self.deleted_flows)
+
+    def test_next_hop_flows_unknown_deleted_with_group(self):
+        # After a restart the agent has not seen the flow rules
+        self.agent._delete_src_node_flow_rules_with_mpls(
+            self._get_src_node_flowrule('node1', '12:34:56:78:cf:23', 2))
+        self.assertNotIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x100ff, 'table': 5},
+            self.deleted_flows)
+        self.agent._delete_src_node_flow_rules_with_mpls(
+            self._get_src_node_flowrule('node2', '12:34:56:78:cf:23', 1))
+        self.assertIn(
+            {'dl_dst': '12:34:56:78:cf:23', 'reg4': 0x100ff, 'table': 5},
+            self.deleted_flows)
+
+    def test_update_flow_rules_next_group_lb_fields(self):
+        group = self._test_update_flow_rules_next_group_parameters(
+            {'lb_fields': 'ip_src&tcp_src', 'symmetric': False})
+        self.assertEqual('select', group['type'])
+        self.assertEqual('hash', group['selection_method'])
+        self.assertEqual(['ip_src', 'tcp_src'], group['fields'])
+
+    def test_update_flow_rules_next_group_symmetric(self):
+        group = self._test_update_flow_rules_next_group_parameters(
+            {'lb_fields': '', 'symmetric': True})
+        self.assertEqual('dp_hash', group['selection_method'])
+        self.assertEqual(
+            agent.DP_HASH_SYMMETRIC_L4, group['selection_method_param'])
+        self.assertNotIn('fields', group)
+
+    def test_report_group_stats(self):
+        self._test_update_flow_rules_next_group_parameters(None)
+        self.assertEqual(
+            {1: ['12:34:56:78:cf:23']}, self.agent.sfc_group_buckets)
+        with mock.patch.object(
+            ovs_ext_lib.OVSBridgeExt, 'dump_group_stats',
+            return_value={
+                1: [{'packet_count': 10, 'byte_count': 980}],
+                2: [{'packet_count': 1, 'byte_count': 98}]
+            }
+        ), mock.patch.object(agent.time, 'time', return_value=100.0):
+            self.agent._sfc_report_group_stats()
+        self.plugin_rpc.update_group_stats.assert_called_once_with(
+            self.agent.context, [{
+                'group_id': 1,
+                'buckets': [{
+                    'mac_address': '12:34:56:78:cf:23',
+                    'packet_count': 10,
+                    'byte_count': 980
+                }]
+            }], 100.0)
+
+    def test_report_group_stats_deleted_group(self):
+        self._test_update_flow_rules_next_group_parameters(None)
+        self.agent._delete_src_node_flow_rules_with_mpls({
+            'id': 'node1',
+            'nsp': 256,
+            'nsi': 255,
+            'next_group_id': 1,
+            'group_refcnt': 1,
+            'next_hops': [{'mac_address': '12:34:56:78:cf:23'}],
+            'egress': None,
+            'del_fcs': []
+        })
+        self.assertEqual({}, self.agent.sfc_group_buckets)
+        with mock.patch.object(
+            ovs_ext_lib.OVSBridgeExt, 'dump_group_stats',
+            return_value={}
+        ):
+            self.agent._sfc_report_group_stats()
+        self.assertFalse(self.plugin_rpc.update_group_stats.called)
+
+    def test_report_flow_stats(self):
+        with mock.patch.object(
+            ovs_ext_lib.OVSBridgeExt, 'dump_flow_stats',
+            return_value={
+                0x5fc000000100ff02: {'packet_count': 10, 'byte_count': 980},
+                0x5fc000000100fe01: {'packet_count': 9, 'byte_count': 882},
+                0x5fc000000100fe02: {'packet_count': 8, 'byte_count': 784}
+            }
+        ) as dump_flow_stats, mock.patch.object(
+            agent.time, 'time', return_value=100.0
+        ):
+            self.agent._sfc_report_flow_stats()
+        dump_flow_stats.assert_called_once_with(
+            agent.SFC_COOKIE_PREFIX, agent.SFC_COOKIE_MASK)
+        self.plugin_rpc.update_flow_stats.assert_called_once_with(
+            self.agent.context, [{
+                'nsp': 256, 'nsi': 255,
+                'packets_in': 0, 'bytes_in': 0,
+                'packets_out': 10, 'bytes_out': 980
+            }, {
+                'nsp': 256, 'nsi': 254,
+                'packets_in': 9, 'bytes_in': 882,
+                'packets_out': 8, 'bytes_out': 784
+            }], 100.0)
+
+    def test_report_flow_stats_no_flows(self):
+        with mock.patch.object(
+            ovs_ext_lib.OVSBridgeExt, 'dump_flow_stats', return_value={}
+        ):
+            self.agent._sfc_report_flow_stats()
+        self.assertFalse(self.plugin_rpc.update_flow_stats.called)
+
     def test_update_flow_rules_src_node_next_hops_same_host_add_fcs(self):
         self.port_mapping = {
             '8768d2b3-746d-4868-ae0e-e81861c2b4e6': {
@@ -853,26 +1168,37 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
                 'dl_type': 2048,
                 'nw_src': '10.0.0.0/8',
                 'priority': 1,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
                 'actions': (
-                    'push_mpls:0x8847,set_mpls_label:65791,set_mpls_ttl:255,'
-                    'mod_vlan_vid:1,,mod_dl_src:00:01:02:03:06:09, '
-                    'resubmit(,10)'),
+                    'mod_dl_src:00:01:02:03:06:09,push_mpls:0x8847,'
+                    'set_mpls_label:65791,set_mpls_ttl:255,'
+                    'mod_vlan_vid:1,,resubmit(,10)'),
                 'dl_dst': '12:34:56:78:cf:23',
                 'priority': 0,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
-                'actions': 'group:1',
+                'actions': 'load:0x100ff->NXM_NX_REG4[],group:1',
+                'cookie': 0x5fc000000100ff02,
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
                 'priority': 30,
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
+            }, {
+                'actions': 'resubmit(,7)',
+                'cookie': 0x5fc0000000000003,
+                'dl_type': 2048,
+                'in_port': 42,
+                'priority': 30,
+                'reg7': '0/0x1',
+                'table': 0
             }]
         )
         self.assertEqual(
@@ -961,27 +1287,40 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
                 'dl_type': 2048,
                 'nw_src': '10.0.0.0/8',
                 'priority': 1,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
                 'actions': (
-                    'push_mpls:0x8847,set_mpls_label:65791,set_mpls_ttl:255,'
-                    'mod_vlan_vid:1,,mod_dl_src:00:01:02:03:06:09, output:2'),
+                    'mod_dl_src:00:01:02:03:06:09,push_mpls:0x8847,'
+                    'set_mpls_label:65791,set_mpls_ttl:255,'
+                    'mod_vlan_vid:1,,output:2'),
                 'dl_dst': '12:34:56:78:cf:23',
                 'priority': 0,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
-                'actions': 'group:1',
+                'actions': 'load:0x100ff->NXM_NX_REG4[],group:1',
+                'cookie': 0x5fc000000100ff02,
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
                 'priority': 30,
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
+            }, {
+                'actions': 'resubmit(,7)',
+                'cookie': 0x5fc0000000000003,
+                'dl_type': 2048,
+                'in_port': 42,
+                'priority': 30,
+                'reg7': '0/0x1',
+                'table': 0
             }, {
                 'actions': 'strip_vlan, pop_mpls:0x0800,output:6',
+                'cookie': 0x5fc000000100ff01,
                 'dl_dst': '00:01:02:03:05:07',
                 'dl_type': 34887,
                 'dl_vlan': 0,
@@ -1076,28 +1415,40 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
                 'dl_type': 2048,
                 'nw_src': '10.0.0.0/8',
                 'priority': 1,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
                 'actions': (
-                    'push_mpls:0x8847,set_mpls_label:65791,set_mpls_ttl:255,'
-                    'mod_vlan_vid:1,,mod_dl_src:00:01:02:03:06:09, '
-                    'resubmit(,10)'),
+                    'mod_dl_src:00:01:02:03:06:09,push_mpls:0x8847,'
+                    'set_mpls_label:65791,set_mpls_ttl:255,'
+                    'mod_vlan_vid:1,,resubmit(,10)'),
                 'dl_dst': '12:34:56:78:cf:23',
                 'priority': 0,
+                'reg4': 0x100ff,
                 'table': 5
             }, {
-                'actions': 'group:1',
+                'actions': 'load:0x100ff->NXM_NX_REG4[],group:1',
+                'cookie': 0x5fc000000100ff02,
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
                 'priority': 30,
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
+            }, {
+                'actions': 'resubmit(,7)',
+                'cookie': 0x5fc0000000000003,
+                'dl_type': 2048,
+                'in_port': 42,
+                'priority': 30,
+                'reg7': '0/0x1',
+                'table': 0
             }, {
                 'actions': 'strip_vlan, pop_mpls:0x0800,output:6',
+                'cookie': 0x5fc000000100ff01,
                 'dl_dst': '00:01:02:03:05:07',
                 'dl_type': 34887,
                 'dl_vlan': 0,
@@ -1154,6 +1505,7 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         )
         self.assertEqual(
             self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100fe01/-1',
                 'dl_dst': '00:01:02:03:05:07',
                 'dl_type': 34887,
                 'mpls_label': 65791,
@@ -1251,15 +1603,17 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         )
         self.assertEqual(
             self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100fe02/-1',
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
             }, {
+                'cookie': '0x5fc000000100fe01/-1',
                 'dl_dst': '00:01:02:03:05:07',
                 'dl_type': 34887,
                 'mpls_label': 65791,
@@ -1272,6 +1626,207 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
             ]
         )
 
+    def _get_mpls_correlated_flowrule(self, next_group_id=None,
+                                      next_hops=None):
+        self.port_mapping = {
+            'dd7374b9-a6ac-4a66-a4a6-7d3dee2a1579': {
+                'port_name': 'src_port',
+                'ofport': 6,
+                'vif_mac': '00:01:02:03:05:07',
+            },
+            '2f1d2140-42ce-4979-9542-7ef25796e536': {
+                'port_name': 'dst_port',
+                'ofport': 42,
+                'vif_mac': '00:01:02:03:06:08',
+            }
+        }
+        flow_classifier = {
+            'source_port_range_min': 100,
+            'destination_ip_prefix': u'10.200.0.0/16',
+            'protocol': u'tcp',
+            'l7_parameters': {},
+            'source_port_range_max': 100,
+            'source_ip_prefix': '10.100.0.0/16',
+            'destination_port_range_min': 100,
+            'ethertype': 'IPv4',
+            'destination_port_range_max': 100,
+        }
+        return {
+            'nsi': 254,
+            'ingress': u'dd7374b9-a6ac-4a66-a4a6-7d3dee2a1579',
+            'next_hops': next_hops,
+            'del_fcs': [flow_classifier],
+            'group_refcnt': 1,
+            'node_type': 'sf_node',
+            'egress': u'2f1d2140-42ce-4979-9542-7ef25796e536',
+            'next_group_id': next_group_id,
+            'nsp': 256,
+            'add_fcs': [flow_classifier],
+            'correlation': 'mpls',
+            'id': uuidutils.generate_uuid()
+        }
+
+    def test_update_flow_rules_mpls_correlated_sf_node(self):
+        self.agent.update_flow_rules(
+            self.context,
+            flowrule_entries=self._get_mpls_correlated_flowrule())
+        self.assertEqual(
+            self.added_flows, self.default_flow_rules + [{
+                'actions': 'pop_mpls:0x0800,normal',
+                'cookie': 0x5fc000000100fe02,
+                'dl_type': 34887,
+                'in_port': 42,
+                'mpls_label': 65791,
+                'priority': 30,
+                'table': 0
+            }, {
+                'actions': 'strip_vlan, output:6',
+                'cookie': 0x5fc000000100fe01,
+                'dl_dst': '00:01:02:03:05:07',
+                'dl_type': 34887,
+                'dl_vlan': 0,
+                'mpls_label': 65791,
+                'priority': 1,
+                'table': 10
+            }]
+        )
+        # No classifier is matched again on the egress of the SF
+        self.assertEqual({}, self.agent.sfc_classifier_flows)
+
+    def test_update_flow_rules_mpls_correlated_sf_node_next_group(self):
+        self.agent.update_flow_rules(
+            self.context,
+            flowrule_entries=self._get_mpls_correlated_flowrule(
+                next_group_id=1, next_hops=[{
+                    'local_endpoint': '10.0.0.1',
+                    'ingress': '8768d2b3-746d-4868-ae0e-e81861c2b4e6',
+                    'weight': 1,
+                    'net_uuid': '8768d2b3-746d-4868-ae0e-e81861c2b4e7',
+                    'network_type': 'vxlan',
+                    'segment_id': 33,
+                    'gw_mac': '00:01:02:03:06:09',
+                    'cidr': '10.0.0.0/8',
+                    'mac_address': '12:34:56:78:cf:23'
+                }]))
+        self.assertIn({
+            'actions': 'pop_mpls:0x0800,load:0x100fe->NXM_NX_REG4[],group:1',
+            'cookie': 0x5fc000000100fe02,
+            'dl_type': 34887,
+            'in_port': 42,
+            'mpls_label': 65791,
+            'priority': 30,
+            'table': 0
+        }, self.added_flows)
+        self.assertEqual([], [
+            flow for flow in self.added_flows
+            if flow.get('table') == agent.CLASSIFIER_TABLE and
+            flow.get('priority')
+        ])
+
+    def test_delete_flow_rules_mpls_correlated_sf_node(self):
+        self.agent.delete_flow_rules(
+            self.context,
+            flowrule_entries=self._get_mpls_correlated_flowrule())
+        self.assertEqual(
+            self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100fe02/-1',
+                'dl_type': 34887,
+                'in_port': 42,
+                'mpls_label': 65791,
+                'table': 0
+            }, {
+                'cookie': '0x5fc000000100fe01/-1',
+                'dl_dst': '00:01:02:03:05:07',
+                'dl_type': 34887,
+                'mpls_label': 65791,
+                'table': 10
+            }]
+        )
+
+    def test_init_agent_eth_nsh(self):
+        cfg.CONF.set_override('sfc_encap_mode', 'eth_nsh', 'AGENT')
+        self.init_agent()
+        self.assertEqual(
+            self.added_flows, [{
+                'actions': 'resubmit(,10)', 'dl_type': 0x894f,
+                'priority': 20, 'table': 0
+            }] + self.default_flow_rules[1:]
+        )
+
+    def test_init_agent_vxlan_nsh_not_supported(self):
+        cfg.CONF.set_override('sfc_encap_mode', 'vxlan_nsh', 'AGENT')
+        agent.SfcPluginApi.reset_mock()
+        self.assertRaises(agent.FeatureSupportError, self.init_agent)
+        # the mode is checked before the RPC is set up
+        self.assertFalse(agent.SfcPluginApi.called)
+
+    def test_update_delete_flow_rules_eth_nsh(self):
+        cfg.CONF.set_override('sfc_encap_mode', 'eth_nsh', 'AGENT')
+        self.init_agent()
+        flowrule = self._get_mpls_correlated_flowrule(
+            next_group_id=1, next_hops=[{
+                'local_endpoint': '10.0.0.2',
+                'ingress': '8768d2b3-746d-4868-ae0e-e81861c2b4e6',
+                'weight': 1,
+                'net_uuid': '8768d2b3-746d-4868-ae0e-e81861c2b4e7',
+                'network_type': 'vxlan',
+                'segment_id': 33,
+                'gw_mac': '00:01:02:03:06:09',
+                'cidr': '10.0.0.0/8',
+                'mac_address': '12:34:56:78:cf:23'
+            }])
+        flowrule.pop('correlation')
+        self.agent.update_flow_rules(
+            self.context, flowrule_entries=flowrule)
+        push_nsh = (
+            'move:NXM_OF_ETH_SRC[]->NXM_NX_XXREG0[0..47],'
+            'encap(nsh(md_type=1)),set_field:0x100->nsh_spi,'
+            'set_field:254->nsh_si,set_field:33->nsh_c1,encap(ethernet),'
+            'move:NXM_NX_XXREG0[0..47]->NXM_OF_ETH_SRC[],'
+            'mod_dl_dst:12:34:56:78:cf:23,mod_vlan_vid:1,')
+        self.assertIn({
+            'actions': push_nsh + ',output:2',
+            'dl_dst': '12:34:56:78:cf:23',
+            'dl_type': 2048,
+            'nw_src': '10.0.0.0/8',
+            'priority': 1,
+            'reg4': 0x100fe,
+            'table': 5
+        }, self.added_flows)
+        self.assertIn({
+            # the source mac of the original frame is rewritten
+            'actions': (
+                'mod_dl_src:00:01:02:03:06:09,' + push_nsh + ',output:2'),
+            'dl_dst': '12:34:56:78:cf:23',
+            'priority': 0,
+            'reg4': 0x100fe,
+            'table': 5
+        }, self.added_flows)
+        self.assertIn({
+            'actions': 'strip_vlan, decap(),decap(),output:6',
+            'cookie': 0x5fc000000100fe01,
+            'dl_dst': '00:01:02:03:05:07',
+            'dl_type': 0x894f,
+            'dl_vlan': 0,
+            'nsh_mdtype': 1,
+            'nsh_si': 255,
+            'nsh_spi': 256,
+            'priority': 1,
+            'table': 10
+        }, self.added_flows)
+
+        self.agent.delete_flow_rules(
+            self.context, flowrule_entries=flowrule)
+        self.assertIn({
+            'cookie': '0x5fc000000100fe01/-1',
+            'dl_dst': '00:01:02:03:05:07',
+            'dl_type': 0x894f,
+            'nsh_mdtype': 1,
+            'nsh_si': 255,
+            'nsh_spi': 256,
+            'table': 10
+        }, self.deleted_flows)
+
     def test_delete_flow_rules_src_node_del_fcs(self):
         self.port_mapping = {
             'dd7374b9-a6ac-4a66-a4a6-7d3dee2a1579': {
@@ -1316,12 +1871,13 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         )
         self.assertEqual(
             self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100fe02/-1',
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
             }]
@@ -1386,16 +1942,18 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         )
         self.assertEqual(
             self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100ff02/-1',
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
             }, {
                 'dl_dst': '12:34:56:78:cf:23',
+                'reg4': 0x100ff,
                 'table': 5
             }]
         )
@@ -1457,21 +2015,24 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
         )
         self.assertEqual(
             self.deleted_flows, self.default_delete_flow_rules + [{
+                'cookie': '0x5fc000000100ff02/-1',
                 'dl_type': 2048,
                 'in_port': 42,
                 'nw_dst': u'10.200.0.0/16',
                 'nw_proto': 6,
                 'nw_src': '10.100.0.0/16',
-                'table': 0,
+                'table': 7,
                 'tp_dst': '0x64/0xffff',
                 'tp_src': '0x64/0xffff'
             }, {
+                'cookie': '0x5fc000000100ff01/-1',
                 'dl_dst': '00:01:02:03:05:07',
                 'dl_type': 34887,
                 'mpls_label': 65792,
                 'table': 10
             }, {
                 'dl_dst': '12:34:56:78:cf:23',
+                'reg4': 0x100ff,
                 'table': 5
             }]
         )
@@ -1489,6 +2050,10 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
                 'dl_type': 34887,
                 'priority': 20,
                 'table': 0
+            }, {
+                'actions': 'load:1->NXM_NX_REG7[0],resubmit(,0)',
+                'priority': 0,
+                'table': 7
             }, {
                 'actions': 'drop',
                 'priority': 0,
@@ -1496,3 +2061,351 @@ class OVSSfcAgentTestCase(base.BaseTestCase):
             }]
         )
         self.assertEqual(self.group_mapping, {})
+
+    def test_update_flow_rules_next_revision(self):
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'revision': 1})
+            mock_update.assert_called_once_with({'revision': 1})
+        self.assertEqual(1, self.agent.sfc_revision)
+        self.plugin_rpc.get_flowrule_changes.assert_called_once_with(
+            self.agent.context, None)
+
+    def test_update_flow_rules_applied_revision(self):
+        self.agent.sfc_revision = 3
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'revision': 3})
+            self.assertFalse(mock_update.called)
+        self.assertEqual(3, self.agent.sfc_revision)
+
+    def test_update_flow_rules_missed_revisions(self):
+        self.flowrule_changes = {'revision': 3, 'changes': [{
+            'revision': 2,
+            'method': 'delete_src_node_flow_rules',
+            'flowrule': {'id': 'node1'}
+        }, {
+            'revision': 3,
+            'method': 'update_flow_rules',
+            'flowrule': {'id': 'node2', 'revision': 3}
+        }]}
+        self.agent.sfc_revision = 1
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update, mock.patch.object(
+            self.agent, '_delete_src_node_flow_rules'
+        ) as mock_delete:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'id': 'node2', 'revision': 3})
+            mock_delete.assert_called_once_with({'id': 'node1'})
+            mock_update.assert_called_once_with(
+                {'id': 'node2', 'revision': 3})
+        self.plugin_rpc.get_flowrule_changes.assert_called_with(
+            self.agent.context, 1)
+        self.assertEqual(3, self.agent.sfc_revision)
+
+    def test_update_flow_rules_missed_revisions_resync(self):
+        self.flowrule_changes = {'revision': 2000, 'changes': None}
+        self.agent.sfc_revision = 1
+        self.agent.sfc_classifiers['fc1'] = (
+            'revision', self._get_flow_classifier('fc1'))
+        self.agent.fullsync = False
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'revision': 2000})
+            self.assertFalse(mock_update.called)
+        self.assertTrue(self.agent.fullsync)
+        self.assertEqual(2000, self.agent.sfc_revision)
+        self.assertEqual({}, self.agent.sfc_classifiers)
+
+    def test_update_flow_rules_no_flowrule_changes(self):
+        # the plugin does not keep the flow rule changes
+        self.agent.sfc_revision = None
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'revision': 5})
+            mock_update.assert_called_once_with({'revision': 5})
+        self.assertIsNone(self.agent.sfc_revision)
+        self.plugin_rpc.get_flowrule_changes.assert_called_once_with(
+            self.agent.context, None)
+
+    def test_update_flow_rules_missed_revisions_unsupported(self):
+        self.flowrule_changes = None
+        self.agent.sfc_revision = 1
+        self.agent.fullsync = False
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'revision': 3})
+            self.assertFalse(mock_update.called)
+        self.assertTrue(self.agent.fullsync)
+        self.assertIsNone(self.agent.sfc_revision)
+
+    def _get_flow_classifier(self, fc_id):
+        return {
+            'id': fc_id,
+            'ethertype': 'IPv4',
+            'protocol': 'tcp',
+            'source_port_range_min': 100,
+            'source_port_range_max': 200,
+            'destination_port_range_min': None,
+            'destination_port_range_max': None,
+            'source_ip_prefix': '10.0.0.0/24',
+            'destination_ip_prefix': None,
+            'logical_source_port': 'port1',
+            'logical_destination_port': None
+        }
+
+    def test_port_index(self):
+        self.get_vif_port.stop()
+        self.get_vlan_by_port.stop()
+        vif_port = ovs_lib.VifPort(
+            'port1', 6, 'port-1', '00:01:02:03:05:07', self.agent.int_br)
+        with mock.patch.object(
+            agent.ovs_neutron_agent.OVSNeutronAgent, 'treat_vif_port',
+            return_value=True
+        ):
+            self.assertTrue(self.agent.treat_vif_port(
+                vif_port, 'port-1', 'net-1', 'vxlan', None, 33, True, [],
+                'compute', False))
+        self.agent.local_vlan_map['net-1'] = mock.Mock(vlan=5)
+        with mock.patch.object(
+            ovs_lib.OVSBridge, 'get_vif_port_by_id'
+        ) as get_vif_port_by_id:
+            self.agent._setup_ingress_flow_rules_with_mpls(
+                {'ingress': 'port-1', 'node_type': 'sf_node',
+                 'nsp': 256, 'nsi': 254})
+            self.assertFalse(get_vif_port_by_id.called)
+        self.assertEqual({
+            'actions': 'strip_vlan, pop_mpls:0x0800,output:6',
+            'cookie': 0x5fc000000100fe01,
+            'dl_dst': '00:01:02:03:05:07',
+            'dl_type': 34887,
+            'dl_vlan': 5,
+            'mpls_label': 65791,
+            'priority': 1,
+            'table': 10
+        }, self.added_flows[-1])
+
+        with mock.patch.object(
+            agent.ovs_neutron_agent.OVSNeutronAgent, 'port_unbound'
+        ) as port_unbound:
+            self.agent.port_unbound('port-1')
+            port_unbound.assert_called_once_with('port-1', net_uuid=None)
+        self.assertIsNone(self.agent._get_vif_port('port-1'))
+        self.assertIsNone(self.agent._get_vlan_by_port('port-1'))
+        # tearDown stops it
+        self.get_vlan_by_port.start()
+
+    def _get_classifier_gotos(self, flows):
+        return [flow for flow in flows
+                if flow.get('table') == 0 and 'reg7' in flow]
+
+    def test_classifier_goto_shared_by_port_classifiers(self):
+        self.port_mapping = {
+            '29e38fb2-a643-43b1-baa8-a86596461cd5': {
+                'port_name': 'port2',
+                'ofport': 42,
+                'vif_mac': '00:01:02:03:06:08',
+            }
+        }
+        flowrule = {
+            'nsp': 256, 'nsi': 254,
+            'egress': '29e38fb2-a643-43b1-baa8-a86596461cd5'
+        }
+        fc1 = self._get_flow_classifier('fc1')
+        fc2 = dict(self._get_flow_classifier('fc2'),
+                   source_ip_prefix='10.1.0.0/24')
+        self.agent._setup_local_switch_flows_on_int_br(
+            flowrule, [fc1, fc2], 'group:1')
+        self.assertEqual([{
+            'actions': 'resubmit(,7)',
+            'cookie': 0x5fc0000000000003,
+            'dl_type': 2048,
+            'in_port': 42,
+            'priority': 30,
+            'reg7': '0/0x1',
+            'table': 0
+        }], self._get_classifier_gotos(self.added_flows))
+
+        self.agent._setup_local_switch_flows_on_int_br(
+            flowrule, [fc1], None, add_flow=False)
+        self.assertEqual(
+            [], self._get_classifier_gotos(self.deleted_flows))
+        self.agent._setup_local_switch_flows_on_int_br(
+            flowrule, [fc2], None, add_flow=False)
+        self.assertEqual([{
+            'cookie': '0x5fc0000000000003/-1',
+            'dl_type': 2048,
+            'in_port': 42,
+            'reg7': '0/0x1',
+            'table': 0
+        }], self._get_classifier_gotos(self.deleted_flows))
+        self.assertEqual({}, self.agent.sfc_classifier_flows)
+
+    def test_classifier_goto_any_port(self):
+        flowrule = {'nsp': 256, 'nsi': 255, 'egress': None}
+        fc1 = self._get_flow_classifier('fc1')
+        self.agent._setup_local_switch_flows_on_int_br(
+            flowrule, [fc1], 'group:1', match_inport=False)
+        self.assertEqual([{
+            'actions': 'resubmit(,7)',
+            'cookie': 0x5fc0000000000004,
+            'dl_type': 2048,
+            'priority': 20,
+            'reg7': '0/0x1',
+            'table': 0
+        }], self._get_classifier_gotos(self.added_flows))
+        self.agent._setup_local_switch_flows_on_int_br(
+            flowrule, [fc1], None, add_flow=False, match_inport=False)
+        self.assertEqual([{
+            'cookie': '0x5fc0000000000004/-1',
+            'dl_type': 2048,
+            'reg7': '0/0x1',
+            'table': 0
+        }], self._get_classifier_gotos(self.deleted_flows))
+
+    def test_update_flow_rules_compact_fetches_missing_classifiers(self):
+        fc1 = self._get_flow_classifier('fc1')
+        fc2 = self._get_flow_classifier('fc2')
+        self.agent.sfc_classifiers['fc1'] = (
+            flowrule_codec.get_classifier_revision(fc1), fc1)
+        self.plugin_rpc.get_flow_classifiers = mock.Mock(
+            return_value=[fc2])
+        flowrule = {
+            'id': 'node1', 'nsp': 256, 'nsi': 255, 'add_fcs': [fc1, fc2],
+            'del_fcs': [], 'next_hops': [{'mac_address': 'mac1'}]
+        }
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ) as mock_update:
+            self.agent.update_flow_rules(
+                self.context,
+                flowrule_entries=flowrule_codec.encode_flowrule(flowrule))
+            mock_update.assert_called_once_with(flowrule)
+            self.agent.update_flow_rules(
+                self.context,
+                flowrule_entries=flowrule_codec.encode_flowrule(flowrule))
+        self.plugin_rpc.get_flow_classifiers.assert_called_once_with(
+            self.agent.context, ['fc2'])
+
+    def test_update_flow_rules_legacy_caches_classifiers(self):
+        fc1 = dict(self._get_flow_classifier('fc1'), name='fc1')
+        self.plugin_rpc.get_flow_classifiers = mock.Mock()
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ), mock.patch.object(
+            self.agent, '_delete_flow_rules'
+        ) as mock_delete:
+            self.agent.update_flow_rules(
+                self.context, flowrule_entries={'add_fcs': [fc1]})
+            self.assertEqual(
+                self._get_flow_classifier('fc1'),
+                self.agent.sfc_classifiers['fc1'][1])
+            self.agent.delete_flow_rules(
+                self.context, flowrule_entries=flowrule_codec.encode_flowrule(
+                    {'del_fcs': [fc1]}))
+            mock_delete.assert_called_once_with(
+                {'del_fcs': [self._get_flow_classifier('fc1')]})
+        self.assertNotIn('fc1', self.agent.sfc_classifiers)
+        self.assertFalse(self.plugin_rpc.get_flow_classifiers.called)
+
+    def test_delete_flow_rules_evicts_unused_classifiers(self):
+        fc1 = self._get_flow_classifier('fc1')
+        self.plugin_rpc.get_flow_classifiers = mock.Mock(
+            return_value=[fc1])
+        with mock.patch.object(
+            self.agent, '_update_flow_rules'
+        ), mock.patch.object(
+            self.agent, '_delete_flow_rules'
+        ):
+            for node_id in ('node1', 'node2'):
+                self.agent.update_flow_rules(
+                    self.context,
+                    flowrule_entries=flowrule_codec.encode_flowrule(
+                        {'id': node_id, 'add_fcs': [fc1]}))
+            self.agent.delete_flow_rules(
+                self.context, flowrule_entries=flowrule_codec.encode_flowrule(
+                    {'id': 'node1', 'del_fcs': [fc1]}))
+            self.assertIn('fc1', self.agent.sfc_classifiers)
+            self.agent.delete_flow_rules(
+                self.context, flowrule_entries=flowrule_codec.encode_flowrule(
+                    {'id': 'node2', 'del_fcs': [fc1]}))
+        self.assertNotIn('fc1', self.agent.sfc_classifiers)
+        self.assertEqual({}, self.agent.sfc_classifier_users)
+        self.plugin_rpc.get_flow_classifiers.assert_called_once_with(
+            self.agent.context, ['fc1'])
+
+    def test_delete_flow_rules_unknown_classifier_resync(self):
+        fc1 = self._get_flow_classifier('fc1')
+        fc2 = self._get_flow_classifier('fc2')
+        self.agent.sfc_classifiers['fc2'] = (
+            flowrule_codec.get_classifier_revision(fc2), fc2)
+        self.plugin_rpc.get_flow_classifiers = mock.Mock(return_value=[])
+        self.agent.fullsync = False
+        with mock.patch.object(
+            self.agent, '_delete_flow_rules'
+        ) as mock_delete:
+            self.agent.delete_flow_rules(
+                self.context, flowrule_entries=flowrule_codec.encode_flowrule(
+                    {'id': 'node1', 'del_fcs': [fc1]}))
+            mock_delete.assert_called_once_with(
+                {'id': 'node1', 'del_fcs': []})
+        self.assertTrue(self.agent.fullsync)
+        self.assertEqual({}, self.agent.sfc_classifiers)
+
+
+class SfcPluginApiTestCase(base.BaseTestCase):
+    def setUp(self):
+        super(SfcPluginApiTestCase, self).setUp()
+        self.client = mock.Mock()
+        self.get_client = mock.patch.object(
+            n_rpc, 'get_client', return_value=self.client).start()
+        self.plugin_api = agent.SfcPluginApi('topic', 'host')
+
+    def test_get_flowrule_changes(self):
+        cctxt = self.client.prepare.return_value
+        cctxt.call.return_value = {'revision': 1, 'changes': []}
+        self.assertEqual(
+            {'revision': 1, 'changes': []},
+            self.plugin_api.get_flowrule_changes('context', 0))
+        self.client.prepare.assert_called_once_with(version='1.1')
+        cctxt.call.assert_called_once_with(
+            'context', 'get_flowrule_changes', host='host', revision=0)
+
+    def _test_get_flowrule_changes_unsupported(self, error):
+        self.client.prepare.return_value.call.side_effect = error
+        self.assertIsNone(
+            self.plugin_api.get_flowrule_changes('context', None))
+        self.get_client.assert_called_with(
+            self.plugin_api.target, version_cap='1.0')
+
+    def test_get_flowrule_changes_unsupported_version(self):
+        self._test_get_flowrule_changes_unsupported(
+            oslo_messaging.UnsupportedVersion('1.1'))
+
+    def test_get_flowrule_changes_remote_unsupported_version(self):
+        self._test_get_flowrule_changes_unsupported(
+            oslo_messaging.RemoteError('UnsupportedVersion'))
+
+    def test_get_flowrule_changes_remote_error(self):
+        self.client.prepare.return_value.call.side_effect = (
+            oslo_messaging.RemoteError('ValueError'))
+        self.assertRaises(
+            oslo_messaging.RemoteError,
+            self.plugin_api.get_flowrule_changes, 'context', None)
+
+    def test_get_flowrule_changes_capped(self):
+        self.client.can_send_version.return_value = False
+        self.assertIsNone(
+            self.plugin_api.get_flowrule_changes('context', None))
+        self.assertFalse(self.client.prepare.called)
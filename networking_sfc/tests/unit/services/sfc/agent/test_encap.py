@@ -0,0 +1,88 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.agent import encap
+
+
+class MplsEncapTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(MplsEncapTestCase, self).setUp()
+        self.encap = encap.MplsEncap()
+
+    def test_get_push_actions(self):
+        self.assertEqual(
+            'push_mpls:0x8847,set_mpls_label:65791,set_mpls_ttl:255,'
+            'mod_vlan_vid:1,',
+            self.encap.get_push_actions(
+                256, 255, 1, {'mac_address': '12:34:56:78:cf:23'}))
+
+    def test_get_push_actions_src_mac(self):
+        self.assertEqual(
+            'mod_dl_src:00:01:02:03:06:09,push_mpls:0x8847,'
+            'set_mpls_label:65791,set_mpls_ttl:255,mod_vlan_vid:1,',
+            self.encap.get_push_actions(
+                256, 255, 1, {'mac_address': '12:34:56:78:cf:23'},
+                src_mac='00:01:02:03:06:09'))
+
+    def test_get_match(self):
+        self.assertEqual(
+            {'dl_type': 0x8847, 'mpls_label': 65791},
+            self.encap.get_match(256, 255))
+
+
+class NshEncapTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(NshEncapTestCase, self).setUp()
+        self.encap = encap.NshEncap()
+
+    def test_get_push_actions(self):
+        self.assertEqual(
+            'move:NXM_OF_ETH_SRC[]->NXM_NX_XXREG0[0..47],'
+            'encap(nsh(md_type=1)),set_field:0xabcdef->nsh_spi,'
+            'set_field:255->nsh_si,set_field:33->nsh_c1,encap(ethernet),'
+            'move:NXM_NX_XXREG0[0..47]->NXM_OF_ETH_SRC[],'
+            'mod_dl_dst:12:34:56:78:cf:23,mod_vlan_vid:1,',
+            self.encap.get_push_actions(
+                0xabcdef, 255, 1,
+                {'mac_address': '12:34:56:78:cf:23', 'segment_id': 33}))
+
+    def test_get_push_actions_src_mac(self):
+        # The source mac of the original frame is rewritten before the
+        # NSH header is pushed, the new Ethernet header copies it
+        actions = self.encap.get_push_actions(
+            256, 255, 1,
+            {'mac_address': '12:34:56:78:cf:23', 'segment_id': 33},
+            src_mac='00:01:02:03:06:09')
+        self.assertTrue(actions.startswith(
+            'mod_dl_src:00:01:02:03:06:09,'
+            'move:NXM_OF_ETH_SRC[]->NXM_NX_XXREG0[0..47],'
+            'encap(nsh(md_type=1)),'))
+        self.assertEqual(1, actions.count('mod_dl_src'))
+
+    def test_get_push_actions_no_segment(self):
+        self.assertIn(
+            'set_field:0->nsh_c1,',
+            self.encap.get_push_actions(
+                256, 255, 1,
+                {'mac_address': '12:34:56:78:cf:23', 'segment_id': None}))
+
+    def test_get_match(self):
+        self.assertEqual(
+            {'dl_type': 0x894f, 'nsh_mdtype': 1, 'nsh_spi': 0xabcdef,
+             'nsh_si': 255},
+            self.encap.get_match(0xabcdef, 255))
@@ -0,0 +1,117 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron_lib import exceptions
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.common import flowrule_codec
+
+
+class FlowruleCodecTestCase(base.BaseTestCase):
+
+    def _get_flow_classifier(self, fc_id, source_ip_prefix):
+        return {
+            'id': fc_id,
+            'ethertype': 'IPv4',
+            'protocol': 'tcp',
+            'source_port_range_min': 100,
+            'source_port_range_max': 200,
+            'destination_port_range_min': None,
+            'destination_port_range_max': None,
+            'source_ip_prefix': source_ip_prefix,
+            'destination_ip_prefix': None,
+            'logical_source_port': 'port1',
+            'logical_destination_port': None
+        }
+
+    def _get_flowrule(self):
+        return {
+            'id': 'node1',
+            'nsp': 256,
+            'nsi': 254,
+            'node_type': 'sf_node',
+            'host': 'test1',
+            'egress': 'port2',
+            'next_group_id': 1,
+            'revision': 3,
+            'add_fcs': [self._get_flow_classifier('fc1', '10.0.0.0/24')],
+            'del_fcs': [self._get_flow_classifier('fc2', '10.0.1.0/24')],
+            'next_hops': [{
+                'local_endpoint': '10.0.0.2',
+                'weight': 1,
+                'mac_address': '12:34:56:78:cf:23',
+                'in_mac_address': '12:34:56:78:cf:24'
+            }],
+            'unknown_key': 'value'
+        }
+
+    def test_encode_flowrule(self):
+        flowrule = self._get_flowrule()
+        compact = flowrule_codec.encode_flowrule(flowrule)
+        self.assertTrue(flowrule_codec.is_compact(compact))
+        self.assertFalse(flowrule_codec.is_compact(flowrule))
+        self.assertEqual(1, compact['v'])
+        self.assertEqual(256, compact['p'])
+        self.assertEqual('value', compact['unknown_key'])
+        self.assertEqual(
+            [{'le': '10.0.0.2', 'w': 1, 'm': '12:34:56:78:cf:23',
+              'in_mac_address': '12:34:56:78:cf:24'}],
+            compact['nh'])
+        self.assertEqual(
+            [['fc1', flowrule_codec.get_classifier_revision(
+                flowrule['add_fcs'][0])],
+             ['fc2', flowrule_codec.get_classifier_revision(
+                 flowrule['del_fcs'][0])]],
+            flowrule_codec.get_classifier_refs(compact))
+
+    def test_decode_flowrule(self):
+        flowrule = self._get_flowrule()
+        compact = flowrule_codec.encode_flowrule(flowrule)
+        classifiers = dict(
+            (fc['id'], fc)
+            for fc in flowrule['add_fcs'] + flowrule['del_fcs'])
+        self.assertEqual(
+            flowrule, flowrule_codec.decode_flowrule(compact, classifiers))
+
+    def test_decode_flowrule_missing_classifier(self):
+        flowrule = self._get_flowrule()
+        compact = flowrule_codec.encode_flowrule(flowrule)
+        decoded = flowrule_codec.decode_flowrule(
+            compact, {'fc1': flowrule['add_fcs'][0]})
+        self.assertEqual(flowrule['add_fcs'], decoded['add_fcs'])
+        self.assertEqual([], decoded['del_fcs'])
+
+    def test_decode_flowrule_unsupported_version(self):
+        compact = flowrule_codec.encode_flowrule(self._get_flowrule())
+        compact['v'] = 2
+        self.assertRaises(
+            exceptions.InvalidInput,
+            flowrule_codec.decode_flowrule, compact, {})
+
+    def test_get_classifier_revision(self):
+        fc1 = self._get_flow_classifier('fc1', '10.0.0.0/24')
+        fc2 = self._get_flow_classifier('fc1', '10.0.1.0/24')
+        self.assertEqual(
+            flowrule_codec.get_classifier_revision(fc1),
+            flowrule_codec.get_classifier_revision(dict(fc1, name='name')))
+        self.assertNotEqual(
+            flowrule_codec.get_classifier_revision(fc1),
+            flowrule_codec.get_classifier_revision(fc2))
+
+    def test_get_classifier(self):
+        fc = self._get_flow_classifier('fc1', '10.0.0.0/24')
+        self.assertEqual(
+            fc, flowrule_codec.get_classifier(
+                dict(fc, name='name', tenant_id='tenant')))
@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import mock
+
 from neutron_lib import exceptions
 
 from neutron.tests import base
@@ -92,3 +94,99 @@ class GetPortMaskTestCase(base.BaseTestCase):
         self.assertEqual(
             masks, ['0x7fff/0xffff', '0x8000/0x8000']
         )
+
+
+class BuildGroupExprStrTestCase(base.BaseTestCase):
+
+    def test_select_group(self):
+        group_str = ovs_ext_lib._build_group_expr_str({
+            'group_id': 1,
+            'type': 'select',
+            'buckets': 'bucket=weight=1,output:1'
+        }, 'add')
+        self.assertEqual(
+            'group_id=1,type=select,bucket=weight=1,output:1', group_str)
+
+    def test_select_group_hash_fields(self):
+        group_str = ovs_ext_lib._build_group_expr_str({
+            'group_id': 1,
+            'selection_method': 'hash',
+            'fields': ['ip_src', 'ip_dst'],
+            'buckets': 'bucket=weight=1,output:1'
+        }, 'add')
+        self.assertEqual(
+            'group_id=1,selection_method=hash,fields(ip_src,ip_dst),'
+            'bucket=weight=1,output:1', group_str)
+
+    def test_missing_buckets(self):
+        self.assertRaises(
+            exceptions.InvalidInput,
+            ovs_ext_lib._build_group_expr_str,
+            {'group_id': 1, 'type': 'select'}, 'mod')
+
+
+class DoActionGroupsTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(DoActionGroupsTestCase, self).setUp()
+        self.br = ovs_ext_lib.OVSBridgeExt('br-int')
+        self.run_ofctl = mock.patch.object(self.br, 'run_ofctl').start()
+
+    def test_add_group(self):
+        self.br.add_group(group_id=1, type='select',
+                          buckets='bucket=weight=1,output:1')
+        self.run_ofctl.assert_called_once_with(
+            'add-groups', ['-'],
+            'group_id=1,type=select,bucket=weight=1,output:1',
+            protocol=ovs_ext_lib.OPENFLOW13)
+
+    def test_mod_group_selection_method(self):
+        self.br.mod_group(group_id=1, type='select',
+                          selection_method='hash', fields=['ip_src'],
+                          buckets='bucket=weight=1,output:1')
+        self.run_ofctl.assert_called_once_with(
+            'mod-group', ['-'], mock.ANY, protocol=ovs_ext_lib.OPENFLOW15)
+
+
+class ParseGroupStatsTestCase(base.BaseTestCase):
+
+    def test_parse_group_stats(self):
+        group_stats = ovs_ext_lib._parse_group_stats(
+            'OFPST_GROUP reply (OF1.3) (xid=0x2):\n'
+            ' group_id=1,duration=4.123s,ref_count=1,packet_count=4,'
+            'byte_count=392,bucket0:packet_count=1,byte_count=98,'
+            'bucket1:packet_count=3,byte_count=294\n'
+            ' group_id=2,duration=1.000s,ref_count=0,packet_count=0,'
+            'byte_count=0,bucket0:packet_count=0,byte_count=0\n')
+        self.assertEqual({
+            1: [{'packet_count': 1, 'byte_count': 98},
+                {'packet_count': 3, 'byte_count': 294}],
+            2: [{'packet_count': 0, 'byte_count': 0}]
+        }, group_stats)
+
+    def test_parse_group_stats_failed_dump(self):
+        self.assertEqual({}, ovs_ext_lib._parse_group_stats(None))
+
+
+class ParseFlowStatsTestCase(base.BaseTestCase):
+
+    def test_parse_flow_stats(self):
+        flow_stats = ovs_ext_lib._parse_flow_stats(
+            'NXST_FLOW reply (xid=0x4):\n'
+            ' cookie=0x5fc000000100ff02, duration=4.1s, table=0, '
+            'n_packets=4, n_bytes=392, idle_age=1, priority=30,ip,'
+            'in_port=42,nw_src=10.100.0.0/16 actions=group:1\n'
+            ' cookie=0x5fc000000100ff02, duration=4.1s, table=0, '
+            'n_packets=1, n_bytes=98, idle_age=1, priority=30,ip,'
+            'in_port=43,nw_src=10.100.0.0/16 actions=group:1\n'
+            ' cookie=0x5fc000000100fe01, duration=2.0s, table=10, '
+            'n_packets=0, n_bytes=0, idle_age=2, priority=1,mpls,'
+            'dl_vlan=0,dl_dst=00:01:02:03:05:07,mpls_label=65791 '
+            'actions=strip_vlan,pop_mpls:0x0800,output:6\n')
+        self.assertEqual({
+            0x5fc000000100ff02: {'packet_count': 5, 'byte_count': 490},
+            0x5fc000000100fe01: {'packet_count': 0, 'byte_count': 0}
+        }, flow_stats)
+
+    def test_parse_flow_stats_failed_dump(self):
+        self.assertEqual({}, ovs_ext_lib._parse_flow_stats(None))
@@ -0,0 +1,372 @@
+# Copyright 2016 All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+
+import mock
+from oslo_utils import importutils
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.common import context as sfc_ctx
+from networking_sfc.services.sfc.drivers.ovn import idl_index
+
+# networking-ovn is not a requirement of networking-sfc, the driver is
+# imported with mocked networking-ovn modules
+OVN_MODULES = (
+    'networking_ovn',
+    'networking_ovn.common',
+    'networking_ovn.common.utils',
+    'networking_ovn.ovsdb',
+    'networking_ovn.ovsdb.impl_idl_ovn'
+)
+
+
+class OVNSfcDriverTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(OVNSfcDriverTestCase, self).setUp()
+        ovn_modules = dict((name, mock.Mock()) for name in OVN_MODULES)
+        for name in OVN_MODULES[1:]:
+            parent, _sep, child = name.rpartition('.')
+            setattr(ovn_modules[parent], child, ovn_modules[name])
+        ovn_modules['networking_ovn.common.utils'].ovn_name = (
+            lambda id: 'neutron-%s' % id)
+        modules_patcher = mock.patch.dict(sys.modules, ovn_modules)
+        modules_patcher.start()
+        self.addCleanup(modules_patcher.stop)
+        self.ovn_driver = importutils.import_module(
+            'networking_sfc.services.sfc.drivers.ovn.driver')
+
+        mock.patch('neutron.callbacks.registry.subscribe').start()
+        self.driver = self.ovn_driver.OVNSfcDriver()
+        self.driver.initialize()
+
+        self.ovn = mock.MagicMock()
+        self.ovn.idl.tables = dict(
+            (table, mock.Mock(rows={}))
+            for table in self.ovn_driver.INDEXED_TABLES)
+        self.ovn.idl._session.get_seqno.return_value = 1
+        self.txn = self.ovn.transaction.return_value.__enter__.return_value
+        self.driver._ovn_property = self.ovn
+        self.driver._ovn_index.attach(self.ovn.idl)
+        self.driver._ovn_seqno = 1
+
+        self.port_pairs = {}
+        self.port_pair_groups = {}
+        self.port_chains = {}
+        self.flow_classifiers = {}
+        self.plugin = mock.Mock()
+        self.plugin.get_port_pair.side_effect = (
+            lambda context, id: self.port_pairs[id])
+        self.plugin.get_port_pairs.side_effect = self._get_port_pairs
+        self.plugin.get_port_pair_group.side_effect = (
+            lambda context, id: self.port_pair_groups[id])
+        self.plugin.get_port_pair_groups.side_effect = (
+            self._get_port_pair_groups)
+        self.plugin.get_port_chain.side_effect = (
+            lambda context, id: self.port_chains[id])
+        self.plugin.get_port_chains.side_effect = (
+            lambda context: list(self.port_chains.values()))
+        mock.patch.object(
+            self.driver, '_get_sfc_plugin', return_value=self.plugin
+        ).start()
+        mock.patch.object(
+            self.driver, '_get_fcs_by_ids', side_effect=lambda fc_ids: [
+                self.flow_classifiers[fc_id] for fc_id in fc_ids
+                if fc_id in self.flow_classifiers]
+        ).start()
+
+        self.lswitch = self._add_row('Logical_Switch', 'neutron-net1',
+                                     port_chains=[], port_pairs=[])
+        for port_id in ('src', 'dst', 'in1', 'out1', 'in2', 'out2'):
+            self.driver._port_networks[port_id] = 'net1'
+            self._add_row('Logical_Switch_Port', port_id)
+        self._add_port_pair('pp1', 'in1', 'out1')
+        self._add_port_pair('pp2', 'in2', 'out2')
+        self._add_port_pair_group('pg1', ['pp1'])
+        self._add_port_pair_group('pg2', ['pp2'])
+        self._add_flow_classifier('fc1')
+        self._add_flow_classifier('fc2')
+
+    def _get_port_pairs(self, context, filters=None):
+        ids = (filters or {}).get('id', list(self.port_pairs))
+        return [self.port_pairs[id] for id in ids if id in self.port_pairs]
+
+    def _get_port_pair_groups(self, context, filters=None):
+        ids = (filters or {}).get('id', list(self.port_pair_groups))
+        return [self.port_pair_groups[id]
+                for id in ids if id in self.port_pair_groups]
+
+    def _add_row(self, table, name, **columns):
+        row = mock.Mock(uuid='uuid-%s' % name, **columns)
+        row.name = name
+        row._table.name = table
+        self.ovn.idl.tables[table].rows[row.uuid] = row
+        self.ovn.idl.notify(idl_index.ROW_CREATE, row)
+        return row
+
+    def _add_port_pair(self, id, ingress, egress, in_ovn=True):
+        self.port_pairs[id] = {'id': id, 'ingress': ingress, 'egress': egress}
+        if in_ovn:
+            lpp = self._add_row('Logical_Port_Pair', 'neutron-sfc-%s' % id)
+            self.lswitch.port_pairs.append(lpp)
+
+    def _add_port_pair_group(self, id, port_pair_ids):
+        self.port_pair_groups[id] = {'id': id, 'port_pairs': port_pair_ids}
+
+    def _add_flow_classifier(self, id):
+        self.flow_classifiers[id] = {
+            'id': id,
+            'name': 'test',
+            'ethertype': 'IPv4',
+            'protocol': 'tcp',
+            'logical_source_port': 'src',
+            'logical_destination_port': 'dst',
+            'l7_parameters': {}
+        }
+
+    def _add_lport_chain(self, id, pg_ids, fc_ids):
+        lppgs = [
+            self._add_row(
+                'Logical_Port_Pair_Group', 'neutron-sfc-%s' % pg_id,
+                port_pairs=[
+                    self.driver._get_ovn_row(
+                        'Logical_Port_Pair', 'neutron-sfc-%s' % pp_id)
+                    for pp_id in self.port_pair_groups[pg_id]['port_pairs']
+                ])
+            for pg_id in pg_ids]
+        lfcs = [
+            self._add_row('Logical_Flow_Classifier', 'neutron-sfc-%s' % fc_id)
+            for fc_id in fc_ids]
+        lport_chain = self._add_row(
+            'Logical_Port_Chain', 'neutron-sfc-%s' % id,
+            port_pair_groups=lppgs, flow_classifier=lfcs)
+        self.lswitch.port_chains.append(lport_chain)
+        return lport_chain
+
+    def _get_port_chain(self, id, pg_ids, fc_ids):
+        port_chain = {
+            'id': id,
+            'name': 'test',
+            'tenant_id': 'tenant',
+            'description': '',
+            'port_pair_groups': pg_ids,
+            'flow_classifiers': fc_ids
+        }
+        self.port_chains[id] = port_chain
+        return port_chain
+
+    def _get_context(self, context_class, current, original=None):
+        return context_class(self.plugin, mock.Mock(), current, original)
+
+    def _assert_port_chain_created(self, id, pg_ids, fc_ids):
+        self.ovn.create_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1',
+            lport_chain_name='neutron-sfc-%s' % id)
+        self.assertEqual(
+            [mock.call(
+                lport_pair_group_name='neutron-sfc-%s' % pg_id,
+                lport_chain_name='neutron-sfc-%s' % id,
+                port_pairs=[
+                    'uuid-neutron-sfc-%s' % pp_id
+                    for pp_id in self.port_pair_groups[pg_id]['port_pairs']])
+             for pg_id in pg_ids],
+            self.ovn.create_lport_pair_group.call_args_list)
+        self.assertEqual(
+            [mock.call(
+                lport_chain_name='neutron-sfc-%s' % id,
+                lflow_classifier_name='neutron-sfc-%s' % fc_id,
+                ethertype='IPv4',
+                protocol='tcp',
+                logical_source_port='uuid-src',
+                logical_destination_port='uuid-dst')
+             for fc_id in fc_ids],
+            self.ovn.create_lflow_classifier.call_args_list)
+
+    def test_create_port_chain(self):
+        port_chain = self._get_port_chain('pc1', ['pg1', 'pg2'], ['fc1'])
+        self.driver.create_port_chain(
+            self._get_context(sfc_ctx.PortChainContext, port_chain))
+        self._assert_port_chain_created('pc1', ['pg1', 'pg2'], ['fc1'])
+        # All the rows of the chain are added in a single transaction
+        self.ovn.transaction.assert_called_once_with(check_error=True)
+        self.assertEqual(4, self.txn.add.call_count)
+
+    def test_create_port_chain_precommit_no_lswitch(self):
+        self.driver._port_networks['src'] = 'net2'
+        port_chain = self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        self.assertRaises(
+            self.ovn_driver.exc.SfcOvnObjectNotFound,
+            self.driver.create_port_chain_precommit,
+            self._get_context(sfc_ctx.PortChainContext, port_chain))
+
+    def test_delete_port_chain(self):
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        port_chain = self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        self.driver.delete_port_chain(
+            self._get_context(sfc_ctx.PortChainContext, port_chain))
+        self.ovn.delete_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1', lport_chain_name='neutron-sfc-pc1')
+
+    def test_delete_port_chain_not_in_ovn(self):
+        port_chain = self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        self.driver.delete_port_chain(
+            self._get_context(sfc_ctx.PortChainContext, port_chain))
+        self.assertFalse(self.ovn.delete_lport_chain.called)
+
+    def test_update_port_chain_port_pair_groups(self):
+        self._add_lport_chain('pc1', ['pg1', 'pg2'], ['fc1'])
+        self._add_port_pair_group('pg3', ['pp1', 'pp2'])
+        original = self._get_port_chain('pc1', ['pg1', 'pg2'], ['fc1'])
+        current = self._get_port_chain('pc1', ['pg1', 'pg3'], ['fc1'])
+        self.driver.update_port_chain(self._get_context(
+            sfc_ctx.PortChainContext, current, original))
+        self.ovn.delete_lport_pair_group.assert_called_once_with(
+            lport_pair_group_name='neutron-sfc-pg2',
+            lport_chain_name='neutron-sfc-pc1')
+        self.ovn.create_lport_pair_group.assert_called_once_with(
+            lport_pair_group_name='neutron-sfc-pg3',
+            lport_chain_name='neutron-sfc-pc1',
+            port_pairs=['uuid-neutron-sfc-pp1', 'uuid-neutron-sfc-pp2'])
+        self.assertFalse(self.ovn.delete_lport_chain.called)
+        self.assertFalse(self.ovn.delete_lflow_classifier.called)
+        self.assertFalse(self.ovn.create_lflow_classifier.called)
+
+    def test_update_port_chain_flow_classifiers(self):
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        original = self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        current = self._get_port_chain('pc1', ['pg1'], ['fc2'])
+        self.driver.update_port_chain(self._get_context(
+            sfc_ctx.PortChainContext, current, original))
+        self.ovn.delete_lflow_classifier.assert_called_once_with(
+            lport_chain_name='neutron-sfc-pc1',
+            lflow_classifier_name='neutron-sfc-fc1')
+        self.assertEqual(
+            'neutron-sfc-fc2',
+            self.ovn.create_lflow_classifier.call_args[1][
+                'lflow_classifier_name'])
+        self.assertFalse(self.ovn.delete_lport_pair_group.called)
+        self.assertFalse(self.ovn.create_lport_pair_group.called)
+
+    def test_update_port_chain_unchanged(self):
+        port_chain = self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        self.driver.update_port_chain(self._get_context(
+            sfc_ctx.PortChainContext, port_chain, dict(port_chain)))
+        self.assertFalse(self.ovn.transaction.called)
+
+    def test_update_port_chain_without_edit_commands(self):
+        del self.ovn.delete_lport_pair_group
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        original = self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        current = self._get_port_chain('pc1', ['pg2'], ['fc1'])
+        self.driver.update_port_chain(self._get_context(
+            sfc_ctx.PortChainContext, current, original))
+        self.ovn.delete_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1', lport_chain_name='neutron-sfc-pc1')
+        self._assert_port_chain_created('pc1', ['pg2'], ['fc1'])
+
+    def test_update_port_pair_group_port_pairs(self):
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        original = dict(self.port_pair_groups['pg1'])
+        self._add_port_pair_group('pg1', ['pp1', 'pp2'])
+        self.driver.update_port_pair_group(self._get_context(
+            sfc_ctx.PortPairGroupContext, self.port_pair_groups['pg1'],
+            original))
+        self.ovn.set_lport_pair_group.assert_called_once_with(
+            lport_pair_group_name='neutron-sfc-pg1',
+            port_pairs=['uuid-neutron-sfc-pp1', 'uuid-neutron-sfc-pp2'])
+
+    def test_update_port_pair_group_not_in_ovn(self):
+        original = dict(self.port_pair_groups['pg1'])
+        self._add_port_pair_group('pg1', ['pp1', 'pp2'])
+        self.driver.update_port_pair_group(self._get_context(
+            sfc_ctx.PortPairGroupContext, self.port_pair_groups['pg1'],
+            original))
+        self.assertFalse(self.ovn.transaction.called)
+
+    def test_update_port_pair_group_without_edit_commands(self):
+        del self.ovn.set_lport_pair_group
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        original = dict(self.port_pair_groups['pg1'])
+        self._add_port_pair_group('pg1', ['pp1', 'pp2'])
+        self.driver.update_port_pair_group(self._get_context(
+            sfc_ctx.PortPairGroupContext, self.port_pair_groups['pg1'],
+            original))
+        self.ovn.delete_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1', lport_chain_name='neutron-sfc-pc1')
+        self._assert_port_chain_created('pc1', ['pg1'], ['fc1'])
+
+    def test_create_port_pair(self):
+        self._add_port_pair('pp3', 'in1', 'out2', in_ovn=False)
+        self.driver.create_port_pair(self._get_context(
+            sfc_ctx.PortPairContext, self.port_pairs['pp3']))
+        self.ovn.create_lport_pair.assert_called_once_with(
+            lport_pair_name='neutron-sfc-pp3',
+            lswitch_name='neutron-net1',
+            outport='uuid-out2',
+            inport='uuid-in1')
+
+    def test_delete_port_pair(self):
+        self.driver.delete_port_pair(self._get_context(
+            sfc_ctx.PortPairContext, self.port_pairs['pp1']))
+        self.ovn.delete_lport_pair.assert_called_once_with(
+            lport_pair_name='neutron-sfc-pp1',
+            lswitch='neutron-net1',
+            lport_pair_group_name=None)
+
+    def test_transaction_resync_on_new_seqno(self):
+        self._add_port_pair('pp3', 'in1', 'out2', in_ovn=False)
+        self._add_lport_chain('stale', ['pg1'], [])
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        self._get_port_chain('pc1', ['pg1'], ['fc1', 'fc2'])
+        self._get_port_chain('pc2', ['pg2'], [])
+        self.ovn.idl._session.get_seqno.return_value = 2
+        with mock.patch.object(
+            self.driver._ovn_index, 'rebuild'
+        ) as rebuild:
+            self.driver._ovn_transaction()
+        rebuild.assert_called_once_with()
+        self.assertEqual(2, self.driver._ovn_seqno)
+        self.assertEqual(
+            'neutron-sfc-pp3',
+            self.ovn.create_lport_pair.call_args[1]['lport_pair_name'])
+        self.ovn.delete_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1', lport_chain_name='neutron-sfc-stale')
+        self.ovn.create_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1', lport_chain_name='neutron-sfc-pc2')
+        self.assertEqual(
+            ['neutron-sfc-fc2'],
+            [call[1]['lflow_classifier_name']
+             for call in self.ovn.create_lflow_classifier.call_args_list])
+
+        # The rows are only resynced again on the next IDL session
+        self.ovn.reset_mock()
+        self.driver._ovn_transaction()
+        self.assertFalse(self.ovn.create_lport_chain.called)
+        self.ovn.transaction.assert_called_once_with(check_error=True)
+
+    def test_transaction_resync_without_edit_commands(self):
+        del self.ovn.delete_lflow_classifier
+        self._add_lport_chain('pc1', ['pg1'], ['fc1'])
+        self._add_lport_chain('pc2', ['pg2'], ['fc1'])
+        self._get_port_chain('pc1', ['pg1'], ['fc1'])
+        self._get_port_chain('pc2', ['pg2'], ['fc2'])
+        self.driver._ovn_seqno = None
+        self.driver._ovn_transaction()
+        # Only the port chain which changed is rebuilt
+        self.ovn.delete_lport_chain.assert_called_once_with(
+            lswitch_name='neutron-net1', lport_chain_name='neutron-sfc-pc2')
+        self._assert_port_chain_created('pc2', ['pg2'], ['fc2'])
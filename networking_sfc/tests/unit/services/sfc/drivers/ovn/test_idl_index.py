@@ -0,0 +1,85 @@
+# Copyright 2016 All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.drivers.ovn import idl_index
+
+
+class IdlNameIndexTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(IdlNameIndexTestCase, self).setUp()
+        self.idl = mock.Mock()
+        self.idl.tables = {
+            'Logical_Switch': mock.Mock(rows={}),
+            'Logical_Port_Pair': mock.Mock(rows={})
+        }
+        self.idl_notify = self.idl.notify
+        self.index = idl_index.IdlNameIndex(
+            ('Logical_Switch', 'Logical_Port_Pair'))
+
+    def _add_row(self, table, uuid, name):
+        row = mock.Mock(uuid=uuid)
+        row.name = name
+        row._table.name = table
+        self.idl.tables[table].rows[uuid] = row
+        return row
+
+    def test_attach(self):
+        row = self._add_row('Logical_Switch', 'uuid1', 'neutron-net1')
+        self.index.attach(self.idl)
+        self.assertIs(
+            row, self.index.get_row('Logical_Switch', 'neutron-net1'))
+        self.assertIsNone(self.index.get_row('Logical_Switch', 'neutron-net2'))
+        self.assertIsNone(
+            self.index.get_row('Logical_Port_Pair', 'neutron-net1'))
+
+    def test_notify(self):
+        self.index.attach(self.idl)
+        row = self._add_row('Logical_Port_Pair', 'uuid1', 'pp1')
+        self.idl.notify(idl_index.ROW_CREATE, row)
+        self.idl_notify.assert_called_once_with(
+            idl_index.ROW_CREATE, row, None)
+        self.assertIs(row, self.index.get_row('Logical_Port_Pair', 'pp1'))
+
+        row.name = 'pp2'
+        self.idl.notify(idl_index.ROW_UPDATE, row, mock.Mock())
+        self.assertIsNone(self.index.get_row('Logical_Port_Pair', 'pp1'))
+        self.assertIs(row, self.index.get_row('Logical_Port_Pair', 'pp2'))
+
+        del self.idl.tables['Logical_Port_Pair'].rows['uuid1']
+        self.idl.notify(idl_index.ROW_DELETE, row)
+        self.assertIsNone(self.index.get_row('Logical_Port_Pair', 'pp2'))
+
+    def test_notify_unindexed_table(self):
+        self.index.attach(self.idl)
+        row = mock.Mock(uuid='uuid1')
+        row._table.name = 'ACL'
+        self.idl.notify(idl_index.ROW_CREATE, row)
+        self.idl_notify.assert_called_once_with(
+            idl_index.ROW_CREATE, row, None)
+
+    def test_get_row_cleared_cache(self):
+        self._add_row('Logical_Switch', 'uuid1', 'neutron-net1')
+        self.index.attach(self.idl)
+        # The IDL clears its cache without notifications on reconnection
+        self.idl.tables['Logical_Switch'].rows.clear()
+        self.assertIsNone(self.index.get_row('Logical_Switch', 'neutron-net1'))
+        row = self._add_row('Logical_Switch', 'uuid2', 'neutron-net1')
+        self.index.rebuild()
+        self.assertIs(
+            row, self.index.get_row('Logical_Switch', 'neutron-net1'))
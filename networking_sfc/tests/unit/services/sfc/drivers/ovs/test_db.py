@@ -0,0 +1,242 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from networking_sfc.db import sfc_db
+from networking_sfc.services.sfc.drivers.ovs import constants as ovs_const
+from networking_sfc.tests.unit.services.sfc.drivers.ovs import test_driver
+
+
+class OVSSfcDriverDBCacheTestCase(test_driver.OVSSfcDriverTestCaseBase):
+
+    def _create_port_detail(self, host_id='test', ingress='ingress'):
+        return self.driver.create_port_detail({
+            'tenant_id': self._tenant_id,
+            'ingress': ingress,
+            'egress': 'egress',
+            'host_id': host_id,
+            'mac_address': '00:01:02:03:04:05',
+            'network_type': 'vxlan',
+            'segment_id': 33,
+            'local_endpoint': '10.0.0.1'
+        })
+
+    def test_get_port_detail_cached_in_scope(self):
+        port = self._create_port_detail()
+        with self.driver.db_cache() as scope:
+            self.assertEqual(port, self.driver.get_port_detail(port['id']))
+            self.assertEqual(port, self.driver.get_port_detail(port['id']))
+            self.assertEqual(1, scope.hits)
+            self.assertEqual(1, scope.misses)
+
+    def test_get_port_detail_by_filter_cached_in_scope(self):
+        port = self._create_port_detail()
+        with self.driver.db_cache() as scope:
+            for i in range(3):
+                self.assertEqual(
+                    port,
+                    self.driver.get_port_detail_by_filter(
+                        dict(id=port['id'])))
+            self.assertEqual(2, scope.hits)
+            self.assertEqual(1, scope.misses)
+
+    def test_get_port_detail_not_cached_out_of_scope(self):
+        port = self._create_port_detail()
+        self.driver.get_port_detail(port['id'])
+        self.driver.get_port_detail(port['id'])
+        stats = self.driver.get_db_cache_stats()
+        self.assertEqual(0, stats['hits'])
+        self.assertEqual(0, stats['misses'])
+
+    def test_cached_value_is_copied(self):
+        port = self._create_port_detail()
+        with self.driver.db_cache():
+            self.driver.get_port_detail(port['id'])['host_id'] = 'other'
+            self.assertEqual(
+                'test', self.driver.get_port_detail(port['id'])['host_id'])
+
+    def test_update_port_detail_invalidates_cache(self):
+        port = self._create_port_detail()
+        with self.driver.db_cache():
+            self.driver.get_port_detail_by_filter(dict(id=port['id']))
+            self.driver.update_port_detail(port['id'], {'host_id': 'other'})
+            self.assertEqual(
+                'other',
+                self.driver.get_port_detail_by_filter(
+                    dict(id=port['id']))['host_id'])
+
+    def test_delete_port_detail_invalidates_cache(self):
+        port = self._create_port_detail()
+        with self.driver.db_cache():
+            self.driver.get_port_detail_by_filter(dict(id=port['id']))
+            self.driver.delete_port_detail(port['id'])
+            self.assertIsNone(
+                self.driver.get_port_detail_by_filter(dict(id=port['id'])))
+
+    def test_get_db_cache_stats(self):
+        port = self._create_port_detail()
+        with self.driver.db_cache():
+            with self.driver.db_cache():
+                for i in range(4):
+                    self.driver.get_port_detail(port['id'])
+        self.assertEqual(
+            {'hits': 3, 'misses': 1, 'hit_rate': 0.75},
+            self.driver.get_db_cache_stats())
+
+    def _make_path_nodes(self, portchain_id, port):
+        # the path nodes reference their port chain
+        with self.driver.admin_context.session.begin(subtransactions=True):
+            self.driver.admin_context.session.add(sfc_db.PortChain(
+                id=portchain_id, tenant_id=self._tenant_id))
+        return [{
+            'id': node_id,
+            'tenant_id': self._tenant_id,
+            'node_type': node_type,
+            'nsp': 256,
+            'nsi': nsi,
+            'portchain_id': portchain_id,
+            'status': 'building',
+            'next_group_id': None,
+            'next_hop': next_hop
+        } for node_id, node_type, nsi, next_hop in [
+            ('src_node', 'src_node', 255,
+             [{'portpair_id': port['id'], 'weight': 1}]),
+            ('sf_node', 'sf_node', 254, [])
+        ]]
+
+    def test_create_path_nodes(self):
+        port = self._create_port_detail()
+        nodes = self.driver.create_path_nodes(
+            self._make_path_nodes('chain1', port),
+            [{'pathnode_id': 'sf_node', 'portpair_id': port['id'],
+              'weight': 2}])
+        self.assertEqual(['src_node', 'sf_node'],
+                         [node['id'] for node in nodes])
+        self.assertEqual([{'portpair_id': port['id'], 'weight': 1}],
+                         nodes[0]['next_hop'])
+        self.assertEqual([], nodes[0]['portpair_details'])
+        self.assertEqual([port['id']], nodes[1]['portpair_details'])
+        self.assertEqual(
+            nodes[1], self.driver.get_path_node_by_filter(
+                dict(portchain_id='chain1', nsi=254)))
+
+    def test_delete_path_nodes_by_portchain(self):
+        port = self._create_port_detail()
+        self.driver.create_path_nodes(
+            self._make_path_nodes('chain1', port),
+            [{'pathnode_id': 'sf_node', 'portpair_id': port['id']}])
+        self.driver.delete_path_nodes_by_portchain('chain1')
+        self.assertIsNone(self.driver.get_path_nodes_by_filter(
+            dict(portchain_id='chain1')))
+        self.assertEqual(
+            [], self.driver.get_port_detail(port['id'])['path_nodes'])
+
+    def test_get_prev_hop_host_counts(self):
+        src_port = self._create_port_detail('test1', 'ingress1')
+        sf_port = self._create_port_detail('test2', 'ingress2')
+        self.driver.create_path_nodes(
+            self._make_path_nodes('chain1', sf_port),
+            [{'pathnode_id': 'src_node', 'portpair_id': src_port['id']},
+             {'pathnode_id': 'sf_node', 'portpair_id': sf_port['id']}])
+        self.assertEqual(
+            {('ingress2', 'test1'): 1},
+            self.driver.get_prev_hop_host_counts(
+                ['ingress1', 'ingress2', 'unknown']))
+        self.assertEqual({}, self.driver.get_prev_hop_host_counts([]))
+
+    def test_update_host_flowrules(self):
+        self.assertIsNone(self.driver.get_host_flowrules('test', 'port1'))
+        self.driver.update_host_flowrules(
+            'test', 'port1', [{'nsp': 256, 'nsi': 255}])
+        self.assertEqual({
+            'host_id': 'test',
+            'port_id': 'port1',
+            'revision': 1,
+            'flowrules': [{'nsp': 256, 'nsi': 255}]
+        }, self.driver.get_host_flowrules('test', 'port1'))
+        self.driver.update_host_flowrules('test', 'port1', [])
+        self.assertEqual({
+            'host_id': 'test',
+            'port_id': 'port1',
+            'revision': 2,
+            'flowrules': []
+        }, self.driver.get_host_flowrules('test', 'port1'))
+
+    def test_get_host_flowrules_by_ports(self):
+        self.driver.update_host_flowrules('test1', 'port1', [])
+        self.driver.update_host_flowrules('test2', 'port1', [])
+        self.driver.update_host_flowrules('test1', 'port2', [])
+        self.assertEqual(
+            [{'host_id': 'test1', 'port_id': 'port1'},
+             {'host_id': 'test2', 'port_id': 'port1'}],
+            sorted(self.driver.get_host_flowrules_by_ports(['port1']),
+                   key=lambda host_port: host_port['host_id']))
+        self.assertEqual([], self.driver.get_host_flowrules_by_ports([]))
+
+    def test_delete_host_flowrules(self):
+        self.driver.update_host_flowrules('test', 'port1', [])
+        self.driver.delete_host_flowrules('test', 'port1')
+        self.assertIsNone(self.driver.get_host_flowrules('test', 'port1'))
+
+    def test_record_host_flowrule_change(self):
+        self.assertEqual(1, self.driver.record_host_flowrule_change(
+            'test', 'update_flow_rules', {'id': 'node1'}))
+        self.assertEqual(2, self.driver.record_host_flowrule_change(
+            'test', 'delete_flow_rules', {'id': 'node1'}))
+        self.assertEqual(1, self.driver.record_host_flowrule_change(
+            'other', 'update_flow_rules', {'id': 'node2'}))
+        self.assertEqual({
+            'revision': 2,
+            'changes': [{
+                'revision': 2,
+                'method': 'delete_flow_rules',
+                'flowrule': {'id': 'node1'}
+            }]
+        }, self.driver.get_host_flowrule_changes('test', 1))
+        self.assertEqual(
+            {'revision': 2, 'changes': []},
+            self.driver.get_host_flowrule_changes('test', 2))
+
+    def test_get_host_flowrule_changes_unknown_revision(self):
+        self.driver.record_host_flowrule_change(
+            'test', 'update_flow_rules', {'id': 'node1'})
+        self.assertEqual(
+            {'revision': 1, 'changes': None},
+            self.driver.get_host_flowrule_changes('test', None))
+        self.assertEqual(
+            {'revision': 0, 'changes': None},
+            self.driver.get_host_flowrule_changes('other', None))
+
+    def test_get_host_flowrule_changes_pruned(self):
+        with mock.patch.object(
+            ovs_const, 'MAX_HOST_FLOWRULE_CHANGES', 2
+        ):
+            for i in range(3):
+                self.driver.record_host_flowrule_change(
+                    'test', 'update_flow_rules', {'id': 'node%d' % i})
+        self.assertEqual(
+            {'revision': 3, 'changes': None},
+            self.driver.get_host_flowrule_changes('test', 0))
+        self.assertEqual(
+            [2, 3], [change['revision'] for change in
+                     self.driver.get_host_flowrule_changes(
+                         'test', 1)['changes']])
+
+    def test_bump_generation(self):
+        self.assertEqual(0, self.driver.get_generation('port_chains'))
+        self.assertEqual(1, self.driver.bump_generation('port_chains'))
+        self.assertEqual(2, self.driver.bump_generation('port_chains'))
+        self.assertEqual(2, self.driver.get_generation('port_chains'))
+        self.assertEqual(0, self.driver.get_generation('other'))
@@ -16,6 +16,7 @@ from eventlet import greenthread
 import mock
 import six
 
+from oslo_config import cfg
 from oslo_utils import importutils
 
 from neutron.api import extensions as api_ext
@@ -30,6 +31,8 @@ from networking_sfc.db import sfc_db
 from networking_sfc.extensions import flowclassifier
 from networking_sfc.extensions import sfc
 from networking_sfc.services.sfc.common import context as sfc_ctx
+from networking_sfc.services.sfc.common import exceptions as sfc_exc
+from networking_sfc.services.sfc.common import flowrule_codec
 from networking_sfc.services.sfc.drivers.ovs import driver
 from networking_sfc.services.sfc.drivers.ovs import rpc
 from networking_sfc.tests import base
@@ -37,7 +40,7 @@ from networking_sfc.tests.unit.db import test_flowclassifier_db
 from networking_sfc.tests.unit.db import test_sfc_db
 
 
-class OVSSfcDriverTestCase(
+class OVSSfcDriverTestCaseBase(
     test_sfc_db.SfcDbPluginTestCaseBase,
     test_flowclassifier_db.FlowClassifierDbPluginTestCaseBase,
     base.NeutronDbPluginV2TestCase
@@ -101,7 +104,7 @@ class OVSSfcDriverTestCase(
         fdb.FlowClassifierDbPlugin.path_prefix = (
             flowclassifier.FLOW_CLASSIFIER_PREFIX
         )
-        super(OVSSfcDriverTestCase, self).setUp(
+        super(OVSSfcDriverTestCaseBase, self).setUp(
             ext_mgr=None,
             plugin=None,
             service_plugins=service_plugins
@@ -163,7 +166,7 @@ class OVSSfcDriverTestCase(
         type_vxlan.VxlanTypeDriver.get_endpoint_by_host = (
             self.backup_get_endpoint_by_host)
         self.init_rpc_calls()
-        super(OVSSfcDriverTestCase, self).tearDown()
+        super(OVSSfcDriverTestCaseBase, self).tearDown()
 
     def map_flow_rules(self, flow_rules, *args):
         flow_rule_dict = {}
@@ -201,6 +204,19 @@ class OVSSfcDriverTestCase(
             info[next_hop['mac_address']] = next_hop['local_endpoint']
         return info
 
+    def next_hops_weights(self, next_hops):
+        return dict((next_hop['mac_address'], next_hop['weight'])
+                    for next_hop in next_hops or [])
+
+    def driver_create_port_chain(self, context):
+        # the plugin runs the precommit in the port chain transaction
+        self.driver.create_port_chain_precommit(context)
+        self.driver.create_port_chain(context)
+
+    def driver_create_port_pair_group(self, context):
+        self.driver.create_port_pair_group_precommit(context)
+        self.driver.create_port_pair_group(context)
+
     def build_ingress_egress_list(self, ingress_gress_list):
         ingress_egress_list = []
         for ingress, egress in ingress_gress_list:
@@ -208,6 +224,9 @@ class OVSSfcDriverTestCase(
                 self.build_ingress_egress(ingress, egress))
         return ingress_egress_list
 
+
+class OVSSfcDriverTestCase(OVSSfcDriverTestCaseBase):
+
     def test_create_port_chain(self):
         with self.port_pair_group(port_pair_group={
             'name': 'test1',
@@ -216,7 +235,7 @@ class OVSSfcDriverTestCase(
                 self.sfc_plugin, self.ctx,
                 pg['port_pair_group']
             )
-            self.driver.create_port_pair_group(pg_context)
+            self.driver_create_port_pair_group(pg_context)
             with self.port_chain(port_chain={
                 'name': 'test1',
                 'port_pair_groups': [pg['port_pair_group']['id']]
@@ -225,10 +244,124 @@ class OVSSfcDriverTestCase(
                     self.sfc_plugin, self.ctx,
                     pc['port_chain']
                 )
-                self.driver.create_port_chain(pc_context)
+                self.driver_create_port_chain(pc_context)
                 self.wait()
                 self.assertEqual(self.rpc_calls['update_flow_rules'], [])
 
+    def test_create_port_chain_precommit(self):
+        with self.port_pair_group(port_pair_group={
+            'name': 'test1',
+        }) as pg:
+            pg_context = sfc_ctx.PortPairGroupContext(
+                self.sfc_plugin, self.ctx,
+                pg['port_pair_group']
+            )
+            self.driver_create_port_pair_group(pg_context)
+            with self.port_chain(port_chain={
+                'name': 'test1',
+                'port_pair_groups': [pg['port_pair_group']['id']]
+            }) as pc:
+                pc_context = sfc_ctx.PortChainContext(
+                    self.sfc_plugin, self.ctx,
+                    pc['port_chain']
+                )
+                self.driver.create_port_chain_precommit(pc_context)
+                self.assertIsNotNone(self.driver.id_pool.get_intid_by_uuid(
+                    'portchain', pc['port_chain']['id']))
+                path_nodes = self.driver.get_path_nodes_by_filter(
+                    dict(portchain_id=pc['port_chain']['id']))
+                self.assertEqual(
+                    ['dst_node', 'sf_node', 'src_node'],
+                    sorted(node['node_type'] for node in path_nodes))
+
+    def test_create_port_chain_precommit_no_path_id(self):
+        with self.port_pair_group(port_pair_group={
+            'name': 'test1',
+        }) as pg:
+            pg_context = sfc_ctx.PortPairGroupContext(
+                self.sfc_plugin, self.ctx,
+                pg['port_pair_group']
+            )
+            self.driver_create_port_pair_group(pg_context)
+            with self.port_chain(port_chain={
+                'name': 'test1',
+                'port_pair_groups': [pg['port_pair_group']['id']]
+            }) as pc:
+                pc_context = sfc_ctx.PortChainContext(
+                    self.sfc_plugin, self.ctx,
+                    pc['port_chain']
+                )
+                with mock.patch.object(
+                    self.driver.id_pool, 'assign_intid', return_value=None
+                ):
+                    self.assertRaises(
+                        sfc_exc.SfcIntIdUnavailable,
+                        self.driver.create_port_chain_precommit,
+                        pc_context)
+                self.assertIsNone(self.driver.get_path_nodes_by_filter(
+                    dict(portchain_id=pc['port_chain']['id'])))
+
+    def test_create_port_chain_precommit_rollback(self):
+        with self.port(
+            name='src',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='dst',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id'],
+                'logical_destination_port': dst_port['port']['id']
+            }) as fc, self.port_pair_group(port_pair_group={
+                'port_pairs': []
+            }) as pg:
+                self.driver_create_port_pair_group(
+                    sfc_ctx.PortPairGroupContext(
+                        self.sfc_plugin, self.ctx, pg['port_pair_group']))
+                with self.port_chain(port_chain={
+                    'name': 'test1',
+                    'port_pair_groups': [pg['port_pair_group']['id']],
+                    'flow_classifiers': [fc['flow_classifier']['id']]
+                }) as pc:
+                    # the driver reads in the session of its admin context,
+                    # make it the one of the port chain transaction
+                    pc_context = sfc_ctx.PortChainContext(
+                        self.sfc_plugin, self.driver.admin_context,
+                        pc['port_chain'])
+                    with mock.patch.object(
+                        self.driver, 'create_path_nodes',
+                        side_effect=ValueError()
+                    ), mock.patch.object(
+                        self.driver, 'create_port_detail',
+                        wraps=self.driver.create_port_detail
+                    ) as create_port_detail:
+                        self.assertRaises(
+                            ValueError,
+                            self.driver.create_port_chain_precommit,
+                            pc_context)
+                    self.assertEqual(
+                        [pc_context._plugin_context.session] * 2,
+                        [call[1].get('session')
+                         for call in create_port_detail.call_args_list])
+                    # the classifier port details are rolled back too
+                    self.assertIsNone(self.driver.get_port_detail_by_filter(
+                        dict(egress=src_port['port']['id'])))
+                    self.assertIsNone(self.driver.get_port_detail_by_filter(
+                        dict(ingress=dst_port['port']['id'])))
+
     def test_create_port_chain_with_port_pairs(self):
         with self.port(
             name='port1',
@@ -266,7 +399,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'name': 'test1',
                         'port_pair_groups': [pg['port_pair_group']['id']]
@@ -275,7 +408,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         update_flow_rules = self.map_flow_rules(
                             self.rpc_calls['update_flow_rules'])
@@ -301,6 +434,60 @@ class OVSSfcDriverTestCase(
                             update_flow_rules[flow1]['next_group_id']
                         )
 
+    def test_create_port_chain_mpls_correlated_port_pair(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='port2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1',
+            }
+            with self.port_pair(port_pair={
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id'],
+                'service_function_parameters': {'correlation': 'mpls'}
+            }) as pp:
+                self.driver.create_port_pair(
+                    sfc_ctx.PortPairContext(
+                        self.sfc_plugin, self.ctx, pp['port_pair']))
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp['port_pair']['id']]
+                }) as pg:
+                    self.driver_create_port_pair_group(
+                        sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']))
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']]
+                    }) as pc:
+                        self.driver_create_port_chain(
+                            sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']))
+                        self.wait()
+                        update_flow_rules = self.map_flow_rules(
+                            self.rpc_calls['update_flow_rules'])
+                        flow1 = self.build_ingress_egress(
+                            pp['port_pair']['ingress'],
+                            pp['port_pair']['egress'])
+                        self.assertEqual(
+                            'mpls',
+                            update_flow_rules[flow1]['correlation'])
+
     def test_create_port_chain_with_flow_classifiers(self):
         with self.port(
             name='src',
@@ -333,7 +520,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'name': 'test1',
                         'port_pair_groups': [pg['port_pair_group']['id']],
@@ -343,7 +530,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         update_flow_rules = self.map_flow_rules(
                             self.rpc_calls['update_flow_rules'])
@@ -436,7 +623,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [pg['port_pair_group']['id']],
@@ -446,7 +633,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             update_flow_rules = self.map_flow_rules(
                                 self.rpc_calls['update_flow_rules'])
@@ -608,17 +795,17 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg1['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg1_context)
+                        self.driver_create_port_pair_group(pg1_context)
                         pg2_context = sfc_ctx.PortPairGroupContext(
                             self.sfc_plugin, self.ctx,
                             pg2['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg2_context)
+                        self.driver_create_port_pair_group(pg2_context)
                         pg3_context = sfc_ctx.PortPairGroupContext(
                             self.sfc_plugin, self.ctx,
                             pg3['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg3_context)
+                        self.driver_create_port_pair_group(pg3_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [
@@ -632,7 +819,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             update_flow_rules = self.map_flow_rules(
                                 self.rpc_calls['update_flow_rules'])
@@ -850,7 +1037,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [
@@ -862,7 +1049,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             update_flow_rules = self.map_flow_rules(
                                 self.rpc_calls['update_flow_rules'])
@@ -1108,12 +1295,12 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg1['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg1_context)
+                        self.driver_create_port_pair_group(pg1_context)
                         pg2_context = sfc_ctx.PortPairGroupContext(
                             self.sfc_plugin, self.ctx,
                             pg2['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg2_context)
+                        self.driver_create_port_pair_group(pg2_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [
@@ -1126,7 +1313,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             update_flow_rules = self.map_flow_rules(
                                 self.rpc_calls['update_flow_rules'])
@@ -1330,7 +1517,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [pg['port_pair_group']['id']],
@@ -1343,7 +1530,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             update_flow_rules = self.map_flow_rules(
                                 self.rpc_calls['update_flow_rules'])
@@ -1437,6 +1624,107 @@ class OVSSfcDriverTestCase(
                                 update_flow_rules[flow3]['node_type'],
                                 'sf_node')
 
+    def test_create_port_chain_flow_classifiers_sharing_ports(self):
+        with self.port(
+            name='src',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='dst',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port, self.port(
+            name='ingress',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress, self.port(
+            name='egress',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            # Two classifiers of the chain from the same source port to
+            # the same destination port
+            with self.flow_classifier(flow_classifier={
+                'protocol': 'tcp',
+                'destination_port_range_min': 80,
+                'destination_port_range_max': 80,
+                'logical_source_port': src_port['port']['id'],
+                'logical_destination_port': dst_port['port']['id']
+            }) as fc1, self.flow_classifier(flow_classifier={
+                'protocol': 'tcp',
+                'destination_port_range_min': 443,
+                'destination_port_range_max': 443,
+                'logical_source_port': src_port['port']['id'],
+                'logical_destination_port': dst_port['port']['id']
+            }) as fc2, self.port_pair(port_pair={
+                'ingress': ingress['port']['id'],
+                'egress': egress['port']['id']
+            }) as pp:
+                self.driver.create_port_pair(
+                    sfc_ctx.PortPairContext(
+                        self.sfc_plugin, self.ctx, pp['port_pair']))
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp['port_pair']['id']]
+                }) as pg:
+                    self.driver_create_port_pair_group(
+                        sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']))
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']],
+                        'flow_classifiers': [
+                            fc1['flow_classifier']['id'],
+                            fc2['flow_classifier']['id']
+                        ]
+                    }) as pc:
+                        self.driver_create_port_chain(
+                            sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']))
+                        self.wait()
+                        update_flow_rules = self.map_flow_rules(
+                            self.rpc_calls['update_flow_rules'])
+                        flow1 = self.build_ingress_egress(
+                            None, src_port['port']['id'])
+                        flow2 = self.build_ingress_egress(
+                            ingress['port']['id'],
+                            egress['port']['id'])
+                        self.assertEqual(
+                            2, len(update_flow_rules[flow1]['add_fcs']))
+                        self.assertEqual(
+                            update_flow_rules[flow1]['node_type'],
+                            'src_node')
+                        self.assertEqual({
+                            dst_port['port']['mac_address']: '10.0.0.1'
+                        }, self.next_hops_info(
+                            update_flow_rules[flow2].get('next_hops')))
+                        for node_type in ('src_node', 'dst_node'):
+                            nodes = self.driver.get_path_nodes_by_filter(
+                                dict(portchain_id=pc['port_chain']['id'],
+                                     node_type=node_type))
+                            self.assertEqual(
+                                1, len(nodes[0]['portpair_details']))
+
     def test_delete_port_chain(self):
         with self.port_pair_group(port_pair_group={
             'name': 'test1',
@@ -1445,7 +1733,7 @@ class OVSSfcDriverTestCase(
                 self.sfc_plugin, self.ctx,
                 pg['port_pair_group']
             )
-            self.driver.create_port_pair_group(pg_context)
+            self.driver_create_port_pair_group(pg_context)
             with self.port_chain(port_chain={
                 'name': 'test1',
                 'port_pair_groups': [pg['port_pair_group']['id']]
@@ -1454,7 +1742,7 @@ class OVSSfcDriverTestCase(
                     self.sfc_plugin, self.ctx,
                     pc['port_chain']
                 )
-                self.driver.create_port_chain(pc_context)
+                self.driver_create_port_chain(pc_context)
                 self.wait()
                 self.driver.delete_port_chain(pc_context)
                 self.wait()
@@ -1498,7 +1786,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'name': 'test1',
                         'port_pair_groups': [pg['port_pair_group']['id']]
@@ -1507,7 +1795,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.driver.delete_port_chain(pc_context)
                         self.wait()
@@ -1561,7 +1849,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'name': 'test1',
                         'port_pair_groups': [pg['port_pair_group']['id']],
@@ -1571,7 +1859,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.driver.delete_port_chain(pc_context)
                         self.wait()
@@ -1660,7 +1948,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [pg['port_pair_group']['id']],
@@ -1670,7 +1958,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             self.init_rpc_calls()
                             self.driver.delete_port_chain(pc_context)
@@ -1804,7 +2092,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [pg['port_pair_group']['id']],
                         'flow_classifiers': [fc['flow_classifier']['id']]
@@ -1813,7 +2101,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -1970,7 +2258,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [pg['port_pair_group']['id']],
                         'flow_classifiers': [fc['flow_classifier']['id']]
@@ -1979,7 +2267,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -2161,7 +2449,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [pg['port_pair_group']['id']],
                         'flow_classifiers': [fc['flow_classifier']['id']]
@@ -2170,7 +2458,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -2361,7 +2649,7 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [pg['port_pair_group']['id']],
                         'flow_classifiers': [
@@ -2372,7 +2660,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -2578,12 +2866,12 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg1['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg1_context)
+                    self.driver_create_port_pair_group(pg1_context)
                     pg2_context = sfc_ctx.PortPairGroupContext(
                         self.sfc_plugin, self.ctx,
                         pg2['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg2_context)
+                    self.driver_create_port_pair_group(pg2_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [pg1['port_pair_group']['id']],
                         'flow_classifiers': [
@@ -2594,7 +2882,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -2825,12 +3113,12 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg1['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg1_context)
+                    self.driver_create_port_pair_group(pg1_context)
                     pg2_context = sfc_ctx.PortPairGroupContext(
                         self.sfc_plugin, self.ctx,
                         pg2['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg2_context)
+                    self.driver_create_port_pair_group(pg2_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [
                             pg1['port_pair_group']['id'],
@@ -2844,7 +3132,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -3074,12 +3362,12 @@ class OVSSfcDriverTestCase(
                         self.sfc_plugin, self.ctx,
                         pg1['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg1_context)
+                    self.driver_create_port_pair_group(pg1_context)
                     pg2_context = sfc_ctx.PortPairGroupContext(
                         self.sfc_plugin, self.ctx,
                         pg2['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg2_context)
+                    self.driver_create_port_pair_group(pg2_context)
                     with self.port_chain(port_chain={
                         'port_pair_groups': [pg1['port_pair_group']['id']],
                         'flow_classifiers': [
@@ -3090,7 +3378,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         self.init_rpc_calls()
                         updates = {
@@ -3220,7 +3508,7 @@ class OVSSfcDriverTestCase(
                             update_flow_rules[flow3]['node_type'],
                             'sf_node')
 
-    def test_agent_init_port_pairs(self):
+    def test_update_port_pair_weight(self):
         with self.port(
             name='port1',
             device_owner='compute',
@@ -3230,101 +3518,615 @@ class OVSSfcDriverTestCase(
             ),
             **{portbindings.HOST_ID: 'test'}
         ) as src_port, self.port(
-            name='port2',
+            name='ingress1',
             device_owner='compute',
             device_id='test',
             arg_list=(
                 portbindings.HOST_ID,
             ),
             **{portbindings.HOST_ID: 'test'}
-        ) as dst_port:
-            self.host_endpoint_mapping = {
-                'test': '10.0.0.1'
-            }
-            with self.port_pair(port_pair={
-                'ingress': src_port['port']['id'],
-                'egress': dst_port['port']['id']
-            }) as pp:
-                pp_context = sfc_ctx.PortPairContext(
-                    self.sfc_plugin, self.ctx,
-                    pp['port_pair']
-                )
-                self.driver.create_port_pair(pp_context)
-                with self.port_pair_group(port_pair_group={
-                    'port_pairs': [pp['port_pair']['id']]
-                }) as pg:
-                    pg_context = sfc_ctx.PortPairGroupContext(
-                        self.sfc_plugin, self.ctx,
-                        pg['port_pair_group']
-                    )
-                    self.driver.create_port_pair_group(pg_context)
-                    with self.port_chain(port_chain={
-                        'name': 'test1',
-                        'port_pair_groups': [pg['port_pair_group']['id']]
-                    }) as pc:
-                        pc_context = sfc_ctx.PortChainContext(
-                            self.sfc_plugin, self.ctx,
-                            pc['port_chain']
-                        )
-                        self.driver.create_port_chain(pc_context)
-                        self.wait()
-                        flow_rules = []
-                        flow_rules_by_portid = {}
-                        for host, portid in [(
-                            src_port['port']['binding:host_id'],
-                            src_port['port']['id']
-                        ), (
-                            dst_port['port']['binding:host_id'],
-                            dst_port['port']['id']
-                        )]:
-                            flow_rules_by_portid[
-                                portid
-                            ] = self.driver.get_flowrules_by_host_portid(
-                                self.ctx, host=host, port_id=portid
-                            )
-                        flow_rules = self.map_flow_rules(
-                            flow_rules, *(flow_rules_by_portid.values())
-                        )
-                        flow1 = self.build_ingress_egress(
-                            pp['port_pair']['ingress'],
-                            pp['port_pair']['egress'])
-                        self.assertEqual(
-                            set(flow_rules.keys()),
-                            set([flow1]))
-                        self.assertEqual(
-                            flow_rules[flow1]['add_fcs'],
-                            [])
-                        self.assertEqual(
-                            flow_rules[flow1]['del_fcs'],
-                            [])
-                        self.assertEqual(
-                            flow_rules[flow1]['node_type'],
-                            'sf_node')
-
-    def test_agent_init_flow_classifiers(self):
-        with self.port(
-            name='port1',
+        ) as ingress1, self.port(
+            name='egress1',
             device_owner='compute',
             device_id='test',
             arg_list=(
                 portbindings.HOST_ID,
             ),
             **{portbindings.HOST_ID: 'test'}
-        ) as src_port:
+        ) as egress1, self.port(
+            name='ingress2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress2, self.port(
+            name='egress2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress2:
             self.host_endpoint_mapping = {
                 'test': '10.0.0.1'
             }
             with self.flow_classifier(flow_classifier={
                 'logical_source_port': src_port['port']['id']
             }) as fc:
-                with self.port_pair_group(port_pair_group={
-                    'port_pairs': []
-                }) as pg:
-                    pg_context = sfc_ctx.PortPairGroupContext(
+                with self.port_pair(port_pair={
+                    'ingress': ingress1['port']['id'],
+                    'egress': egress1['port']['id'],
+                    'service_function_parameters': {'weight': 2}
+                }) as pp1, self.port_pair(port_pair={
+                    'ingress': ingress2['port']['id'],
+                    'egress': egress2['port']['id']
+                }) as pp2:
+                    for pp in (pp1, pp2):
+                        self.driver.create_port_pair(
+                            sfc_ctx.PortPairContext(
+                                self.sfc_plugin, self.ctx,
+                                pp['port_pair']))
+                    with self.port_pair_group(port_pair_group={
+                        'port_pairs': [
+                            pp1['port_pair']['id'],
+                            pp2['port_pair']['id']
+                        ]
+                    }) as pg:
+                        pg_context = sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']
+                        )
+                        self.driver_create_port_pair_group(pg_context)
+                        with self.port_chain(port_chain={
+                            'name': 'test1',
+                            'port_pair_groups': [
+                                pg['port_pair_group']['id']
+                            ],
+                            'flow_classifiers': [fc['flow_classifier']['id']]
+                        }) as pc:
+                            pc_context = sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']
+                            )
+                            self.driver_create_port_chain(pc_context)
+                            self.wait()
+                            flow1 = self.build_ingress_egress(
+                                None, src_port['port']['id'])
+                            update_flow_rules = self.map_flow_rules(
+                                self.rpc_calls['update_flow_rules'])
+                            self.assertEqual({
+                                ingress1['port']['mac_address']: 2,
+                                ingress2['port']['mac_address']: 1
+                            }, self.next_hops_weights(
+                                update_flow_rules[flow1]['next_hops']))
+
+                            self.init_rpc_calls()
+                            updated_pp2 = self._update(
+                                'port_pairs', pp2['port_pair']['id'],
+                                {'port_pair': {
+                                    'service_function_parameters': {
+                                        'weight': 3}}})
+                            self.driver.update_port_pair(
+                                sfc_ctx.PortPairContext(
+                                    self.sfc_plugin, self.ctx,
+                                    updated_pp2['port_pair'],
+                                    pp2['port_pair']))
+                            self.wait()
+                            self.assertEqual(
+                                [], self.rpc_calls['delete_flow_rules'])
+                            update_flow_rules = self.map_flow_rules(
+                                self.rpc_calls['update_flow_rules'])
+                            self.assertEqual(
+                                set([flow1]), set(update_flow_rules.keys()))
+                            self.assertEqual({
+                                ingress1['port']['mac_address']: 2,
+                                ingress2['port']['mac_address']: 3
+                            }, self.next_hops_weights(
+                                update_flow_rules[flow1]['next_hops']))
+
+    def test_update_group_stats(self):
+        cfg.CONF.set_override('load_feedback', True, 'sfc_ovs')
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='ingress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress1, self.port(
+            name='egress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress1, self.port(
+            name='ingress2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress2, self.port(
+            name='egress2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress2:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id']
+            }) as fc:
+                with self.port_pair(port_pair={
+                    'ingress': ingress1['port']['id'],
+                    'egress': egress1['port']['id']
+                }) as pp1, self.port_pair(port_pair={
+                    'ingress': ingress2['port']['id'],
+                    'egress': egress2['port']['id']
+                }) as pp2:
+                    for pp in (pp1, pp2):
+                        self.driver.create_port_pair(
+                            sfc_ctx.PortPairContext(
+                                self.sfc_plugin, self.ctx,
+                                pp['port_pair']))
+                    with self.port_pair_group(port_pair_group={
+                        'port_pairs': [
+                            pp1['port_pair']['id'],
+                            pp2['port_pair']['id']
+                        ]
+                    }) as pg:
+                        pg_context = sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']
+                        )
+                        self.driver_create_port_pair_group(pg_context)
+                        with self.port_chain(port_chain={
+                            'name': 'test1',
+                            'port_pair_groups': [
+                                pg['port_pair_group']['id']
+                            ],
+                            'flow_classifiers': [fc['flow_classifier']['id']]
+                        }) as pc:
+                            pc_context = sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']
+                            )
+                            self.driver_create_port_chain(pc_context)
+                            self.wait()
+                            flow1 = self.build_ingress_egress(
+                                None, src_port['port']['id'])
+                            update_flow_rules = self.map_flow_rules(
+                                self.rpc_calls['update_flow_rules'])
+                            group_id = update_flow_rules[flow1][
+                                'next_group_id']
+                            mac1 = ingress1['port']['mac_address']
+                            mac2 = ingress2['port']['mac_address']
+
+                            self.init_rpc_calls()
+                            for timestamp, counters in (
+                                (0.0, (0, 0)), (10.0, (30000, 10000))
+                            ):
+                                self.driver.update_group_stats(
+                                    self.ctx, 'test', [{
+                                        'group_id': group_id,
+                                        'buckets': [{
+                                            'mac_address': mac1,
+                                            'packet_count': 1,
+                                            'byte_count': counters[0]
+                                        }, {
+                                            'mac_address': mac2,
+                                            'packet_count': 1,
+                                            'byte_count': counters[1]
+                                        }]
+                                    }], timestamp)
+                            self.wait()
+                            self.assertEqual(
+                                [], self.rpc_calls['delete_flow_rules'])
+                            update_flow_rules = self.map_flow_rules(
+                                self.rpc_calls['update_flow_rules'])
+                            # The overloaded port pair gets less traffic
+                            self.assertEqual({
+                                mac1: 82,
+                                mac2: 141
+                            }, self.next_hops_weights(
+                                update_flow_rules[flow1]['next_hops']))
+
+                            # Balanced, the weights are left alone
+                            self.init_rpc_calls()
+                            self.driver.update_group_stats(
+                                self.ctx, 'test', [{
+                                    'group_id': group_id,
+                                    'buckets': [{
+                                        'mac_address': mac1,
+                                        'packet_count': 1,
+                                        'byte_count': 50000
+                                    }, {
+                                        'mac_address': mac2,
+                                        'packet_count': 1,
+                                        'byte_count': 30000
+                                    }]
+                                }], 20.0)
+                            self.wait()
+                            self.assertEqual(
+                                [], self.rpc_calls['update_flow_rules'])
+
+    def test_update_group_stats_disabled(self):
+        self.driver.update_group_stats(
+            self.ctx, 'test', [{'group_id': 1, 'buckets': []}], 0.0)
+        self.assertEqual([], self.rpc_calls['update_flow_rules'])
+
+    def test_update_flow_stats(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='ingress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress1, self.port(
+            name='egress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress1:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id']
+            }) as fc, self.port_pair(port_pair={
+                'ingress': ingress1['port']['id'],
+                'egress': egress1['port']['id']
+            }) as pp:
+                self.driver.create_port_pair(
+                    sfc_ctx.PortPairContext(
+                        self.sfc_plugin, self.ctx, pp['port_pair']))
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp['port_pair']['id']]
+                }) as pg:
+                    self.driver_create_port_pair_group(
+                        sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']))
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']],
+                        'flow_classifiers': [fc['flow_classifier']['id']]
+                    }) as pc:
+                        self.driver_create_port_chain(
+                            sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']))
+                        self.wait()
+                        flow1 = self.build_ingress_egress(
+                            None, src_port['port']['id'])
+                        update_flow_rules = self.map_flow_rules(
+                            self.rpc_calls['update_flow_rules'])
+                        nsp = update_flow_rules[flow1]['nsp']
+                        self.driver.update_flow_stats(
+                            self.ctx, 'test', [{
+                                'nsp': nsp, 'nsi': 255,
+                                'packets_in': 0, 'bytes_in': 0,
+                                'packets_out': 10, 'bytes_out': 980
+                            }, {
+                                'nsp': nsp, 'nsi': 254,
+                                'packets_in': 10, 'bytes_in': 980,
+                                'packets_out': 8, 'bytes_out': 784
+                            }, {
+                                # path of no port chain
+                                'nsp': nsp + 1, 'nsi': 255,
+                                'packets_in': 0, 'bytes_in': 0,
+                                'packets_out': 1, 'bytes_out': 98
+                            }], 100.0)
+                        statistics = self.sfc_plugin.get_port_chain(
+                            self.ctx, pc['port_chain']['id']
+                        )['chain_statistics']
+                        self.assertEqual(
+                            [(0, 10, 0), (1, 8, 2)],
+                            [(hop['hop'], hop['packets_out'],
+                              hop['packets_dropped'])
+                             for hop in statistics])
+
+    def test_create_port_chain_port_pair_group_parameters(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='ingress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress1, self.port(
+            name='egress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress1:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id']
+            }) as fc, self.port_pair(port_pair={
+                'ingress': ingress1['port']['id'],
+                'egress': egress1['port']['id']
+            }) as pp:
+                self.driver.create_port_pair(
+                    sfc_ctx.PortPairContext(
+                        self.sfc_plugin, self.ctx, pp['port_pair']))
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp['port_pair']['id']],
+                    'port_pair_group_parameters': {
+                        'lb_fields': 'ip_src&ip_dst'}
+                }) as pg:
+                    self.driver_create_port_pair_group(
+                        sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']))
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']],
+                        'flow_classifiers': [fc['flow_classifier']['id']]
+                    }) as pc:
+                        self.driver_create_port_chain(
+                            sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']))
+                        self.wait()
+                        flow1 = self.build_ingress_egress(
+                            None, src_port['port']['id'])
+                        flow2 = self.build_ingress_egress(
+                            ingress1['port']['id'], egress1['port']['id'])
+                        update_flow_rules = self.map_flow_rules(
+                            self.rpc_calls['update_flow_rules'])
+                        self.assertEqual(
+                            {'lb_fields': 'ip_src&ip_dst',
+                             'symmetric': False},
+                            update_flow_rules[flow1][
+                                'next_group_parameters'])
+                        self.assertNotIn(
+                            'next_group_parameters',
+                            update_flow_rules[flow2])
+
+    def test_create_port_chain_local_port_pair_group(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='ingress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as ingress1, self.port(
+            name='egress1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as egress1, self.port(
+            name='ingress2',
+            device_owner='compute',
+            device_id='test2',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test2'}
+        ) as ingress2, self.port(
+            name='egress2',
+            device_owner='compute',
+            device_id='test2',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test2'}
+        ) as egress2:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1',
+                'test2': '10.0.0.2'
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id']
+            }) as fc, self.port_pair(port_pair={
+                'ingress': ingress1['port']['id'],
+                'egress': egress1['port']['id']
+            }) as pp1, self.port_pair(port_pair={
+                'ingress': ingress2['port']['id'],
+                'egress': egress2['port']['id']
+            }) as pp2:
+                for pp in (pp1, pp2):
+                    self.driver.create_port_pair(
+                        sfc_ctx.PortPairContext(
+                            self.sfc_plugin, self.ctx, pp['port_pair']))
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [
+                        pp1['port_pair']['id'],
+                        pp2['port_pair']['id']
+                    ],
+                    'port_pair_group_parameters': {'locality': 'local'}
+                }) as pg:
+                    self.driver_create_port_pair_group(
+                        sfc_ctx.PortPairGroupContext(
+                            self.sfc_plugin, self.ctx,
+                            pg['port_pair_group']))
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']],
+                        'flow_classifiers': [fc['flow_classifier']['id']]
+                    }) as pc:
+                        self.driver_create_port_chain(
+                            sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']))
+                        self.wait()
+                        flow1 = self.build_ingress_egress(
+                            None, src_port['port']['id'])
+                        update_flow_rules = self.map_flow_rules(
+                            self.rpc_calls['update_flow_rules'])
+                        self.assertEqual({
+                            ingress1['port']['mac_address']: '10.0.0.1'
+                        }, self.next_hops_info(
+                            update_flow_rules[flow1]['next_hops']))
+                        self.assertNotIn(
+                            'next_group_parameters',
+                            update_flow_rules[flow1])
+
+    def test_agent_init_port_pairs(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='port2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            with self.port_pair(port_pair={
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id']
+            }) as pp:
+                pp_context = sfc_ctx.PortPairContext(
+                    self.sfc_plugin, self.ctx,
+                    pp['port_pair']
+                )
+                self.driver.create_port_pair(pp_context)
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp['port_pair']['id']]
+                }) as pg:
+                    pg_context = sfc_ctx.PortPairGroupContext(
+                        self.sfc_plugin, self.ctx,
+                        pg['port_pair_group']
+                    )
+                    self.driver_create_port_pair_group(pg_context)
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']]
+                    }) as pc:
+                        pc_context = sfc_ctx.PortChainContext(
+                            self.sfc_plugin, self.ctx,
+                            pc['port_chain']
+                        )
+                        self.driver_create_port_chain(pc_context)
+                        self.wait()
+                        flow_rules = []
+                        flow_rules_by_portid = {}
+                        for host, portid in [(
+                            src_port['port']['binding:host_id'],
+                            src_port['port']['id']
+                        ), (
+                            dst_port['port']['binding:host_id'],
+                            dst_port['port']['id']
+                        )]:
+                            flow_rules_by_portid[
+                                portid
+                            ] = self.driver.get_flowrules_by_host_portid(
+                                self.ctx, host=host, port_id=portid
+                            )
+                        flow_rules = self.map_flow_rules(
+                            flow_rules, *(flow_rules_by_portid.values())
+                        )
+                        flow1 = self.build_ingress_egress(
+                            pp['port_pair']['ingress'],
+                            pp['port_pair']['egress'])
+                        self.assertEqual(
+                            set(flow_rules.keys()),
+                            set([flow1]))
+                        self.assertEqual(
+                            flow_rules[flow1]['add_fcs'],
+                            [])
+                        self.assertEqual(
+                            flow_rules[flow1]['del_fcs'],
+                            [])
+                        self.assertEqual(
+                            flow_rules[flow1]['node_type'],
+                            'sf_node')
+
+    def test_agent_init_flow_classifiers(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1'
+            }
+            with self.flow_classifier(flow_classifier={
+                'logical_source_port': src_port['port']['id']
+            }) as fc:
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': []
+                }) as pg:
+                    pg_context = sfc_ctx.PortPairGroupContext(
                         self.sfc_plugin, self.ctx,
                         pg['port_pair_group']
                     )
-                    self.driver.create_port_pair_group(pg_context)
+                    self.driver_create_port_pair_group(pg_context)
                     with self.port_chain(port_chain={
                         'name': 'test1',
                         'port_pair_groups': [pg['port_pair_group']['id']],
@@ -3334,7 +4136,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pc['port_chain']
                         )
-                        self.driver.create_port_chain(pc_context)
+                        self.driver_create_port_chain(pc_context)
                         self.wait()
                         flow_rules = []
                         flow_rules_by_portid = {}
@@ -3429,7 +4231,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [pg['port_pair_group']['id']],
@@ -3439,7 +4241,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             flow_rules = []
                             flow_rules_by_portid = {}
@@ -3615,17 +4417,17 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg1['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg1_context)
+                        self.driver_create_port_pair_group(pg1_context)
                         pg2_context = sfc_ctx.PortPairGroupContext(
                             self.sfc_plugin, self.ctx,
                             pg2['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg2_context)
+                        self.driver_create_port_pair_group(pg2_context)
                         pg3_context = sfc_ctx.PortPairGroupContext(
                             self.sfc_plugin, self.ctx,
                             pg3['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg3_context)
+                        self.driver_create_port_pair_group(pg3_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [
@@ -3639,7 +4441,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             flow_rules = []
                             flow_rules_by_portid = {}
@@ -3874,7 +4676,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [
@@ -3886,7 +4688,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             flow_rules = []
                             flow_rules_by_portid = {}
@@ -4083,7 +4885,7 @@ class OVSSfcDriverTestCase(
                             self.sfc_plugin, self.ctx,
                             pg['port_pair_group']
                         )
-                        self.driver.create_port_pair_group(pg_context)
+                        self.driver_create_port_pair_group(pg_context)
                         with self.port_chain(port_chain={
                             'name': 'test1',
                             'port_pair_groups': [pg['port_pair_group']['id']],
@@ -4096,7 +4898,7 @@ class OVSSfcDriverTestCase(
                                 self.sfc_plugin, self.ctx,
                                 pc['port_chain']
                             )
-                            self.driver.create_port_chain(pc_context)
+                            self.driver_create_port_chain(pc_context)
                             self.wait()
                             flow_rules = []
                             flow_rules_by_portid = {}
@@ -4210,3 +5012,314 @@ class OVSSfcDriverTestCase(
                             self.assertEqual(
                                 flow_rules[flow3]['node_type'],
                                 'sf_node')
+
+    def test_get_flowrules_by_host_portid_materialized(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port, self.port(
+            name='port2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1',
+            }
+            with self.port_pair(port_pair={
+                'ingress': src_port['port']['id'],
+                'egress': dst_port['port']['id']
+            }) as pp:
+                pp_context = sfc_ctx.PortPairContext(
+                    self.sfc_plugin, self.ctx,
+                    pp['port_pair']
+                )
+                self.driver.create_port_pair(pp_context)
+                flow_rules = self.driver.get_flowrules_by_host_portid(
+                    self.ctx, 'test', src_port['port']['id'])
+                self.assertEqual([], flow_rules)
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp['port_pair']['id']]
+                }) as pg:
+                    pg_context = sfc_ctx.PortPairGroupContext(
+                        self.sfc_plugin, self.ctx,
+                        pg['port_pair_group']
+                    )
+                    self.driver_create_port_pair_group(pg_context)
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [pg['port_pair_group']['id']]
+                    }) as pc:
+                        pc_context = sfc_ctx.PortChainContext(
+                            self.sfc_plugin, self.ctx,
+                            pc['port_chain']
+                        )
+                        self.driver_create_port_chain(pc_context)
+                        self.wait()
+                        # the stored flow rules were rebuilt with the chain
+                        host_flowrules = self.driver.get_host_flowrules(
+                            'test', src_port['port']['id'])
+                        self.assertEqual(2, host_flowrules['revision'])
+                        self.assertEqual(
+                            ['sf_node'],
+                            [flow_rule['node_type'] for flow_rule in
+                             host_flowrules['flowrules']])
+                        with mock.patch.object(
+                            self.driver, '_build_flowrules_by_host_portid'
+                        ) as mock_build:
+                            flow_rules = (
+                                self.driver.get_flowrules_by_host_portid(
+                                    self.ctx, 'test', src_port['port']['id']))
+                            mock_build.assert_not_called()
+                        self.assertEqual(
+                            host_flowrules['flowrules'], flow_rules)
+
+    def test_get_flowrules_by_host_portid_port_rebound(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port1, self.port(
+            name='port2',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port1, self.port(
+            name='port3',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port2, self.port(
+            name='port4',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as dst_port2:
+            self.host_endpoint_mapping = {
+                'test': '10.0.0.1',
+                'test2': '10.0.0.2',
+            }
+            with self.port_pair(port_pair={
+                'ingress': src_port1['port']['id'],
+                'egress': dst_port1['port']['id']
+            }) as pp1, self.port_pair(port_pair={
+                'ingress': src_port2['port']['id'],
+                'egress': dst_port2['port']['id']
+            }) as pp2:
+                for pp in (pp1, pp2):
+                    self.driver.create_port_pair(sfc_ctx.PortPairContext(
+                        self.sfc_plugin, self.ctx, pp['port_pair']))
+                with self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp1['port_pair']['id']]
+                }) as pg1, self.port_pair_group(port_pair_group={
+                    'port_pairs': [pp2['port_pair']['id']]
+                }) as pg2:
+                    for pg in (pg1, pg2):
+                        self.driver_create_port_pair_group(
+                            sfc_ctx.PortPairGroupContext(
+                                self.sfc_plugin, self.ctx,
+                                pg['port_pair_group']))
+                    with self.port_chain(port_chain={
+                        'name': 'test1',
+                        'port_pair_groups': [
+                            pg1['port_pair_group']['id'],
+                            pg2['port_pair_group']['id']]
+                    }) as pc:
+                        self.driver_create_port_chain(
+                            sfc_ctx.PortChainContext(
+                                self.sfc_plugin, self.ctx,
+                                pc['port_chain']))
+                        self.wait()
+                        for port in (dst_port1, src_port2):
+                            self.driver.get_flowrules_by_host_portid(
+                                self.ctx, 'test', port['port']['id'])
+                        with mock.patch.object(
+                            self.driver, '_get_portpair_detail_info',
+                            return_value=(
+                                'test2', '10.0.0.2', None, None, None)
+                        ):
+                            self.driver.get_flowrules_by_host_portid(
+                                self.ctx, 'test2', src_port2['port']['id'])
+                        port_detail = self.driver.get_port_detail_by_filter(
+                            dict(ingress=src_port2['port']['id']))
+                        self.assertEqual('test2', port_detail['host_id'])
+                        self.assertEqual(
+                            '10.0.0.2', port_detail['local_endpoint'])
+                        # the port left its old host
+                        self.assertIsNone(self.driver.get_host_flowrules(
+                            'test', src_port2['port']['id']))
+                        self.assertIsNotNone(self.driver.get_host_flowrules(
+                            'test2', src_port2['port']['id']))
+                        # the previous hop forwards to the new host
+                        host_flowrules = self.driver.get_host_flowrules(
+                            'test', dst_port1['port']['id'])
+                        self.assertEqual(
+                            [['10.0.0.2']],
+                            [[next_hop['local_endpoint']
+                              for next_hop in flow_rule['next_hops']]
+                             for flow_rule in host_flowrules['flowrules']
+                             if flow_rule['next_hops']])
+
+    def test_start_rpc_listeners(self):
+        self.assertFalse(n_rpc.create_connection.called)
+        conn = n_rpc.create_connection.return_value
+        conn.consume_in_threads.return_value = ['server']
+        self.assertEqual(['server'], self.driver.start_rpc_listeners())
+        conn.create_consumer.assert_called_once_with(
+            'q-sfc-plugin', mock.ANY, fanout=False)
+
+    def test_get_flow_classifiers_by_ids(self):
+        with self.port(
+            name='port1',
+            device_owner='compute',
+            device_id='test',
+            arg_list=(
+                portbindings.HOST_ID,
+            ),
+            **{portbindings.HOST_ID: 'test'}
+        ) as src_port:
+            with self.flow_classifier(flow_classifier={
+                'source_port_range_min': 100,
+                'source_port_range_max': 200,
+                'ethertype': 'IPv4',
+                'protocol': 'tcp',
+                'logical_source_port': src_port['port']['id']
+            }) as fc1, self.flow_classifier(flow_classifier={
+                'source_port_range_min': 300,
+                'source_port_range_max': 400,
+                'ethertype': 'IPv4',
+                'protocol': 'tcp',
+                'logical_source_port': src_port['port']['id']
+            }):
+                fcs = self.driver.get_flow_classifiers_by_ids(
+                    self.ctx, [fc1['flow_classifier']['id']])
+                self.assertEqual(
+                    [flowrule_codec.get_classifier(fc1['flow_classifier'])],
+                    fcs)
+                self.assertEqual(
+                    [], self.driver.get_flow_classifiers_by_ids(self.ctx, []))
+
+    def _get_agent_fdb(self, port, segment, agent_host):
+        return {port['network_id']: {
+            'segment_id': segment['segmentation_id'],
+            'network_type': segment['network_type'],
+            'ports': {agent_host: [
+                ('00:00:00:00:00:00', '0.0.0.0'),
+                (port['mac_address'], port['ip_address'])
+            ]}
+        }}
+
+    def test_agent_fdb_entries_batch_failed(self):
+        with mock.patch.object(
+            self.driver, 'l2pop_notifier'
+        ) as notifier, mock.patch.object(
+            self.driver, '_get_remote_pop_ports',
+            return_value=[({
+                'id': 'port1',
+                'network_id': 'net1',
+                'mac_address': 'mac_port1',
+                'ip_address': 'ip_port1',
+                'binding:host_id': '10.0.0.1'
+            }, {'network_type': 'vxlan', 'segmentation_id': 33})]
+        ), mock.patch.object(
+            self.driver, 'get_prev_hop_host_counts',
+            return_value={('port1', 'host1'): 1}
+        ), mock.patch.object(
+            self.driver, '_get_agent_fdb', side_effect=self._get_agent_fdb
+        ):
+            def update_and_fail():
+                with self.driver.fdb_batch():
+                    self.driver._update_agent_fdb_entries(
+                        {'host_id': 'host1'})
+                    raise ValueError()
+
+            self.assertRaises(ValueError, update_and_fail)
+            self.assertFalse(notifier.add_fdb_entries.called)
+            self.assertIsNone(self.driver._fdb_batch_local.batch)
+
+            # the next batch does not carry the entries of the failed one
+            with self.driver.fdb_batch() as batch:
+                self.assertEqual({}, batch)
+            self.assertFalse(notifier.add_fdb_entries.called)
+
+    def test_agent_fdb_entries_batched(self):
+        segment = {'network_type': 'vxlan', 'segmentation_id': 33}
+        pop_ports = dict((port_id, {
+            'id': port_id,
+            'network_id': 'net1',
+            'mac_address': 'mac_%s' % port_id,
+            'ip_address': 'ip_%s' % port_id,
+            'binding:host_id': '10.0.0.%d' % i
+        }) for i, port_id in enumerate(['port1', 'port2', 'port3']))
+        flow_rules = {
+            'rule1': {'host_id': 'host1', 'pop_ports': ['port1', 'port2']},
+            'rule2': {'host_id': 'host1', 'pop_ports': ['port2']},
+            'rule3': {'host_id': 'host1', 'pop_ports': ['port3']},
+            'rule4': {'host_id': 'host2', 'pop_ports': ['port3']}
+        }
+        with mock.patch.object(
+            self.driver, 'l2pop_notifier'
+        ) as notifier, mock.patch.object(
+            self.driver, '_get_remote_pop_ports',
+            side_effect=lambda flow_rule: [
+                (pop_ports[port_id], segment)
+                for port_id in flow_rule['pop_ports']]
+        ), mock.patch.object(
+            self.driver, 'get_prev_hop_host_counts',
+            return_value={('port1', 'host1'): 1, ('port2', 'host1'): 1,
+                          ('port3', 'host1'): 1, ('port3', 'host2'): 2}
+        ), mock.patch.object(
+            self.driver, '_get_agent_fdb', side_effect=self._get_agent_fdb
+        ):
+            with self.driver.fdb_batch():
+                self.driver._update_agent_fdb_entries(flow_rules['rule1'])
+                self.driver._update_agent_fdb_entries(flow_rules['rule2'])
+                self.driver._update_agent_fdb_entries(flow_rules['rule3'])
+                self.driver._delete_agent_fdb_entries(flow_rules['rule3'])
+                self.driver._update_agent_fdb_entries(flow_rules['rule4'])
+                self.assertFalse(notifier.add_fdb_entries.called)
+            notifier.add_fdb_entries.assert_called_once_with(
+                self.driver.rpc_ctx, {'net1': {
+                    'segment_id': 33,
+                    'network_type': 'vxlan',
+                    'ports': {
+                        '10.0.0.0': [('00:00:00:00:00:00', '0.0.0.0'),
+                                     ('mac_port1', 'ip_port1')],
+                        '10.0.0.1': [('00:00:00:00:00:00', '0.0.0.0'),
+                                     ('mac_port2', 'ip_port2')]
+                    }
+                }}, 'host1')
+            notifier.remove_fdb_entries.assert_called_once_with(
+                self.driver.rpc_ctx, {'net1': {
+                    'segment_id': 33,
+                    'network_type': 'vxlan',
+                    'ports': {
+                        '10.0.0.2': [('00:00:00:00:00:00', '0.0.0.0'),
+                                     ('mac_port3', 'ip_port3')]
+                    }
+                }}, 'host1')
+
+            # without a batch the entries are sent right away
+            self.driver._update_agent_fdb_entries(flow_rules['rule3'])
+            self.assertEqual(2, notifier.add_fdb_entries.call_count)
@@ -0,0 +1,136 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.tests import base
+
+from networking_sfc.services.sfc.drivers.ovs import load_feedback
+
+
+class WeightControllerTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(WeightControllerTestCase, self).setUp()
+        self.controller = load_feedback.WeightController()
+        self.capacities = {'a': 1, 'b': 1}
+
+    def _report(self, counters_list, source='host1', group=1):
+        for timestamp, counters in enumerate(counters_list):
+            self.controller.update_counters(
+                group, source, counters, float(timestamp))
+
+    def test_get_weights_unmeasured(self):
+        self.assertIsNone(
+            self.controller.get_weights(1, self.capacities, {}))
+        # One report does not give a rate yet
+        self._report([{'a': 100, 'b': 100}])
+        self.assertIsNone(
+            self.controller.get_weights(1, self.capacities, {}))
+
+    def test_get_weights_missing_member(self):
+        self._report([{'a': 0}, {'a': 100}])
+        self.assertIsNone(self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1}))
+
+    def test_get_weights_balanced(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 1000, 'b': 1020}])
+        self.assertIsNone(self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1}))
+
+    def test_get_weights_overloaded_member(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 3000, 'b': 1000}])
+        weights = self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1})
+        self.assertLess(weights['a'], weights['b'])
+        # The weights are rescaled from the configured weights
+        self.assertEqual(
+            {'a': int(round(100 * (2.0 / 3) ** 0.5)),
+             'b': int(round(100 * 2 ** 0.5))},
+            weights)
+
+    def test_get_weights_capacities(self):
+        # b has twice the capacity of a and gets twice its traffic
+        self._report([{'a': 0, 'b': 0}, {'a': 1000, 'b': 2000}])
+        self.assertIsNone(self.controller.get_weights(
+            1, {'a': 1, 'b': 2}, {'a': 1, 'b': 2}))
+
+    def test_get_weights_summed_over_sources(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 2000, 'b': 0}],
+                     source='host1')
+        self._report([{'a': 0, 'b': 0}, {'a': 0, 'b': 2000}],
+                     source='host2')
+        self.assertIsNone(self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1}))
+        self.assertEqual({'a': 2000, 'b': 2000}, self.controller.get_rates(1))
+
+    def test_get_weights_idle_member(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 1000, 'b': 0}])
+        weights = self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1})
+        self.assertEqual(
+            {'a': int(round(100 * 0.5 ** 0.5)),
+             'b': int(round(100 * 2 ** 0.5))},
+            weights)
+
+    def test_get_weights_from_installed_weights(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 1000, 'b': 1000}])
+        # Balanced with weights already moved, nothing to change
+        self.assertIsNone(self.controller.get_weights(
+            1, self.capacities, {'a': 50, 'b': 150}))
+
+    def test_get_weights_resets_samples(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 3000, 'b': 1000}])
+        self.assertIsNotNone(self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1}))
+        # The rates measured under the previous weights are dropped
+        self.assertEqual({}, self.controller.get_rates(1))
+        self.controller.update_counters(
+            1, 'host1', {'a': 0, 'b': 0}, 2.0)
+        self.assertEqual({}, self.controller.get_rates(1))
+
+    def test_counter_reset(self):
+        self._report([{'a': 5000, 'b': 0}, {'a': 1000, 'b': 1000},
+                      {'a': 3000, 'b': 2000}])
+        # The reset only rebaselines the counter, the elapsed time since
+        # the reset is not known
+        self.assertEqual({'a': 2000, 'b': 1000}, self.controller.get_rates(1))
+
+    def test_counter_reset_no_rate(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 4000, 'b': 1000},
+                      {'a': 1000, 'b': 2000}])
+        self.assertEqual({'b': 1000}, self.controller.get_rates(1))
+
+    def test_stale_source(self):
+        self.controller = load_feedback.WeightController(max_age=5)
+        self._report([{'a': 0, 'b': 0}, {'a': 2000, 'b': 0}],
+                     source='host1')
+        self.controller.update_counters(1, 'host2', {'a': 0, 'b': 0}, 5.0)
+        self.controller.update_counters(
+            1, 'host2', {'a': 1000, 'b': 1000}, 6.0)
+        self.assertEqual({'a': 3000, 'b': 1000}, self.controller.get_rates(1))
+        # host1 no longer reports, its rates stop counting
+        self.controller.update_counters(
+            1, 'host2', {'a': 2000, 'b': 2000}, 7.0)
+        self.assertEqual({'a': 1000, 'b': 1000}, self.controller.get_rates(1))
+
+    def test_removed_member(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 3000, 'b': 1000}])
+        self.assertIsNone(self.controller.get_weights(1, {'a': 1}, {'a': 1}))
+        self.assertEqual({'a': 3000}, self.controller.get_rates(1))
+
+    def test_forget(self):
+        self._report([{'a': 0, 'b': 0}, {'a': 3000, 'b': 1000}])
+        self.controller.forget(1)
+        self.assertEqual({}, self.controller.get_rates(1))
+        self.assertIsNone(self.controller.get_weights(
+            1, self.capacities, {'a': 1, 'b': 1}))
@@ -0,0 +1,215 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import mock
+from oslo_config import cfg
+
+from networking_sfc.services.sfc.common import flowrule_codec
+from networking_sfc.services.sfc.drivers.ovs import rpc
+from networking_sfc.tests import base
+
+
+class SingleFlightTestCase(base.BaseTestCase):
+
+    def test_do_shares_in_flight_call(self):
+        single_flight = rpc.SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def func():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return ['result']
+
+        def caller():
+            results.append(single_flight.do('key', func))
+
+        threads = [threading.Thread(target=caller)]
+        threads[0].start()
+        started.wait()
+        for i in range(3):
+            thread = threading.Thread(target=caller)
+            thread.start()
+            threads.append(thread)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+        self.assertEqual([['result']] * 4, results)
+
+    def test_do_runs_again_once_done(self):
+        single_flight = rpc.SingleFlight()
+        func = mock.Mock(return_value='result')
+        self.assertEqual('result', single_flight.do('key', func, 1))
+        self.assertEqual('result', single_flight.do('key', func, 1))
+        self.assertEqual(2, func.call_count)
+
+    def test_do_shares_in_flight_error(self):
+        single_flight = rpc.SingleFlight()
+        entered = threading.Semaphore(0)
+
+        class CountingLock(object):
+            # Counts the callers entering do, the waiters lock once
+
+            def __init__(self):
+                self._lock = threading.Lock()
+
+            def __enter__(self):
+                self._lock.acquire()
+                entered.release()
+
+            def __exit__(self, *args):
+                self._lock.release()
+
+        single_flight._lock = CountingLock()
+        calls = []
+        errors = []
+
+        def func():
+            calls.append(1)
+            # The leader and the 3 waiters are in do
+            for i in range(4):
+                entered.acquire()
+            raise ValueError('leader')
+
+        def caller():
+            try:
+                single_flight.do('key', func)
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=caller) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+        self.assertEqual(['leader'] * 4, errors)
+
+    def test_do_error_releases_key(self):
+        single_flight = rpc.SingleFlight()
+        func = mock.Mock(side_effect=[ValueError, 'result'])
+        self.assertRaises(ValueError, single_flight.do, 'key', func)
+        self.assertEqual('result', single_flight.do('key', func))
+
+
+class SfcRpcCallbackTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(SfcRpcCallbackTestCase, self).setUp()
+        self.driver = mock.Mock()
+        self.driver.get_port_chains_generation.return_value = 1
+        self.driver.get_all_src_node_flowrules.return_value = [
+            {'nsp': 256}]
+        self.driver.get_local_src_node_flowrules.side_effect = (
+            lambda context, host, flow_rules: flow_rules)
+        self.callback = rpc.SfcRpcCallback(self.driver)
+
+    def test_get_all_src_node_flowrules_cached_per_generation(self):
+        for host in ('host1', 'host2'):
+            self.assertEqual(
+                [{'nsp': 256}],
+                self.callback.get_all_src_node_flowrules(
+                    'context', host=host))
+        self.driver.get_all_src_node_flowrules.assert_called_once_with(
+            'context')
+
+        self.driver.get_port_chains_generation.return_value = 2
+        self.driver.get_all_src_node_flowrules.return_value = []
+        self.assertEqual(
+            [],
+            self.callback.get_all_src_node_flowrules(
+                'context', host='host1'))
+        self.assertEqual(
+            2, self.driver.get_all_src_node_flowrules.call_count)
+
+    def test_get_all_src_node_flowrules_localized_per_host(self):
+        self.callback.get_all_src_node_flowrules('context', host='host1')
+        self.callback.get_all_src_node_flowrules('context', host='host2')
+        self.driver.get_local_src_node_flowrules.assert_has_calls([
+            mock.call('context', 'host1', [{'nsp': 256}]),
+            mock.call('context', 'host2', [{'nsp': 256}])])
+
+    def test_get_all_src_node_flowrules_failure_not_cached(self):
+        self.driver.get_all_src_node_flowrules.return_value = None
+        self.assertIsNone(self.callback.get_all_src_node_flowrules(
+            'context', host='host1'))
+        self.assertIsNone(self.callback.get_all_src_node_flowrules(
+            'context', host='host1'))
+        self.assertEqual(
+            2, self.driver.get_all_src_node_flowrules.call_count)
+
+    def test_get_flow_classifiers(self):
+        self.driver.get_flow_classifiers_by_ids.return_value = [{'id': 'fc1'}]
+        self.assertEqual(
+            [{'id': 'fc1'}],
+            self.callback.get_flow_classifiers('context', fc_ids=['fc1']))
+        self.driver.get_flow_classifiers_by_ids.assert_called_once_with(
+            'context', ['fc1'])
+
+    def test_update_group_stats(self):
+        group_stats = [{
+            'group_id': 1,
+            'buckets': [{'mac_address': '00:01:02:03:05:07',
+                         'packet_count': 10, 'byte_count': 1000}]
+        }]
+        self.callback.update_group_stats(
+            'context', host='host1', group_stats=group_stats,
+            timestamp=100.0)
+        self.driver.update_group_stats.assert_called_once_with(
+            'context', 'host1', group_stats, 100.0)
+
+    def test_update_flow_stats(self):
+        flow_stats = [{
+            'nsp': 256, 'nsi': 254,
+            'packets_in': 9, 'bytes_in': 882,
+            'packets_out': 8, 'bytes_out': 784
+        }]
+        self.callback.update_flow_stats(
+            'context', host='host1', flow_stats=flow_stats,
+            timestamp=100.0)
+        self.driver.update_flow_stats.assert_called_once_with(
+            'context', 'host1', flow_stats, 100.0)
+
+
+class SfcAgentRpcClientTestCase(base.BaseTestCase):
+
+    def setUp(self):
+        super(SfcAgentRpcClientTestCase, self).setUp()
+        self.get_client = mock.patch.object(rpc.n_rpc, 'get_client').start()
+        self.cctxt = self.get_client.return_value.prepare.return_value
+        self.client = rpc.SfcAgentRpcClient()
+        self.flows = {
+            'host': 'test1',
+            'nsp': 256,
+            'add_fcs': [{'id': 'fc1', 'ethertype': 'IPv4'}],
+            'del_fcs': []
+        }
+
+    def test_ask_agent_to_update_flow_rules(self):
+        self.client.ask_agent_to_update_flow_rules('context', self.flows)
+        self.cctxt.cast.assert_called_once_with(
+            'context', 'update_flow_rules', flowrule_entries=self.flows)
+
+    def test_ask_agent_to_update_flow_rules_compact(self):
+        cfg.CONF.set_override('compact_flowrules', True, 'sfc_ovs')
+        self.client.ask_agent_to_update_flow_rules('context', self.flows)
+        self.cctxt.cast.assert_called_once_with(
+            'context', 'update_flow_rules',
+            flowrule_entries=flowrule_codec.encode_flowrule(self.flows))
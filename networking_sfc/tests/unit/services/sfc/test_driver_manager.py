@@ -72,6 +72,35 @@ class DriverManagerTestCase(base.BaseTestCase):
             mock_driver1.initialize.assert_called_once_with()
             mock_driver2.initialize.assert_called_once_with()
 
+    def test_get_driver_stats(self):
+        mock_driver = mock.Mock()
+        mock_driver.create_port_chain = mock.Mock(
+            side_effect=[None, sfc_exc.SfcException]
+        )
+        with self.driver_manager_context({
+            'dummy': mock_driver
+        }) as manager:
+            mocked_context = mock.Mock()
+            manager.create_port_chain(mocked_context)
+            self.assertRaises(
+                sfc_exc.SfcDriverError,
+                manager.create_port_chain, mocked_context
+            )
+            stats = manager.get_driver_stats()['dummy']['create_port_chain']
+            self.assertEqual(2, stats['calls'])
+            self.assertEqual(1, stats['errors'])
+
+    def test_start_rpc_listeners(self):
+        mock_driver1 = mock.Mock()
+        mock_driver1.start_rpc_listeners.return_value = ['server1']
+        mock_driver2 = mock.Mock(spec=['initialize'])
+        with self.driver_manager_context({
+            'dummy1': mock_driver1,
+            'dummy2': mock_driver2
+        }) as manager:
+            self.assertEqual(['server1'], manager.start_rpc_listeners())
+            mock_driver1.start_rpc_listeners.assert_called_once_with()
+
     def test_create_port_chain_called(self):
         mock_driver1 = mock.Mock()
         mock_driver2 = mock.Mock()
@@ -100,6 +129,34 @@ class DriverManagerTestCase(base.BaseTestCase):
                 manager.create_port_chain, mocked_context
             )
 
+    def test_create_port_chain_precommit_called(self):
+        mock_driver1 = mock.Mock()
+        mock_driver2 = mock.Mock()
+        with self.driver_manager_context({
+            'dummy1': mock_driver1,
+            'dummy2': mock_driver2
+        }) as manager:
+            mocked_context = mock.Mock()
+            manager.create_port_chain_precommit(mocked_context)
+            mock_driver1.create_port_chain_precommit.assert_called_once_with(
+                mocked_context)
+            mock_driver2.create_port_chain_precommit.assert_called_once_with(
+                mocked_context)
+
+    def test_create_port_chain_precommit_exception(self):
+        mock_driver = mock.Mock()
+        mock_driver.create_port_chain_precommit = mock.Mock(
+            side_effect=sfc_exc.SfcException
+        )
+        with self.driver_manager_context({
+            'dummy': mock_driver,
+        }) as manager:
+            mocked_context = mock.Mock()
+            self.assertRaises(
+                sfc_exc.SfcException,
+                manager.create_port_chain_precommit, mocked_context
+            )
+
     def test_update_port_chain_called(self):
         mock_driver1 = mock.Mock()
         mock_driver2 = mock.Mock()
@@ -43,6 +43,11 @@ class SfcPluginTestCase(test_sfc_db.SfcDbPluginTestCase):
     def _record_context(self, plugin_context):
         self.plugin_context = plugin_context
 
+    def test_start_rpc_listeners(self):
+        self.fake_driver_manager.start_rpc_listeners.return_value = [
+            'server']
+        self.assertEqual(['server'], self.sfc_plugin.start_rpc_listeners())
+
     def test_create_port_chain_driver_manager_called(self):
         self.fake_driver_manager.create_port_chain = mock.Mock(
             side_effect=self._record_context)
@@ -77,6 +82,25 @@ class SfcPluginTestCase(test_sfc_db.SfcDbPluginTestCase):
             mock.ANY
         )
 
+    def test_create_port_chain_precommit_driver_manager_exception(self):
+        self.fake_driver_manager.create_port_chain_precommit = mock.Mock(
+            side_effect=sfc_exc.SfcDriverError(
+                method='create_port_chain_precommit'
+            )
+        )
+        with self.port_pair_group(port_pair_group={}) as pg:
+            self._create_port_chain(
+                self.fmt,
+                {'port_pair_groups': [pg['port_pair_group']['id']]},
+                expected_res_status=500)
+            self._test_list_resources('port_chain', [])
+        driver_manager = self.fake_driver_manager
+        driver_manager.create_port_chain_precommit.assert_called_once_with(
+            mock.ANY
+        )
+        driver_manager.create_port_chain.assert_not_called()
+        driver_manager.delete_port_chain.assert_not_called()
+
     def test_update_port_chain_driver_manager_called(self):
         self.fake_driver_manager.update_port_chain = mock.Mock(
             side_effect=self._record_context)
@@ -133,6 +157,29 @@ class SfcPluginTestCase(test_sfc_db.SfcDbPluginTestCase):
                 self.assertItemsEqual(
                     res['port_chains'], [updated_port_chain])
 
+    def test_update_port_chain_precommit_driver_manager_exception(self):
+        self.fake_driver_manager.update_port_chain_precommit = mock.Mock(
+            side_effect=sfc_exc.SfcDriverError(
+                method='update_port_chain_precommit'
+            )
+        )
+        with self.port_pair_group(port_pair_group={}) as pg:
+            with self.port_chain(port_chain={
+                'name': 'test1',
+                'port_pair_groups': [pg['port_pair_group']['id']]
+            }) as pc:
+                req = self.new_update_request(
+                    'port_chains', {'port_chain': {'name': 'test2'}},
+                    pc['port_chain']['id']
+                )
+                res = req.get_response(self.ext_api)
+                self.assertEqual(res.status_int, 500)
+                res = self._list('port_chains')
+                self.assertItemsEqual(
+                    res['port_chains'], [pc['port_chain']])
+                driver_manager = self.fake_driver_manager
+                driver_manager.update_port_chain.assert_not_called()
+
     def test_delete_port_chain_manager_called(self):
         self.fake_driver_manager.delete_port_chain = mock.Mock(
             side_effect=self._record_context)
@@ -203,6 +250,18 @@ class SfcPluginTestCase(test_sfc_db.SfcDbPluginTestCase):
             mock.ANY
         )
 
+    def test_create_port_pair_group_precommit_driver_manager_exception(self):
+        self.fake_driver_manager.create_port_pair_group_precommit = (
+            mock.Mock(side_effect=sfc_exc.SfcDriverError(
+                method='create_port_pair_group_precommit'
+            ))
+        )
+        self._create_port_pair_group(self.fmt, {}, expected_res_status=500)
+        self._test_list_resources('port_pair_group', [])
+        driver_manager = self.fake_driver_manager
+        driver_manager.create_port_pair_group.assert_not_called()
+        driver_manager.delete_port_pair_group.assert_not_called()
+
     def test_update_port_pair_group_driver_manager_called(self):
         self.fake_driver_manager.update_port_pair_group = mock.Mock(
             side_effect=self._record_context)
@@ -343,6 +402,31 @@ class SfcPluginTestCase(test_sfc_db.SfcDbPluginTestCase):
                 mock.ANY
             )
 
+    def test_create_port_pair_precommit_driver_manager_exception(self):
+        self.fake_driver_manager.create_port_pair_precommit = mock.Mock(
+            side_effect=sfc_exc.SfcDriverError(
+                method='create_port_pair_precommit'
+            )
+        )
+        with self.port(
+            name='port1',
+            device_id='default'
+        ) as src_port, self.port(
+            name='port2',
+            device_id='default'
+        ) as dst_port:
+            self._create_port_pair(
+                self.fmt,
+                {
+                    'ingress': src_port['port']['id'],
+                    'egress': dst_port['port']['id']
+                },
+                expected_res_status=500)
+            self._test_list_resources('port_pair', [])
+            driver_manager = self.fake_driver_manager
+            driver_manager.create_port_pair.assert_not_called()
+            driver_manager.delete_port_pair.assert_not_called()
+
     def test_update_port_pair_driver_manager_called(self):
         self.fake_driver_manager.update_port_pair = mock.Mock(
             side_effect=self._record_context)
@@ -0,0 +1,128 @@
+# Copyright 2016 Futurewei. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from neutron.tests import base
+
+from networking_sfc.services import driver_dispatch
+
+
+class DriverStatsTestCase(base.BaseTestCase):
+
+    def test_record(self):
+        stats = driver_dispatch.DriverStats('SFC')
+        stats.record('dummy', 'create_port_chain', 0.002)
+        stats.record('dummy', 'create_port_chain', 0.2, failed=True)
+        stats.record('dummy', 'create_port_chain', 10)
+        method_stats = stats.get_stats()['dummy']['create_port_chain']
+        self.assertEqual(3, method_stats['calls'])
+        self.assertEqual(1, method_stats['errors'])
+        self.assertEqual(10000, method_stats['max_ms'])
+        self.assertEqual(1, method_stats['histogram']['le_5ms'])
+        self.assertEqual(1, method_stats['histogram']['le_500ms'])
+        self.assertEqual(1, method_stats['histogram']['inf'])
+        self.assertEqual(0, method_stats['histogram']['le_1ms'])
+
+    def test_measure_failure(self):
+        stats = driver_dispatch.DriverStats('SFC')
+
+        def measure():
+            with stats.measure('dummy', 'create_port_chain'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, measure)
+        self.assertEqual(
+            1, stats.get_stats()['dummy']['create_port_chain']['errors'])
+
+    def test_log_stats(self):
+        stats = driver_dispatch.DriverStats('SFC')
+        stats.record('dummy', 'create_port_chain', 0.002)
+        with mock.patch.object(driver_dispatch, 'LOG') as mock_log:
+            stats.log_stats()
+            self.assertEqual(1, mock_log.info.call_count)
+
+    def test_start_periodic_dump_disabled(self):
+        stats = driver_dispatch.DriverStats('SFC')
+        with mock.patch.object(
+            driver_dispatch.loopingcall, 'FixedIntervalLoopingCall'
+        ) as looping_call:
+            stats.start_periodic_dump(0)
+            self.assertFalse(looping_call.called)
+            stats.start_periodic_dump(60)
+            looping_call.return_value.start.assert_called_once_with(
+                interval=60, initial_delay=60)
+
+
+class DriverDispatcherTestCase(base.BaseTestCase):
+
+    def _make_driver(self, name, independent=False, side_effect=None):
+        driver = mock.Mock()
+        driver.name = name
+        driver.obj.independent = independent
+        driver.obj.create_port_chain.side_effect = side_effect
+        return driver
+
+    def test_call_in_order(self):
+        calls = []
+        drivers = [
+            self._make_driver(
+                name, side_effect=lambda context, name=name: calls.append(
+                    name))
+            for name in ('dummy1', 'dummy2')]
+        dispatcher = driver_dispatch.DriverDispatcher('SFC', drivers)
+        dispatcher.call('create_port_chain', 'context')
+        self.assertEqual(['dummy1', 'dummy2'], calls)
+        self.assertEqual(
+            ['dummy1', 'dummy2'], sorted(dispatcher.stats.get_stats()))
+
+    def test_call_independent_drivers_concurrently(self):
+        running = []
+        concurrency = []
+
+        def create_port_chain(context):
+            running.append(1)
+            concurrency.append(len(running))
+            eventlet.sleep(0.01)
+            running.pop()
+
+        drivers = [
+            self._make_driver(name, independent=True,
+                              side_effect=create_port_chain)
+            for name in ('dummy1', 'dummy2')]
+        dispatcher = driver_dispatch.DriverDispatcher(
+            'SFC', drivers, parallel=True)
+        dispatcher.call('create_port_chain', 'context')
+        self.assertEqual(2, max(concurrency))
+
+        dispatcher = driver_dispatch.DriverDispatcher('SFC', drivers)
+        concurrency[:] = []
+        dispatcher.call('create_port_chain', 'context')
+        self.assertEqual(1, max(concurrency))
+
+    def test_call_independent_driver_failure(self):
+        drivers = [
+            self._make_driver('dummy1', independent=True,
+                              side_effect=ValueError),
+            self._make_driver('dummy2')]
+        dispatcher = driver_dispatch.DriverDispatcher(
+            'SFC', drivers, parallel=True)
+        self.assertRaises(
+            ValueError, dispatcher.call, 'create_port_chain', 'context')
+        drivers[1].obj.create_port_chain.assert_called_once_with('context')
+        self.assertEqual(
+            1,
+            dispatcher.stats.get_stats()['dummy1']['create_port_chain'][
+                'errors'])